@@ -19,9 +19,8 @@ import traceback
 import yaml
 from utils import FileManager, DownloaderRunner
 from utils.history_manager_db import HistoryManagerDB
-from utils.import_runner import ImportRunner
-from utils.stm_import_runner import STMImportRunner
 from utils.unified_import_runner import unified_import_runner
+from utils.job_executor import job_executor
 from utils.log_stream import log_streamer
 from utils.settings_manager import SettingsManager
 from utils.scheduler import download_scheduler
@@ -32,12 +31,13 @@ from utils.auth import auth_manager, User, require_role, require_admin
 from utils.audit_logger import audit_logger
 from utils.rate_limiter import rate_limiter, limit_login, limit_api, limit_download, limit_export
 from utils.security_headers import setup_security_headers
+from utils.query_fanout import init_query_timing
 from utils.license_middleware import require_license_write_access, get_license_status_banner
 from utils.fiscal_year import (
-    get_fiscal_year_sql_filter_gregorian,
     get_fiscal_year_range_gregorian,
     get_fiscal_year_range_be
 )
+from utils.sql_helpers import sql_fiscal_year_filter
 from config.database import get_db_config, DB_TYPE
 from config.db_pool import init_pool, close_pool, get_connection as get_pooled_connection, return_connection, get_pool_status
 
@@ -58,6 +58,7 @@ from routes.master_data_api import master_data_api_bp
 from routes.benchmark_api import benchmark_api_bp
 from routes.alerts_api import alerts_api_bp
 from routes.system_api import system_api_bp
+from routes.progress_api import progress_api_bp
 
 # Flask-Login
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
@@ -100,18 +101,6 @@ def sql_interval_months(months: int) -> str:
     return f"INTERVAL '{months} months'"
 
 
-def sql_format_year_month(column: str) -> str:
-    """Generate SQL for formatting date as YYYY-MM"""
-    if DB_TYPE == 'mysql':
-        return f"DATE_FORMAT({column}, '%%Y-%%m')"
-    return f"TO_CHAR({column}, 'YYYY-MM')"
-
-
-def sql_format_month(column: str) -> str:
-    """Generate SQL for formatting date as YYYY-MM (alias for sql_format_year_month)"""
-    return sql_format_year_month(column)
-
-
 def sql_cast_numeric(expr: str) -> str:
     """Generate SQL for casting to numeric type"""
     if DB_TYPE == 'mysql':
@@ -147,20 +136,6 @@ def sql_cast_int(expr: str) -> str:
     return f"({expr})::int"
 
 
-def sql_extract_year(column: str) -> str:
-    """Generate SQL for extracting year as integer"""
-    if DB_TYPE == 'mysql':
-        return f"YEAR({column})"
-    return f"EXTRACT(YEAR FROM {column})::int"
-
-
-def sql_extract_month(column: str) -> str:
-    """Generate SQL for extracting month"""
-    if DB_TYPE == 'mysql':
-        return f"MONTH({column})"
-    return f"EXTRACT(MONTH FROM {column})"
-
-
 def sql_full_outer_join(left_table: str, right_table: str, left_alias: str, right_alias: str, join_condition: str) -> str:
     """
     Generate SQL for FULL OUTER JOIN.
@@ -210,6 +185,9 @@ app.config['SECRET_KEY'] = secret_key
 app.config['JSON_AS_ASCII'] = False
 app.config['JSON_SORT_KEYS'] = False
 
+# Per-query timings of fanned-out analytics queries (Server-Timing header)
+app.config['QUERY_TIMING_HEADER'] = os.getenv('QUERY_TIMING_HEADER', 'false').lower() == 'true'
+
 # CSRF Protection Configuration
 app.config['WTF_CSRF_ENABLED'] = True
 app.config['WTF_CSRF_TIME_LIMIT'] = None  # No time limit (rely on session expiry)
@@ -305,6 +283,9 @@ security_mode = 'strict' if is_https else 'permissive'
 setup_security_headers(app, mode=security_mode)
 logger.info(f"Security headers configured ({security_mode} mode)")
 
+# Server-Timing header for concurrent analytics queries
+init_query_timing(app)
+
 # Register blueprints
 app.register_blueprint(settings_api_bp)  # API routes
 logger.info("✓ Settings API blueprint registered")
@@ -359,6 +340,9 @@ logger.info("✓ Alerts API blueprint registered")
 app.register_blueprint(system_api_bp)  # System Health and Seed Data API routes
 logger.info("✓ System API blueprint registered")
 
+app.register_blueprint(progress_api_bp)  # Progress push (SSE) routes
+logger.info("✓ Progress API blueprint registered")
+
 # Initialize Swagger UI for API documentation
 # Load OpenAPI spec from YAML file
 openapi_spec_path = os.path.join(app.root_path, 'static', 'swagger', 'openapi.yaml')
@@ -382,7 +366,8 @@ swagger_config = {
 # Load OpenAPI spec from YAML file
 try:
     with open(openapi_spec_path, 'r', encoding='utf-8') as f:
-        swagger_template = yaml.safe_load(f)
+        # libyaml's loader parses the spec ~10x faster than the pure-Python one
+        swagger_template = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
     logger.info("✓ Loaded OpenAPI spec from openapi.yaml")
 except FileNotFoundError:
     logger.warning("⚠ OpenAPI spec file not found, using minimal template")
@@ -400,8 +385,8 @@ logger.info("✓ Swagger UI initialized at /api/docs")
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user for Flask-Login."""
-    return auth_manager.get_user_by_id(int(user_id))
+    """Load user for Flask-Login (cached - progress polling would otherwise query users per request)."""
+    return auth_manager.get_user_by_id(int(user_id), use_cache=True)
 
 # Inject current_user and license info into all templates
 @app.context_processor
@@ -418,8 +403,6 @@ history_manager = HistoryManagerDB(download_type='rep')  # REP files
 stm_history_manager = HistoryManagerDB(download_type='stm')  # Statement files
 file_manager = FileManager()
 downloader_runner = DownloaderRunner()
-import_runner = ImportRunner()
-stm_import_runner = STMImportRunner()
 settings_manager = SettingsManager()
 
 # Make managers accessible to blueprints
@@ -430,8 +413,11 @@ app.config['stm_history_manager'] = stm_history_manager
 app.config['file_manager'] = file_manager
 app.config['FILE_MANAGER'] = file_manager  # Alias for backward compatibility
 app.config['UNIFIED_IMPORT_RUNNER'] = unified_import_runner
-app.config['import_runner'] = import_runner
-app.config['stm_import_runner'] = stm_import_runner
+
+
+def init_job_executor():
+    """Start job workers in the serving process (runs imports and downloads queued before a restart)"""
+    job_executor.start()
 
 
 def check_license_status():
@@ -573,51 +559,6 @@ def get_db_connection():
         return None
 
 
-def get_import_status_map():
-    """
-    Get mapping of filename -> import status from database
-
-    Returns:
-        dict: {filename: {'imported': bool, 'file_id': int, 'imported_at': str}}
-    """
-    status_map = {}
-    conn = get_db_connection()
-
-    if not conn:
-        return status_map
-
-    try:
-        cursor = conn.cursor()
-        query = """
-            SELECT filename, id, status, import_completed_at, imported_records, total_records
-            FROM eclaim_imported_files
-            WHERE status = 'completed'
-            ORDER BY import_completed_at DESC
-        """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-
-        for row in rows:
-            filename, file_id, status, completed_at, imported_records, total_records = row
-            status_map[filename] = {
-                'imported': True,
-                'file_id': file_id,
-                'imported_at': completed_at.isoformat() if completed_at else None,
-                'imported_records': imported_records or 0,
-                'total_records': total_records or 0
-            }
-
-        cursor.close()
-        conn.close()
-
-    except Exception as e:
-        app.logger.error(f"Error getting import status: {e}")
-        if conn:
-            conn.close()
-
-    return status_map
-
-
 # =============================================================================
 # AUTHENTICATION ROUTES
 # =============================================================================
@@ -877,59 +818,23 @@ def upload():
     if filter_year is None:
         filter_year = now.year + 543  # Convert to Buddhist Era
 
-    all_files = history_manager.get_all_downloads()
-
-    # Get import status from database
-    import_status_map = get_import_status_map()
-
-    # Filter by month/year and type
-    filtered_files = []
-    for file in all_files:
-        file_month = file.get('month')
-        file_year = file.get('year')
-
-        # If month/year not in file metadata, try to extract from filename
-        if file_month is None or file_year is None:
-            import re
-            match = re.search(r'_(\d{4})(\d{2})\d{2}_', file.get('filename', ''))
-            if match:
-                file_year = int(match.group(1))
-                file_month = int(match.group(2))
-
-        # Apply month/year filter
-        if file_month != filter_month or file_year != filter_year:
-            continue
-
-        # Apply type filter if specified
-        if filter_type:
-            file_path = file.get('file_path', '')
-            if filter_type == 'rep' and '/rep/' not in file_path:
-                continue
-            elif filter_type == 'stm' and '/stm/' not in file_path:
-                continue
-            elif filter_type == 'smt' and '/smt/' not in file_path:
-                continue
-
-        filtered_files.append(file)
-
-    # Sort by download date (most recent first)
-    filtered_files = sorted(
-        filtered_files,
-        key=lambda d: d.get('download_date') or '',
-        reverse=True
+    # Filter, join import status, count and paginate in the database
+    result = history_manager.get_downloads_page(
+        page=page,
+        per_page=per_page,
+        month=filter_month,
+        year=filter_year,
+        file_type=filter_type
     )
-
-    # Calculate pagination
-    total_files = len(filtered_files)
-    total_pages = (total_files + per_page - 1) // per_page
-    page = max(1, min(page, total_pages if total_pages > 0 else 1))
-
-    # Paginate
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    paginated_files = filtered_files[start_idx:end_idx]
-
-    # Format for display and add import status
+    paginated_files = result['files']
+    page = result['page']
+    per_page = result['per_page']
+    total_files = result['total_files']
+    total_pages = result['total_pages']
+    imported_count = result['imported_count']
+    not_imported_count = result['not_imported_count']
+
+    # Format for display
     for file in paginated_files:
         file['size_formatted'] = humanize.naturalsize(file.get('file_size') or 0)
         try:
@@ -943,19 +848,6 @@ def upload():
             file['date_formatted'] = file.get('download_date', 'Unknown')
             file['date_relative'] = 'Unknown'
 
-        # Add import status
-        filename = file.get('filename', '')
-        if filename in import_status_map:
-            file['import_status'] = import_status_map[filename]
-            file['imported'] = True
-        else:
-            file['import_status'] = None
-            file['imported'] = False
-
-    # Count imported vs not imported
-    imported_count = sum(1 for f in filtered_files if f.get('imported', False))
-    not_imported_count = len(filtered_files) - imported_count
-
     # Get available months/years for filter dropdown
     available_dates = history_manager.get_available_dates()
 
@@ -998,86 +890,29 @@ def files():
     filter_date_from = request.args.get('date_from', default_date_from, type=str)
     filter_date_to = request.args.get('date_to', default_date_to, type=str)
 
-    all_files = history_manager.get_all_downloads()
-
-    # Get import status from database
-    import_status_map = get_import_status_map()
-
-    # Filter by date range, type, and search
-    filtered_files = []
-    for file in all_files:
-        # Extract date from filename (format: eclaim_10670_OP_25690106_xxx.xls → 2569-01-06)
-        import re
-        match = re.search(r'_(\d{4})(\d{2})(\d{2})_', file.get('filename', ''))
-        if match:
-            file_year = int(match.group(1))
-            file_month = int(match.group(2))
-            file_day = int(match.group(3))
-            # Convert Buddhist Era to Gregorian (2569 → 2026)
-            file_date_str = f"{file_year - 543:04d}-{file_month:02d}-{file_day:02d}"
-        else:
-            # Fallback: use download_date
-            download_date = file.get('download_date', '')
-            if download_date:
-                try:
-                    dt = datetime.fromisoformat(download_date)
-                    file_date_str = dt.strftime('%Y-%m-%d')
-                except (ValueError, TypeError):
-                    file_date_str = None
-            else:
-                file_date_str = None
-
-        # Apply date range filter
-        if filter_date_from and file_date_str:
-            if file_date_str < filter_date_from:
-                continue
-
-        if filter_date_to and file_date_str:
-            if file_date_str > filter_date_to:
-                continue
-
-        # Apply type filter if specified
-        if filter_type:
-            file_path = file.get('file_path') or ''
-            filename = file.get('filename', '').lower()
-
-            # Check both file_path and filename for type matching
-            if filter_type == 'rep':
-                if '/rep/' not in file_path and 'eclaim_' not in filename:
-                    continue
-            elif filter_type == 'stm':
-                if '/stm/' not in file_path and 'stm_' not in filename:
-                    continue
-            elif filter_type == 'smt':
-                if '/smt/' not in file_path and 'smt_budget_' not in filename:
-                    continue
-
-        # Apply search filter if specified
-        if filter_search:
-            filename = file.get('filename', '').lower()
-            if filter_search.lower() not in filename:
-                continue
-
-        filtered_files.append(file)
-
-    # Sort by download date (most recent first)
-    filtered_files = sorted(
-        filtered_files,
-        key=lambda d: d.get('download_date') or '',
-        reverse=True
-    )
-
-    # Calculate pagination
-    total_files = len(filtered_files)
-    total_pages = (total_files + per_page - 1) // per_page  # Ceiling division
-    page = max(1, min(page, total_pages if total_pages > 0 else 1))
-
-    # Paginate
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    paginated_files = filtered_files[start_idx:end_idx]
+    filter_status = request.args.get('status', type=str)  # imported / pending
+    if filter_status not in ('imported', 'pending'):
+        filter_status = None
 
-    # Format for display and add import status
+    # Filter, join import status, count and paginate in the database
+    result = history_manager.get_downloads_page(
+        page=page,
+        per_page=per_page,
+        date_from=filter_date_from,
+        date_to=filter_date_to,
+        file_type=filter_type,
+        search=filter_search,
+        import_status=filter_status
+    )
+    paginated_files = result['files']
+    page = result['page']
+    per_page = result['per_page']
+    total_files = result['total_files']
+    total_pages = result['total_pages']
+    imported_count = result['imported_count']
+    not_imported_count = result['not_imported_count']
+
+    # Format for display
     for file in paginated_files:
         file['size_formatted'] = humanize.naturalsize(file.get('file_size') or 0)
         try:
@@ -1096,19 +931,6 @@ def files():
             file['date_formatted'] = file.get('download_date', 'Unknown')
             file['date_relative'] = 'Unknown'
 
-        # Add import status
-        filename = file.get('filename', '')
-        if filename in import_status_map:
-            file['import_status'] = import_status_map[filename]
-            file['imported'] = True
-        else:
-            file['import_status'] = None
-            file['imported'] = False
-
-    # Count imported vs not imported (from filtered files)
-    imported_count = sum(1 for f in filtered_files if f.get('imported', False))
-    not_imported_count = len(filtered_files) - imported_count
-
     # Get available months/years for filter dropdown
     available_dates = history_manager.get_available_dates()
 
@@ -1129,6 +951,7 @@ def files():
         filter_date_from=filter_date_from,
         filter_date_to=filter_date_to,
         filter_search=filter_search,
+        filter_status=filter_status,
         available_dates=available_dates,
         schedule_settings=schedule_settings,
         schedule_jobs=schedule_jobs
@@ -1314,105 +1137,21 @@ def data_management():
     filter_month = start_month or now.month
     filter_year = start_year or (now.year + 543)
 
-    all_files = history_manager.get_all_downloads()
-
-    # Get import status from database
-    import_status_map = get_import_status_map()
-
-    # Helper function to convert month/year to comparable number
-    def date_to_num(m, y):
-        return y * 12 + m
-
-    # Filter files
-    filtered_files = []
-    for file in all_files:
-        file_month = file.get('month')
-        file_year = file.get('year')
-
-        # If month/year not in file metadata, try to extract from filename
-        if file_month is None or file_year is None:
-            import re
-            match = re.search(r'_(\d{4})(\d{2})\d{2}_', file.get('filename', ''))
-            if match:
-                file_year = int(match.group(1))
-                file_month = int(match.group(2))
-
-        # Skip if still no date info
-        if file_month is None or file_year is None:
-            if not show_all_dates:
-                continue
-        else:
-            # Date range filter
-            if not show_all_dates:
-                file_date_num = date_to_num(file_month, file_year)
-
-                if start_month and start_year:
-                    start_num = date_to_num(start_month, start_year)
-                    if file_date_num < start_num:
-                        continue
-
-                if end_month and end_year:
-                    end_num = date_to_num(end_month, end_year)
-                    if file_date_num > end_num:
-                        continue
-
-        # Scheme filter (check filename)
-        if filter_scheme:
-            filename_lower = file.get('filename', '').lower()
-            if filter_scheme not in filename_lower:
-                continue
-
-        # File type filter (op, ip, orf, appeal)
-        if filter_file_type:
-            filename_upper = file.get('filename', '').upper()
-            if filter_file_type == 'op':
-                # Match OP but not OPLGO, OPSSS, OP_APPEAL
-                if '_OP_' not in filename_upper and not filename_upper.endswith('_OP.xls'):
-                    continue
-            elif filter_file_type == 'ip':
-                # Match IP but not IPLGO, IPSSS, IP_APPEAL
-                if '_IP_' not in filename_upper and not filename_upper.endswith('_IP.xls'):
-                    continue
-            elif filter_file_type == 'orf':
-                if '_ORF_' not in filename_upper:
-                    continue
-            elif filter_file_type == 'appeal':
-                if 'APPEAL' not in filename_upper:
-                    continue
-
-        # Add import status early for status filtering
-        filename = file.get('filename', '')
-        file['imported'] = filename in import_status_map
-        if filename in import_status_map:
-            file['import_status'] = import_status_map[filename]
-        else:
-            file['import_status'] = None
-
-        # Status filter
-        if filter_status:
-            if filter_status == 'imported' and not file['imported']:
-                continue
-            if filter_status == 'pending' and file['imported']:
-                continue
-
-        filtered_files.append(file)
-
-    # Sort by download date (most recent first)
-    filtered_files = sorted(
-        filtered_files,
-        key=lambda d: d.get('download_date') or '',
-        reverse=True
+    # Filter, join import status, count and paginate in the database
+    result = history_manager.get_downloads_page(
+        page=page,
+        per_page=per_page,
+        period_start=(start_year, start_month) if not show_all_dates and start_month and start_year else None,
+        period_end=(end_year, end_month) if not show_all_dates and end_month and end_year else None,
+        scheme=filter_scheme or None,
+        rep_file_type=filter_file_type or None,
+        import_status=filter_status or None
     )
-
-    # Calculate pagination
-    total_files_filtered = len(filtered_files)
-    total_pages = (total_files_filtered + per_page - 1) // per_page
-    page = max(1, min(page, total_pages if total_pages > 0 else 1))
-
-    # Paginate
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    paginated_files = filtered_files[start_idx:end_idx]
+    paginated_files = result['files']
+    page = result['page']
+    per_page = result['per_page']
+    total_pages = result['total_pages']
+    total_files_filtered = result['total_files']
 
     # Format for display (import status already added during filtering)
     for file in paginated_files:
@@ -1428,10 +1167,6 @@ def data_management():
             file['date_formatted'] = file.get('download_date', 'Unknown')
             file['date_relative'] = 'Unknown'
 
-    # Count imported vs not imported (from filtered files, not all files)
-    filtered_imported_count = sum(1 for f in filtered_files if f.get('imported', False))
-    filtered_not_imported_count = len(filtered_files) - filtered_imported_count
-
     # Get available months/years for filter
     available_dates = history_manager.get_available_dates()
 
@@ -1464,30 +1199,14 @@ def data_management():
             if conn:
                 conn.close()
 
-    # Calculate file types count
-    file_types = {}
-    for f in filtered_files:
-        ftype = f.get('file_type', 'unknown').upper()
-        file_types[ftype] = file_types.get(ftype, 0) + 1
-
-    # Get last download time
-    last_run = 'Never'
-    if filtered_files:
-        try:
-            latest = max(filtered_files, key=lambda x: x.get('download_date', ''))
-            last_run = latest.get('download_date', 'Unknown')[:19]  # Truncate to datetime
-        except (ValueError, TypeError):
-            pass
-
-    # Calculate stats (from filtered files to match filter selection)
-    stats = {
-        'total_files': len(filtered_files),
-        'total_size': humanize.naturalsize(sum((f.get('file_size') or 0) for f in filtered_files)),
-        'imported_count': filtered_imported_count,
-        'not_imported_count': filtered_not_imported_count,
-        'file_types': file_types,
-        'last_run': last_run
-    }
+    # Filtered totals from the page query; file types and last run from cached history stats
+    stats = history_manager.get_statistics()
+    stats.update({
+        'total_files': total_files_filtered,
+        'total_size': humanize.naturalsize(result['total_size']),
+        'imported_count': result['imported_count'],
+        'not_imported_count': result['not_imported_count']
+    })
 
     # Get schedule settings for display
     schedule_settings = {
@@ -1820,11 +1539,12 @@ def get_analytics_date_filter():
     if fiscal_year:
         # Use standardized fiscal year calculation from utils/fiscal_year.py
         # FY 2569 BE = Oct 2025 CE - Sep 2026 CE (1 Oct 2025 - 30 Sep 2026)
-        where_clause, where_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+        where_clause, where_params = sql_fiscal_year_filter(fiscal_year)
         where_clauses.append(where_clause)
         params.extend(where_params)
+        fy_start, fy_end = get_fiscal_year_range_gregorian(fiscal_year)
         filter_info['fiscal_year'] = fiscal_year
-        filter_info['date_range'] = f"{where_params[0]} to {where_params[1]}"
+        filter_info['date_range'] = f"{fy_start} to {fy_end}"
     elif start_date or end_date:
         if start_date:
             where_clauses.append("dateadm >= %s")
@@ -1840,17 +1560,11 @@ def get_analytics_date_filter():
 
 
 def get_available_fiscal_years(cursor):
-    """Get list of available fiscal years from data"""
-    year_expr = sql_extract_year('dateadm')
-    month_expr = sql_extract_month('dateadm')
-    cursor.execute(f"""
-        SELECT DISTINCT
-            CASE
-                WHEN {month_expr} >= 10 THEN {year_expr} + 544
-                ELSE {year_expr} + 543
-            END as fiscal_year
+    """Get list of available fiscal years from data (indexed fiscal_year_be)"""
+    cursor.execute("""
+        SELECT DISTINCT fiscal_year_be as fiscal_year
         FROM claim_rep_opip_nhso_item
-        WHERE dateadm IS NOT NULL
+        WHERE fiscal_year_be IS NOT NULL
         ORDER BY fiscal_year DESC
     """)
     return [row[0] for row in cursor.fetchall()]
@@ -2302,9 +2016,27 @@ def api_get_hospital_code():
 # Main Entry Point
 # =============================================================================
 
+# Denial model preload: 'background' thread when serving with python app.py,
+# 'import' loads it while app is imported (gunicorn --preload: the master maps
+# the model once and workers share its pages), 'off' loads on first use
+ML_PRELOAD = os.getenv('ML_PRELOAD', 'background').lower()
+
+if ML_PRELOAD == 'import':
+    from utils.ml.predictor import preload_model
+    preload_model(background=False)
+
+
 if __name__ == '__main__':
+    debug = os.getenv('FLASK_ENV') == 'development'
+    # With the reloader only the serving child starts job workers and preloads
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_job_executor()
+        if ML_PRELOAD == 'background':
+            from utils.ml.predictor import preload_model
+            preload_model()
+
     app.run(
         host='0.0.0.0',
         port=5001,
-        debug=(os.getenv('FLASK_ENV') == 'development')
+        debug=debug
     )
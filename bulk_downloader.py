@@ -14,6 +14,7 @@ import subprocess
 # Import the main downloader
 from eclaim_downloader_http import EClaimDownloader
 from utils.logging_config import setup_logger, safe_format_exception
+from utils.progress_stream import progress_hub
 
 # Set up secure logging with credential masking
 logger = setup_logger('bulk_downloader', enable_masking=True)
@@ -178,9 +179,10 @@ class BulkDownloader:
         return None
 
     def save_progress(self, progress):
-        """Save progress to file"""
+        """Save progress to file and push it to the 'download:bulk' progress channel"""
         with open(self.progress_file, 'w', encoding='utf-8') as f:
             json.dump(progress, f, ensure_ascii=False, indent=2)
+        progress_hub.publish('download:bulk', {**progress, 'running': progress.get('status') == 'running'})
 
     def monitor_file_count(self, month, year, scheme, progress):
         """
@@ -233,7 +235,16 @@ class BulkDownloader:
                 print(f"Monitor error: {e}", flush=True)
                 break
 
-    def run_bulk_download(self, start_month, start_year, end_month, end_year, schemes=None, auto_import=False):
+    def wait(self, seconds, should_stop=None):
+        """Sleep between iterations, returning early once should_stop() is True"""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if should_stop and should_stop():
+                return
+            time.sleep(max(0, min(0.5, deadline - time.monotonic())))
+
+    def run_bulk_download(self, start_month, start_year, end_month, end_year, schemes=None, auto_import=False,
+                          should_stop=None):
         """
         Execute downloads sequentially for each month and scheme in the date range
 
@@ -245,6 +256,11 @@ class BulkDownloader:
             schemes (list, optional): List of scheme codes to download.
                                      Defaults to DEFAULT_ENABLED_SCHEMES.
             auto_import (bool): Whether to auto-import files after each download iteration.
+            should_stop (callable, optional): Checked before each iteration and file;
+                                             the bulk download stops when it returns True.
+
+        Returns:
+            dict: Final progress (status completed or cancelled)
         """
         # Start job tracking
         job_id = None
@@ -325,6 +341,7 @@ class BulkDownloader:
             stream_log(f"Auto-import: ENABLED", 'success')
 
         iteration = 0
+        cancelled = False
         # Process each month
         for month_idx, (month, year) in enumerate(date_range, 1):
             stream_log(f"\n{'='*60}")
@@ -333,6 +350,11 @@ class BulkDownloader:
 
             # Process each scheme for this month
             for scheme_idx, scheme in enumerate(scheme_codes, 1):
+                if should_stop and should_stop():
+                    cancelled = True
+                    stream_log(f"Bulk download cancelled after {iteration}/{total_iterations} iterations", 'warning')
+                    break
+
                 iteration += 1
                 pct = int(iteration / total_iterations * 100)
                 stream_log(f"\n[{iteration}/{total_iterations}] ({pct}%) {month}/{year} - Scheme: {scheme.upper()}")
@@ -354,18 +376,19 @@ class BulkDownloader:
                     'started_at': datetime.now().isoformat()
                 }
 
-                try:
-                    # Start monitoring thread
-                    self.stop_monitoring = False
-                    monitor_thread = threading.Thread(
-                        target=self.monitor_file_count,
-                        args=(month, year, scheme, progress),
-                        daemon=True
-                    )
-                    monitor_thread.start()
+                # Start monitoring thread
+                self.stop_monitoring = False
+                monitor_thread = threading.Thread(
+                    target=self.monitor_file_count,
+                    args=(month, year, scheme, progress),
+                    daemon=True
+                )
+                monitor_thread.start()
+                downloader = None
 
+                try:
                     # Create downloader for this specific month/year/scheme
-                    downloader = EClaimDownloader(month=month, year=year, scheme=scheme)
+                    downloader = EClaimDownloader(month=month, year=year, scheme=scheme, should_stop=should_stop)
 
                     # Get initial files list (using filenames)
                     from utils.history_manager import HistoryManager
@@ -382,6 +405,7 @@ class BulkDownloader:
                     # Stop monitoring thread
                     self.stop_monitoring = True
                     monitor_thread.join(timeout=2)
+                    cancelled = downloader.cancelled
 
                     # Get final files list and find new downloads
                     final_files = [
@@ -413,7 +437,7 @@ class BulkDownloader:
                     stream_log(f"✓ {scheme.upper()} {month}/{year}: {files_downloaded} files", 'success')
 
                     # Auto-import if enabled and files were downloaded
-                    if auto_import and new_file_paths:
+                    if auto_import and new_file_paths and not cancelled:
                         time.sleep(self.delay_before_import)
                         import_results = self.import_downloaded_files(new_file_paths, progress)
 
@@ -436,23 +460,36 @@ class BulkDownloader:
                     result['error'] = str(e)
                     result['completed_at'] = datetime.now().isoformat()
 
+                finally:
+                    self.stop_monitoring = True
+                    if downloader is not None:
+                        downloader.close()
+
                 # Record result
                 progress['monthly_results'].append(result)
                 progress['completed_iterations'] = iteration
                 self.save_progress(progress)
 
+                if cancelled:
+                    break
+
                 # Delay between schemes (except for last scheme of last month)
                 if scheme_idx < len(scheme_codes) or month_idx < len(date_range):
                     delay = self.delay_between_schemes if scheme_idx < len(scheme_codes) else self.delay_between_months
                     stream_log(f"Waiting {delay} seconds...")
-                    time.sleep(delay)
+                    self.wait(delay, should_stop)
+
+            if cancelled:
+                break
 
             # Update completed months
             progress['completed_months'] = month_idx
             self.save_progress(progress)
 
-        # Mark bulk operation as completed
-        progress['status'] = 'completed'
+        # Mark bulk operation as completed (or cancelled)
+        progress['status'] = 'cancelled' if cancelled else 'completed'
+        if cancelled:
+            progress['cancelled_at'] = datetime.now().isoformat()
         progress['completed_at'] = datetime.now().isoformat()
         self.save_progress(progress)
 
@@ -487,7 +524,8 @@ class BulkDownloader:
                 total_files = sum(s.get('files', 0) for s in progress.get('scheme_progress', {}).values())
                 job_history_manager.complete_job(
                     job_id=job_id,
-                    status='completed' if failed_count == 0 else 'completed_with_errors',
+                    status='cancelled' if cancelled else
+                           'completed' if failed_count == 0 else 'completed_with_errors',
                     results={
                         'total_iterations': total_iterations,
                         'completed_iterations': progress['completed_iterations'],
@@ -501,6 +539,8 @@ class BulkDownloader:
             except Exception as e:
                 stream_log(f"Warning: Could not complete job tracking: {e}", 'warning')
 
+        return progress
+
 
 def main():
     """Entry point for bulk downloader"""
@@ -0,0 +1,92 @@
+-- Migration 014: Add file_date column to download_history for server-side file filtering
+-- MySQL version
+--
+-- file_date is the service date encoded in the filename (Buddhist Era,
+-- e.g. eclaim_10670_OP_25690106_xxx.xls -> 2026-01-06), falling back to the
+-- download date. It is maintained by trigger so every writer fills it, and is
+-- indexed together with download_type so the /files page can filter a date
+-- range with an index range scan instead of loading all history into Python.
+
+-- Add file_date column if not exists
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'download_history' AND COLUMN_NAME = 'file_date') > 0,
+    'SELECT 1',
+    'ALTER TABLE download_history ADD COLUMN file_date DATE NULL'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+DROP FUNCTION IF EXISTS download_history_file_date;
+DROP TRIGGER IF EXISTS tr_download_history_file_date_insert;
+DROP TRIGGER IF EXISTS tr_download_history_file_date_update;
+
+DELIMITER //
+
+CREATE FUNCTION download_history_file_date(p_filename VARCHAR(255), p_downloaded_at DATETIME)
+RETURNS DATE
+DETERMINISTIC
+BEGIN
+    DECLARE digits CHAR(8);
+    DECLARE y INT;
+    DECLARE m INT;
+    DECLARE d INT;
+    DECLARE first_of_month DATE;
+
+    SET digits = SUBSTRING(REGEXP_SUBSTR(p_filename, '_[0-9]{8}_'), 2, 8);
+    IF digits IS NOT NULL AND digits <> '' THEN
+        SET y = CAST(SUBSTRING(digits, 1, 4) AS UNSIGNED) - 543;
+        SET m = CAST(SUBSTRING(digits, 5, 2) AS UNSIGNED);
+        SET d = CAST(SUBSTRING(digits, 7, 2) AS UNSIGNED);
+        IF y BETWEEN 1 AND 9999 AND m BETWEEN 1 AND 12 AND d >= 1 THEN
+            SET first_of_month = MAKEDATE(y, 1) + INTERVAL (m - 1) MONTH;
+            IF d <= DAY(LAST_DAY(first_of_month)) THEN
+                RETURN first_of_month + INTERVAL (d - 1) DAY;
+            END IF;
+        END IF;
+    END IF;
+    RETURN DATE(p_downloaded_at);
+END//
+
+CREATE TRIGGER tr_download_history_file_date_insert
+BEFORE INSERT ON download_history
+FOR EACH ROW
+BEGIN
+    SET NEW.file_date = download_history_file_date(NEW.filename, NEW.downloaded_at);
+END//
+
+CREATE TRIGGER tr_download_history_file_date_update
+BEFORE UPDATE ON download_history
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.filename <=> OLD.filename) OR NOT (NEW.downloaded_at <=> OLD.downloaded_at) THEN
+        SET NEW.file_date = download_history_file_date(NEW.filename, NEW.downloaded_at);
+    END IF;
+END//
+
+DELIMITER ;
+
+-- Backfill existing rows
+UPDATE download_history
+SET file_date = download_history_file_date(filename, downloaded_at)
+WHERE file_date IS NULL;
+
+-- Create index if not exists
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'download_history' AND INDEX_NAME = 'idx_download_history_type_file_date') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_download_history_type_file_date ON download_history (download_type, file_date)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Import status lookups join on filename
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'eclaim_imported_files' AND INDEX_NAME = 'idx_imported_files_filename_status') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_imported_files_filename_status ON eclaim_imported_files (filename, status)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,46 @@
+-- Migration 015: Composite indexes for download history queries
+-- MySQL version
+--
+-- Every history query filters on download_type first, then orders by
+-- downloaded_at or groups by scheme / fiscal_year / service_month. The
+-- single-column indexes from migration 005 cannot serve these together.
+
+-- Latest downloads, paginated lists (ORDER BY downloaded_at DESC LIMIT n)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'download_history' AND INDEX_NAME = 'idx_download_history_type_downloaded') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_download_history_type_downloaded ON download_history (download_type, downloaded_at)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Month/year lists and statistics (get_downloads_by_date, get_available_dates)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'download_history' AND INDEX_NAME = 'idx_download_history_type_period') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_download_history_type_period ON download_history (download_type, fiscal_year, service_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Scheme lists and statistics (get_downloads_by_scheme, get_statistics_by_scheme)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'download_history' AND INDEX_NAME = 'idx_download_history_type_scheme_period') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_download_history_type_scheme_period ON download_history (download_type, scheme, fiscal_year, service_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Failed download retries (get_failed_downloads ORDER BY last_attempt_at)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'download_history' AND INDEX_NAME = 'idx_download_history_type_status_attempt') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_download_history_type_status_attempt ON download_history (download_type, download_status, last_attempt_at)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,16 @@
+-- Migration 016: Shared rate limit counters
+-- MySQL version
+--
+-- Sliding window counters for RATE_LIMIT_BACKEND=database, so every worker
+-- and server enforces one shared limit. bucket_key is a hash of endpoint +
+-- user/IP; rows past expires_at are deleted by the rate limiter.
+
+CREATE TABLE IF NOT EXISTS rate_limit_counters (
+    bucket_key VARCHAR(64) NOT NULL PRIMARY KEY,
+    window_id BIGINT NOT NULL COMMENT 'floor(epoch / window)',
+    current_count INT NOT NULL COMMENT 'Requests allowed in window_id',
+    previous_count INT NOT NULL COMMENT 'Requests allowed in window_id - 1',
+    allowed TINYINT NOT NULL COMMENT 'Decision of the last check (1/0)',
+    expires_at DOUBLE NOT NULL COMMENT 'Epoch seconds; row is stale after this',
+    INDEX idx_rate_limit_counters_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,137 @@
+-- Migration 017: Claim search index
+-- MySQL version
+--
+-- MySQL has no trigram index, so /api/analytics/search looks claims up in
+-- claim_search_tokens: one row per normalised identifier (TRAN_ID, HN, AN,
+-- PID) of every REP and Statement claim. Exact and prefix matches use the
+-- primary key. Triggers keep the table in sync with the claim tables.
+--
+-- Normalisation (must match utils/claim_search.normalize_identifier):
+-- trimmed, dashes and spaces removed, upper case.
+--
+-- Rows deleted by ON DELETE CASCADE do not fire triggers and leave stale
+-- tokens behind; searches join on the claim id, so stale tokens never match.
+
+CREATE TABLE IF NOT EXISTS claim_search_tokens (
+    token VARCHAR(20) NOT NULL COMMENT 'Normalised identifier',
+    source VARCHAR(3) NOT NULL COMMENT 'rep or stm',
+    field VARCHAR(7) NOT NULL COMMENT 'tran_id, hn, an or pid',
+    claim_id INT NOT NULL COMMENT 'claim_rep_opip_nhso_item.id or stm_claim_item.id',
+    PRIMARY KEY (token, source, field, claim_id),
+    INDEX idx_claim_search_claim (source, claim_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+DELIMITER //
+
+DROP PROCEDURE IF EXISTS index_claim_search_tokens//
+
+CREATE PROCEDURE index_claim_search_tokens(
+    IN p_source VARCHAR(3),
+    IN p_claim_id INT,
+    IN p_tran_id VARCHAR(20),
+    IN p_hn VARCHAR(20),
+    IN p_an VARCHAR(20),
+    IN p_pid VARCHAR(20)
+)
+BEGIN
+    DELETE FROM claim_search_tokens WHERE source = p_source AND claim_id = p_claim_id;
+
+    INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+    SELECT token, p_source, field, p_claim_id
+    FROM (
+        SELECT UPPER(REPLACE(REPLACE(TRIM(p_tran_id), '-', ''), ' ', '')) AS token, 'tran_id' AS field
+        UNION ALL SELECT UPPER(REPLACE(REPLACE(TRIM(p_hn), '-', ''), ' ', '')), 'hn'
+        UNION ALL SELECT UPPER(REPLACE(REPLACE(TRIM(p_an), '-', ''), ' ', '')), 'an'
+        UNION ALL SELECT UPPER(REPLACE(REPLACE(TRIM(p_pid), '-', ''), ' ', '')), 'pid'
+    ) identifiers
+    WHERE token IS NOT NULL AND token <> '';
+END//
+
+-- REP claims
+DROP TRIGGER IF EXISTS claim_rep_search_insert//
+CREATE TRIGGER claim_rep_search_insert
+AFTER INSERT ON claim_rep_opip_nhso_item
+FOR EACH ROW
+BEGIN
+    CALL index_claim_search_tokens('rep', NEW.id, NEW.tran_id, NEW.hn, NEW.an, NEW.pid);
+END//
+
+DROP TRIGGER IF EXISTS claim_rep_search_update//
+CREATE TRIGGER claim_rep_search_update
+AFTER UPDATE ON claim_rep_opip_nhso_item
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.tran_id <=> OLD.tran_id AND NEW.hn <=> OLD.hn AND NEW.an <=> OLD.an AND NEW.pid <=> OLD.pid) THEN
+        CALL index_claim_search_tokens('rep', NEW.id, NEW.tran_id, NEW.hn, NEW.an, NEW.pid);
+    END IF;
+END//
+
+DROP TRIGGER IF EXISTS claim_rep_search_delete//
+CREATE TRIGGER claim_rep_search_delete
+AFTER DELETE ON claim_rep_opip_nhso_item
+FOR EACH ROW
+BEGIN
+    DELETE FROM claim_search_tokens WHERE source = 'rep' AND claim_id = OLD.id;
+END//
+
+-- Statement claims
+DROP TRIGGER IF EXISTS claim_stm_search_insert//
+CREATE TRIGGER claim_stm_search_insert
+AFTER INSERT ON stm_claim_item
+FOR EACH ROW
+BEGIN
+    CALL index_claim_search_tokens('stm', NEW.id, NEW.tran_id, NEW.hn, NEW.an, NEW.pid);
+END//
+
+DROP TRIGGER IF EXISTS claim_stm_search_update//
+CREATE TRIGGER claim_stm_search_update
+AFTER UPDATE ON stm_claim_item
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.tran_id <=> OLD.tran_id AND NEW.hn <=> OLD.hn AND NEW.an <=> OLD.an AND NEW.pid <=> OLD.pid) THEN
+        CALL index_claim_search_tokens('stm', NEW.id, NEW.tran_id, NEW.hn, NEW.an, NEW.pid);
+    END IF;
+END//
+
+DROP TRIGGER IF EXISTS claim_stm_search_delete//
+CREATE TRIGGER claim_stm_search_delete
+AFTER DELETE ON stm_claim_item
+FOR EACH ROW
+BEGIN
+    DELETE FROM claim_search_tokens WHERE source = 'stm' AND claim_id = OLD.id;
+END//
+
+DELIMITER ;
+
+-- Backfill existing claims
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(tran_id), '-', ''), ' ', '')), 'rep', 'tran_id', id
+FROM claim_rep_opip_nhso_item WHERE tran_id IS NOT NULL AND TRIM(tran_id) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(hn), '-', ''), ' ', '')), 'rep', 'hn', id
+FROM claim_rep_opip_nhso_item WHERE hn IS NOT NULL AND TRIM(hn) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(an), '-', ''), ' ', '')), 'rep', 'an', id
+FROM claim_rep_opip_nhso_item WHERE an IS NOT NULL AND TRIM(an) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(pid), '-', ''), ' ', '')), 'rep', 'pid', id
+FROM claim_rep_opip_nhso_item WHERE pid IS NOT NULL AND TRIM(pid) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(tran_id), '-', ''), ' ', '')), 'stm', 'tran_id', id
+FROM stm_claim_item WHERE tran_id IS NOT NULL AND TRIM(tran_id) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(hn), '-', ''), ' ', '')), 'stm', 'hn', id
+FROM stm_claim_item WHERE hn IS NOT NULL AND TRIM(hn) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(an), '-', ''), ' ', '')), 'stm', 'an', id
+FROM stm_claim_item WHERE an IS NOT NULL AND TRIM(an) <> '';
+
+INSERT IGNORE INTO claim_search_tokens (token, source, field, claim_id)
+SELECT UPPER(REPLACE(REPLACE(TRIM(pid), '-', ''), ' ', '')), 'stm', 'pid', id
+FROM stm_claim_item WHERE pid IS NOT NULL AND TRIM(pid) <> '';
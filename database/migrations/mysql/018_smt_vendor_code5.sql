@@ -0,0 +1,39 @@
+-- Migration 018: Normalised vendor code on smt_budget_transfers
+-- MySQL version
+--
+-- vendor_no is zero-padded ("0000010670") while health_offices.hcode5 is not
+-- ("10670"), so benchmark and reconciliation queries joined on
+-- TRIM(LEADING '0' FROM vendor_no) OR vendor_no (with COLLATE conversions),
+-- which cannot use an index. vendor_code5 holds the normalised code (digits
+-- without leading zeros, see utils/vendor_code.py) in the same collation as
+-- health_offices.hcode5. SMTBudgetFetcher.save_to_database fills it on
+-- insert; existing rows are backfilled here.
+
+-- Add vendor_code5 column if not exists
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'smt_budget_transfers' AND COLUMN_NAME = 'vendor_code5') > 0,
+    'SELECT 1',
+    'ALTER TABLE smt_budget_transfers ADD COLUMN vendor_code5 VARCHAR(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL AFTER vendor_no'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Backfill existing rows
+UPDATE smt_budget_transfers
+SET vendor_code5 = COALESCE(
+    NULLIF(TRIM(LEADING '0' FROM REGEXP_REPLACE(vendor_no, '[^0-9]', '')), ''),
+    NULLIF(REGEXP_REPLACE(vendor_no, '[^0-9]', ''), '')
+)
+WHERE vendor_code5 IS NULL AND vendor_no IS NOT NULL;
+
+-- Per-hospital filters (vendor_code5 = %s AND run_date BETWEEN ...) and
+-- joins to health_offices (h.hcode5 = s.vendor_code5, hcode5 is unique)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'smt_budget_transfers' AND INDEX_NAME = 'idx_smt_budget_vendor_code5_run_date') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_smt_budget_vendor_code5_run_date ON smt_budget_transfers (vendor_code5, run_date)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,80 @@
+-- Migration 019: Precomputed SMT benchmark snapshots
+-- MySQL version
+--
+-- /api/benchmark/* read fiscal-year aggregates of smt_budget_transfers from
+-- these tables instead of scanning the transfers on every request. They are
+-- filled by utils/benchmark_snapshots.py after each SMT fetch (only the
+-- fiscal years the fetch touched) or on first read of a fiscal year.
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_runs (
+    fiscal_year INT NOT NULL PRIMARY KEY COMMENT 'Buddhist Era fiscal year',
+    vendor_count INT NOT NULL DEFAULT 0,
+    built_at DATETIME DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_vendor_fy (
+    fiscal_year INT NOT NULL,
+    vendor_no VARCHAR(20) NOT NULL,
+    vendor_code5 VARCHAR(10),
+    records INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    wait_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debt_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    bond_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    first_date DATE,
+    last_date DATE,
+    PRIMARY KEY (fiscal_year, vendor_no),
+    INDEX idx_smt_benchmark_vendor_fy_code5 (vendor_code5, fiscal_year)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_vendor_month (
+    fiscal_year INT NOT NULL,
+    vendor_no VARCHAR(20) NOT NULL,
+    vendor_code5 VARCHAR(10),
+    year INT NOT NULL COMMENT 'Gregorian calendar month of run_date',
+    month INT NOT NULL,
+    records INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    wait_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debt_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fiscal_year, vendor_no, year, month),
+    INDEX idx_smt_benchmark_vendor_month_code5 (vendor_code5, fiscal_year)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_vendor_fund (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    fiscal_year INT NOT NULL,
+    vendor_no VARCHAR(20) NOT NULL,
+    vendor_code5 VARCHAR(10),
+    fund_name VARCHAR(100),
+    fund_group INT,
+    fund_group_desc VARCHAR(100),
+    records INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    wait_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debt_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    INDEX idx_smt_benchmark_vendor_fund_fy (fiscal_year, vendor_no),
+    INDEX idx_smt_benchmark_vendor_fund_code5 (vendor_code5, fiscal_year)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_group_fy (
+    fiscal_year INT NOT NULL,
+    group_type VARCHAR(20) NOT NULL COMMENT 'national, region, level',
+    group_key VARCHAR(100) NOT NULL COMMENT 'all, health_region or hospital_level',
+    hospital_count INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    avg_total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    avg_wait_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    avg_debt_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fiscal_year, group_type, group_key)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Snapshot builds find the fiscal years with data via MIN/MAX(run_date)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'smt_budget_transfers' AND INDEX_NAME = 'idx_smt_budget_run_date') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_smt_budget_run_date ON smt_budget_transfers (run_date)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
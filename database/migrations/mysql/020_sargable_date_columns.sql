@@ -0,0 +1,111 @@
+-- Migration 020: Generated month / fiscal-year columns for sargable date predicates
+-- MySQL version
+--
+-- Analytics and reconciliation grouped and filtered on expressions such as
+-- DATE_FORMAT(dateadm, '%Y-%m'), YEAR(dateadm) + 543 and
+-- LEFT(posting_date, 6), which no index can serve. The stored generated
+-- columns below are computed by the database on every insert (i.e. at
+-- import time) and indexed; utils/sql_helpers.py rewrites month and
+-- fiscal-year predicates to use them.
+--
+-- - service_month  'YYYY-MM' of the service date (dateadm / date_admit)
+-- - fiscal_year_be Buddhist Era fiscal year (Oct-Sep) of the service date
+-- - posting_month  'YYYYMM' (BE) of smt_budget_transfers.posting_date
+--
+-- Adding a stored column rebuilds the table once; run during a quiet period
+-- on large installations.
+
+-- claim_rep_opip_nhso_item.service_month
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND COLUMN_NAME = 'service_month') > 0,
+    'SELECT 1',
+    'ALTER TABLE claim_rep_opip_nhso_item ADD COLUMN service_month CHAR(7) GENERATED ALWAYS AS (DATE_FORMAT(dateadm, ''%Y-%m'')) STORED'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- claim_rep_opip_nhso_item.fiscal_year_be
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND COLUMN_NAME = 'fiscal_year_be') > 0,
+    'SELECT 1',
+    'ALTER TABLE claim_rep_opip_nhso_item ADD COLUMN fiscal_year_be INT GENERATED ALWAYS AS (YEAR(dateadm) + 543 + (MONTH(dateadm) >= 10)) STORED'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- stm_claim_item.service_month
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stm_claim_item' AND COLUMN_NAME = 'service_month') > 0,
+    'SELECT 1',
+    'ALTER TABLE stm_claim_item ADD COLUMN service_month CHAR(7) GENERATED ALWAYS AS (DATE_FORMAT(date_admit, ''%Y-%m'')) STORED'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- stm_claim_item.fiscal_year_be
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stm_claim_item' AND COLUMN_NAME = 'fiscal_year_be') > 0,
+    'SELECT 1',
+    'ALTER TABLE stm_claim_item ADD COLUMN fiscal_year_be INT GENERATED ALWAYS AS (YEAR(date_admit) + 543 + (MONTH(date_admit) >= 10)) STORED'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- smt_budget_transfers.posting_month
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'smt_budget_transfers' AND COLUMN_NAME = 'posting_month') > 0,
+    'SELECT 1',
+    'ALTER TABLE smt_budget_transfers ADD COLUMN posting_month CHAR(6) GENERATED ALWAYS AS (LEFT(posting_date, 6)) STORED'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND INDEX_NAME = 'idx_opip_fiscal_year_be') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_opip_fiscal_year_be ON claim_rep_opip_nhso_item (fiscal_year_be, service_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND INDEX_NAME = 'idx_opip_service_month') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_opip_service_month ON claim_rep_opip_nhso_item (service_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stm_claim_item' AND INDEX_NAME = 'idx_stm_claim_fiscal_year_be') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_stm_claim_fiscal_year_be ON stm_claim_item (fiscal_year_be, service_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stm_claim_item' AND INDEX_NAME = 'idx_stm_claim_service_month') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_stm_claim_service_month ON stm_claim_item (service_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'smt_budget_transfers' AND INDEX_NAME = 'idx_smt_budget_posting_month') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_smt_budget_posting_month ON smt_budget_transfers (posting_month)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
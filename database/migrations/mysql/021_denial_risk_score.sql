@@ -0,0 +1,46 @@
+-- Migration 021: Persisted denial risk score on REP claims
+-- MySQL version
+--
+-- Claims are scored by the denial model when a REP file is imported
+-- (utils/ml/risk_scoring.py) instead of on every page view.
+-- denial_risk_model records the model version that produced the score so
+-- scripts/rescore_denial_risk.py can re-score only stale rows after the
+-- model is retrained.
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND COLUMN_NAME = 'denial_risk_score') > 0,
+    'SELECT 1',
+    'ALTER TABLE claim_rep_opip_nhso_item ADD COLUMN denial_risk_score DECIMAL(5,4) NULL COMMENT ''Predicted denial probability (0-1) from the denial model'''
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND COLUMN_NAME = 'denial_risk_model') > 0,
+    'SELECT 1',
+    'ALTER TABLE claim_rep_opip_nhso_item ADD COLUMN denial_risk_model VARCHAR(40) NULL COMMENT ''Model version that produced denial_risk_score'''
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- High-risk listings: ORDER BY denial_risk_score DESC LIMIT n
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND INDEX_NAME = 'idx_opip_denial_risk_score') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_opip_denial_risk_score ON claim_rep_opip_nhso_item (denial_risk_score DESC)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Re-scoring: rows scored by another model version (or not at all)
+SET @sql = (SELECT IF(
+    (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'claim_rep_opip_nhso_item' AND INDEX_NAME = 'idx_opip_denial_risk_model') > 0,
+    'SELECT 1',
+    'CREATE INDEX idx_opip_denial_risk_model ON claim_rep_opip_nhso_item (denial_risk_model)'
+));
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
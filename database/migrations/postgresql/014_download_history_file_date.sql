@@ -0,0 +1,61 @@
+-- Migration 014: Add file_date column to download_history for server-side file filtering
+-- PostgreSQL version
+--
+-- file_date is the service date encoded in the filename (Buddhist Era,
+-- e.g. eclaim_10670_OP_25690106_xxx.xls -> 2026-01-06), falling back to the
+-- download date. It is maintained by trigger so every writer fills it, and is
+-- indexed together with download_type so the /files page can filter a date
+-- range with an index range scan instead of loading all history into Python.
+
+ALTER TABLE download_history
+ADD COLUMN IF NOT EXISTS file_date DATE;
+
+CREATE OR REPLACE FUNCTION download_history_file_date(p_filename TEXT, p_downloaded_at TIMESTAMP)
+RETURNS DATE AS $$
+DECLARE
+    digits TEXT;
+BEGIN
+    digits := substring(p_filename from '_([0-9]{8})_');
+    IF digits IS NOT NULL THEN
+        BEGIN
+            RETURN make_date(
+                substr(digits, 1, 4)::INTEGER - 543,
+                substr(digits, 5, 2)::INTEGER,
+                substr(digits, 7, 2)::INTEGER
+            );
+        EXCEPTION WHEN others THEN
+            -- Not a valid date, fall back to download date
+            NULL;
+        END;
+    END IF;
+    RETURN p_downloaded_at::DATE;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION set_download_history_file_date()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.file_date := download_history_file_date(NEW.filename, NEW.downloaded_at);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tr_download_history_file_date ON download_history;
+CREATE TRIGGER tr_download_history_file_date
+    BEFORE INSERT OR UPDATE OF filename, downloaded_at ON download_history
+    FOR EACH ROW
+    EXECUTE FUNCTION set_download_history_file_date();
+
+-- Backfill existing rows
+UPDATE download_history
+SET file_date = download_history_file_date(filename, downloaded_at)
+WHERE file_date IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_download_history_type_file_date
+    ON download_history(download_type, file_date);
+
+-- Import status lookups join on filename
+CREATE INDEX IF NOT EXISTS idx_imported_files_filename_status
+    ON eclaim_imported_files(filename, status);
+
+COMMENT ON COLUMN download_history.file_date IS 'Service date from filename (Gregorian), falls back to download date';
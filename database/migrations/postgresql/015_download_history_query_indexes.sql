@@ -0,0 +1,22 @@
+-- Migration 015: Composite indexes for download history queries
+-- PostgreSQL version
+--
+-- Every history query filters on download_type first, then orders by
+-- downloaded_at or groups by scheme / fiscal_year / service_month. The
+-- single-column indexes from migration 005 cannot serve these together.
+
+-- Latest downloads, paginated lists (ORDER BY downloaded_at DESC LIMIT n)
+CREATE INDEX IF NOT EXISTS idx_download_history_type_downloaded
+    ON download_history(download_type, downloaded_at);
+
+-- Month/year lists and statistics (get_downloads_by_date, get_available_dates)
+CREATE INDEX IF NOT EXISTS idx_download_history_type_period
+    ON download_history(download_type, fiscal_year, service_month);
+
+-- Scheme lists and statistics (get_downloads_by_scheme, get_statistics_by_scheme)
+CREATE INDEX IF NOT EXISTS idx_download_history_type_scheme_period
+    ON download_history(download_type, scheme, fiscal_year, service_month);
+
+-- Failed download retries (get_failed_downloads ORDER BY last_attempt_at)
+CREATE INDEX IF NOT EXISTS idx_download_history_type_status_attempt
+    ON download_history(download_type, download_status, last_attempt_at);
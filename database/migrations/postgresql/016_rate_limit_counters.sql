@@ -0,0 +1,17 @@
+-- Migration 016: Shared rate limit counters
+-- PostgreSQL version
+--
+-- Sliding window counters for RATE_LIMIT_BACKEND=database, so every worker
+-- and server enforces one shared limit. bucket_key is a hash of endpoint +
+-- user/IP; rows past expires_at are deleted by the rate limiter.
+
+CREATE TABLE IF NOT EXISTS rate_limit_counters (
+    bucket_key VARCHAR(64) PRIMARY KEY,
+    window_id BIGINT NOT NULL,              -- floor(epoch / window)
+    current_count INTEGER NOT NULL,         -- Requests allowed in window_id
+    previous_count INTEGER NOT NULL,        -- Requests allowed in window_id - 1
+    allowed SMALLINT NOT NULL,              -- Decision of the last check (1/0)
+    expires_at DOUBLE PRECISION NOT NULL    -- Epoch seconds; row is stale after this
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limit_counters_expires ON rate_limit_counters(expires_at);
@@ -0,0 +1,26 @@
+-- Migration 017: Claim search index
+-- PostgreSQL version
+--
+-- /api/analytics/search matches TRAN_ID, HN, AN and PID exactly first
+-- (btree indexes) and falls back to substring ILIKE. Trigram GIN indexes
+-- serve the substring search, so it no longer scans the claim tables.
+-- Building them on large claim tables takes a few minutes.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- REP claims
+CREATE INDEX IF NOT EXISTS idx_opip_tran_id_trgm ON claim_rep_opip_nhso_item USING gin (tran_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_opip_hn_trgm ON claim_rep_opip_nhso_item USING gin (hn gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_opip_an_trgm ON claim_rep_opip_nhso_item USING gin (an gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_opip_pid_trgm ON claim_rep_opip_nhso_item USING gin (pid gin_trgm_ops);
+
+-- Statement claims (AN had no index for the exact path)
+CREATE INDEX IF NOT EXISTS idx_stm_claim_an ON stm_claim_item(an);
+CREATE INDEX IF NOT EXISTS idx_stm_claim_tran_id_trgm ON stm_claim_item USING gin (tran_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_stm_claim_hn_trgm ON stm_claim_item USING gin (hn gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_stm_claim_an_trgm ON stm_claim_item USING gin (an gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_stm_claim_pid_trgm ON stm_claim_item USING gin (pid gin_trgm_ops);
+
+-- SMT budget transfers
+CREATE INDEX IF NOT EXISTS idx_smt_budget_ref_doc_trgm ON smt_budget_transfers USING gin (ref_doc_no gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_smt_budget_fund_group_trgm ON smt_budget_transfers USING gin (fund_group_desc gin_trgm_ops);
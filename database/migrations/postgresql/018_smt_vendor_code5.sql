@@ -0,0 +1,27 @@
+-- Migration 018: Normalised vendor code on smt_budget_transfers
+-- PostgreSQL version
+--
+-- vendor_no is zero-padded ("0000010670") while health_offices.hcode5 is not
+-- ("10670"), so benchmark and reconciliation queries joined on
+-- LTRIM(vendor_no, '0') OR vendor_no, which cannot use an index.
+-- vendor_code5 holds the normalised code (digits without leading zeros, see
+-- utils/vendor_code.py). SMTBudgetFetcher.save_to_database fills it on insert;
+-- existing rows are backfilled here.
+
+ALTER TABLE smt_budget_transfers
+ADD COLUMN IF NOT EXISTS vendor_code5 VARCHAR(10);
+
+-- Backfill existing rows
+UPDATE smt_budget_transfers
+SET vendor_code5 = COALESCE(
+    NULLIF(LTRIM(REGEXP_REPLACE(vendor_no, '[^0-9]', '', 'g'), '0'), ''),
+    NULLIF(REGEXP_REPLACE(vendor_no, '[^0-9]', '', 'g'), '')
+)
+WHERE vendor_code5 IS NULL AND vendor_no IS NOT NULL;
+
+-- Per-hospital filters (vendor_code5 = %s AND run_date BETWEEN ...) and
+-- joins to health_offices (h.hcode5 = s.vendor_code5, hcode5 is unique)
+CREATE INDEX IF NOT EXISTS idx_smt_budget_vendor_code5_run_date
+    ON smt_budget_transfers(vendor_code5, run_date);
+
+COMMENT ON COLUMN smt_budget_transfers.vendor_code5 IS 'vendor_no normalised to hcode5 (digits, no leading zeros)';
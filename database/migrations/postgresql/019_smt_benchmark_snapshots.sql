@@ -0,0 +1,76 @@
+-- Migration 019: Precomputed SMT benchmark snapshots
+-- PostgreSQL version
+--
+-- /api/benchmark/* read fiscal-year aggregates of smt_budget_transfers from
+-- these tables instead of scanning the transfers on every request. They are
+-- filled by utils/benchmark_snapshots.py after each SMT fetch (only the
+-- fiscal years the fetch touched) or on first read of a fiscal year.
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_runs (
+    fiscal_year     INTEGER PRIMARY KEY,            -- Buddhist Era fiscal year
+    vendor_count    INTEGER NOT NULL DEFAULT 0,
+    built_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_vendor_fy (
+    fiscal_year     INTEGER NOT NULL,
+    vendor_no       VARCHAR(20) NOT NULL,
+    vendor_code5    VARCHAR(10),
+    records         INTEGER NOT NULL DEFAULT 0,
+    total_amount    DECIMAL(18,2) NOT NULL DEFAULT 0,
+    wait_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debt_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    bond_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    first_date      DATE,
+    last_date       DATE,
+    PRIMARY KEY (fiscal_year, vendor_no)
+);
+CREATE INDEX IF NOT EXISTS idx_smt_benchmark_vendor_fy_code5 ON smt_benchmark_vendor_fy(vendor_code5, fiscal_year);
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_vendor_month (
+    fiscal_year     INTEGER NOT NULL,
+    vendor_no       VARCHAR(20) NOT NULL,
+    vendor_code5    VARCHAR(10),
+    year            INTEGER NOT NULL,               -- Gregorian calendar month of run_date
+    month           INTEGER NOT NULL,
+    records         INTEGER NOT NULL DEFAULT 0,
+    total_amount    DECIMAL(18,2) NOT NULL DEFAULT 0,
+    wait_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debt_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fiscal_year, vendor_no, year, month)
+);
+CREATE INDEX IF NOT EXISTS idx_smt_benchmark_vendor_month_code5 ON smt_benchmark_vendor_month(vendor_code5, fiscal_year);
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_vendor_fund (
+    id              SERIAL PRIMARY KEY,
+    fiscal_year     INTEGER NOT NULL,
+    vendor_no       VARCHAR(20) NOT NULL,
+    vendor_code5    VARCHAR(10),
+    fund_name       VARCHAR(100),
+    fund_group      INTEGER,
+    fund_group_desc VARCHAR(100),
+    records         INTEGER NOT NULL DEFAULT 0,
+    total_amount    DECIMAL(18,2) NOT NULL DEFAULT 0,
+    wait_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    debt_amount     DECIMAL(18,2) NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_smt_benchmark_vendor_fund_fy ON smt_benchmark_vendor_fund(fiscal_year, vendor_no);
+CREATE INDEX IF NOT EXISTS idx_smt_benchmark_vendor_fund_code5 ON smt_benchmark_vendor_fund(vendor_code5, fiscal_year);
+
+CREATE TABLE IF NOT EXISTS smt_benchmark_group_fy (
+    fiscal_year      INTEGER NOT NULL,
+    group_type       VARCHAR(20) NOT NULL,          -- national, region, level
+    group_key        VARCHAR(100) NOT NULL,         -- 'all', health_region or hospital_level
+    hospital_count   INTEGER NOT NULL DEFAULT 0,
+    total_amount     DECIMAL(18,2) NOT NULL DEFAULT 0,
+    avg_total_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    avg_wait_amount  DECIMAL(18,2) NOT NULL DEFAULT 0,
+    avg_debt_amount  DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fiscal_year, group_type, group_key)
+);
+
+-- Snapshot builds find the fiscal years with data via MIN/MAX(run_date)
+CREATE INDEX IF NOT EXISTS idx_smt_budget_run_date ON smt_budget_transfers(run_date);
+
+COMMENT ON TABLE smt_benchmark_vendor_fy IS 'SMT totals per vendor and fiscal year (utils/benchmark_snapshots.py)';
+COMMENT ON TABLE smt_benchmark_group_fy IS 'Average vendor totals per fiscal year: national, per health region, per hospital level';
@@ -0,0 +1,58 @@
+-- Migration 020: Generated month / fiscal-year columns for sargable date predicates
+-- PostgreSQL version
+--
+-- Analytics and reconciliation grouped and filtered on expressions such as
+-- TO_CHAR(dateadm, 'YYYY-MM'), EXTRACT(YEAR FROM dateadm) + 543 and
+-- LEFT(posting_date, 6), which no index can serve. The stored generated
+-- columns below are computed by the database on every insert (i.e. at
+-- import time) and indexed; utils/sql_helpers.py rewrites month and
+-- fiscal-year predicates to use them.
+--
+-- - service_month  'YYYY-MM' of the service date (dateadm / date_admit)
+-- - fiscal_year_be Buddhist Era fiscal year (Oct-Sep) of the service date
+-- - posting_month  'YYYYMM' (BE) of smt_budget_transfers.posting_date
+--
+-- Adding a stored column rewrites the table once; run during a quiet period
+-- on large installations.
+--
+-- The expressions avoid TO_CHAR, which is not IMMUTABLE.
+
+-- REP claims
+ALTER TABLE claim_rep_opip_nhso_item
+ADD COLUMN IF NOT EXISTS service_month CHAR(7) GENERATED ALWAYS AS (
+    EXTRACT(YEAR FROM dateadm)::int::text || '-' || LPAD(EXTRACT(MONTH FROM dateadm)::int::text, 2, '0')
+) STORED;
+
+ALTER TABLE claim_rep_opip_nhso_item
+ADD COLUMN IF NOT EXISTS fiscal_year_be INTEGER GENERATED ALWAYS AS (
+    EXTRACT(YEAR FROM dateadm)::int + 543 + CASE WHEN EXTRACT(MONTH FROM dateadm) >= 10 THEN 1 ELSE 0 END
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_opip_fiscal_year_be ON claim_rep_opip_nhso_item(fiscal_year_be, service_month);
+CREATE INDEX IF NOT EXISTS idx_opip_service_month ON claim_rep_opip_nhso_item(service_month);
+
+-- Statement claims
+ALTER TABLE stm_claim_item
+ADD COLUMN IF NOT EXISTS service_month CHAR(7) GENERATED ALWAYS AS (
+    EXTRACT(YEAR FROM date_admit)::int::text || '-' || LPAD(EXTRACT(MONTH FROM date_admit)::int::text, 2, '0')
+) STORED;
+
+ALTER TABLE stm_claim_item
+ADD COLUMN IF NOT EXISTS fiscal_year_be INTEGER GENERATED ALWAYS AS (
+    EXTRACT(YEAR FROM date_admit)::int + 543 + CASE WHEN EXTRACT(MONTH FROM date_admit) >= 10 THEN 1 ELSE 0 END
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_stm_claim_fiscal_year_be ON stm_claim_item(fiscal_year_be, service_month);
+CREATE INDEX IF NOT EXISTS idx_stm_claim_service_month ON stm_claim_item(service_month);
+
+-- SMT budget transfers (posting_date is a BE 'YYYYMMDD' string)
+ALTER TABLE smt_budget_transfers
+ADD COLUMN IF NOT EXISTS posting_month CHAR(6) GENERATED ALWAYS AS (LEFT(posting_date, 6)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_smt_budget_posting_month ON smt_budget_transfers(posting_month);
+
+COMMENT ON COLUMN claim_rep_opip_nhso_item.service_month IS 'YYYY-MM of dateadm (generated)';
+COMMENT ON COLUMN claim_rep_opip_nhso_item.fiscal_year_be IS 'Buddhist Era fiscal year (Oct-Sep) of dateadm (generated)';
+COMMENT ON COLUMN stm_claim_item.service_month IS 'YYYY-MM of date_admit (generated)';
+COMMENT ON COLUMN stm_claim_item.fiscal_year_be IS 'Buddhist Era fiscal year (Oct-Sep) of date_admit (generated)';
+COMMENT ON COLUMN smt_budget_transfers.posting_month IS 'BE YYYYMM of posting_date (generated)';
@@ -0,0 +1,19 @@
+-- Migration 021: Persisted denial risk score on REP claims
+-- PostgreSQL version
+--
+-- Claims are scored by the denial model when a REP file is imported
+-- (utils/ml/risk_scoring.py) instead of on every page view.
+-- denial_risk_model records the model version that produced the score so
+-- scripts/rescore_denial_risk.py can re-score only stale rows after the
+-- model is retrained.
+
+ALTER TABLE claim_rep_opip_nhso_item ADD COLUMN IF NOT EXISTS denial_risk_score NUMERIC(5,4);
+ALTER TABLE claim_rep_opip_nhso_item ADD COLUMN IF NOT EXISTS denial_risk_model VARCHAR(40);
+
+COMMENT ON COLUMN claim_rep_opip_nhso_item.denial_risk_score IS 'Predicted denial probability (0-1) from the denial model';
+COMMENT ON COLUMN claim_rep_opip_nhso_item.denial_risk_model IS 'Model version that produced denial_risk_score';
+
+-- High-risk listings: ORDER BY denial_risk_score DESC LIMIT n
+CREATE INDEX IF NOT EXISTS idx_opip_denial_risk_score ON claim_rep_opip_nhso_item(denial_risk_score DESC);
+-- Re-scoring: rows scored by another model version (or not at all)
+CREATE INDEX IF NOT EXISTS idx_opip_denial_risk_model ON claim_rep_opip_nhso_item(denial_risk_model);
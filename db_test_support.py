@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Database Test Support - Connect DB-backed tests to a dedicated test database
+
+DB-backed tests only run against the database named by TEST_DB_NAME (host,
+port, user and password come from the usual DB_* settings). Without it, or
+if the database cannot be reached, they raise unittest.SkipTest, which
+pytest reports as skipped and the test scripts print as SKIP.
+
+Usage:
+    from db_test_support import connect_test_db, migrate_test_db
+
+    conn = connect_test_db()      # raises SkipTest without a test database
+    migrate_test_db(conn)         # apply pending migrations
+"""
+
+import os
+from unittest import SkipTest
+
+from config.database import DB_TYPE, get_db_config
+
+CONNECT_TIMEOUT = 5  # seconds
+
+
+def connect_test_db():
+    """Connection to the test database; raises SkipTest if none is configured or reachable"""
+    name = os.getenv('TEST_DB_NAME')
+    if not name:
+        raise SkipTest('No test database configured (set TEST_DB_NAME)')
+
+    config = dict(get_db_config(), database=name)
+    try:
+        if DB_TYPE == 'postgresql':
+            import psycopg2
+            return psycopg2.connect(**config, connect_timeout=CONNECT_TIMEOUT)
+        import pymysql
+        return pymysql.connect(**config, connect_timeout=CONNECT_TIMEOUT)
+    except Exception as e:
+        raise SkipTest(f'Test database {name} not reachable: {e}')
+
+
+def migrate_test_db(conn) -> int:
+    """Apply pending migrations to the test database, returns the number applied"""
+    from database.migrate import MigrationRunner
+
+    runner = MigrationRunner()
+    runner.conn = conn
+    runner.cursor = conn.cursor()
+    try:
+        return runner.run_migrations()
+    finally:
+        runner.cursor.close()
@@ -7,13 +7,11 @@ Automatically downloads Excel files from NHSO e-claim validation page using HTTP
 import os
 import json
 import time
-import re
 from datetime import datetime
 from pathlib import Path
-from urllib.parse import urljoin, urlparse, parse_qs
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from utils.eclaim.links import parse_download_links
 from utils.logging_config import setup_logger, safe_format_exception
 
 # Load environment variables
@@ -51,7 +49,7 @@ def stream_log(message: str, level: str = 'info'):
         pass  # Silently ignore log errors
 
 class EClaimDownloader:
-    def __init__(self, month=None, year=None, scheme='ucs', import_each=False):
+    def __init__(self, month=None, year=None, scheme='ucs', import_each=False, should_stop=None):
         """
         Initialize E-Claim Downloader
 
@@ -61,6 +59,7 @@ class EClaimDownloader:
             scheme (str, optional): Insurance scheme code. Defaults to 'ucs'.
                 Valid schemes: ucs, ofc, sss, lgo, nhs, bkk, bmt, srt
             import_each (bool, optional): Import each file immediately after download. Defaults to False.
+            should_stop (callable, optional): Checked before each file; the download stops when it returns True.
 
         Note: Download history is now always stored in database (no longer uses JSON files).
         """
@@ -69,6 +68,8 @@ class EClaimDownloader:
         self.download_dir = Path(os.getenv('DOWNLOAD_DIR', './downloads')) / 'rep'
         self.iteration_progress_file = Path('download_iteration_progress.json')
         self.import_each = import_each
+        self.should_stop = should_stop
+        self.cancelled = False
         self.scheme = scheme
         self._history_db = None
 
@@ -191,23 +192,40 @@ class EClaimDownloader:
             self._init_history_db()
         return self._history_db
 
-    def _is_already_downloaded(self, filename):
+    def close(self):
+        """Close the history database connection and the HTTP session"""
+        if self._history_db is not None:
+            self._history_db.disconnect()
+            self._history_db = None
+        self.session.close()
+
+    def _filter_new_links(self, download_links):
         """
-        Check if file was already downloaded
+        Drop links whose files are already downloaded
 
         Note: Filename-based deduplication works because each scheme has
         different files with unique filenames (includes timestamp).
-        We also check scheme for extra safety.
 
-        Checks database only. Failed downloads are NOT counted as downloaded (can be retried).
+        Checks the page listing against the database in one batched
+        filter_not_downloaded() lookup. Files recorded as downloaded but
+        missing on disk are kept so they get downloaded again. Failed
+        downloads are NOT counted as downloaded (can be retried).
+
+        Args:
+            download_links (list): Links from get_download_links()
+
+        Returns:
+            list: Links that still need downloading, in page order
         """
         try:
-            db = self._get_history_db()
-            # Only check successful downloads (failed can be retried)
-            return db.is_downloaded('rep', filename, check_file_exists=True)
+            pending = set(self._get_history_db().filter_not_downloaded(
+                'rep', [link['filename'] for link in download_links]
+            ))
         except Exception as e:
             stream_log(f"Warning: Could not check download history: {e}", 'warning')
-            return False
+            return download_links
+
+        return [link for link in download_links if link['filename'] in pending]
 
     def _import_file(self, file_path, filename):
         """
@@ -284,67 +302,7 @@ class EClaimDownloader:
             response = self.session.get(self.validation_url, timeout=120)
             response.raise_for_status()
 
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'lxml')
-
-            # Find all download excel links
-            download_links = []
-
-            # Find all tables
-            tables = soup.find_all('table')
-
-            for table in tables:
-                rows = table.find_all('tr')
-
-                for row in rows:
-                    # Look for download excel link
-                    excel_links = row.find_all('a', string=re.compile(r'download excel', re.IGNORECASE))
-
-                    for excel_link in excel_links:
-                        excel_href = excel_link.get('href')
-
-                        if excel_href:
-                            # Extract filename from URL parameter 'fn'
-                            parsed = urlparse(excel_href)
-                            params = parse_qs(parsed.query)
-
-                            filename = None
-                            if 'fn' in params:
-                                filename = params['fn'][0]
-                            elif 'filename' in params:
-                                # Extract filename from 'filename' parameter and replace .ecd with .xls
-                                filename = params['filename'][0].replace('.ecd', '.xls')
-                            elif 'file' in params:
-                                filename = params['file'][0]
-
-                            # If still no filename, try rep link
-                            if not filename:
-                                rep_links = row.find_all('a', string=re.compile(r'rep_eclaim', re.IGNORECASE))
-                                if rep_links:
-                                    rep_href = rep_links[0].get('href')
-                                    if rep_href:
-                                        filename = rep_href.split('/')[-1].replace('.ecd', '.xls')
-
-                            # Last resort - generate filename
-                            if not filename:
-                                filename = f"eclaim_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xls"
-
-                            # Build full URL
-                            full_url = urljoin(self.base_url, excel_href)
-
-                            download_links.append({
-                                'url': full_url,
-                                'filename': filename
-                            })
-
-            # Remove duplicates
-            unique_links = []
-            seen_filenames = set()
-
-            for link in download_links:
-                if link['filename'] not in seen_filenames:
-                    unique_links.append(link)
-                    seen_filenames.add(link['filename'])
+            unique_links = parse_download_links(response.content, self.base_url)
 
             stream_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Found {len(unique_links)} unique download links")
             return unique_links
@@ -362,18 +320,17 @@ class EClaimDownloader:
         total_files = len(download_links)
 
         for idx, link_info in enumerate(download_links, 1):
+            if self.should_stop and self.should_stop():
+                self.cancelled = True
+                stream_log(f"Download cancelled after {idx - 1}/{total_files} files", 'warning')
+                break
+
             filename = link_info['filename']
             url = link_info['url']
 
             # Update iteration progress for real-time tracking
             self._update_iteration_progress(idx, total_files, filename)
 
-            # Check if already downloaded
-            if self._is_already_downloaded(filename):
-                stream_log(f"[{idx}/{total_files}] Skipping {filename} (already downloaded)")
-                skipped_count += 1
-                continue
-
             # Retry logic
             max_retries = 2
             retry_count = 0
@@ -494,7 +451,7 @@ class EClaimDownloader:
         return downloaded_count, skipped_count, error_count
 
     def run(self):
-        """Main execution"""
+        """Main execution, returns the download counts"""
         stream_log("="*60)
         stream_log("E-Claim Excel File Downloader (HTTP Client)")
         stream_log("="*60)
@@ -545,10 +502,18 @@ class EClaimDownloader:
                         )
                     except Exception:
                         pass
-                return
+                return {'total_files': 0, 'downloaded': 0, 'skipped': 0, 'errors': 0, 'cancelled': False}
+
+            # Only new files reach the download queue
+            new_links = self._filter_new_links(download_links)
+            already_downloaded = total_files - len(new_links)
+            stream_log(
+                f"New files: {len(new_links)}, already downloaded: {already_downloaded}"
+            )
 
             # Download files
-            downloaded, skipped, errors = self.download_files(download_links)
+            downloaded, skipped, errors = self.download_files(new_links)
+            skipped += already_downloaded
 
             # Summary
             stream_log("="*60)
@@ -567,7 +532,8 @@ class EClaimDownloader:
                 try:
                     job_history_manager.complete_job(
                         job_id=job_id,
-                        status='completed' if errors == 0 else 'completed_with_errors',
+                        status='cancelled' if self.cancelled else
+                               'completed' if errors == 0 else 'completed_with_errors',
                         results={
                             'total_files': total_files,
                             'downloaded': downloaded,
@@ -579,6 +545,14 @@ class EClaimDownloader:
                 except Exception as e:
                     stream_log(f"Warning: Could not complete job tracking: {e}", 'warning')
 
+            return {
+                'total_files': total_files,
+                'downloaded': downloaded,
+                'skipped': skipped,
+                'errors': errors,
+                'cancelled': self.cancelled
+            }
+
         except Exception as e:
             stream_log(f"✗ Error: {str(e)}", 'error')
             logger.error(safe_format_exception())
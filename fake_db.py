@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Fake Database Connection - Shared stand-in for psycopg2 / pymysql in tests
+
+Records every statement (whitespace-normalised, with its params) and answers
+queries from rules matched by SQL substring, so tests can check both what
+was sent and how the code handles the rows that come back.
+
+Usage:
+    from fake_db import FakeConnection
+
+    conn = FakeConnection({'FROM smt_benchmark_runs': [(2569,), (2568,)]})
+    run_code_under_test(conn)
+    conn.queries   # [(query, params), ...]
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def normalize(query: str) -> str:
+    """Collapse whitespace so tests can match statements on one line"""
+    return ' '.join(query.split())
+
+
+class FakeConnection:
+    """Connection that records statements and answers queries by SQL substring"""
+
+    def __init__(self, answers: Optional[Dict[str, Any]] = None, default=(),
+                 fail_on: Optional[Callable[[str, Any], Any]] = None, rowcount: int = 0):
+        """
+        Args:
+            answers: {SQL substring: rows}, first match wins. Rows may be a
+                callable(query, params) returning the rows.
+            default: Rows for statements no answer matches
+            fail_on: callable(query, params); a truthy result makes execute()
+                raise it (if it is an exception) or a RuntimeError
+            rowcount: cursor.rowcount after statements other than SELECT
+        """
+        self.answers = dict(answers or {})
+        self.default = default
+        self.fail_on = fail_on
+        self.rowcount = rowcount
+        self.queries: List[Tuple[str, Any]] = []
+        self.batches: List[Tuple[str, list]] = []  # executemany() statements and rows
+        self.cursor_names: List[Optional[str]] = []
+        self.fetch_sizes: List[Optional[int]] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        self.cursor_names.append(kwargs.get('name'))
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+    def answer(self, query: str, params) -> list:
+        """Rows for a statement"""
+        for key, rows in self.answers.items():
+            if key in query:
+                return list(rows(query, params) if callable(rows) else rows)
+        return list(self.default(query, params) if callable(self.default) else self.default)
+
+    def statements(self, fragment: str) -> List[Tuple[str, Any]]:
+        """Recorded (query, params) containing fragment"""
+        return [(query, params) for query, params in self.queries if fragment in query]
+
+
+class FakeCursor:
+    """Cursor over a FakeConnection; fetches consume the answered rows"""
+
+    def __init__(self, conn: FakeConnection):
+        self.conn = conn
+        self.rows: list = []
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def _check_failure(self, query, params):
+        if self.conn.fail_on:
+            error = self.conn.fail_on(query, params)
+            if error:
+                raise error if isinstance(error, Exception) else RuntimeError('simulated failure')
+
+    def execute(self, query, params=None):
+        query = normalize(query)
+        if params is None:
+            params = ()
+        elif isinstance(params, list):
+            params = tuple(params)
+        self.conn.queries.append((query, params))
+        self._check_failure(query, params)
+
+        self.rows = self.conn.answer(query, params)
+        is_select = query.upper().startswith(('SELECT', 'WITH'))
+        self.rowcount = len(self.rows) if is_select else self.conn.rowcount
+
+    def executemany(self, query, rows):
+        query, rows = normalize(query), list(rows)
+        self.conn.batches.append((query, rows))
+        self._check_failure(query, rows)
+        self.rowcount = len(rows)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=None):
+        self.conn.fetch_sizes.append(size)
+        size = len(self.rows) if size is None else size
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        return chunk
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
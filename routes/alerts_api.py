@@ -137,8 +137,6 @@ def check_health_and_alert():
 
         # Check stale processes
         pid_files = {
-            'downloader': Path('/tmp/eclaim_downloader.pid'),
-            'import': Path('/tmp/eclaim_import.pid'),
             'parallel': Path('/tmp/eclaim_parallel_download.pid'),
         }
 
@@ -15,11 +15,19 @@ from config.database import get_db_config, DB_TYPE
 from config.db_pool import get_connection as get_pooled_connection
 from utils.settings_manager import SettingsManager
 from utils.fiscal_year import (
-    get_fiscal_year_sql_filter_gregorian,
     get_fiscal_year_range_gregorian,
     get_fiscal_year_range_be
 )
+from utils.sql_helpers import (
+    CLAIM_TABLE,
+    sql_extract_month,
+    sql_extract_year,
+    sql_fiscal_year_filter,
+    sql_service_month,
+)
 from utils.logging_config import safe_format_exception
+from utils.claim_search import search_claims
+from utils.query_fanout import run_queries
 
 # Initialize settings manager
 settings_manager = SettingsManager()
@@ -36,13 +44,6 @@ def sql_date_trunc_month(column: str) -> str:
     return f"DATE_TRUNC('month', {column})"
 
 
-def sql_count_distinct_months(column: str) -> str:
-    """Generate SQL for counting distinct months"""
-    if DB_TYPE == 'mysql':
-        return f"COUNT(DISTINCT DATE_FORMAT({column}, '%%Y-%%m'))"
-    return f"COUNT(DISTINCT DATE_TRUNC('month', {column}))"
-
-
 def sql_current_month_start() -> str:
     """Generate SQL for start of current month"""
     if DB_TYPE == 'mysql':
@@ -64,18 +65,6 @@ def sql_interval_days(days: int) -> str:
     return f"INTERVAL '{days} days'"
 
 
-def sql_format_year_month(column: str) -> str:
-    """Generate SQL for formatting date as YYYY-MM"""
-    if DB_TYPE == 'mysql':
-        return f"DATE_FORMAT({column}, '%%Y-%%m')"
-    return f"TO_CHAR({column}, 'YYYY-MM')"
-
-
-def sql_format_month(column: str) -> str:
-    """Generate SQL for formatting date as YYYY-MM (alias for sql_format_year_month)"""
-    return sql_format_year_month(column)
-
-
 def sql_cast_numeric(expr: str) -> str:
     """Generate SQL for casting to numeric type"""
     if DB_TYPE == 'mysql':
@@ -90,20 +79,6 @@ def sql_coalesce_numeric(column: str, default: str = "0") -> str:
     return f"COALESCE({column}, {default})"
 
 
-def sql_extract_year(column: str) -> str:
-    """Generate SQL for extracting year from date"""
-    if DB_TYPE == 'mysql':
-        return f"YEAR({column})"
-    return f"EXTRACT(YEAR FROM {column})"
-
-
-def sql_extract_month(column: str) -> str:
-    """Generate SQL for extracting month from date"""
-    if DB_TYPE == 'mysql':
-        return f"MONTH({column})"
-    return f"EXTRACT(MONTH FROM {column})"
-
-
 def sql_regex_match(column: str, pattern: str) -> str:
     """Generate SQL for regex matching"""
     if DB_TYPE == 'mysql':
@@ -137,7 +112,7 @@ def _validate_date_param(date_str):
     return date_str
 
 
-def get_analytics_date_filter():
+def get_analytics_date_filter(table=CLAIM_TABLE, alias=''):
     """
     Get date filter parameters from request args.
     Returns tuple: (where_clause, params, filter_info)
@@ -147,8 +122,12 @@ def get_analytics_date_filter():
     - start_date: Start date in YYYY-MM-DD format
     - end_date: End date in YYYY-MM-DD format
 
+    The clause filters the dateadm of table (qualified with alias); on the
+    claims table the fiscal year uses the indexed fiscal_year_be column.
+
     All parameters are validated and passed via parameterized queries.
     """
+    date_column = f"{alias}.dateadm" if alias else "dateadm"
     fiscal_year = request.args.get('fiscal_year', type=int)
     start_date = _validate_date_param(request.args.get('start_date'))
     end_date = _validate_date_param(request.args.get('end_date'))
@@ -160,18 +139,19 @@ def get_analytics_date_filter():
     if fiscal_year:
         # Use standardized fiscal year calculation from utils/fiscal_year.py
         # FY 2569 BE = Oct 2025 CE - Sep 2026 CE (1 Oct 2025 - 30 Sep 2026)
-        where_clause, where_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+        where_clause, where_params = sql_fiscal_year_filter(fiscal_year, table, alias=alias)
         where_clauses.append(where_clause)
         params.extend(where_params)
+        fy_start, fy_end = get_fiscal_year_range_gregorian(fiscal_year)
         filter_info['fiscal_year'] = fiscal_year
-        filter_info['date_range'] = f"{where_params[0]} to {where_params[1]}"
+        filter_info['date_range'] = f"{fy_start} to {fy_end}"
     elif start_date or end_date:
         if start_date:
-            where_clauses.append("dateadm >= %s")
+            where_clauses.append(f"{date_column} >= %s")
             params.append(start_date)
             filter_info['start_date'] = start_date
         if end_date:
-            where_clauses.append("dateadm <= %s")
+            where_clauses.append(f"{date_column} <= %s")
             params.append(end_date)
             filter_info['end_date'] = end_date
 
@@ -180,17 +160,11 @@ def get_analytics_date_filter():
 
 
 def get_available_fiscal_years(cursor):
-    """Get list of available fiscal years from data"""
-    year_expr = sql_extract_year('dateadm')
-    month_expr = sql_extract_month('dateadm')
-    cursor.execute(f"""
-        SELECT DISTINCT
-            CASE
-                WHEN {month_expr} >= 10 THEN {year_expr} + 544
-                ELSE {year_expr} + 543
-            END as fiscal_year
+    """Get list of available fiscal years from data (indexed fiscal_year_be)"""
+    cursor.execute("""
+        SELECT DISTINCT fiscal_year_be as fiscal_year
         FROM claim_rep_opip_nhso_item
-        WHERE dateadm IS NOT NULL
+        WHERE fiscal_year_be IS NOT NULL
         ORDER BY fiscal_year DESC
     """)
     return [row[0] for row in cursor.fetchall()]
@@ -216,8 +190,6 @@ def api_analysis_summary():
         return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
     try:
-        cursor = conn.cursor()
-
         # Build date range for filtering (fiscal year starts in October)
         # fiscal_year 2568 means Oct 2024 - Sep 2025 (Gregorian: Oct 2024 = Oct 2024)
         where_clauses_rep = []
@@ -299,82 +271,51 @@ def api_analysis_summary():
         if where_clauses_stm:
             date_filter_stm = " WHERE " + " AND ".join(where_clauses_stm)
 
-        # REP data summary
-        rep_data = {'total_records': 0, 'total_amount': 0, 'files_count': 0}
-        try:
-            query = f"""
+        # Independent aggregates, run concurrently on pooled connections.
+        # Each section is optional: a failing table leaves its zeros.
+        queries = {
+            'rep': (f"""
                 SELECT COUNT(*), COALESCE(SUM(reimb_nhso), 0)
                 FROM claim_rep_opip_nhso_item
                 {date_filter_rep}
-            """
-            cursor.execute(query, params_rep)
-            row = cursor.fetchone()
-            rep_data['total_records'] = row[0] or 0
-            rep_data['total_amount'] = float(row[1] or 0)
-
-            if date_filter_rep:
-                cursor.execute(f"""
-                    SELECT COUNT(DISTINCT file_id) FROM claim_rep_opip_nhso_item
-                    {date_filter_rep}
-                """, params_rep)
-                rep_data['files_count'] = cursor.fetchone()[0] or 0
-            else:
-                cursor.execute("SELECT COUNT(*) FROM eclaim_imported_files WHERE status = 'completed'")
-                rep_data['files_count'] = cursor.fetchone()[0] or 0
-        except Exception as e:
-            current_app.logger.warning(f"Error getting REP summary: {e}")
-
-        # Statement data summary
-        stm_data = {'total_records': 0, 'total_amount': 0, 'files_count': 0}
-        try:
-            query = f"""
+            """, params_rep),
+            'stm': (f"""
                 SELECT COUNT(*), COALESCE(SUM(paid_after_deduction), 0)
                 FROM stm_claim_item
                 {date_filter_stm}
-            """
-            cursor.execute(query, params_stm)
-            row = cursor.fetchone()
-            stm_data['total_records'] = row[0] or 0
-            stm_data['total_amount'] = float(row[1] or 0)
-
-            if date_filter_stm:
-                cursor.execute(f"""
-                    SELECT COUNT(DISTINCT file_id) FROM stm_claim_item
-                    {date_filter_stm}
-                """, params_stm)
-                stm_data['files_count'] = cursor.fetchone()[0] or 0
-            else:
-                cursor.execute("SELECT COUNT(*) FROM stm_imported_files WHERE status = 'completed'")
-                stm_data['files_count'] = cursor.fetchone()[0] or 0
-        except Exception as e:
-            current_app.logger.warning(f"Error getting Statement summary: {e}")
-
-        # SMT Budget summary
-        smt_data = {'total_records': 0, 'total_amount': 0, 'files_count': 0}
-        try:
-            query = f"""
+            """, params_stm),
+            'smt': (f"""
                 SELECT COUNT(*), COALESCE(SUM(total_amount), 0)
                 FROM smt_budget_transfers
                 {date_filter_smt}
-            """
-            cursor.execute(query, params_smt)
-            row = cursor.fetchone()
-            smt_data['total_records'] = row[0] or 0
-            smt_data['total_amount'] = float(row[1] or 0)
-
-            if date_filter_smt:
-                cursor.execute(f"""
-                    SELECT COUNT(DISTINCT run_date) FROM smt_budget_transfers
-                    {date_filter_smt}
-                """, params_smt)
-                smt_data['files_count'] = cursor.fetchone()[0] or 0
-            else:
-                cursor.execute("SELECT COUNT(DISTINCT run_date) FROM smt_budget_transfers")
-                smt_data['files_count'] = cursor.fetchone()[0] or 0
-        except Exception as e:
-            current_app.logger.warning(f"Error getting SMT summary: {e}")
+            """, params_smt),
+            'smt_files': (f"SELECT COUNT(DISTINCT run_date) FROM smt_budget_transfers {date_filter_smt}", params_smt),
+        }
+        if date_filter_rep:
+            queries['rep_files'] = (f"SELECT COUNT(DISTINCT file_id) FROM claim_rep_opip_nhso_item {date_filter_rep}",
+                                    params_rep)
+        else:
+            queries['rep_files'] = ("SELECT COUNT(*) FROM eclaim_imported_files WHERE status = 'completed'", [])
+        if date_filter_stm:
+            queries['stm_files'] = (f"SELECT COUNT(DISTINCT file_id) FROM stm_claim_item {date_filter_stm}", params_stm)
+        else:
+            queries['stm_files'] = ("SELECT COUNT(*) FROM stm_imported_files WHERE status = 'completed'", [])
+
+        results = run_queries(queries, connect=get_db_connection, fallback_conn=conn, optional=queries.keys())
+
+        summaries = {}
+        for source in ('rep', 'stm', 'smt'):
+            data = {'total_records': 0, 'total_amount': 0, 'files_count': 0}
+            totals = results.one(source)
+            if totals:
+                data['total_records'] = totals[0] or 0
+                data['total_amount'] = float(totals[1] or 0)
+            files = results.one(f'{source}_files')
+            if files:
+                data['files_count'] = files[0] or 0
+            summaries[source] = data
+        rep_data, stm_data, smt_data = summaries['rep'], summaries['stm'], summaries['smt']
 
-        cursor.close()
         conn.close()
 
         return jsonify({
@@ -1139,17 +1080,11 @@ def api_analysis_search():
         if not query_term:
             return jsonify({'success': False, 'error': 'Search query required'}), 400
 
-        # Search in REP data
-        like_op = "LIKE" if DB_TYPE == 'mysql' else "ILIKE"
+        # Search in REP data (exact identifier match first, then indexed partial match)
         rep_results = []
         try:
-            cursor.execute(f"""
-                SELECT tran_id, rep_no, hn, name, dateadm, reimb_nhso
-                FROM claim_rep_opip_nhso_item
-                WHERE tran_id {like_op} %s OR hn {like_op} %s OR an {like_op} %s OR pid {like_op} %s
-                LIMIT 50
-            """, (f'%{query_term}%', f'%{query_term}%', f'%{query_term}%', f'%{query_term}%'))
-            for row in cursor.fetchall():
+            rows, _ = search_claims(cursor, 'rep', query_term)
+            for row in rows:
                 rep_results.append({
                     'tran_id': row[0],
                     'rep_no': row[1],
@@ -1164,13 +1099,8 @@ def api_analysis_search():
         # Search in Statement data
         stm_results = []
         try:
-            cursor.execute(f"""
-                SELECT tran_id, rep_no, hn, patient_name, date_admit, paid_after_deduction
-                FROM stm_claim_item
-                WHERE tran_id {like_op} %s OR hn {like_op} %s OR an {like_op} %s OR pid {like_op} %s
-                LIMIT 50
-            """, (f'%{query_term}%', f'%{query_term}%', f'%{query_term}%', f'%{query_term}%'))
-            for row in cursor.fetchall():
+            rows, _ = search_claims(cursor, 'stm', query_term)
+            for row in rows:
                 stm_results.append({
                     'tran_id': row[0],
                     'rep_no': row[1],
@@ -1182,16 +1112,11 @@ def api_analysis_search():
         except Exception as e:
             current_app.logger.warning(f"Error searching Statement: {e}")
 
-        # Search in SMT Budget data
+        # Search in SMT Budget data (reference document / fund group)
         smt_results = []
         try:
-            cursor.execute(f"""
-                SELECT posting_date, ref_doc_no, fund_group_desc, total_amount, payment_status
-                FROM smt_budget_transfers
-                WHERE ref_doc_no {like_op} %s OR fund_group_desc {like_op} %s
-                LIMIT 50
-            """, (f'%{query_term}%', f'%{query_term}%'))
-            for row in cursor.fetchall():
+            rows, _ = search_claims(cursor, 'smt', query_term)
+            for row in rows:
                 smt_results.append({
                     'posting_date': str(row[0]) if row[0] else None,
                     'ref_doc_no': row[1],
@@ -2321,27 +2246,75 @@ def api_analytics_overview():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
-
         # Get date filter (returns only static SQL with %s placeholders)
         date_filter, filter_params, filter_info = get_analytics_date_filter()
         base_where = "dateadm IS NOT NULL"
         if date_filter:
             base_where = base_where + " AND " + date_filter
 
-        # Total claims and amounts (parameterized query)
-        query = """
-            SELECT
-                COUNT(*) as total_claims,
-                COALESCE(SUM(reimb_nhso), 0) as total_reimb,
-                COALESCE(SUM(paid), 0) as total_paid,
-                COALESCE(SUM(claim_drg), 0) as total_claim_drg,
-                COUNT(DISTINCT hn) as unique_patients,
-                """ + sql_count_distinct_months('dateadm') + """ as active_months
-            FROM claim_rep_opip_nhso_item
-            WHERE """ + base_where
-        cursor.execute(query, filter_params)
-        row = cursor.fetchone()
+        # eclaim_* tables have their own dateadm (no generated columns)
+        eclaim_filter, eclaim_params, _ = get_analytics_date_filter('eclaim_drug')
+        drug_where = eclaim_filter if eclaim_filter else "1=1"
+        hospital_code = settings_manager.get_hospital_code()
+
+        # Independent aggregates, run concurrently on pooled connections
+        queries = {
+            # Total claims and amounts
+            'totals': ("""
+                SELECT
+                    COUNT(*) as total_claims,
+                    COALESCE(SUM(reimb_nhso), 0) as total_reimb,
+                    COALESCE(SUM(paid), 0) as total_paid,
+                    COALESCE(SUM(claim_drg), 0) as total_claim_drg,
+                    COUNT(DISTINCT hn) as unique_patients,
+                    COUNT(DISTINCT """ + sql_service_month() + """) as active_months
+                FROM claim_rep_opip_nhso_item
+                WHERE """ + base_where, filter_params),
+            # OPD/IPD breakdown (AN = IPD, no AN = OPD)
+            # Also separate by error_code (ผ่าน = no error, ไม่ผ่าน = has error)
+            'opd_ipd': ("""
+                SELECT
+                    CASE WHEN an IS NOT NULL AND an != '' THEN 'IPD' ELSE 'OPD' END as visit_type,
+                    CASE WHEN error_code IS NULL OR error_code = '' THEN 'pass' ELSE 'fail' END as status,
+                    COUNT(*) as claims,
+                    COALESCE(SUM(claim_drg), 0) as total_claim,
+                    COALESCE(SUM(reimb_nhso), 0) as total_reimb
+                FROM claim_rep_opip_nhso_item
+                WHERE """ + base_where + """
+                GROUP BY
+                    CASE WHEN an IS NOT NULL AND an != '' THEN 'IPD' ELSE 'OPD' END,
+                    CASE WHEN error_code IS NULL OR error_code = '' THEN 'pass' ELSE 'fail' END
+            """, filter_params),
+            # Drug summary with count of distinct cases
+            'drugs': ("""
+                SELECT
+                    COUNT(*) as total_drugs,
+                    COALESCE(SUM(reimb_amount), 0) as total_drug_reimb,
+                    COALESCE(SUM(claim_amount), 0) as total_drug_claim,
+                    COUNT(DISTINCT tran_id) as total_drug_cases
+                FROM eclaim_drug
+                WHERE """ + drug_where, eclaim_params),
+            'instruments': ("""
+                SELECT
+                    COUNT(*) as total_instruments,
+                    COALESCE(SUM(reimb_amount), 0) as total_instrument_reimb,
+                    COALESCE(SUM(claim_amount), 0) as total_instrument_claim
+                FROM eclaim_instrument
+                WHERE """ + drug_where, eclaim_params),
+            'denials': ("SELECT COUNT(*) FROM eclaim_deny WHERE " + drug_where, eclaim_params),
+        }
+        if hospital_code:
+            # Per-Bed KPIs: hospital info from health_offices
+            queries['hospital'] = ("""
+                SELECT name, hospital_level, actual_beds, province, health_region
+                FROM health_offices
+                WHERE hcode5 = %s OR hcode9 LIKE %s
+                LIMIT 1
+            """, (hospital_code, f'%{hospital_code}'))
+        results = run_queries(queries, connect=get_db_connection, fallback_conn=conn,
+                              optional=('hospital',))
+
+        row = results.one('totals')
         total_claims = row[0] or 0
         total_reimb = float(row[1] or 0)
         total_paid = float(row[2] or 0)
@@ -2363,23 +2336,7 @@ def api_analytics_overview():
             'filter': filter_info
         }
 
-        # OPD/IPD breakdown (AN = IPD, no AN = OPD)
-        # Also separate by error_code (ผ่าน = no error, ไม่ผ่าน = has error)
-        opd_ipd_query = """
-            SELECT
-                CASE WHEN an IS NOT NULL AND an != '' THEN 'IPD' ELSE 'OPD' END as visit_type,
-                CASE WHEN error_code IS NULL OR error_code = '' THEN 'pass' ELSE 'fail' END as status,
-                COUNT(*) as claims,
-                COALESCE(SUM(claim_drg), 0) as total_claim,
-                COALESCE(SUM(reimb_nhso), 0) as total_reimb
-            FROM claim_rep_opip_nhso_item
-            WHERE """ + base_where + """
-            GROUP BY
-                CASE WHEN an IS NOT NULL AND an != '' THEN 'IPD' ELSE 'OPD' END,
-                CASE WHEN error_code IS NULL OR error_code = '' THEN 'pass' ELSE 'fail' END
-        """
-        cursor.execute(opd_ipd_query, filter_params)
-        opd_ipd_rows = cursor.fetchall()
+        opd_ipd_rows = results['opd_ipd']
 
         # Initialize OPD/IPD data
         opd_data = {'pass': {'claims': 0, 'claim': 0, 'reimb': 0}, 'fail': {'claims': 0, 'claim': 0, 'reimb': 0}}
@@ -2451,8 +2408,7 @@ def api_analytics_overview():
         overview['total_loss'] = total_loss
         overview['denial_rate'] = denial_rate
 
-        # Per-Bed KPIs: Get hospital info from health_offices table
-        hospital_code = settings_manager.get_hospital_code()
+        # Per-Bed KPIs (hospital info from health_offices, queried above)
         active_months = overview['active_months'] or 1  # Avoid division by zero
 
         hospital_info = {
@@ -2464,26 +2420,13 @@ def api_analytics_overview():
             'health_region': None
         }
 
-        if hospital_code:
-            try:
-                # Query health_offices table
-                hospital_query = """
-                    SELECT name, hospital_level, actual_beds, province, health_region
-                    FROM health_offices
-                    WHERE hcode5 = %s OR hcode9 LIKE %s
-                    LIMIT 1
-                """
-                cursor.execute(hospital_query, (hospital_code, f'%{hospital_code}'))
-                hospital_row = cursor.fetchone()
-
-                if hospital_row:
-                    hospital_info['hospital_name'] = hospital_row[0]
-                    hospital_info['hospital_level'] = hospital_row[1]
-                    hospital_info['actual_beds'] = hospital_row[2] or 0
-                    hospital_info['province'] = hospital_row[3]
-                    hospital_info['health_region'] = hospital_row[4]
-            except Exception as e:
-                current_app.logger.warning(f"Could not fetch hospital info: {e}")
+        hospital_row = results.one('hospital')
+        if hospital_row:
+            hospital_info['hospital_name'] = hospital_row[0]
+            hospital_info['hospital_level'] = hospital_row[1]
+            hospital_info['actual_beds'] = hospital_row[2] or 0
+            hospital_info['province'] = hospital_row[3]
+            hospital_info['health_region'] = hospital_row[4]
 
         overview['hospital'] = hospital_info
 
@@ -2504,20 +2447,8 @@ def api_analytics_overview():
 
         overview['per_bed'] = per_bed
 
-        # Drug summary with date filter (parameterized query)
-        # Show both reimb_amount (ยอดชดเชย) and claim_amount (ยอดเรียกเก็บ)
-        # Include count of distinct cases and calculate rates
-        drug_where = date_filter if date_filter else "1=1"
-        drug_query = """
-            SELECT
-                COUNT(*) as total_drugs,
-                COALESCE(SUM(reimb_amount), 0) as total_drug_reimb,
-                COALESCE(SUM(claim_amount), 0) as total_drug_claim,
-                COUNT(DISTINCT tran_id) as total_drug_cases
-            FROM eclaim_drug
-            WHERE """ + drug_where
-        cursor.execute(drug_query, filter_params)
-        drug_row = cursor.fetchone()
+        # Drug summary: both reimb_amount (ยอดชดเชย) and claim_amount (ยอดเรียกเก็บ)
+        drug_row = results.one('drugs')
         total_drug_items = drug_row[0] or 0
         total_drug_reimb = float(drug_row[1] or 0)
         total_drug_claim = float(drug_row[2] or 0)
@@ -2533,25 +2464,13 @@ def api_analytics_overview():
         overview['drug_avg_claim_per_case'] = round(total_drug_claim / total_drug_cases, 2) if total_drug_cases > 0 else 0
         overview['drug_avg_reimb_per_case'] = round(total_drug_reimb / total_drug_cases, 2) if total_drug_cases > 0 else 0
 
-        # Instrument summary with date filter (parameterized query)
-        # Show both reimb_amount (ยอดชดเชย) and claim_amount (ยอดเรียกเก็บ)
-        inst_query = """
-            SELECT
-                COUNT(*) as total_instruments,
-                COALESCE(SUM(reimb_amount), 0) as total_instrument_reimb,
-                COALESCE(SUM(claim_amount), 0) as total_instrument_claim
-            FROM eclaim_instrument
-            WHERE """ + drug_where
-        cursor.execute(inst_query, filter_params)
-        inst_row = cursor.fetchone()
+        # Instrument summary: both reimb_amount (ยอดชดเชย) and claim_amount (ยอดเรียกเก็บ)
+        inst_row = results.one('instruments')
         overview['total_instrument_items'] = inst_row[0] or 0
         overview['total_instrument_cost'] = float(inst_row[1] or 0)  # ยอดชดเชย (ตัวใหญ่)
         overview['total_instrument_claim'] = float(inst_row[2] or 0)  # ยอดเรียกเก็บ (ตัวเล็ก)
 
-        # Denial summary with date filter (parameterized query)
-        deny_query = "SELECT COUNT(*) FROM eclaim_deny WHERE " + drug_where
-        cursor.execute(deny_query, filter_params)
-        overview['total_denials'] = cursor.fetchone()[0] or 0
+        overview['total_denials'] = results.one('denials')[0] or 0
 
         return jsonify({'success': True, 'data': overview})
 
@@ -2585,7 +2504,7 @@ def api_analytics_monthly_trend():
             base_where += f" AND {date_filter}"
 
         # Monthly claims and amounts
-        year_month_col = sql_format_year_month('dateadm')
+        year_month_col = sql_service_month()
         query = f"""
             SELECT
                 {year_month_col} as month,
@@ -2863,9 +2782,7 @@ def api_analytics_drug():
         cursor = conn.cursor()
 
         # Get date filter - use c.dateadm since we JOIN with claims table
-        date_filter, filter_params, filter_info = get_analytics_date_filter()
-        # Replace dateadm with c.dateadm for JOIN query
-        date_filter_joined = date_filter.replace('dateadm', 'c.dateadm') if date_filter else ''
+        date_filter_joined, filter_params, filter_info = get_analytics_date_filter(alias='c')
 
         base_where = "d.generic_name IS NOT NULL AND d.generic_name != ''"
         all_where = "1=1"
@@ -2953,8 +2870,7 @@ def api_analytics_instrument():
         cursor = conn.cursor()
 
         # Get date filter - use c.dateadm since we JOIN with claims table
-        date_filter, filter_params, filter_info = get_analytics_date_filter()
-        date_filter_joined = date_filter.replace('dateadm', 'c.dateadm') if date_filter else ''
+        date_filter_joined, filter_params, filter_info = get_analytics_date_filter(alias='c')
 
         base_where = "i.inst_name IS NOT NULL AND i.inst_name != ''"
         if date_filter_joined:
@@ -3009,7 +2925,7 @@ def api_analytics_denial():
 
         # Get date filter - use c.dateadm since we JOIN with claims table
         date_filter, filter_params, filter_info = get_analytics_date_filter()
-        date_filter_joined = date_filter.replace('dateadm', 'c.dateadm') if date_filter else ''
+        date_filter_joined, _, _ = get_analytics_date_filter(alias='c')
 
         deny_where = "1=1"
         error_where = "error_code IS NOT NULL AND error_code != ''"
@@ -3095,7 +3011,7 @@ def api_analytics_comparison():
             base_where += f" AND {date_filter}"
 
         # Monthly comparison
-        year_month_col = sql_format_year_month('dateadm')
+        year_month_col = sql_service_month()
         query = f"""
             SELECT
                 {year_month_col} as month,
@@ -3200,7 +3116,7 @@ def api_claims_detail():
 
         # Fiscal year filter
         if fiscal_year:
-            where_clause, where_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+            where_clause, where_params = sql_fiscal_year_filter(fiscal_year)
             where_clauses.append(where_clause)
             params.extend(where_params)
 
@@ -3401,7 +3317,7 @@ def api_denial_root_cause():
         params = []
 
         if fiscal_year:
-            where_clause, where_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+            where_clause, where_params = sql_fiscal_year_filter(fiscal_year)
             where_clauses.append(where_clause)
             params.extend(where_params)
 
@@ -3530,12 +3446,12 @@ def api_denial_root_cause():
         # 5. Monthly trend
         trend_query = """
             SELECT
-                """ + sql_format_year_month('dateadm') + """ as month,
+                """ + sql_service_month() + """ as month,
                 COUNT(*) as count,
                 COALESCE(SUM(claim_drg), 0) as total_amount
             FROM claim_rep_opip_nhso_item
             WHERE """ + where_clause + """ AND dateadm IS NOT NULL
-            GROUP BY """ + sql_format_year_month('dateadm') + """
+            GROUP BY """ + sql_service_month() + """
             ORDER BY month DESC
             LIMIT 12
         """
@@ -3597,28 +3513,68 @@ def api_analytics_efficiency():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
-
         # Get date filter
         date_filter, filter_params, filter_info = get_analytics_date_filter()
         base_where = "dateadm IS NOT NULL"
         if date_filter:
             base_where = base_where + " AND " + date_filter
 
+        # Independent aggregates, run concurrently on pooled connections
+        queries = {
+            'overall': ("""
+                SELECT
+                    COUNT(*) as total_claims,
+                    COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed_claims,
+                    COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) as denied_claims,
+                    COALESCE(SUM(claim_drg), 0) as total_claimed,
+                    COALESCE(SUM(reimb_nhso), 0) as total_reimbursed,
+                    COALESCE(SUM(CASE WHEN error_code IS NULL OR error_code = '' THEN claim_drg ELSE 0 END), 0) as passed_claimed,
+                    COALESCE(SUM(CASE WHEN error_code IS NULL OR error_code = '' THEN reimb_nhso ELSE 0 END), 0) as passed_reimbursed
+                FROM claim_rep_opip_nhso_item
+                WHERE """ + base_where, filter_params),
+            'by_service': ("""
+                SELECT
+                    CASE WHEN an IS NOT NULL AND an != '' THEN 'IP' ELSE 'OP' END as service_type,
+                    COUNT(*) as claims,
+                    COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed,
+                    COALESCE(SUM(claim_drg), 0) as claimed,
+                    COALESCE(SUM(reimb_nhso), 0) as reimbursed
+                FROM claim_rep_opip_nhso_item
+                WHERE """ + base_where + """
+                GROUP BY CASE WHEN an IS NOT NULL AND an != '' THEN 'IP' ELSE 'OP' END
+                ORDER BY service_type
+            """, filter_params),
+            'by_fund': ("""
+                SELECT
+                    COALESCE(main_fund, 'ไม่ระบุ') as fund,
+                    COUNT(*) as claims,
+                    COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed,
+                    COALESCE(SUM(claim_drg), 0) as claimed,
+                    COALESCE(SUM(reimb_nhso), 0) as reimbursed
+                FROM claim_rep_opip_nhso_item
+                WHERE """ + base_where + """
+                GROUP BY COALESCE(main_fund, 'ไม่ระบุ')
+                ORDER BY SUM(claim_drg) DESC
+                LIMIT 10
+            """, filter_params),
+            'monthly': ("""
+                SELECT
+                    """ + sql_service_month() + """ as month,
+                    COUNT(*) as claims,
+                    COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed,
+                    COALESCE(SUM(claim_drg), 0) as claimed,
+                    COALESCE(SUM(reimb_nhso), 0) as reimbursed
+                FROM claim_rep_opip_nhso_item
+                WHERE dateadm IS NOT NULL
+                GROUP BY """ + sql_service_month() + """
+                ORDER BY """ + sql_service_month() + """ DESC
+                LIMIT 6
+            """, None),
+        }
+        results = run_queries(queries, connect=get_db_connection, fallback_conn=conn)
+
         # 1. Overall Efficiency Metrics
-        overall_query = """
-            SELECT
-                COUNT(*) as total_claims,
-                COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed_claims,
-                COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) as denied_claims,
-                COALESCE(SUM(claim_drg), 0) as total_claimed,
-                COALESCE(SUM(reimb_nhso), 0) as total_reimbursed,
-                COALESCE(SUM(CASE WHEN error_code IS NULL OR error_code = '' THEN claim_drg ELSE 0 END), 0) as passed_claimed,
-                COALESCE(SUM(CASE WHEN error_code IS NULL OR error_code = '' THEN reimb_nhso ELSE 0 END), 0) as passed_reimbursed
-            FROM claim_rep_opip_nhso_item
-            WHERE """ + base_where
-        cursor.execute(overall_query, filter_params)
-        row = cursor.fetchone()
+        row = results.one('overall')
 
         total_claims = row[0] or 0
         passed_claims = row[1] or 0
@@ -3645,20 +3601,7 @@ def api_analytics_efficiency():
         }
 
         # 2. Efficiency by Service Type (OP vs IP)
-        service_query = """
-            SELECT
-                CASE WHEN an IS NOT NULL AND an != '' THEN 'IP' ELSE 'OP' END as service_type,
-                COUNT(*) as claims,
-                COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed,
-                COALESCE(SUM(claim_drg), 0) as claimed,
-                COALESCE(SUM(reimb_nhso), 0) as reimbursed
-            FROM claim_rep_opip_nhso_item
-            WHERE """ + base_where + """
-            GROUP BY CASE WHEN an IS NOT NULL AND an != '' THEN 'IP' ELSE 'OP' END
-            ORDER BY service_type
-        """
-        cursor.execute(service_query, filter_params)
-        service_rows = cursor.fetchall()
+        service_rows = results['by_service']
 
         by_service = []
         for row in service_rows:
@@ -3677,21 +3620,7 @@ def api_analytics_efficiency():
             })
 
         # 3. Efficiency by Fund (สิทธิ)
-        fund_query = """
-            SELECT
-                COALESCE(main_fund, 'ไม่ระบุ') as fund,
-                COUNT(*) as claims,
-                COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed,
-                COALESCE(SUM(claim_drg), 0) as claimed,
-                COALESCE(SUM(reimb_nhso), 0) as reimbursed
-            FROM claim_rep_opip_nhso_item
-            WHERE """ + base_where + """
-            GROUP BY COALESCE(main_fund, 'ไม่ระบุ')
-            ORDER BY SUM(claim_drg) DESC
-            LIMIT 10
-        """
-        cursor.execute(fund_query, filter_params)
-        fund_rows = cursor.fetchall()
+        fund_rows = results['by_fund']
 
         by_fund = []
         for row in fund_rows:
@@ -3710,21 +3639,7 @@ def api_analytics_efficiency():
             })
 
         # 4. Monthly Efficiency Trend (last 6 months)
-        monthly_query = """
-            SELECT
-                """ + sql_format_month('dateadm') + """ as month,
-                COUNT(*) as claims,
-                COUNT(CASE WHEN error_code IS NULL OR error_code = '' THEN 1 END) as passed,
-                COALESCE(SUM(claim_drg), 0) as claimed,
-                COALESCE(SUM(reimb_nhso), 0) as reimbursed
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm IS NOT NULL
-            GROUP BY """ + sql_format_month('dateadm') + """
-            ORDER BY """ + sql_format_month('dateadm') + """ DESC
-            LIMIT 6
-        """
-        cursor.execute(monthly_query)
-        monthly_rows = cursor.fetchall()
+        monthly_rows = results['monthly']
 
         monthly_trend = []
         for row in monthly_rows:
@@ -3741,7 +3656,6 @@ def api_analytics_efficiency():
         # Reverse to show oldest first
         monthly_trend.reverse()
 
-        cursor.close()
         conn.close()
 
         return jsonify({
@@ -3778,19 +3692,41 @@ def api_alerts():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
         alerts = []
 
+        # Independent aggregates, run concurrently on pooled connections
+        queries = {
+            'current_month': ("""
+                SELECT
+                    COUNT(*) as total_claims,
+                    COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) as denied_claims,
+                    COALESCE(SUM(claim_drg), 0) as total_claimed,
+                    COALESCE(SUM(paid), 0) as total_paid
+                FROM claim_rep_opip_nhso_item
+                WHERE dateadm >= """ + sql_current_month_start(), None),
+            'monthly': ("""
+                SELECT
+                    """ + sql_service_month() + """ as month,
+                    COUNT(*) as claims,
+                    COALESCE(SUM(reimb_nhso), 0) as reimb
+                FROM claim_rep_opip_nhso_item
+                WHERE dateadm >= """ + sql_current_month_start() + """ - """ + sql_interval_months(2) + """
+                GROUP BY """ + sql_service_month() + """
+                ORDER BY month DESC
+                LIMIT 2
+            """, None),
+            'pending': (f"""
+                SELECT COUNT(*)
+                FROM claim_rep_opip_nhso_item
+                WHERE (paid IS NULL OR paid = 0)
+                AND claim_drg > 0
+                AND dateadm < CURRENT_DATE - {sql_interval_days(30)}
+            """, None),
+        }
+        results = run_queries(queries, connect=get_db_connection, fallback_conn=conn)
+
         # Get current month data
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_claims,
-                COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) as denied_claims,
-                COALESCE(SUM(claim_drg), 0) as total_claimed,
-                COALESCE(SUM(paid), 0) as total_paid
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm >= """ + sql_current_month_start())
-        current = cursor.fetchone()
+        current = results.one('current_month')
 
         if current[0] > 0:
             # Alert 1: High Denial Rate
@@ -3849,18 +3785,7 @@ def api_alerts():
                     })
 
         # Alert 3: Month-over-Month decline
-        cursor.execute("""
-            SELECT
-                """ + sql_format_year_month('dateadm') + """ as month,
-                COUNT(*) as claims,
-                COALESCE(SUM(reimb_nhso), 0) as reimb
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm >= """ + sql_current_month_start() + """ - """ + sql_interval_months(2) + """
-            GROUP BY """ + sql_format_year_month('dateadm') + """
-            ORDER BY month DESC
-            LIMIT 2
-        """)
-        monthly = cursor.fetchall()
+        monthly = results['monthly']
 
         if len(monthly) >= 2:
             current_reimb = float(monthly[0][2])
@@ -3893,14 +3818,7 @@ def api_alerts():
                     })
 
         # Alert 4: Pending claims (no payment)
-        cursor.execute(f"""
-            SELECT COUNT(*)
-            FROM claim_rep_opip_nhso_item
-            WHERE (paid IS NULL OR paid = 0)
-            AND claim_drg > 0
-            AND dateadm < CURRENT_DATE - {sql_interval_days(30)}
-        """)
-        pending = cursor.fetchone()[0]
+        pending = results.one('pending')[0]
         if pending > 100:
             alerts.append({
                 'id': 'pending_claims',
@@ -3914,7 +3832,6 @@ def api_alerts():
                 'action': 'ติดตามกับ สปสช.'
             })
 
-        cursor.close()
         conn.close()
 
         # Sort alerts by severity
@@ -3945,112 +3862,35 @@ def api_alerts():
 def api_revenue_forecast():
     """
     Phase 2.1: Revenue Projection
-    Forecast revenue for next 6 months based on historical trends.
+    Forecast revenue for the next months based on historical trends.
 
-    Uses simple linear regression on monthly data.
+    Uses a least-squares trend with fiscal-year (Oct-Sep) seasonality, fitted
+    for the hospital total, every fund and every scheme in one batch and
+    cached until the next import (see utils.ml.forecaster).
+
+    Query params:
+        months: Months to project (1-12, default 6)
+        by: 'fund' or 'scheme' for one forecast per fund / scheme
     """
     try:
+        by = request.args.get('by')
+        if by and by not in ('fund', 'scheme'):
+            return jsonify({'success': False, 'error': "by must be 'fund' or 'scheme'"}), 400
+        horizon = request.args.get('months', 6, type=int)
+
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
-
-        # Get historical monthly data (last 24 months)
-        query = """
-            SELECT
-                """ + sql_format_year_month('dateadm') + """ as month,
-                COUNT(*) as claims,
-                COALESCE(SUM(claim_drg), 0) as claimed,
-                COALESCE(SUM(reimb_nhso), 0) as reimb,
-                COALESCE(SUM(paid), 0) as paid
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm IS NOT NULL
-              AND dateadm >= CURRENT_DATE - """ + sql_interval_months(24) + """
-            GROUP BY """ + sql_format_year_month('dateadm') + """
-            ORDER BY month ASC
-        """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-
-        historical = [
-            {
-                'month': r[0],
-                'claims': r[1],
-                'claimed': float(r[2]),
-                'reimb': float(r[3]),
-                'paid': float(r[4])
-            }
-            for r in rows
-        ]
-
-        # Simple forecasting using moving average and trend
-        forecast = []
-        if len(historical) >= 6:
-            # Calculate average growth rate from last 6 months
-            recent = historical[-6:]
-            reimb_values = [h['reimb'] for h in recent]
-
-            # Average monthly value
-            avg_reimb = sum(reimb_values) / len(reimb_values)
-
-            # Calculate trend (simple linear)
-            n = len(reimb_values)
-            if n > 1:
-                x_mean = (n - 1) / 2
-                y_mean = avg_reimb
-                numerator = sum((i - x_mean) * (reimb_values[i] - y_mean) for i in range(n))
-                denominator = sum((i - x_mean) ** 2 for i in range(n))
-                slope = numerator / denominator if denominator != 0 else 0
-            else:
-                slope = 0
-
-            # Generate forecast for next 6 months
-            from datetime import datetime
-            from dateutil.relativedelta import relativedelta
-
-            last_month = datetime.strptime(historical[-1]['month'], '%Y-%m')
-
-            for i in range(1, 7):
-                future_month = last_month + relativedelta(months=i)
-                projected_value = avg_reimb + (slope * (n + i - 1))
-
-                # Confidence decreases with distance
-                confidence = max(50, 95 - (i * 7))
-
-                # Seasonality adjustment (simple: same month last year if available)
-                seasonal_adjustment = 1.0
-                target_month_str = future_month.strftime('%Y-%m')
-                last_year_month = (future_month - relativedelta(years=1)).strftime('%Y-%m')
-                for h in historical:
-                    if h['month'] == last_year_month:
-                        if avg_reimb > 0:
-                            seasonal_adjustment = h['reimb'] / avg_reimb
-                        break
-
-                adjusted_value = projected_value * seasonal_adjustment
-
-                forecast.append({
-                    'month': future_month.strftime('%Y-%m'),
-                    'month_name': future_month.strftime('%b %Y'),
-                    'projected_reimb': round(adjusted_value, 2),
-                    'projected_claims': round(sum(h['claims'] for h in recent) / len(recent)),
-                    'confidence': confidence,
-                    'lower_bound': round(adjusted_value * 0.85, 2),
-                    'upper_bound': round(adjusted_value * 1.15, 2)
-                })
-
-        cursor.close()
-        conn.close()
+        try:
+            from utils.ml.forecaster import get_revenue_forecast
+            data = get_revenue_forecast(conn, horizon=horizon, by=by)
+        finally:
+            conn.close()
 
         return jsonify({
             'success': True,
-            'data': {
-                'historical': historical[-12:],  # Last 12 months
-                'forecast': forecast,
-                'method': 'linear_regression_with_seasonality',
-                'data_points': len(historical)
-            }
+            'data': data
         })
 
     except Exception as e:
@@ -4240,7 +4080,7 @@ def api_export_report(report_type):
             params = []
 
             if fiscal_year:
-                where_clause, where_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+                where_clause, where_params = sql_fiscal_year_filter(fiscal_year)
                 where_clauses.append(where_clause)
                 params.extend(where_params)
 
@@ -4292,7 +4132,7 @@ def api_export_report(report_type):
 
         elif report_type == 'monthly':
             # Export monthly summary
-            year_month_col = sql_format_year_month('dateadm')
+            year_month_col = sql_service_month()
             query = f"""
                 SELECT {year_month_col} as month,
                        COUNT(*) as claims,
@@ -4759,247 +4599,33 @@ def api_anomalies():
     Phase 3.2: Anomaly Detection
     Detect unusual claim amounts and patterns
     Uses statistical analysis to identify outliers
+
+    Statistics come from one streaming pass over the claims and are cached
+    until the next import (see utils.ml.anomaly_detector).
+
+    Query params:
+        segment: 'scheme' or 'drg' for per-segment IQR bounds and outliers
+        limit: Maximum number of segments (default 50)
     """
     try:
+        segment = request.args.get('segment')
+        if segment and segment not in ('scheme', 'drg'):
+            return jsonify({'success': False, 'error': "segment must be 'scheme' or 'drg'"}), 400
+        limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
-        claim_numeric = sql_coalesce_numeric('claim_drg', 0)
-        reimb_numeric = sql_coalesce_numeric('reimb_nhso', 0)
-
-        # 1. Calculate statistical metrics for claim amounts
-        if DB_TYPE == 'mysql':
-            # MySQL: Calculate basic stats, then compute percentiles via subqueries
-            cursor.execute(f"""
-                SELECT
-                    AVG({claim_numeric}) as mean_amount,
-                    STDDEV({claim_numeric}) as std_amount,
-                    MIN({claim_numeric}) as min_amount,
-                    MAX({claim_numeric}) as max_amount,
-                    COUNT(*) as total_count
-                FROM claim_rep_opip_nhso_item
-                WHERE claim_drg IS NOT NULL
-            """)
-            basic_stats = cursor.fetchone()
-            total_count = basic_stats[4] if basic_stats[4] else 0
-
-            # Compute percentiles using LIMIT/OFFSET for MySQL
-            median = 0
-            q1 = 0
-            q3 = 0
-            if total_count > 0:
-                # Median (50th percentile)
-                offset_50 = max(0, int(total_count * 0.5) - 1)
-                cursor.execute(f"""
-                    SELECT {claim_numeric}
-                    FROM claim_rep_opip_nhso_item
-                    WHERE claim_drg IS NOT NULL
-                    ORDER BY claim_drg
-                    LIMIT 1 OFFSET {offset_50}
-                """)
-                median_row = cursor.fetchone()
-                median = float(median_row[0]) if median_row and median_row[0] else 0
-
-                # Q1 (25th percentile)
-                offset_25 = max(0, int(total_count * 0.25) - 1)
-                cursor.execute(f"""
-                    SELECT {claim_numeric}
-                    FROM claim_rep_opip_nhso_item
-                    WHERE claim_drg IS NOT NULL
-                    ORDER BY claim_drg
-                    LIMIT 1 OFFSET {offset_25}
-                """)
-                q1_row = cursor.fetchone()
-                q1 = float(q1_row[0]) if q1_row and q1_row[0] else 0
-
-                # Q3 (75th percentile)
-                offset_75 = max(0, int(total_count * 0.75) - 1)
-                cursor.execute(f"""
-                    SELECT {claim_numeric}
-                    FROM claim_rep_opip_nhso_item
-                    WHERE claim_drg IS NOT NULL
-                    ORDER BY claim_drg
-                    LIMIT 1 OFFSET {offset_75}
-                """)
-                q3_row = cursor.fetchone()
-                q3 = float(q3_row[0]) if q3_row and q3_row[0] else 0
-
-            stats = {
-                'mean': float(basic_stats[0]) if basic_stats[0] else 0,
-                'median': median,
-                'std': float(basic_stats[1]) if basic_stats[1] else 0,
-                'min': float(basic_stats[2]) if basic_stats[2] else 0,
-                'max': float(basic_stats[3]) if basic_stats[3] else 0,
-                'q1': q1,
-                'q3': q3
-            }
-        else:
-            # PostgreSQL: Use PERCENTILE_CONT
-            cursor.execute(f"""
-                SELECT
-                    AVG({claim_numeric}) as mean_amount,
-                    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY {claim_numeric}) as median_amount,
-                    STDDEV({claim_numeric}) as std_amount,
-                    MIN({claim_numeric}) as min_amount,
-                    MAX({claim_numeric}) as max_amount,
-                    PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY {claim_numeric}) as q1,
-                    PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY {claim_numeric}) as q3
-                FROM claim_rep_opip_nhso_item
-                WHERE claim_drg IS NOT NULL
-            """)
-            stats_row = cursor.fetchone()
-            stats = {
-                'mean': float(stats_row[0]) if stats_row[0] else 0,
-                'median': float(stats_row[1]) if stats_row[1] else 0,
-                'std': float(stats_row[2]) if stats_row[2] else 0,
-                'min': float(stats_row[3]) if stats_row[3] else 0,
-                'max': float(stats_row[4]) if stats_row[4] else 0,
-                'q1': float(stats_row[5]) if stats_row[5] else 0,
-                'q3': float(stats_row[6]) if stats_row[6] else 0
-            }
-
-        # Calculate IQR bounds for outliers
-        iqr = stats['q3'] - stats['q1']
-        lower_bound = stats['q1'] - (1.5 * iqr)
-        upper_bound = stats['q3'] + (1.5 * iqr)
-
-        # 2. Find high-value anomalies (claims above upper bound)
-        cursor.execute(f"""
-            SELECT
-                tran_id, hn, name, dateadm, service_type, drg,
-                claim_drg, reimb_nhso, error_code
-            FROM claim_rep_opip_nhso_item
-            WHERE {claim_numeric} > %s
-            ORDER BY claim_drg DESC
-            LIMIT 20
-        """, (upper_bound,))
-        high_value_anomalies = []
-        for row in cursor.fetchall():
-            high_value_anomalies.append({
-                'tran_id': row[0],
-                'hn': row[1],
-                'name': row[2],
-                'dateadm': row[3].strftime('%Y-%m-%d') if row[3] else None,
-                'service_type': row[4],
-                'drg': row[5],
-                'claim_drg': float(row[6]) if row[6] else 0,
-                'reimb_nhso': float(row[7]) if row[7] else 0,
-                'error_code': row[8],
-                'anomaly_type': 'high_value',
-                'deviation': round((float(row[6] or 0) - stats['mean']) / stats['std'], 2) if stats['std'] > 0 else 0
-            })
-
-        # 3. Find claims with large reimbursement variance
-        cursor.execute(f"""
-            SELECT
-                tran_id, hn, name, dateadm, service_type, drg,
-                claim_drg, reimb_nhso, paid,
-                {claim_numeric} - {reimb_numeric} as variance
-            FROM claim_rep_opip_nhso_item
-            WHERE claim_drg IS NOT NULL
-              AND reimb_nhso IS NOT NULL
-              AND ABS({claim_numeric} - {reimb_numeric}) >
-                  (SELECT AVG(ABS({claim_numeric} - {reimb_numeric})) * 3
-                   FROM claim_rep_opip_nhso_item
-                   WHERE claim_drg IS NOT NULL AND reimb_nhso IS NOT NULL)
-            ORDER BY ABS({claim_numeric} - {reimb_numeric}) DESC
-            LIMIT 20
-        """)
-        variance_anomalies = []
-        for row in cursor.fetchall():
-            variance_anomalies.append({
-                'tran_id': row[0],
-                'hn': row[1],
-                'name': row[2],
-                'dateadm': row[3].strftime('%Y-%m-%d') if row[3] else None,
-                'service_type': row[4],
-                'drg': row[5],
-                'claim_drg': float(row[6]) if row[6] else 0,
-                'reimb_nhso': float(row[7]) if row[7] else 0,
-                'paid': float(row[8]) if row[8] else 0,
-                'variance': float(row[9]) if row[9] else 0,
-                'anomaly_type': 'high_variance'
-            })
-
-        # 4. Find unusual RW (relative weight) values
-        # Skip RW analysis if data has non-numeric values
-        rw_anomalies = []
-        rw_cast = sql_cast_numeric('rw')
-        rw_regex = sql_regex_match('rw', '^[0-9]+\\.?[0-9]*$')
         try:
-            cursor.execute(f"""
-                SELECT
-                    AVG({rw_cast}) as mean_rw,
-                    STDDEV({rw_cast}) as std_rw
-                FROM claim_rep_opip_nhso_item
-                WHERE rw IS NOT NULL
-                  AND rw <> ''
-                  AND {rw_regex}
-            """)
-            rw_stats = cursor.fetchone()
-            rw_mean = float(rw_stats[0]) if rw_stats[0] else 0
-            rw_std = float(rw_stats[1]) if rw_stats[1] else 1
-
-            if rw_mean > 0:
-                cursor.execute(f"""
-                    SELECT
-                        tran_id, hn, name, dateadm, drg, rw, claim_drg
-                    FROM claim_rep_opip_nhso_item
-                    WHERE rw IS NOT NULL
-                      AND rw <> ''
-                      AND {rw_regex}
-                      AND {rw_cast} > %s
-                    ORDER BY {rw_cast} DESC
-                    LIMIT 15
-                """, (rw_mean + (2 * rw_std),))
-                for row in cursor.fetchall():
-                    rw_anomalies.append({
-                        'tran_id': row[0],
-                        'hn': row[1],
-                        'name': row[2],
-                        'dateadm': row[3].strftime('%Y-%m-%d') if row[3] else None,
-                        'drg': row[4],
-                        'rw': float(row[5]) if row[5] else 0,
-                        'claim_drg': float(row[6]) if row[6] else 0,
-                        'anomaly_type': 'high_rw'
-                    })
-        except Exception as rw_error:
-            current_app.logger.warning(f"RW anomaly detection skipped: {rw_error}")
-            conn.rollback()  # Reset transaction state
-
-        # 5. Anomaly summary
-        cursor.execute(f"""
-            SELECT
-                COUNT(*) as total_claims,
-                COUNT(CASE WHEN {claim_numeric} > %s THEN 1 END) as high_value_count,
-                COUNT(CASE WHEN {claim_numeric} < %s THEN 1 END) as low_value_count
-            FROM claim_rep_opip_nhso_item
-        """, (upper_bound, lower_bound if lower_bound > 0 else 0))
-        anomaly_summary = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+            from utils.ml.anomaly_detector import get_claim_anomalies
+            data = get_claim_anomalies(conn, segment=segment, limit=limit)
+        finally:
+            conn.close()
 
         return jsonify({
             'success': True,
-            'data': {
-                'statistics': stats,
-                'bounds': {
-                    'lower': max(0, lower_bound),
-                    'upper': upper_bound,
-                    'iqr': iqr
-                },
-                'summary': {
-                    'total_claims': anomaly_summary[0],
-                    'high_value_anomalies': anomaly_summary[1],
-                    'low_value_anomalies': anomaly_summary[2]
-                },
-                'high_value_claims': high_value_anomalies,
-                'variance_anomalies': variance_anomalies,
-                'rw_anomalies': rw_anomalies
-            }
+            'data': data
         })
 
     except Exception as e:
@@ -5201,25 +4827,66 @@ def api_insights():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
         insights = []
         priority_score = 0
 
+        # Independent aggregates, run concurrently on pooled connections
+        queries = {
+            'monthly_rates': ("""
+                SELECT
+                    """ + sql_service_month() + """ as month,
+                    COUNT(*) as total,
+                    COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) as errors,
+                    ROUND(COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) * 100.0 /
+                          NULLIF(COUNT(*), 0), 2) as error_rate
+                FROM claim_rep_opip_nhso_item
+                WHERE dateadm IS NOT NULL
+                GROUP BY """ + sql_service_month() + """
+                ORDER BY month DESC
+                LIMIT 6
+            """, None),
+            'high_error_services': ("""
+                SELECT service_type,
+                       COUNT(*) as total,
+                       ROUND(COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) * 100.0 /
+                             NULLIF(COUNT(*), 0), 2) as error_rate
+                FROM claim_rep_opip_nhso_item
+                WHERE service_type IS NOT NULL AND service_type != ''
+                GROUP BY service_type
+                HAVING COUNT(*) >= 20 AND
+                       COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) * 100.0 /
+                       NULLIF(COUNT(*), 0) > 15
+                ORDER BY error_rate DESC
+                LIMIT 3
+            """, None),
+            'reimbursement': ("""
+                SELECT
+                    SUM(COALESCE(claim_drg, 0)) as claimed,
+                    SUM(COALESCE(paid, 0)) as paid
+                FROM claim_rep_opip_nhso_item
+                WHERE dateadm >= NOW() - """ + sql_interval_months(3), None),
+            'common_errors': ("""
+                SELECT error_code, COUNT(*) as count,
+                       SUM(COALESCE(claim_drg, 0)) as total_value
+                FROM claim_rep_opip_nhso_item
+                WHERE error_code IS NOT NULL AND error_code != ''
+                  AND dateadm >= NOW() - """ + sql_interval_months(3) + """
+                GROUP BY error_code
+                ORDER BY count DESC
+                LIMIT 3
+            """, None),
+            'pending': (f"""
+                SELECT COUNT(*)
+                FROM claim_rep_opip_nhso_item
+                WHERE dateadm < NOW() - {sql_interval_days(60)}
+                  AND (paid IS NULL OR {sql_coalesce_numeric('paid', 0)} = 0)
+                  AND (error_code IS NULL OR error_code = '')
+            """, None),
+        }
+        results = run_queries(queries, connect=get_db_connection, fallback_conn=conn)
+
         # 1. Check overall denial rate trend
-        cursor.execute("""
-            SELECT
-                """ + sql_format_year_month('dateadm') + """ as month,
-                COUNT(*) as total,
-                COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) as errors,
-                ROUND(COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) * 100.0 /
-                      NULLIF(COUNT(*), 0), 2) as error_rate
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm IS NOT NULL
-            GROUP BY """ + sql_format_year_month('dateadm') + """
-            ORDER BY month DESC
-            LIMIT 6
-        """)
-        monthly_rates = cursor.fetchall()
+        monthly_rates = results['monthly_rates']
         if len(monthly_rates) >= 2:
             recent_rate = float(monthly_rates[0][3] or 0)
             prev_rate = float(monthly_rates[1][3] or 0)
@@ -5246,21 +4913,7 @@ def api_insights():
                 })
 
         # 2. Check for specific high-error service types
-        cursor.execute("""
-            SELECT service_type,
-                   COUNT(*) as total,
-                   ROUND(COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) * 100.0 /
-                         NULLIF(COUNT(*), 0), 2) as error_rate
-            FROM claim_rep_opip_nhso_item
-            WHERE service_type IS NOT NULL AND service_type != ''
-            GROUP BY service_type
-            HAVING COUNT(*) >= 20 AND
-                   COUNT(CASE WHEN error_code IS NOT NULL AND error_code != '' THEN 1 END) * 100.0 /
-                   NULLIF(COUNT(*), 0) > 15
-            ORDER BY error_rate DESC
-            LIMIT 3
-        """)
-        high_error_services = cursor.fetchall()
+        high_error_services = results['high_error_services']
         for service in high_error_services:
             insights.append({
                 'type': 'warning',
@@ -5274,13 +4927,7 @@ def api_insights():
             priority_score += 15
 
         # 3. Check reimbursement rate
-        cursor.execute("""
-            SELECT
-                SUM(COALESCE(claim_drg, 0)) as claimed,
-                SUM(COALESCE(paid, 0)) as paid
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm >= NOW() - """ + sql_interval_months(3))
-        reimb_row = cursor.fetchone()
+        reimb_row = results.one('reimbursement')
         if reimb_row[0] and reimb_row[0] > 0:
             reimb_rate = float(reimb_row[1] or 0) / float(reimb_row[0]) * 100
             if reimb_rate < 85:
@@ -5306,17 +4953,7 @@ def api_insights():
                 })
 
         # 4. Check for common error codes
-        cursor.execute("""
-            SELECT error_code, COUNT(*) as count,
-                   SUM(COALESCE(claim_drg, 0)) as total_value
-            FROM claim_rep_opip_nhso_item
-            WHERE error_code IS NOT NULL AND error_code != ''
-              AND dateadm >= NOW() - """ + sql_interval_months(3) + """
-            GROUP BY error_code
-            ORDER BY count DESC
-            LIMIT 3
-        """)
-        common_errors = cursor.fetchall()
+        common_errors = results['common_errors']
         if common_errors:
             top_error = common_errors[0]
             insights.append({
@@ -5331,15 +4968,7 @@ def api_insights():
             priority_score += 10
 
         # 5. Check for pending long-duration claims
-        paid_numeric = sql_coalesce_numeric('paid', 0)
-        cursor.execute(f"""
-            SELECT COUNT(*)
-            FROM claim_rep_opip_nhso_item
-            WHERE dateadm < NOW() - {sql_interval_days(60)}
-              AND (paid IS NULL OR {paid_numeric} = 0)
-              AND (error_code IS NULL OR error_code = '')
-        """)
-        pending_count = cursor.fetchone()[0]
+        pending_count = results.one('pending')[0]
         if pending_count > 10:
             insights.append({
                 'type': 'warning',
@@ -5352,7 +4981,6 @@ def api_insights():
             })
             priority_score += 15
 
-        cursor.close()
         conn.close()
 
         # Sort insights by priority
@@ -5455,11 +5083,79 @@ def api_ml_predict_batch():
 
 
 
+ML_HIGH_RISK_THRESHOLD = 0.3  # Medium or high risk
+NO_ERROR_CODE = "(error_code IS NULL OR error_code = '' OR error_code = '0')"
+
+
+def _live_high_risk_claims(cursor, predictor):
+    """Score the 100 largest error-free claims on the fly (claims not scored at import yet)"""
+    cursor.execute(f"""
+        SELECT
+            tran_id,
+            COALESCE(service_type, 'UN') as service_type,
+            COALESCE(error_code, '0') as error_code,
+            COALESCE(drg, 'UNKNOWN') as drg,
+            COALESCE(main_fund, 'UNKNOWN') as main_fund,
+            COALESCE(main_inscl, 'UNKNOWN') as main_inscl,
+            COALESCE(ptype, 'UNKNOWN') as ptype,
+            COALESCE(claim_drg, 0) as claim_amount,
+            COALESCE(rw, 0) as rw,
+            COALESCE(adjrw_nhso, 0) as adjrw,
+            hn, name
+        FROM claim_rep_opip_nhso_item
+        WHERE claim_drg IS NOT NULL AND claim_drg > 0
+        AND {NO_ERROR_CODE}
+        ORDER BY claim_drg DESC
+        LIMIT 100
+    """)
+
+    claims = []
+    for row in cursor.fetchall():
+        claims.append({
+            'tran_id': row[0],
+            'service_type': row[1],
+            'error_code': row[2],
+            'drg': row[3],
+            'main_fund': row[4],
+            'main_inscl': row[5],
+            'ptype': row[6],
+            'claim_amount': float(row[7]) if row[7] else 0,
+            'rw': float(row[8]) if row[8] else 0,
+            'adjrw': float(row[9]) if row[9] else 0,
+            'hn': row[10],
+            'name': row[11]
+        })
+
+    high_risk_claims = []
+    for claim, prediction in zip(claims, predictor.predict_batch(claims)):
+        if prediction.get('risk_score', 0) >= ML_HIGH_RISK_THRESHOLD:
+            high_risk_claims.append({
+                'tran_id': claim['tran_id'],
+                'hn': claim['hn'],
+                'name': claim['name'],
+                'service_type': claim['service_type'],
+                'drg': claim['drg'],
+                'main_fund': claim['main_fund'],
+                'claim_amount': claim['claim_amount'],
+                'risk_score': prediction['risk_score'],
+                'risk_level': prediction['risk_level'],
+                'confidence': prediction['confidence'],
+                'factors': prediction.get('factors', [])
+            })
+
+    high_risk_claims.sort(key=lambda x: x['risk_score'], reverse=True)
+    return high_risk_claims, len(claims)
+
+
 @analytics_api_bp.route('/api/predictive/ml-high-risk')
 def api_ml_high_risk():
     """
     Get claims with highest predicted denial risk using ML model
     Returns top claims that need attention based on ML prediction
+
+    Reads denial_risk_score, persisted when each REP file is imported
+    (utils.ml.risk_scoring); falls back to scoring on the fly until any
+    claim has been scored.
     """
     try:
         from utils.ml.predictor import get_predictor
@@ -5469,78 +5165,79 @@ def api_ml_high_risk():
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
         cursor = conn.cursor()
+        predictor = get_predictor()
 
-        # Get recent claims without errors for prediction
-        cursor.execute("""
-            SELECT
-                tran_id,
-                COALESCE(service_type, 'UN') as service_type,
-                COALESCE(error_code, '0') as error_code,
-                COALESCE(drg, 'UNKNOWN') as drg,
-                COALESCE(main_fund, 'UNKNOWN') as main_fund,
-                COALESCE(main_inscl, 'UNKNOWN') as main_inscl,
-                COALESCE(ptype, 'UNKNOWN') as ptype,
-                COALESCE(claim_drg, 0) as claim_amount,
-                COALESCE(rw, 0) as rw,
-                COALESCE(adjrw_nhso, 0) as adjrw,
-                hn, name
-            FROM claim_rep_opip_nhso_item
-            WHERE claim_drg IS NOT NULL AND claim_drg > 0
-            AND (error_code IS NULL OR error_code = '' OR error_code = '0')
-            ORDER BY claim_drg DESC
-            LIMIT 100
-        """)
-
-        claims = []
-        for row in cursor.fetchall():
-            claims.append({
-                'tran_id': row[0],
-                'service_type': row[1],
-                'error_code': row[2],
-                'drg': row[3],
-                'main_fund': row[4],
-                'main_inscl': row[5],
-                'ptype': row[6],
-                'claim_amount': float(row[7]) if row[7] else 0,
-                'rw': float(row[8]) if row[8] else 0,
-                'adjrw': float(row[9]) if row[9] else 0,
-                'hn': row[10],
-                'name': row[11]
-            })
+        try:
+            cursor.execute("SELECT COUNT(denial_risk_score) FROM claim_rep_opip_nhso_item")
+            scored_claims = cursor.fetchone()[0] or 0
+        except Exception as e:
+            current_app.logger.warning(f"Persisted denial risk scores unavailable (migration 021?): {e}")
+            conn.rollback()
+            scored_claims = 0
 
-        cursor.close()
-        conn.close()
+        if scored_claims:
+            # Indexed on denial_risk_score
+            cursor.execute(f"""
+                SELECT
+                    tran_id, hn, name,
+                    COALESCE(service_type, 'UN'),
+                    COALESCE(drg, 'UNKNOWN'),
+                    COALESCE(main_fund, 'UNKNOWN'),
+                    COALESCE(error_code, '0'),
+                    COALESCE(claim_drg, 0),
+                    COALESCE(rw, 0),
+                    denial_risk_score,
+                    denial_risk_model
+                FROM claim_rep_opip_nhso_item
+                WHERE denial_risk_score >= %s
+                AND {NO_ERROR_CODE}
+                ORDER BY denial_risk_score DESC
+                LIMIT 20
+            """, (ML_HIGH_RISK_THRESHOLD,))
+            rows = cursor.fetchall()
 
-        # Predict denial risk for each claim
-        predictor = get_predictor()
-        high_risk_claims = []
+            cursor.execute(f"""
+                SELECT COUNT(*)
+                FROM claim_rep_opip_nhso_item
+                WHERE denial_risk_score >= %s
+                AND {NO_ERROR_CODE}
+            """, (ML_HIGH_RISK_THRESHOLD,))
+            high_risk_count = cursor.fetchone()[0] or 0
 
-        for claim in claims:
-            prediction = predictor.predict(claim)
-            if prediction.get('risk_score', 0) >= 0.3:  # Medium or high risk
+            high_risk_claims = []
+            for row in rows:
+                claim_amount = float(row[7]) if row[7] else 0
+                prediction = predictor.describe_score(float(row[9]), row[6], claim_amount,
+                                                      float(row[8]) if row[8] else 0)
                 high_risk_claims.append({
-                    'tran_id': claim['tran_id'],
-                    'hn': claim['hn'],
-                    'name': claim['name'],
-                    'service_type': claim['service_type'],
-                    'drg': claim['drg'],
-                    'main_fund': claim['main_fund'],
-                    'claim_amount': claim['claim_amount'],
+                    'tran_id': row[0],
+                    'hn': row[1],
+                    'name': row[2],
+                    'service_type': row[3],
+                    'drg': row[4],
+                    'main_fund': row[5],
+                    'claim_amount': claim_amount,
                     'risk_score': prediction['risk_score'],
                     'risk_level': prediction['risk_level'],
                     'confidence': prediction['confidence'],
-                    'factors': prediction.get('factors', [])
+                    'factors': prediction['factors'],
+                    'model_version': row[10]
                 })
+            total_analyzed = scored_claims
+        else:
+            high_risk_claims, total_analyzed = _live_high_risk_claims(cursor, predictor)
+            high_risk_count = len(high_risk_claims)
 
-        # Sort by risk score descending
-        high_risk_claims.sort(key=lambda x: x['risk_score'], reverse=True)
+        cursor.close()
+        conn.close()
 
         return jsonify({
             'success': True,
             'data': {
                 'high_risk_claims': high_risk_claims[:20],  # Top 20
-                'total_analyzed': len(claims),
-                'high_risk_count': len(high_risk_claims),
+                'total_analyzed': total_analyzed,
+                'high_risk_count': high_risk_count,
+                'scored_at_import': bool(scored_claims),
                 'model_info': predictor.get_model_info()
             }
         })
@@ -4,12 +4,11 @@ from flask import Blueprint, jsonify, request, current_app
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from utils.logging_config import setup_logger, safe_format_exception
-from utils.fiscal_year import (
-    get_fiscal_year_sql_filter_gregorian,
-    get_fiscal_year_range_gregorian
-)
 from config.database import DB_TYPE
 from config.db_pool import get_connection as get_pooled_connection
+from utils.vendor_code import normalize_vendor_code
+from utils.sql_helpers import sql_fiscal_year
+from utils.benchmark_snapshots import ensure_benchmark_snapshots, rebuild_benchmark_snapshots
 
 # Thailand timezone
 TZ_BANGKOK = ZoneInfo('Asia/Bangkok')
@@ -34,28 +33,6 @@ def get_db_connection():
         return None
 
 
-# Database-specific SQL helpers for PostgreSQL/MySQL compatibility
-def sql_extract_year(column: str) -> str:
-    """Generate SQL for extracting year as integer"""
-    if DB_TYPE == 'mysql':
-        return f"YEAR({column})"
-    return f"EXTRACT(YEAR FROM {column})::int"
-
-
-def sql_extract_month(column: str) -> str:
-    """Generate SQL for extracting month"""
-    if DB_TYPE == 'mysql':
-        return f"MONTH({column})"
-    return f"EXTRACT(MONTH FROM {column})"
-
-
-def sql_format_year_month(column: str) -> str:
-    """Generate SQL for formatting date as YYYY-MM"""
-    if DB_TYPE == 'mysql':
-        return f"DATE_FORMAT({column}, '%%Y-%%m')"
-    return f"TO_CHAR({column}, 'YYYY-MM')"
-
-
 # ============================================
 # Benchmark API Routes
 # ============================================
@@ -70,52 +47,32 @@ def api_benchmark_hospitals():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
+        # Read vendor totals from the fiscal-year snapshots (all years if not given)
+        fiscal_years = [int(fiscal_year)] if fiscal_year else None
+        ensure_benchmark_snapshots(conn, fiscal_years)
 
-        # Build date filter based on fiscal year
-        # Thai fiscal year: Oct (year-1) to Sep (year)
         where_clause = ""
         params = []
+        if fiscal_years:
+            where_clause = "WHERE v.fiscal_year = %s"
+            params = fiscal_years
 
-        if fiscal_year:
-            fiscal_year_int = int(fiscal_year)
-            # Use fiscal year utility for Gregorian date filtering (run_date is Gregorian)
-            sql_filter, filter_params = get_fiscal_year_sql_filter_gregorian(fiscal_year_int, 's.run_date')
-            where_clause = f"WHERE {sql_filter}"
-            params = filter_params
-
-        # Get summary by vendor from smt_budget_transfers with hospital name lookup
-        ltrim_expr = "TRIM(LEADING '0' FROM s.vendor_no)" if DB_TYPE == 'mysql' else "LTRIM(s.vendor_no, '0')"
-
-        # Fix collation mismatch for MySQL
-        if DB_TYPE == 'mysql':
-            join_condition = f"""
-                h.hcode5 COLLATE utf8mb4_unicode_ci = {ltrim_expr} COLLATE utf8mb4_unicode_ci
-                OR h.hcode5 COLLATE utf8mb4_unicode_ci = s.vendor_no COLLATE utf8mb4_unicode_ci
-            """
-        else:
-            join_condition = f"""
-                h.hcode5 = {ltrim_expr}
-                OR h.hcode5 = s.vendor_no
-            """
-
+        cursor = conn.cursor()
         query = f"""
             SELECT
-                s.vendor_no,
-                COUNT(*) as records,
-                COALESCE(SUM(s.total_amount), 0) as total_amount,
-                COALESCE(SUM(s.wait_amount), 0) as wait_amount,
-                COALESCE(SUM(s.debt_amount), 0) as debt_amount,
-                COALESCE(SUM(s.bond_amount), 0) as bond_amount,
-                MIN(s.run_date) as first_date,
-                MAX(s.run_date) as last_date,
+                v.vendor_no,
+                SUM(v.records) as records,
+                SUM(v.total_amount) as total_amount,
+                SUM(v.wait_amount) as wait_amount,
+                SUM(v.debt_amount) as debt_amount,
+                SUM(v.bond_amount) as bond_amount,
+                MIN(v.first_date) as first_date,
+                MAX(v.last_date) as last_date,
                 h.name as hospital_name
-            FROM smt_budget_transfers s
-            LEFT JOIN health_offices h ON (
-                {join_condition}
-            )
+            FROM smt_benchmark_vendor_fy v
+            LEFT JOIN health_offices h ON h.hcode5 = v.vendor_code5
             {where_clause}
-            GROUP BY s.vendor_no, h.name
+            GROUP BY v.vendor_no, h.name
             ORDER BY total_amount DESC
         """
         cursor.execute(query, params)
@@ -130,7 +87,7 @@ def api_benchmark_hospitals():
             hospital_name = row[8] if row[8] else None
             hospitals.append({
                 'vendor_no': vendor_no,
-                'records': row[1],
+                'records': int(row[1]),
                 'total_amount': float(row[2]) if row[2] else 0,
                 'wait_amount': float(row[3]) if row[3] else 0,
                 'debt_amount': float(row[4]) if row[4] else 0,
@@ -163,77 +120,53 @@ def api_benchmark_timeseries():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
+        # Monthly vendor totals come from the snapshots (the year list needs all years)
+        ensure_benchmark_snapshots(conn)
 
-        # Build date filter based on fiscal year and month range
+        # Build filter based on fiscal year and month range
         # Thai fiscal year: Oct (year-1) to Sep (year)
         where_clause = ""
         params = []
 
         if fiscal_year:
             fiscal_year_int = int(fiscal_year)
-            # Use fiscal year utility for Gregorian date filtering (run_date is Gregorian)
-            sql_filter, filter_params = get_fiscal_year_sql_filter_gregorian(fiscal_year_int, 'run_date')
-            where_clause = f"WHERE {sql_filter}"
-            params = filter_params
+            where_clause = "WHERE v.fiscal_year = %s"
+            params = [fiscal_year_int]
 
             # If specific month range is specified
             if start_month and end_month:
                 start_m = int(start_month)
                 end_m = int(end_month)
-                # Adjust dates based on month in fiscal year
-                # Convert Buddhist Era to Gregorian for month range calculation
+                # Convert Buddhist Era to Gregorian year-month (YYYYMM) bounds
                 gregorian_year = fiscal_year_int - 543
-                if start_m >= 10:
-                    start_date = f"{gregorian_year - 1}-{start_m:02d}-01"
-                else:
-                    start_date = f"{gregorian_year}-{start_m:02d}-01"
-                if end_m >= 10:
-                    end_date = f"{gregorian_year - 1}-{end_m:02d}-28"
-                else:
-                    end_date = f"{gregorian_year}-{end_m:02d}-28"
-                # Override with month-specific range
-                where_clause = "WHERE run_date >= %s AND run_date <= %s"
-                params = [start_date, end_date]
-
-        # Get monthly summary by vendor
-        year_expr = sql_extract_year('s.run_date')
-        month_expr = sql_extract_month('s.run_date')
-        # LTRIM syntax differs between databases
-        ltrim_expr = "TRIM(LEADING '0' FROM s.vendor_no)" if DB_TYPE == 'mysql' else "LTRIM(s.vendor_no, '0')"
+                start_ym = (gregorian_year - 1 if start_m >= 10 else gregorian_year) * 100 + start_m
+                end_ym = (gregorian_year - 1 if end_m >= 10 else gregorian_year) * 100 + end_m
+                where_clause += " AND v.year * 100 + v.month BETWEEN %s AND %s"
+                params += [start_ym, end_ym]
+
+        cursor = conn.cursor()
         query = f"""
             SELECT
-                s.vendor_no,
+                v.vendor_no,
                 h.name as hospital_name,
-                {year_expr} as year,
-                {month_expr} as month,
-                COUNT(*) as records,
-                COALESCE(SUM(s.total_amount), 0) as total_amount,
-                COALESCE(SUM(s.wait_amount), 0) as wait_amount,
-                COALESCE(SUM(s.debt_amount), 0) as debt_amount
-            FROM smt_budget_transfers s
-            LEFT JOIN health_offices h ON (
-                h.hcode5 = {ltrim_expr}
-                OR h.hcode5 = s.vendor_no
-            )
+                v.year,
+                v.month,
+                v.records,
+                v.total_amount,
+                v.wait_amount,
+                v.debt_amount
+            FROM smt_benchmark_vendor_month v
+            LEFT JOIN health_offices h ON h.hcode5 = v.vendor_code5
             {where_clause}
-            GROUP BY s.vendor_no, h.name, {year_expr}, {month_expr}
-            ORDER BY s.vendor_no, year, month
+            ORDER BY v.vendor_no, v.year, v.month
         """
 
         cursor.execute(query, params)
         rows = cursor.fetchall()
 
         # Also get available fiscal years
-        fy_year_expr = sql_extract_year('run_date')
-        fy_month_expr = sql_extract_month('run_date')
-        cursor.execute(f"""
-            SELECT DISTINCT
-                CASE
-                    WHEN {fy_month_expr} >= 10 THEN {fy_year_expr} + 544
-                    ELSE {fy_year_expr} + 543
-                END as fiscal_year
-            FROM smt_budget_transfers
+        cursor.execute("""
+            SELECT DISTINCT fiscal_year FROM smt_benchmark_vendor_fy
             ORDER BY fiscal_year DESC
         """)
         fiscal_years = [int(r[0]) for r in cursor.fetchall()]
@@ -294,53 +227,27 @@ def api_benchmark_hospital_years():
 
         cursor = conn.cursor()
 
-        # Normalize vendor_id
-        vendor_id_10 = vendor_id.zfill(10)
-        vendor_id_5 = vendor_id.lstrip('0') or vendor_id  # Keep original if all zeros
-
-        print(f"[DEBUG] hospital-years: vendor_id={vendor_id}, vendor_id_10={vendor_id_10}, vendor_id_5={vendor_id_5}")
-
-        # First check what vendor_no values exist in DB for debugging
-        cursor.execute("""
-            SELECT DISTINCT vendor_no FROM smt_budget_transfers
-            WHERE vendor_no LIKE %s OR vendor_no LIKE %s
-            LIMIT 5
-        """, (f'%{vendor_id_5}%', f'%{vendor_id}%'))
-        debug_vendors = cursor.fetchall()
-        print(f"[DEBUG] Found vendor_nos in DB matching pattern: {debug_vendors}")
+        # Normalize vendor_id (any padding) to match vendor_code5
+        vendor_code5 = normalize_vendor_code(vendor_id)
 
         # Get all fiscal years that have data for this hospital
-        # Use flexible matching: cast to numeric and compare to handle different padding
-        fy_year_expr = sql_extract_year('run_date')
-        fy_month_expr = sql_extract_month('run_date')
-        # MySQL and PostgreSQL have different REGEXP_REPLACE syntax
-        if DB_TYPE == 'mysql':
-            vendor_cast = "CAST(REGEXP_REPLACE(vendor_no, '[^0-9]', '') AS UNSIGNED)"
-        else:
-            vendor_cast = "CAST(NULLIF(REGEXP_REPLACE(vendor_no, '[^0-9]', '', 'g'), '') AS BIGINT)"
+        fy_expr = sql_fiscal_year('smt_budget_transfers', 'run_date')
         cursor.execute(f"""
             SELECT
-                CASE
-                    WHEN {fy_month_expr} >= 10 THEN {fy_year_expr} + 544
-                    ELSE {fy_year_expr} + 543
-                END as fiscal_year,
+                {fy_expr} as fiscal_year,
                 COUNT(*) as records,
                 COALESCE(SUM(total_amount), 0) as total_amount
             FROM smt_budget_transfers
-            WHERE {vendor_cast} = %s
+            WHERE vendor_code5 = %s
             GROUP BY fiscal_year
             ORDER BY fiscal_year DESC
-        """, (int(vendor_id_5),))
+        """, (vendor_code5,))
         rows = cursor.fetchall()
-        print(f"[DEBUG] Found {len(rows)} years with data for vendor {vendor_id_5}")
 
         # Get all available years in the system (from any hospital)
         cursor.execute(f"""
             SELECT DISTINCT
-                CASE
-                    WHEN {fy_month_expr} >= 10 THEN {fy_year_expr} + 544
-                    ELSE {fy_year_expr} + 543
-                END as fiscal_year
+                {fy_expr} as fiscal_year
             FROM smt_budget_transfers
             WHERE run_date IS NOT NULL
             ORDER BY fiscal_year DESC
@@ -411,17 +318,14 @@ def api_benchmark_my_hospital():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
-
-        # Convert fiscal year to date range using standardized calculation
-        start_date, end_date = get_fiscal_year_range_gregorian(fiscal_year)
+        # Current and previous year (for YoY comparison) come from the snapshots
+        ensure_benchmark_snapshots(conn, [fiscal_year, fiscal_year - 1])
 
-        # Previous year for YoY comparison
-        prev_start_date, prev_end_date = get_fiscal_year_range_gregorian(fiscal_year - 1)
+        cursor = conn.cursor()
 
         # Normalize vendor_id (can be 5 or 10 digits)
         vendor_id_10 = vendor_id.zfill(10)
-        vendor_id_5 = vendor_id.lstrip('0')
+        vendor_id_5 = normalize_vendor_code(vendor_id)
 
         # Get hospital info from health_offices (including bed count)
         cursor.execute("""
@@ -445,24 +349,22 @@ def api_benchmark_my_hospital():
         # Get current year summary
         cursor.execute("""
             SELECT
-                COUNT(*) as records,
+                COALESCE(SUM(records), 0) as records,
                 COALESCE(SUM(total_amount), 0) as total_amount,
                 COALESCE(SUM(wait_amount), 0) as wait_amount,
                 COALESCE(SUM(debt_amount), 0) as debt_amount,
                 COALESCE(SUM(bond_amount), 0) as bond_amount
-            FROM smt_budget_transfers
-            WHERE (vendor_no = %s OR vendor_no = %s)
-              AND run_date >= %s AND run_date <= %s
-        """, (vendor_id_10, vendor_id_5, start_date, end_date))
+            FROM smt_benchmark_vendor_fy
+            WHERE vendor_code5 = %s AND fiscal_year = %s
+        """, (vendor_id_5, fiscal_year))
         summary_row = cursor.fetchone()
 
         # Get previous year total for YoY
         cursor.execute("""
             SELECT COALESCE(SUM(total_amount), 0) as prev_total
-            FROM smt_budget_transfers
-            WHERE (vendor_no = %s OR vendor_no = %s)
-              AND run_date >= %s AND run_date <= %s
-        """, (vendor_id_10, vendor_id_5, prev_start_date, prev_end_date))
+            FROM smt_benchmark_vendor_fy
+            WHERE vendor_code5 = %s AND fiscal_year = %s
+        """, (vendor_id_5, fiscal_year - 1))
         prev_row = cursor.fetchone()
         prev_total = float(prev_row[0]) if prev_row and prev_row[0] else 0
 
@@ -496,12 +398,11 @@ def api_benchmark_my_hospital():
                 COALESCE(SUM(total_amount), 0) as total_amount,
                 COALESCE(SUM(wait_amount), 0) as wait_amount,
                 COALESCE(SUM(debt_amount), 0) as debt_amount,
-                COUNT(*) as records
-            FROM smt_budget_transfers
-            WHERE (vendor_no = %s OR vendor_no = %s)
-              AND run_date >= %s AND run_date <= %s
+                SUM(records) as records
+            FROM smt_benchmark_vendor_fund
+            WHERE vendor_code5 = %s AND fiscal_year = %s
             GROUP BY {fund_case}
-        """, (vendor_id_10, vendor_id_5, start_date, end_date))
+        """, (vendor_id_5, fiscal_year))
 
         # Initialize fund categories
         fund_categories = {
@@ -522,7 +423,7 @@ def api_benchmark_my_hospital():
                 fund_categories[cat]['total_amount'] = float(row[1]) if row[1] else 0
                 fund_categories[cat]['wait_amount'] = float(row[2]) if row[2] else 0
                 fund_categories[cat]['debt_amount'] = float(row[3]) if row[3] else 0
-                fund_categories[cat]['records'] = row[4]
+                fund_categories[cat]['records'] = int(row[4])
             if cat == 'IPD':
                 ipd_total = float(row[1]) if row[1] else 0
                 ipd_wait = float(row[2]) if row[2] else 0
@@ -547,7 +448,7 @@ def api_benchmark_my_hospital():
             'bond_amount': float(summary_row[4]) if summary_row else 0,
             'wait_ratio': (wait_amount / total_amount * 100) if total_amount > 0 else 0,
             'debt_ratio': (debt_amount / total_amount * 100) if total_amount > 0 else 0,
-            'record_count': summary_row[0] if summary_row else 0,
+            'record_count': int(summary_row[0]) if summary_row else 0,
             'growth_yoy': round(growth_yoy, 1),
             # Per-bed metrics (all from IPD since beds are for inpatients)
             'actual_beds': actual_beds,
@@ -571,13 +472,12 @@ def api_benchmark_my_hospital():
                 fund_group,
                 fund_group_desc,
                 COALESCE(SUM(total_amount), 0) as amount,
-                COUNT(*) as records
-            FROM smt_budget_transfers
-            WHERE (vendor_no = %s OR vendor_no = %s)
-              AND run_date >= %s AND run_date <= %s
+                SUM(records) as records
+            FROM smt_benchmark_vendor_fund
+            WHERE vendor_code5 = %s AND fiscal_year = %s
             GROUP BY fund_name, fund_group, fund_group_desc
             ORDER BY amount DESC
-        """, (vendor_id_10, vendor_id_5, start_date, end_date))
+        """, (vendor_id_5, fiscal_year))
 
         fund_rows = cursor.fetchall()
         fund_breakdown = []
@@ -589,33 +489,33 @@ def api_benchmark_my_hospital():
                 'fund_group_desc': row[2],
                 'amount': amount,
                 'percentage': (amount / total_amount * 100) if total_amount > 0 else 0,
-                'records': row[4]
+                'records': int(row[4])
             })
 
         # Get monthly trend
         cursor.execute("""
             SELECT
-                """ + sql_format_year_month('run_date') + """ as month,
+                year,
+                month,
                 COALESCE(SUM(total_amount), 0) as total_amount,
                 COALESCE(SUM(wait_amount), 0) as wait_amount,
                 COALESCE(SUM(debt_amount), 0) as debt_amount,
-                COUNT(*) as records
-            FROM smt_budget_transfers
-            WHERE (vendor_no = %s OR vendor_no = %s)
-              AND run_date >= %s AND run_date <= %s
-            GROUP BY """ + sql_format_year_month('run_date') + """
-            ORDER BY month
-        """, (vendor_id_10, vendor_id_5, start_date, end_date))
+                SUM(records) as records
+            FROM smt_benchmark_vendor_month
+            WHERE vendor_code5 = %s AND fiscal_year = %s
+            GROUP BY year, month
+            ORDER BY year, month
+        """, (vendor_id_5, fiscal_year))
 
         monthly_rows = cursor.fetchall()
         monthly_trend = []
         for row in monthly_rows:
             monthly_trend.append({
-                'month': row[0],
-                'total_amount': float(row[1]) if row[1] else 0,
-                'wait_amount': float(row[2]) if row[2] else 0,
-                'debt_amount': float(row[3]) if row[3] else 0,
-                'records': row[4]
+                'month': f"{int(row[0])}-{int(row[1]):02d}",
+                'total_amount': float(row[2]) if row[2] else 0,
+                'wait_amount': float(row[3]) if row[3] else 0,
+                'debt_amount': float(row[4]) if row[4] else 0,
+                'records': int(row[5])
             })
 
         # Calculate risk score
@@ -645,19 +545,12 @@ def api_benchmark_my_hospital():
 
         # Get ranking (national)
         cursor.execute("""
-            WITH hospital_totals AS (
-                SELECT
-                    vendor_no,
-                    SUM(total_amount) as total
-                FROM smt_budget_transfers
-                WHERE run_date >= %s AND run_date <= %s
-                GROUP BY vendor_no
-            )
             SELECT
                 COUNT(*) as total_hospitals,
-                SUM(CASE WHEN total > %s THEN 1 ELSE 0 END) as hospitals_above
-            FROM hospital_totals
-        """, (start_date, end_date, total_amount))
+                SUM(CASE WHEN total_amount > %s THEN 1 ELSE 0 END) as hospitals_above
+            FROM smt_benchmark_vendor_fy
+            WHERE fiscal_year = %s
+        """, (total_amount, fiscal_year))
         rank_row = cursor.fetchone()
         total_hospitals = int(rank_row[0]) if rank_row and rank_row[0] else 0
         hospitals_above = int(rank_row[1]) if rank_row and rank_row[1] else 0
@@ -713,37 +606,16 @@ def api_benchmark_region_average():
         if not conn:
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
-        cursor = conn.cursor()
+        ensure_benchmark_snapshots(conn, [fiscal_year])
 
-        # Convert fiscal year to date range using standardized calculation
-        start_date, end_date = get_fiscal_year_range_gregorian(fiscal_year)
+        cursor = conn.cursor()
 
-        # Get regional averages
-        ltrim_expr = "TRIM(LEADING '0' FROM s.vendor_no)" if DB_TYPE == 'mysql' else "LTRIM(s.vendor_no, '0')"
-        cursor.execute(f"""
-            WITH hospital_totals AS (
-                SELECT
-                    s.vendor_no,
-                    SUM(s.total_amount) as total_amount,
-                    SUM(s.wait_amount) as wait_amount,
-                    SUM(s.debt_amount) as debt_amount
-                FROM smt_budget_transfers s
-                JOIN health_offices h ON (
-                    h.hcode5 = {ltrim_expr}
-                    OR h.hcode5 = s.vendor_no
-                )
-                WHERE h.health_region = %s
-                  AND s.run_date >= %s AND s.run_date <= %s
-                GROUP BY s.vendor_no
-            )
-            SELECT
-                COUNT(*) as hospital_count,
-                COALESCE(AVG(total_amount), 0) as avg_total,
-                COALESCE(AVG(wait_amount), 0) as avg_wait,
-                COALESCE(AVG(debt_amount), 0) as avg_debt,
-                COALESCE(SUM(total_amount), 0) as sum_total
-            FROM hospital_totals
-        """, (health_region_pattern, start_date, end_date))
+        # Get regional averages (precomputed per fiscal year)
+        cursor.execute("""
+            SELECT hospital_count, avg_total_amount, avg_wait_amount, avg_debt_amount, total_amount
+            FROM smt_benchmark_group_fy
+            WHERE fiscal_year = %s AND group_type = 'region' AND group_key = %s
+        """, (fiscal_year, health_region_pattern))
         avg_row = cursor.fetchone()
 
         averages = {
@@ -759,21 +631,17 @@ def api_benchmark_region_average():
         averages['avg_debt_ratio'] = (averages['avg_debt_amount'] / avg_total * 100) if avg_total > 0 else 0
 
         # Get fund breakdown averages for region
-        cursor.execute(f"""
+        cursor.execute("""
             WITH hospital_funds AS (
                 SELECT
-                    s.vendor_no,
-                    s.fund_name,
-                    s.fund_group,
-                    SUM(s.total_amount) as amount
-                FROM smt_budget_transfers s
-                JOIN health_offices h ON (
-                    h.hcode5 = {ltrim_expr}
-                    OR h.hcode5 = s.vendor_no
-                )
-                WHERE h.health_region = %s
-                  AND s.run_date >= %s AND s.run_date <= %s
-                GROUP BY s.vendor_no, s.fund_name, s.fund_group
+                    f.vendor_no,
+                    f.fund_name,
+                    f.fund_group,
+                    SUM(f.total_amount) as amount
+                FROM smt_benchmark_vendor_fund f
+                JOIN health_offices h ON h.hcode5 = f.vendor_code5
+                WHERE h.health_region = %s AND f.fiscal_year = %s
+                GROUP BY f.vendor_no, f.fund_name, f.fund_group
             )
             SELECT
                 fund_name,
@@ -783,7 +651,7 @@ def api_benchmark_region_average():
             FROM hospital_funds
             GROUP BY fund_name, fund_group
             ORDER BY total_amount DESC
-        """, (health_region_pattern, start_date, end_date))
+        """, (health_region_pattern, fiscal_year))
 
         fund_rows = cursor.fetchall()
         fund_breakdown = []
@@ -795,31 +663,28 @@ def api_benchmark_region_average():
                 'total_amount': float(row[3]) if row[3] else 0
             })
 
-        # Get monthly trend for region
-        month_format = sql_format_year_month('s.run_date')
-        cursor.execute(f"""
+        # Get monthly trend for region (avg_amount is per transfer, as before)
+        cursor.execute("""
             SELECT
-                {month_format} as month,
-                COALESCE(SUM(s.total_amount), 0) as total_amount,
-                COALESCE(AVG(s.total_amount), 0) as avg_amount
-            FROM smt_budget_transfers s
-            JOIN health_offices h ON (
-                h.hcode5 = {ltrim_expr}
-                OR h.hcode5 = s.vendor_no
-            )
-            WHERE h.health_region = %s
-              AND s.run_date >= %s AND s.run_date <= %s
-            GROUP BY {month_format}
-            ORDER BY month
-        """, (health_region_pattern, start_date, end_date))
+                m.year,
+                m.month,
+                COALESCE(SUM(m.total_amount), 0) as total_amount,
+                SUM(m.records) as records
+            FROM smt_benchmark_vendor_month m
+            JOIN health_offices h ON h.hcode5 = m.vendor_code5
+            WHERE h.health_region = %s AND m.fiscal_year = %s
+            GROUP BY m.year, m.month
+            ORDER BY m.year, m.month
+        """, (health_region_pattern, fiscal_year))
 
         monthly_rows = cursor.fetchall()
         monthly_trend = []
         for row in monthly_rows:
+            total = float(row[2]) if row[2] else 0
             monthly_trend.append({
-                'month': row[0],
-                'total_amount': float(row[1]) if row[1] else 0,
-                'avg_amount': float(row[2]) if row[2] else 0
+                'month': f"{int(row[0])}-{int(row[1]):02d}",
+                'total_amount': total,
+                'avg_amount': total / int(row[3]) if row[3] else 0
             })
 
         cursor.close()
@@ -848,16 +713,26 @@ def api_benchmark_delete_hospital(vendor_no):
             return jsonify({'success': False, 'error': 'Database connection failed'}), 500
 
         cursor = conn.cursor()
+        vendor_code5 = normalize_vendor_code(vendor_no)
+
+        # Fiscal years whose benchmark snapshots include this vendor
+        cursor.execute(
+            "SELECT fiscal_year FROM smt_benchmark_vendor_fy WHERE vendor_code5 = %s",
+            (vendor_code5,)
+        )
+        fiscal_years = [int(row[0]) for row in cursor.fetchall()]
 
-        # Delete all records for this vendor
+        # Delete all records for this vendor (any padding)
         cursor.execute("""
             DELETE FROM smt_budget_transfers
-            WHERE vendor_no = %s OR vendor_no = %s
-        """, (vendor_no, vendor_no.zfill(10)))
+            WHERE vendor_code5 = %s
+        """, (vendor_code5,))
 
         deleted = cursor.rowcount
         conn.commit()
         cursor.close()
+
+        rebuild_benchmark_snapshots(conn, fiscal_years)
         conn.close()
 
         return jsonify({
@@ -882,14 +757,10 @@ def api_benchmark_available_years():
 
         # Get distinct fiscal years from smt_budget_transfers
         # Fiscal year is determined by run_date: Oct-Dec = next year, Jan-Sep = current year
-        year_expr = sql_extract_year('run_date')
-        month_expr = sql_extract_month('run_date')
+        fy_expr = sql_fiscal_year('smt_budget_transfers', 'run_date')
         cursor.execute(f"""
             SELECT DISTINCT
-                CASE
-                    WHEN {month_expr} >= 10 THEN {year_expr} + 544
-                    ELSE {year_expr} + 543
-                END as fiscal_year
+                {fy_expr} as fiscal_year
             FROM smt_budget_transfers
             WHERE run_date IS NOT NULL
             ORDER BY fiscal_year DESC
@@ -14,6 +14,7 @@ from pathlib import Path
 # Import managers and utilities
 from utils import DownloaderRunner
 from utils.history_manager_db import HistoryManagerDB
+from utils.history_stats_cache import history_stats_cache
 from utils.settings_manager import SettingsManager
 from utils.log_stream import log_streamer
 from utils.job_history_manager import job_history_manager
@@ -641,6 +642,8 @@ def clear_download_history():
                 deleted_count = db.cursor.rowcount
                 db.conn.commit()
 
+        history_stats_cache.invalidate(None if download_type == 'all' else download_type)
+
         log_streamer.write_log(
             f"Cleared {deleted_count} download history records (type: {download_type})",
             'info',
@@ -153,6 +153,9 @@ def scan_files_to_history():
     Scan files in downloads directory and register them in download_history database.
     This is useful when files are manually added to the directory.
 
+    Scans are incremental: only files that are new or changed since the last
+    scan are hashed and written, and records of deleted files are marked missing.
+
     Request body (optional):
         {
             "types": ["rep", "stm"]  // defaults to both
@@ -162,8 +165,8 @@ def scan_files_to_history():
         {
             "success": true,
             "reports": [
-                {"directory": "downloads/rep", "added": 807, "skipped": 0, "errors": 0},
-                {"directory": "downloads/stm", "added": 123, "skipped": 0, "errors": 0}
+                {"directory": "downloads/rep", "added": 807, "updated": 0, "removed": 0, "skipped": 0, "errors": 0},
+                {"directory": "downloads/stm", "added": 123, "updated": 0, "removed": 0, "skipped": 0, "errors": 0}
             ],
             "total_added": 930
         }
@@ -305,15 +308,10 @@ def upload_file():
         # Trigger import if requested
         if auto_import:
             try:
-                if file_type == 'rep':
-                    # Trigger REP import
-                    import_runner = current_app.config['import_runner']
-                    import_result = import_runner.start(str(target_path))
-                    result['import_result'] = import_result
-                elif file_type == 'stm':
-                    # Trigger STM import
-                    stm_import_runner = current_app.config['stm_import_runner']
-                    import_result = stm_import_runner.start(str(target_path))
+                if file_type in ('rep', 'stm'):
+                    # Queue REP/STM import on the job executor
+                    unified_import_runner = current_app.config['UNIFIED_IMPORT_RUNNER']
+                    import_result = unified_import_runner.start_single_file_import(file_type, str(target_path))
                     result['import_result'] = import_result
                 elif file_type == 'smt':
                     # Trigger SMT import
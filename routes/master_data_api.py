@@ -4,12 +4,11 @@ import io
 import re
 import time
 import datetime as dt
-import pandas as pd
-from openpyxl import load_workbook
 from flask import Blueprint, jsonify, request, current_app
 from flask_login import login_required
 from config.database import DB_TYPE
 from utils.logging_config import safe_format_exception
+from utils.benchmark_snapshots import refresh_group_snapshots
 
 
 # Create blueprint
@@ -213,6 +212,9 @@ def api_health_offices_stats():
 @master_data_api_bp.route('/api/health-offices/import', methods=['POST'])
 def api_health_offices_import():
     """Import health offices from uploaded Excel file"""
+    # Deferred: pandas/openpyxl add ~0.6s to app start and only this endpoint needs them
+    import pandas as pd
+    from openpyxl import load_workbook
 
     def parse_formula_value(val):
         """Parse Excel formula value like ='32045' or =\"32045\" to plain value"""
@@ -508,6 +510,13 @@ def api_health_offices_import():
 
         conn.commit()
         cursor.close()
+
+        # Hospital regions/levels may have changed: refresh benchmark group averages
+        try:
+            refresh_group_snapshots(conn)
+        except Exception as e:
+            current_app.logger.warning(f"Benchmark group snapshots not refreshed: {e}")
+
         conn.close()
 
         return jsonify({
@@ -0,0 +1,50 @@
+"""Progress API Blueprint - Push download, import and seed progress over SSE"""
+
+import re
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from utils.progress_stream import progress_hub
+
+# Create blueprint
+progress_api_bp = Blueprint('progress_api', __name__)
+
+CHANNEL_PATTERN = re.compile(r'^[a-z_]+(:[a-z0-9_-]+)?$')
+MAX_CHANNELS = 8
+
+
+@progress_api_bp.route('/api/progress/stream')
+def stream_progress():
+    """
+    Stream progress snapshots via Server-Sent Events (SSE)
+
+    One connection per page carries every channel it watches, e.g.
+    /api/progress/stream?channels=download:rep,import,seed. Each event is
+    named after its channel and carries the same JSON as the matching
+    polling endpoint.
+    """
+    channels = [c.strip() for c in request.args.get('channels', '').split(',') if c.strip()]
+
+    if not channels or len(channels) > MAX_CHANNELS:
+        return jsonify({'success': False, 'error': f'Specify 1-{MAX_CHANNELS} channels'}), 400
+
+    invalid = [c for c in channels if not CHANNEL_PATTERN.match(c)]
+    if invalid:
+        return jsonify({'success': False, 'error': f"Invalid channel: {', '.join(invalid)}"}), 400
+
+    def generate():
+        try:
+            for event in progress_hub.stream(channels):
+                yield event
+        except GeneratorExit:
+            pass
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Connection': 'keep-alive'
+        }
+    )
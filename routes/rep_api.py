@@ -11,8 +11,6 @@ This blueprint handles all REP (E-Claim Reimbursement) data source specific endp
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required
 import humanize
-from collections import defaultdict
-import re
 from config.database import DB_TYPE
 from config.db_pool import get_connection as get_pooled_connection
 
@@ -36,27 +34,10 @@ def get_db_connection():
 def get_file_type_stats():
     """Get file statistics grouped by file type"""
     try:
-        from utils import FileManager
         from utils.history_manager_db import HistoryManagerDB
 
-        # Get file manager instance
-        file_manager = FileManager()
-
-        # Get all files from downloads directory
-        all_files = file_manager.history_manager.get_all_downloads()
-
-        # Get import status from database
-        import_status_map = {}
-        try:
-            with get_db_connection() as conn:
-                if conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT filename, status FROM eclaim_imported_files")
-                    for row in cursor.fetchall():
-                        import_status_map[row[0]] = row[1]
-                    cursor.close()
-        except Exception as e:
-            current_app.logger.warning(f"Could not get import status: {e}")
+        # Counts, sizes and import status aggregated in SQL (cached per type)
+        type_stats = HistoryManagerDB(download_type='rep').get_file_type_statistics()
 
         # File type definitions with descriptions
         file_type_info = {
@@ -73,25 +54,6 @@ def get_file_type_stats():
             'OP_APPEAL_CD': {'name': 'OP Appeal CD', 'description': 'อุทธรณ์ ผป.นอก (โรคเรื้อรัง)', 'category': 'appeal', 'icon': '📋'},
         }
 
-        # Parse file types from filenames
-        type_stats = defaultdict(lambda: {'count': 0, 'imported': 0, 'pending': 0, 'size': 0})
-        pattern = re.compile(r'eclaim_\d+_([A-Z_]+)_\d{8}_\d+\.xls')
-
-        for file_info in all_files:
-            filename = file_info.get('filename', '')
-            match = pattern.match(filename)
-            if match:
-                file_type = match.group(1)
-                type_stats[file_type]['count'] += 1
-                type_stats[file_type]['size'] += file_info.get('size', 0)
-
-                # Check import status
-                status = import_status_map.get(filename, 'pending')
-                if status == 'completed':
-                    type_stats[file_type]['imported'] += 1
-                else:
-                    type_stats[file_type]['pending'] += 1
-
         # Build response with descriptions
         result = []
         for file_type, stats in sorted(type_stats.items(), key=lambda x: x[1]['count'], reverse=True):
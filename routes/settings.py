@@ -10,7 +10,7 @@ Handles all settings-related routes:
 - User management (Admin only)
 """
 
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, current_app
 from flask_login import login_required
 from utils.auth import require_admin
 from utils.settings_manager import SettingsManager
@@ -585,8 +585,7 @@ def test_schedule():
     """Test schedule immediately"""
     try:
         # Trigger download now
-        from utils.downloader_runner import DownloaderRunner
-        downloader_runner = DownloaderRunner()
+        downloader_runner = current_app.config['downloader_runner']
 
         if downloader_runner.is_running():
             return jsonify({
@@ -12,6 +12,7 @@ This blueprint handles all SMT (Smart Money Transfer) budget-related endpoints:
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required
 from config.db_pool import get_connection as get_pooled_connection
+from utils.benchmark_snapshots import clear_benchmark_snapshots
 
 # Create blueprint
 smt_api_bp = Blueprint('smt_api', __name__)
@@ -394,9 +395,10 @@ def api_smt_clear():
 
         cursor = conn.cursor()
 
-        # Delete all SMT budget transfers
+        # Delete all SMT budget transfers (and the benchmark snapshots built from them)
         cursor.execute("DELETE FROM smt_budget_transfers")
         deleted_count = cursor.rowcount
+        clear_benchmark_snapshots(cursor)
 
         conn.commit()
         cursor.close()
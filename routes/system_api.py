@@ -19,6 +19,8 @@ from config.database import DOWNLOADS_DIR, DB_TYPE
 from config.db_pool import get_connection as get_pooled_connection, return_connection
 from utils.logging_config import setup_logger, safe_format_exception
 from utils.job_history_manager import job_history_manager
+from utils.progress_stream import progress_hub
+from utils.job_executor import job_executor
 
 # Setup logger
 logger = setup_logger('system_api', logging.INFO, 'logs/system_api.log')
@@ -150,8 +152,6 @@ def get_system_health():
 
     # === 3. Running Processes ===
     pid_files = {
-        'downloader': Path('/tmp/eclaim_downloader.pid'),
-        'import': Path('/tmp/eclaim_import.pid'),
         'parallel': Path('/tmp/eclaim_parallel_download.pid'),
         'stm': Path('/tmp/eclaim_stm_downloader.pid'),
         'smt': Path('/tmp/eclaim_smt_fetch.pid')
@@ -160,6 +160,19 @@ def get_system_health():
     running_processes = []
     stale_processes = []
 
+    # Imports and downloads run as in-process jobs
+    try:
+        for job in job_executor.list_jobs(statuses=('running',)):
+            running_processes.append({
+                'name': job['job_type'],
+                'pid': job['owner_pid'],
+                'status': 'running',
+                'started': job['started_at'],
+                'job_id': job['id']
+            })
+    except Exception as e:
+        logger.warning(f"Cannot list running jobs: {e}")
+
     for name, pid_file in pid_files.items():
         if pid_file.exists():
             try:
@@ -376,27 +389,29 @@ def run_seed_initialization():
             'progress': seed_progress
         }), 400
 
+    # Reset progress before the thread starts so watchers never see the previous run
+    seed_progress = {
+        'running': True,
+        'current_task': None,
+        'tasks': [
+            {'id': 'dim', 'name': 'Dimension Tables', 'status': 'pending', 'records': 0},
+            {'id': 'health', 'name': 'Health Offices', 'status': 'pending', 'records': 0},
+            {'id': 'errors', 'name': 'NHSO Error Codes', 'status': 'pending', 'records': 0}
+        ],
+        'completed': 0,
+        'total': 3,
+        'error': None,
+        'started_at': datetime.now(TZ_BANGKOK).isoformat()
+    }
+    progress_hub.publish('seed', seed_progress)
+
     # Start seed process in background thread
     def run_seeds():
-        global seed_progress
-        seed_progress = {
-            'running': True,
-            'current_task': None,
-            'tasks': [
-                {'id': 'dim', 'name': 'Dimension Tables', 'status': 'pending', 'records': 0},
-                {'id': 'health', 'name': 'Health Offices', 'status': 'pending', 'records': 0},
-                {'id': 'errors', 'name': 'NHSO Error Codes', 'status': 'pending', 'records': 0}
-            ],
-            'completed': 0,
-            'total': 3,
-            'error': None,
-            'started_at': datetime.now(TZ_BANGKOK).isoformat()
-        }
-
         try:
             # Task 1: Dimension tables (migrate.py --seed)
             seed_progress['current_task'] = 'dim'
             seed_progress['tasks'][0]['status'] = 'running'
+            progress_hub.publish('seed', seed_progress)
 
             # Get app root directory (container: /app, local: project root)
             cwd = os.environ.get('APP_ROOT', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -412,10 +427,12 @@ def run_seed_initialization():
             seed_progress['tasks'][0]['status'] = 'completed'
             seed_progress['tasks'][0]['records'] = 2600  # Approximate
             seed_progress['completed'] = 1
+            progress_hub.publish('seed', seed_progress)
 
             # Task 2: Health Offices
             seed_progress['current_task'] = 'health'
             seed_progress['tasks'][1]['status'] = 'running'
+            progress_hub.publish('seed', seed_progress)
 
             result = subprocess.run(
                 ['python', 'database/seeds/health_offices_importer.py'],
@@ -433,10 +450,12 @@ def run_seed_initialization():
             seed_progress['tasks'][1]['status'] = 'completed'
             seed_progress['tasks'][1]['records'] = records
             seed_progress['completed'] = 2
+            progress_hub.publish('seed', seed_progress)
 
             # Task 3: NHSO Error Codes
             seed_progress['current_task'] = 'errors'
             seed_progress['tasks'][2]['status'] = 'running'
+            progress_hub.publish('seed', seed_progress)
 
             # Pass the correct path to the error codes SQL file
             sql_file = os.path.join(cwd, 'database/seeds/nhso_error_codes.sql')
@@ -470,6 +489,7 @@ def run_seed_initialization():
 
         finally:
             seed_progress['running'] = False
+            progress_hub.publish('seed', seed_progress)
 
     thread = threading.Thread(target=run_seeds, daemon=True)
     thread.start()
@@ -514,8 +534,6 @@ def sync_system_status():
 
     # PID files to check
     pid_files = {
-        'downloader': Path('/tmp/eclaim_downloader.pid'),
-        'import': Path('/tmp/eclaim_import.pid'),
         'parallel': Path('/tmp/eclaim_parallel_download.pid'),
         'stm': Path('/tmp/eclaim_stm_downloader.pid'),
         'smt': Path('/tmp/eclaim_smt_fetch.pid')
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Backtest Forecast - Report revenue forecast error on the imported claims
+
+Refits the /api/analytics/forecast model on history that ends earlier
+(rolling origin) and compares its projections with what was actually
+reimbursed, for the hospital total and every fund and scheme.
+
+Usage:
+    python scripts/backtest_forecast.py
+    python scripts/backtest_forecast.py --horizon 3 --folds 6
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import get_db_connection
+from utils.ml.forecaster import METRICS, backtest, load_monthly_series
+
+
+def _format(value) -> str:
+    return '-' if value is None or value != value else f"{value:,.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the revenue forecast')
+    parser.add_argument('--horizon', type=int, default=6, help='Months projected per origin (default 6)')
+    parser.add_argument('--folds', type=int, default=3, help='Forecast origins to test (default 3)')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        data = load_monthly_series(conn)
+    finally:
+        conn.close()
+
+    flat = data['values'].reshape(-1, data['months'])
+    result = backtest(flat, data['first_month'], args.horizon, args.folds)
+    if not result['folds']:
+        print(f"✗ Not enough history ({data['months']} months) for a {args.horizon}-month backtest")
+        return 1
+
+    reimb = METRICS.index('reimb')
+    print(f"Backtest: {result['folds']} origins x {args.horizon} months, {data['months']} months of history\n")
+    print(f"{'Series':<40} {'MAE':>16} {'MAPE %':>8}")
+    for key, (breakdown, label) in enumerate(data['keys']):
+        series = key * len(METRICS) + reimb
+        name = 'Total' if breakdown == 'total' else f"{breakdown}: {label}"
+        print(f"{name[:40]:<40} {_format(result['mae'][series]):>16} {_format(result['mape'][series]):>8}")
+
+    steps = ', '.join(_format(v) for v in result['mape_by_step'][:, reimb])
+    print(f"\nTotal MAPE % by months ahead: {steps}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
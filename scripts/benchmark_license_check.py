@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+License Check Benchmark - Per-request overhead of license lookups
+
+Simulates the license work done for one request (template context via
+SettingsManager.get_license_info, write-access decorator via
+get_license_state, feature gate via check_feature_access) against a
+freshly signed test license, with and without the verified-state cache.
+
+"Uncached" invalidates the checker before every request, which reproduces
+the old behaviour of reading and RSA-verifying the license each time.
+
+Usage:
+    python scripts/benchmark_license_check.py
+    python scripts/benchmark_license_check.py --requests 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def create_test_license(directory: Path, hospital_code: str) -> Path:
+    """Sign a one-year enterprise license with a throwaway RSA key."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('utf-8')
+
+    now = int(time.time())
+    token = jwt.encode({
+        'license_key': 'BENCH-0000-0000',
+        'tier': 'enterprise',
+        'hospital_code': hospital_code,
+        'iat': now,
+        'exp': now + 365 * 86400,
+    }, private_key, algorithm='RS256')
+
+    license_file = directory / 'license.json'
+    license_file.write_text(json.dumps({
+        'license_key': 'BENCH-0000-0000',
+        'license_token': token,
+        'public_key': public_pem,
+    }), encoding='utf-8')
+    return license_file
+
+
+def run(requests_count: int, cached: bool) -> float:
+    """Return mean microseconds of license work per simulated request."""
+    from utils.license_checker import get_license_checker
+    from utils.settings_manager import SettingsManager
+
+    checker = get_license_checker()
+    settings_manager = SettingsManager()
+
+    # Warm up (first verification is paid once in both modes)
+    settings_manager.get_license_info()
+
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        if not cached:
+            checker.invalidate()
+        settings_manager.get_license_info()
+        checker.get_license_state()
+        checker.check_feature_access('rep_access')
+    elapsed = time.perf_counter() - start
+
+    return elapsed / requests_count * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-request license check overhead')
+    parser.add_argument('--requests', type=int, default=2000, help='Simulated requests per mode')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        hospital_code = '10670'
+
+        settings_file = tmp_dir / 'settings.json'
+        settings_file.write_text(json.dumps({'hospital_code': hospital_code}), encoding='utf-8')
+        os.environ['SETTINGS_FILE'] = str(settings_file)
+
+        license_file = create_test_license(tmp_dir, hospital_code)
+
+        import utils.license_checker as license_checker
+        license_checker._license_checker = license_checker.LicenseChecker(
+            license_file=str(license_file),
+            license_lic_file=str(tmp_dir / 'license.lic')
+        )
+
+        state = license_checker.get_license_checker().get_license_state()
+        print(f"License state: {state}")
+        print(f"Requests per mode: {args.requests:,}")
+        print()
+
+        uncached = run(args.requests, cached=False)
+        cached = run(args.requests, cached=True)
+
+        print(f"{'Mode':<12} {'per request':>14}")
+        print(f"{'uncached':<12} {uncached:>11.1f} us")
+        print(f"{'cached':<12} {cached:>11.1f} us")
+        print()
+        print(f"Speedup: {uncached / cached:.0f}x")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Benchmark - Checks per second per backend
+
+Runs RateLimiter.hit() against each backend with a mix of repeated and
+unique identifiers (like a poller plus anonymous IPs), optionally from
+several processes at once to mimic gunicorn workers sharing one limit.
+
+The database backend needs migration 016 and a reachable database; it is
+skipped unless --database is given.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py
+    python scripts/benchmark_rate_limiter.py --checks 50000 --workers 4 --database
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import DatabaseBackend, MemoryBackend, RateLimiter, SQLiteBackend
+
+UNIQUE_IPS = 5000
+
+
+def make_backend(name: str, sqlite_path: str):
+    """Create a fresh backend instance (one per worker process)."""
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend(sqlite_path)
+    return DatabaseBackend()
+
+
+def run_checks(name: str, sqlite_path: str, checks: int, worker: int) -> float:
+    """Run `checks` limiter hits and return elapsed seconds."""
+    limiter = RateLimiter(backend=make_backend(name, sqlite_path))
+    identifiers = [f'ip:10.{worker}.{i // 256}.{i % 256}' for i in range(UNIQUE_IPS)]
+
+    start = time.perf_counter()
+    for i in range(checks):
+        # Half the checks come from one polling user, half from many IPs
+        identifier = 'user:1' if i % 2 else identifiers[i % UNIQUE_IPS]
+        limiter.hit('/api/imports/progress', identifier, requests=60, window=60)
+    return time.perf_counter() - start
+
+
+def _worker(args):
+    return run_checks(*args)
+
+
+def benchmark(name: str, sqlite_path: str, checks: int, workers: int) -> float:
+    """Return total checks per second across all workers."""
+    if workers == 1:
+        elapsed = run_checks(name, sqlite_path, checks, 0)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            elapsed = max(pool.map(_worker, [(name, sqlite_path, checks, w) for w in range(workers)]))
+    return checks * workers / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rate limiter backends')
+    parser.add_argument('--checks', type=int, default=20000, help='Checks per worker')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes (memory is per-process)')
+    parser.add_argument('--database', action='store_true', help='Include the database backend')
+    args = parser.parse_args()
+
+    backends = ['memory', 'sqlite'] + (['database'] if args.database else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_path = os.path.join(tmp, 'rate_limits.sqlite3')
+        SQLiteBackend(sqlite_path)  # Create the table before workers start
+
+        print(f"Checks per worker: {args.checks:,}, workers: {args.workers}")
+        print()
+        print(f"{'Backend':<10} {'checks/sec':>12} {'us/check':>10}")
+        for name in backends:
+            rate = benchmark(name, sqlite_path, args.checks, args.workers)
+            print(f"{name:<10} {rate:>12,.0f} {args.workers / rate * 1_000_000:>10.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
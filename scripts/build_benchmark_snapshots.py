@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Build Benchmark Snapshots - Precompute /api/benchmark/* fiscal-year metrics
+
+Snapshots are rebuilt automatically for the fiscal years each SMT fetch
+touches. Run this after bulk changes made outside the app (e.g. restoring
+smt_budget_transfers) or to refresh region/level averages after editing
+health_offices.
+
+Usage:
+    # Rebuild every fiscal year with SMT data
+    python scripts/build_benchmark_snapshots.py
+
+    # Rebuild specific fiscal years only
+    python scripts/build_benchmark_snapshots.py --fiscal-year 2568 --fiscal-year 2569
+
+    # Only recompute region/level averages from the existing vendor snapshots
+    python scripts/build_benchmark_snapshots.py --groups-only
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import get_db_connection
+from utils.benchmark_snapshots import rebuild_benchmark_snapshots, refresh_group_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build SMT benchmark snapshots')
+    parser.add_argument('--fiscal-year', type=int, action='append', dest='fiscal_years',
+                        help='Buddhist Era fiscal year to rebuild (repeatable, default: all)')
+    parser.add_argument('--groups-only', action='store_true',
+                        help='Only recompute national/region/level averages')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.groups_only:
+            fiscal_years = refresh_group_snapshots(conn)
+            print(f"✓ Refreshed group averages for FY {fiscal_years}")
+            return 0
+
+        result = rebuild_benchmark_snapshots(conn, args.fiscal_years)
+        print(f"✓ Built FY {result['fiscal_years']}: {result['vendor_rows']} vendor rows "
+              f"in {result['duration_ms']:.0f}ms")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
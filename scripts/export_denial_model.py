@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Export Denial Model - Write the compact (mmap) artefact for the joblib model
+
+Training writes both formats. Run this for a model trained before the
+compact artefact existed, or after replacing denial_predictor.joblib by
+hand. The exported forest is checked against the joblib forest on synthetic
+claims, and the cold-load time of both formats is measured in a fresh
+interpreter.
+
+Usage:
+    python scripts/export_denial_model.py
+    python scripts/export_denial_model.py --claims 20000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils.ml import predictor as predictor_module
+from utils.ml.model_artifact import export_forest, load_artifact
+
+COLD_LOAD = (
+    "import time; started = time.perf_counter()\n"
+    "from utils.ml import predictor\n"
+    "{setup}"
+    "p = predictor.DenialPredictor(); assert p.ensure_loaded()\n"
+    "p.predict({{'service_type': 'IP', 'error_code': '998', 'claim_amount': 2500}})\n"
+    "print(p.model_format, time.perf_counter() - started)\n"
+)
+
+
+def cold_load(joblib_only: bool) -> tuple:
+    """(format, seconds) to import, load and score one claim in a fresh interpreter"""
+    setup = "predictor.ARTIFACT_DIR = predictor.MODEL_DIR / 'missing'\n" if joblib_only else ""
+    result = subprocess.run([sys.executable, '-c', COLD_LOAD.format(setup=setup)],
+                            cwd=predictor_module.MODEL_DIR.parents[2], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    model_format, seconds = result.stdout.split()[-2:]
+    return model_format, float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the denial model as a compact mmap artefact')
+    parser.add_argument('--claims', type=int, default=5000, help='Synthetic claims to compare (default 5000)')
+    args = parser.parse_args()
+
+    import joblib
+    from benchmark_denial_predictor import make_claims
+
+    if not predictor_module.MODEL_PATH.exists():
+        print(f"✗ Model not found: {predictor_module.MODEL_PATH}")
+        return 1
+
+    bundle = joblib.load(predictor_module.MODEL_PATH)
+    with open(predictor_module.METADATA_PATH) as f:
+        metadata = json.load(f)
+    class_index = {col: {cls: i for i, cls in enumerate(encoder.classes_)}
+                   for col, encoder in bundle['label_encoders'].items() if encoder}
+
+    directory = export_forest(bundle['model'], class_index, bundle['feature_cols'], metadata,
+                              predictor_module.ARTIFACT_DIR)
+    artifact = load_artifact(directory, trained_at=metadata.get('trained_at'))
+    size_kb = sum(path.stat().st_size for path in directory.iterdir()) / 1024
+    print(f"✓ Exported {artifact['manifest']['n_estimators']} trees, "
+          f"{artifact['manifest']['n_nodes']:,} nodes ({size_kb:,.0f} KB) to {directory}")
+
+    # Same features, both forests
+    predictor = predictor_module.DenialPredictor()
+    predictor.ensure_loaded()
+    X = predictor._prepare_batch([predictor._claim_values(claim) for claim in make_claims(predictor, args.claims)])
+    expected = bundle['model'].predict_proba(X)
+    actual = artifact['model'].predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    if not np.allclose(expected, actual, rtol=0, atol=1e-12):
+        print(f"✗ Probabilities differ by up to {max_diff:.2e}")
+        return 1
+    print(f"✓ {args.claims:,} claims score the same as the joblib forest (max difference {max_diff:.1e})")
+
+    for joblib_only in (True, False):
+        model_format, seconds = cold_load(joblib_only)
+        print(f"  cold load + first prediction ({model_format}): {seconds * 1000:,.0f} ms")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
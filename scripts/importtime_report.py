@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Import Time Report - Cold start profile of app.py with a regression budget
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, prints
+the slowest imports and checks the result against scripts/importtime_budget.json:
+
+- max_cumulative_ms: cumulative import time of the app module
+- deferred_modules: heavy packages (pandas, sklearn, openpyxl, ...) that must
+  only be imported when an analytics, ML, import or download endpoint first
+  needs them, never at app start
+
+The database does not need to be reachable. Exits 1 if the budget is exceeded.
+
+Usage:
+    python scripts/importtime_report.py
+    python scripts/importtime_report.py --top 40 --output importtime.txt
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / 'importtime_budget.json'
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def profile(module: str):
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        (entries, loaded) where entries is a list of (module, self_us,
+        cumulative_us, depth) and loaded is the set of top-level packages in
+        sys.modules afterwards
+    """
+    code = f"import sys, {module}; print('LOADED:', *sorted({{m.split('.')[0] for m in sys.modules}}))"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+    loaded = set()
+    for line in result.stdout.splitlines():
+        if line.startswith('LOADED:'):
+            loaded = set(line.split()[1:])
+    return entries, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile app import time against a budget')
+    parser.add_argument('--top', type=int, default=25, help='Slowest imports to list')
+    parser.add_argument('--output', help='Also write the raw -X importtime report to this file')
+    parser.add_argument('--budget', default=str(BUDGET_FILE), help='Budget JSON file')
+    args = parser.parse_args()
+
+    budget = json.loads(Path(args.budget).read_text(encoding='utf-8'))
+    module = budget.get('module', 'app')
+
+    entries, loaded = profile(module)
+    if args.output:
+        Path(args.output).write_text(
+            '\n'.join(f"{cum:>10} {self_:>10} {'  ' * depth}{name}" for name, self_, cum, depth in entries) + '\n',
+            encoding='utf-8'
+        )
+
+    total_ms = next((cum for name, _, cum, depth in entries if name == module and depth == 0), 0) / 1000
+
+    print("=" * 60)
+    print(f"IMPORT TIME: {module}")
+    print("=" * 60)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+
+    failures = []
+    limit = budget.get('max_cumulative_ms')
+    if limit is not None and total_ms > limit:
+        failures.append(f"import {module} took {total_ms:.0f}ms (budget {limit}ms)")
+
+    eager = sorted(set(budget.get('deferred_modules', [])) & loaded)
+    if eager:
+        failures.append(f"deferred modules imported at start: {', '.join(eager)}")
+
+    print(f"\nTotal: {total_ms:.0f}ms (budget {limit}ms)")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        return 1
+
+    print("✓ Within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Re-score Denial Risk - Refresh persisted denial_risk_score after retraining
+
+REP imports score their own claims. Run this once after training a new
+model (utils/ml/train_denial_model.py) or after applying migration 021 to
+score claims imported earlier. Only claims scored by another model version
+(or not scored yet) are processed unless --all is given.
+
+Usage:
+    python scripts/rescore_denial_risk.py
+    python scripts/rescore_denial_risk.py --all --batch-size 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import get_db_connection
+from utils.ml.risk_scoring import DENIAL_RISK_BATCH_SIZE, rescore_stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score denial risk of REP claims')
+    parser.add_argument('--all', action='store_true', dest='rescore_all',
+                        help='Re-score every claim, not only stale ones')
+    parser.add_argument('--batch-size', type=int, default=DENIAL_RISK_BATCH_SIZE,
+                        help=f'Claims per model call and commit (default {DENIAL_RISK_BATCH_SIZE})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        result = rescore_stale(conn, rescore_all=args.rescore_all, batch_size=args.batch_size)
+    finally:
+        conn.close()
+
+    if result.get('skipped'):
+        print(f"✗ Not scored: {result['skipped']}")
+        return 1
+
+    print(f"✓ Scored {result['scored']:,} claims with model {result['model_version']} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
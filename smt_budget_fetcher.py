@@ -25,6 +25,8 @@ from typing import Optional, List, Dict, Any
 import requests
 from dotenv import load_dotenv
 
+from utils.vendor_code import normalize_vendor_code
+
 # Load environment variables
 load_dotenv()
 
@@ -384,9 +386,11 @@ class SMTBudgetFetcher:
             id SERIAL PRIMARY KEY,
             run_date DATE,
             posting_date VARCHAR(20),
+            posting_month CHAR(6) GENERATED ALWAYS AS (LEFT(posting_date, 6)) STORED,
             batch_no VARCHAR(20),
             ref_doc_no VARCHAR(50),
             vendor_no VARCHAR(20),
+            vendor_code5 VARCHAR(10),
             fund_name VARCHAR(100),
             fund_group INTEGER,
             fund_group_desc VARCHAR(100),
@@ -427,16 +431,17 @@ class SMTBudgetFetcher:
             insert_sql = """
             INSERT INTO smt_budget_transfers (
                 run_date, posting_date, batch_no, ref_doc_no, vendor_no,
-                fund_name, fund_group, fund_group_desc, fund_desc, efund_desc,
-                mou_grp_code, amount, wait_amount, debt_amount, bond_amount,
-                total_amount, bank_name, payment_status, budget_source,
-                moph_id, moph_desc
+                vendor_code5, fund_name, fund_group, fund_group_desc, fund_desc,
+                efund_desc, mou_grp_code, amount, wait_amount, debt_amount,
+                bond_amount, total_amount, bank_name, payment_status,
+                budget_source, moph_id, moph_desc
             ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
                 %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
             )
             ON CONFLICT (ref_doc_no, vendor_no, posting_date, mou_grp_code)
             DO UPDATE SET
+                vendor_code5 = EXCLUDED.vendor_code5,
                 amount = EXCLUDED.amount,
                 total_amount = EXCLUDED.total_amount,
                 payment_status = EXCLUDED.payment_status
@@ -445,15 +450,16 @@ class SMTBudgetFetcher:
             insert_sql = """
             INSERT INTO smt_budget_transfers (
                 run_date, posting_date, batch_no, ref_doc_no, vendor_no,
-                fund_name, fund_group, fund_group_desc, fund_desc, efund_desc,
-                mou_grp_code, amount, wait_amount, debt_amount, bond_amount,
-                total_amount, bank_name, payment_status, budget_source,
-                moph_id, moph_desc
+                vendor_code5, fund_name, fund_group, fund_group_desc, fund_desc,
+                efund_desc, mou_grp_code, amount, wait_amount, debt_amount,
+                bond_amount, total_amount, bank_name, payment_status,
+                budget_source, moph_id, moph_desc
             ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
                 %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
             )
             ON DUPLICATE KEY UPDATE
+                vendor_code5 = VALUES(vendor_code5),
                 amount = VALUES(amount),
                 total_amount = VALUES(total_amount),
                 payment_status = VALUES(payment_status)
@@ -494,6 +500,7 @@ class SMTBudgetFetcher:
                     record.get('batchNo') or None,
                     record.get('refDocNo') or None,
                     record.get('vndrNo') or None,
+                    normalize_vendor_code(record.get('vndrNo')),
                     record.get('fundName') or None,
                     to_int(record.get('fundGroup')),
                     record.get('fundGroupDescr') or record.get('fundGroupDesc') or None,
@@ -519,6 +526,16 @@ class SMTBudgetFetcher:
 
         conn.commit()
         cursor.close()
+
+        # Refresh benchmark snapshots for the fiscal years this fetch touched
+        if insert_count:
+            try:
+                from utils.benchmark_snapshots import fiscal_years_of_records, rebuild_benchmark_snapshots
+                result = rebuild_benchmark_snapshots(conn, fiscal_years_of_records(records))
+                stream_log(f"✓ Benchmark snapshots rebuilt for FY {result['fiscal_years']}", 'info')
+            except Exception as e:
+                stream_log(f"⚠ Benchmark snapshots not rebuilt: {e}", 'warning')
+
         conn.close()
 
         stream_log(f"✓ Saved {insert_count} records to database", 'success')
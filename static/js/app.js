@@ -4,7 +4,107 @@
 
 // State
 let pollingInterval = null;
-let importPollingInterval = null;
+let importProgressWatch = null;
+
+// Progress push: one SSE connection per page, shared by all progress watchers
+const progressWatchers = new Set();
+let progressEventSource = null;
+let progressStreamFailed = false;
+
+/**
+ * Watch a progress channel, falling back to polling when SSE is unavailable
+ *
+ * @param {string} channel - Progress channel (download:rep, import, seed)
+ * @param {string} pollUrl - Polling endpoint returning the same JSON
+ * @param {number} intervalMs - Polling interval for the fallback
+ * @param {function} onProgress - Called with each snapshot; return true to stop watching
+ * @returns {object} Watcher handle for stopProgressWatch()
+ */
+function watchProgress(channel, pollUrl, intervalMs, onProgress) {
+    const watcher = { channel, pollUrl, intervalMs, onProgress, timer: null };
+    progressWatchers.add(watcher);
+
+    if (window.EventSource && !progressStreamFailed) {
+        connectProgressStream();
+    } else {
+        startProgressPolling(watcher);
+    }
+    return watcher;
+}
+
+/**
+ * Stop a progress watcher
+ */
+function stopProgressWatch(watcher) {
+    if (!watcher || !progressWatchers.has(watcher)) return;
+
+    progressWatchers.delete(watcher);
+    if (watcher.timer) {
+        clearInterval(watcher.timer);
+        watcher.timer = null;
+    }
+    if (!progressStreamFailed) {
+        connectProgressStream();
+    }
+}
+
+function deliverProgress(watcher, progress) {
+    if (progressWatchers.has(watcher) && watcher.onProgress(progress) === true) {
+        stopProgressWatch(watcher);
+    }
+}
+
+function startProgressPolling(watcher) {
+    if (watcher.timer) return;
+
+    watcher.timer = setInterval(async () => {
+        try {
+            const response = await fetch(watcher.pollUrl);
+            deliverProgress(watcher, await response.json());
+        } catch (error) {
+            console.error(`Error polling ${watcher.channel} progress:`, error);
+        }
+    }, watcher.intervalMs);
+}
+
+/**
+ * (Re)open the shared progress stream for the channels currently watched
+ */
+function connectProgressStream() {
+    const channels = [...new Set([...progressWatchers].map(w => w.channel))].sort();
+    const channelKey = channels.join(',');
+
+    if (progressEventSource && progressEventSource.channelKey === channelKey) return;
+    if (progressEventSource) {
+        progressEventSource.close();
+        progressEventSource = null;
+    }
+    if (channels.length === 0) return;
+
+    const source = new EventSource('/api/progress/stream?channels=' + encodeURIComponent(channelKey));
+    source.channelKey = channelKey;
+
+    channels.forEach(channel => {
+        source.addEventListener(channel, (event) => {
+            const progress = JSON.parse(event.data);
+            [...progressWatchers]
+                .filter(w => w.channel === channel)
+                .forEach(w => deliverProgress(w, progress));
+        });
+    });
+
+    source.onerror = () => {
+        // EventSource retries by itself; poll only once it has given up
+        if (source.readyState !== EventSource.CLOSED || progressEventSource !== source) return;
+
+        console.warn('Progress stream unavailable, falling back to polling');
+        progressEventSource = null;
+        progressStreamFailed = true;
+        progressWatchers.forEach(startProgressPolling);
+    };
+
+    progressEventSource = source;
+}
 
 /**
  * Trigger download and start polling for status
@@ -1026,6 +1126,8 @@ async function cancelBulkDownload() {
                 clearInterval(pollingInterval);
                 pollingInterval = null;
             }
+            stopProgressWatch(bulkProgressWatch);
+            bulkProgressWatch = null;
 
             // Hide progress and reset button
             const progressDiv = document.getElementById('bulk-progress');
@@ -1113,7 +1215,7 @@ function toggleParallelWorkersSection() {
 }
 
 // Parallel download progress polling interval
-let parallelPollingInterval = null;
+let parallelProgressWatch = null;
 
 /**
  * Start polling parallel download progress
@@ -1128,109 +1230,103 @@ function startParallelProgressPolling() {
     // Show progress display
     if (progressDiv) progressDiv.classList.remove('hidden');
 
-    // Clear any existing interval
-    if (parallelPollingInterval) {
-        clearInterval(parallelPollingInterval);
-    }
+    // Stop any existing watcher
+    stopProgressWatch(parallelProgressWatch);
 
-    // Poll every 2 seconds
-    parallelPollingInterval = setInterval(async () => {
-        try {
-            const response = await fetch('/api/download/parallel/progress');
-            const progress = await response.json();
-
-            if (progress.running || progress.status === 'downloading') {
-                // Update display
-                const completed = progress.completed || 0;
-                const skipped = progress.skipped || 0;
-                const total = progress.total || 0;
-                const failed = progress.failed || 0;
-                const workers = progress.workers || [];
-
-                // Calculate processed (completed + skipped)
-                const processed = completed + skipped;
+    // Pushed over the progress stream (polled every 2 seconds as fallback)
+    parallelProgressWatch = watchProgress('download:rep', '/api/download/parallel/progress', 2000, (progress) => {
+        if (progress.running || progress.status === 'downloading') {
+            // Update display
+            const completed = progress.completed || 0;
+            const skipped = progress.skipped || 0;
+            const total = progress.total || 0;
+            const failed = progress.failed || 0;
+            const workers = progress.workers || [];
 
-                // Update current status
-                if (currentMonthSpan) {
-                    const workerInfo = workers.length > 0
-                        ? workers.map(w => w.name.split('/')[0]).join(', ')
-                        : `${Object.keys(progress.current_files || {}).length} active`;
-                    currentMonthSpan.textContent = `Parallel: ${workerInfo}`;
-                }
+            // Calculate processed (completed + skipped)
+            const processed = completed + skipped;
 
-                // Update progress count with detailed breakdown
-                if (progressCountSpan) {
-                    if (skipped > 0 || completed > 0) {
-                        progressCountSpan.textContent = `${processed} / ${total} files (${completed} new, ${skipped} skipped)`;
-                    } else {
-                        progressCountSpan.textContent = `${processed} / ${total} files`;
-                    }
-                }
+            // Update current status
+            if (currentMonthSpan) {
+                const workerInfo = workers.length > 0
+                    ? workers.map(w => w.name.split('/')[0]).join(', ')
+                    : `${Object.keys(progress.current_files || {}).length} active`;
+                currentMonthSpan.textContent = `Parallel: ${workerInfo}`;
+            }
 
-                // Update progress bar (use processed instead of completed)
-                const percentage = total > 0 ? (processed / total) * 100 : 0;
-                if (progressBar) {
-                    progressBar.style.width = `${Math.max(percentage, 2)}%`;
+            // Update progress count with detailed breakdown
+            if (progressCountSpan) {
+                if (skipped > 0 || completed > 0) {
+                    progressCountSpan.textContent = `${processed} / ${total} files (${completed} new, ${skipped} skipped)`;
+                } else {
+                    progressCountSpan.textContent = `${processed} / ${total} files`;
                 }
+            }
 
-                // Update percentage text
-                if (progressPercentage) {
-                    progressPercentage.textContent = `${processed}/${total}`;
-                }
+            // Update progress bar (use processed instead of completed)
+            const percentage = total > 0 ? (processed / total) * 100 : 0;
+            if (progressBar) {
+                progressBar.style.width = `${Math.max(percentage, 2)}%`;
+            }
 
-            } else if (progress.status === 'stale' || progress.status === 'interrupted') {
-                // Stale or interrupted download - show warning and allow force cancel
-                clearInterval(parallelPollingInterval);
-                parallelPollingInterval = null;
+            // Update percentage text
+            if (progressPercentage) {
+                progressPercentage.textContent = `${processed}/${total}`;
+            }
 
-                const reason = progress.stale_reason || progress.interrupted_reason || 'Process stopped unexpectedly';
+        } else if (progress.status === 'stale' || progress.status === 'interrupted') {
+            // Stale or interrupted download - show warning and allow force cancel
+            stopProgressWatch(parallelProgressWatch);
+            parallelProgressWatch = null;
 
-                // Update UI to show stale state
-                if (currentMonthSpan) {
-                    currentMonthSpan.textContent = progress.status === 'stale' ? '⚠️ Process not responding' : '⚠️ Interrupted';
-                }
+            const reason = progress.stale_reason || progress.interrupted_reason || 'Process stopped unexpectedly';
 
-                // Change cancel button to "Clear & Retry"
-                const cancelBtn = document.getElementById('cancel-download-btn');
-                if (cancelBtn) {
-                    cancelBtn.textContent = '🔄 ล้างแล้วลองใหม่';
-                    cancelBtn.className = 'px-4 py-2 bg-orange-500 hover:bg-orange-600 text-white text-sm font-medium rounded-md transition-colors flex items-center gap-2';
-                    cancelBtn.onclick = () => forceCleanDownload();
-                }
+            // Update UI to show stale state
+            if (currentMonthSpan) {
+                currentMonthSpan.textContent = progress.status === 'stale' ? '⚠️ Process not responding' : '⚠️ Interrupted';
+            }
 
-                // Show warning toast
-                showToast('⚠️ Download ' + progress.status + ': ' + reason, 'warning');
+            // Change cancel button to "Clear & Retry"
+            const cancelBtn = document.getElementById('cancel-download-btn');
+            if (cancelBtn) {
+                cancelBtn.textContent = '🔄 ล้างแล้วลองใหม่';
+                cancelBtn.className = 'px-4 py-2 bg-orange-500 hover:bg-orange-600 text-white text-sm font-medium rounded-md transition-colors flex items-center gap-2';
+                cancelBtn.onclick = () => forceCleanDownload();
+            }
 
-            } else if (progress.status === 'completed' || progress.status === 'error') {
-                // Download completed
-                clearInterval(parallelPollingInterval);
-                parallelPollingInterval = null;
+            // Show warning toast
+            showToast('⚠️ Download ' + progress.status + ': ' + reason, 'warning');
 
-                if (progress.status === 'completed') {
-                    showToast('Parallel download completed! ' + (progress.completed || 0) + ' files', 'success');
-                } else {
-                    showToast('Download error: ' + (progress.error || 'Unknown'), 'error');
-                }
+        } else if (['completed', 'error', 'failed', 'cancelled'].includes(progress.status)) {
+            // Download finished (pushed snapshots never fall back to 'idle')
+            stopProgressWatch(parallelProgressWatch);
+            parallelProgressWatch = null;
 
-                // Reset button
-                setDownloadButtonState(false);
+            if (progress.status === 'completed') {
+                showToast('Parallel download completed! ' + (progress.completed || 0) + ' files', 'success');
+            } else {
+                showToast('Download ' + progress.status + ': ' + (progress.error || 'Unknown'), 'error');
+            }
 
-                // Update progress to 100%
-                if (progressBar) progressBar.style.width = '100%';
-                if (progressPercentage) progressPercentage.textContent = '✓ Done';
+            // Reset button
+            setDownloadButtonState(false);
 
-                // Hide progress after delay
-                setTimeout(() => {
-                    if (progressDiv) progressDiv.classList.add('hidden');
-                }, 3000);
-            }
+            // Update progress to 100%
+            if (progressBar) progressBar.style.width = '100%';
+            if (progressPercentage) progressPercentage.textContent = '✓ Done';
 
-        } catch (error) {
-            console.error('Error polling parallel progress:', error);
+            // Hide progress after delay
+            setTimeout(() => {
+                if (progressDiv) progressDiv.classList.add('hidden');
+            }, 3000);
         }
-    }, 2000);
+
+    });
 }
 
+// Bulk download progress watcher
+let bulkProgressWatch = null;
+
 /**
  * Start polling bulk download progress
  */
@@ -1244,101 +1340,92 @@ function startBulkProgressPolling() {
     // Show progress display
     progressDiv.classList.remove('hidden');
 
-    // Clear any existing interval
-    if (pollingInterval) {
-        clearInterval(pollingInterval);
-    }
-
-    // Poll every 3 seconds
-    pollingInterval = setInterval(async () => {
-        try {
-            const response = await fetch('/api/downloads/bulk/progress');
-            const progress = await response.json();
-
-            if (progress.running && progress.current_month) {
-                // Get iteration progress (X/Y files)
-                const currentIdx = progress.iteration_current_idx || 0;
-                const totalFiles = progress.iteration_total_files || 0;
-                const fileCount = progress.current_files || 0;
-
-                // Format file progress string
-                let fileProgressText;
-                if (totalFiles > 0) {
-                    fileProgressText = `${currentIdx}/${totalFiles} files`;
-                } else if (fileCount > 0) {
-                    fileProgressText = `${fileCount} files`;
-                } else {
-                    fileProgressText = 'loading...';
-                }
+    // Stop any existing watcher
+    stopProgressWatch(bulkProgressWatch);
+
+    // Pushed over the progress stream (polled every 3 seconds as fallback)
+    bulkProgressWatch = watchProgress('download:bulk', '/api/downloads/bulk/progress', 3000, (progress) => {
+        if (progress.running && progress.current_month) {
+            // Get iteration progress (X/Y files)
+            const currentIdx = progress.iteration_current_idx || 0;
+            const totalFiles = progress.iteration_total_files || 0;
+            const fileCount = progress.current_files || 0;
+
+            // Format file progress string
+            let fileProgressText;
+            if (totalFiles > 0) {
+                fileProgressText = `${currentIdx}/${totalFiles} files`;
+            } else if (fileCount > 0) {
+                fileProgressText = `${fileCount} files`;
+            } else {
+                fileProgressText = 'loading...';
+            }
 
-                // Update current month with file progress
-                currentMonthSpan.textContent = `Month ${progress.current_month.month}/${progress.current_month.year} (${fileProgressText})`;
+            // Update current month with file progress
+            currentMonthSpan.textContent = `Month ${progress.current_month.month}/${progress.current_month.year} (${fileProgressText})`;
 
-                // Update progress count
-                progressCountSpan.textContent = `${progress.completed_months} / ${progress.total_months} months`;
+            // Update progress count
+            progressCountSpan.textContent = `${progress.completed_months} / ${progress.total_months} months`;
 
-                // Calculate progress percentage based on iterations and current file
-                const totalIterations = progress.total_iterations || 1;
-                const completedIterations = progress.completed_iterations || 0;
-                let percentage;
-                if (totalFiles > 0 && currentIdx > 0) {
-                    // Include partial progress of current iteration
-                    const iterationProgress = currentIdx / totalFiles;
-                    percentage = ((completedIterations + iterationProgress) / totalIterations) * 100;
-                } else {
-                    percentage = (completedIterations / totalIterations) * 100;
-                }
-                // Show at least 2% to indicate activity
-                percentage = Math.max(percentage, progress.status === 'running' ? 2 : 0);
-                progressBar.style.width = `${percentage}%`;
-
-                // Show file progress or percentage
-                if (totalFiles > 0) {
-                    progressPercentage.textContent = `${currentIdx}/${totalFiles}`;
-                } else if (completedIterations === 0) {
-                    progressPercentage.textContent = 'Starting...';
-                } else {
-                    progressPercentage.textContent = `${Math.round(percentage)}%`;
-                }
+            // Calculate progress percentage based on iterations and current file
+            const totalIterations = progress.total_iterations || 1;
+            const completedIterations = progress.completed_iterations || 0;
+            let percentage;
+            if (totalFiles > 0 && currentIdx > 0) {
+                // Include partial progress of current iteration
+                const iterationProgress = currentIdx / totalFiles;
+                percentage = ((completedIterations + iterationProgress) / totalIterations) * 100;
+            } else {
+                percentage = (completedIterations / totalIterations) * 100;
             }
+            // Show at least 2% to indicate activity
+            percentage = Math.max(percentage, progress.status === 'running' ? 2 : 0);
+            progressBar.style.width = `${percentage}%`;
+
+            // Show file progress or percentage
+            if (totalFiles > 0) {
+                progressPercentage.textContent = `${currentIdx}/${totalFiles}`;
+            } else if (completedIterations === 0) {
+                progressPercentage.textContent = 'Starting...';
+            } else {
+                progressPercentage.textContent = `${Math.round(percentage)}%`;
+            }
+        }
 
-            if (progress.status === 'completed') {
-                // Bulk download completed
-                clearInterval(pollingInterval);
-                pollingInterval = null;
+        if (progress.status === 'completed') {
+            // Bulk download completed
+            stopProgressWatch(bulkProgressWatch);
+            bulkProgressWatch = null;
 
-                progressBar.style.width = '100%';
-                progressPercentage.textContent = '100%';
+            progressBar.style.width = '100%';
+            progressPercentage.textContent = '100%';
 
-                showToast('Bulk download completed!', 'success');
-                setDownloadButtonState(false);
+            showToast('Bulk download completed!', 'success');
+            setDownloadButtonState(false);
 
-                // Refresh page after 2 seconds
-                setTimeout(() => {
-                    location.reload();
-                }, 2000);
-            } else if (progress.status === 'failed') {
-                // Bulk download failed
-                clearInterval(pollingInterval);
-                pollingInterval = null;
+            // Refresh page after 2 seconds
+            setTimeout(() => {
+                location.reload();
+            }, 2000);
+        } else if (progress.status === 'failed') {
+            // Bulk download failed
+            stopProgressWatch(bulkProgressWatch);
+            bulkProgressWatch = null;
 
-                showToast('Bulk download failed. Check logs for details.', 'error');
-                setDownloadButtonState(false);
+            showToast('Bulk download failed. Check logs for details.', 'error');
+            setDownloadButtonState(false);
 
-                // Hide progress after 3 seconds
-                setTimeout(() => {
-                    progressDiv.classList.add('hidden');
-                }, 3000);
-            } else if (!progress.running) {
-                // Download stopped unexpectedly
-                clearInterval(pollingInterval);
-                pollingInterval = null;
-                setDownloadButtonState(false);
-            }
-        } catch (error) {
-            console.error('Error polling bulk progress:', error);
+            // Hide progress after 3 seconds
+            setTimeout(() => {
+                progressDiv.classList.add('hidden');
+            }, 3000);
+        } else if (!progress.running) {
+            // Download stopped unexpectedly
+            stopProgressWatch(bulkProgressWatch);
+            bulkProgressWatch = null;
+            setDownloadButtonState(false);
         }
-    }, 3000);
+    });
 }
 
 /**
@@ -1450,52 +1537,42 @@ function closeImportModal() {
         modal.classList.add('hidden');
     }
 
-    // Stop polling
-    if (importPollingInterval) {
-        clearInterval(importPollingInterval);
-        importPollingInterval = null;
-    }
+    // Stop watching progress
+    stopProgressWatch(importProgressWatch);
+    importProgressWatch = null;
 }
 
 /**
  * Start polling import progress
  */
 function startImportProgressPolling() {
-    // Clear any existing interval
-    if (importPollingInterval) {
-        clearInterval(importPollingInterval);
-    }
-
-    // Poll every 2 seconds
-    importPollingInterval = setInterval(async () => {
-        try {
-            const response = await fetch('/api/imports/progress');
-            const progress = await response.json();
+    // Stop any existing watcher
+    stopProgressWatch(importProgressWatch);
 
-            updateImportProgressUI(progress);
+    // Pushed over the progress stream (polled every 2 seconds as fallback)
+    importProgressWatch = watchProgress('import', '/api/imports/progress', 2000, (data) => {
+        const progress = data.progress || data;
+        updateImportProgressUI(progress);
 
-            if (!progress.running || progress.status === 'completed') {
-                // Import completed
-                clearInterval(importPollingInterval);
-                importPollingInterval = null;
+        if (!progress.running || progress.status === 'completed') {
+            // Import completed
+            stopProgressWatch(importProgressWatch);
+            importProgressWatch = null;
 
-                // Update to 100%
-                document.getElementById('import-progress-bar').style.width = '100%';
-                document.getElementById('import-progress-percentage').textContent = '100%';
-                document.getElementById('import-progress-text').textContent = 'Import completed!';
+            // Update to 100%
+            document.getElementById('import-progress-bar').style.width = '100%';
+            document.getElementById('import-progress-percentage').textContent = '100%';
+            document.getElementById('import-progress-text').textContent = 'Import completed!';
 
-                showToast('Import completed successfully!', 'success');
+            showToast('Import completed successfully!', 'success');
 
-                // Close modal and refresh after 2 seconds
-                setTimeout(() => {
-                    closeImportModal();
-                    location.reload();
-                }, 2000);
-            }
-        } catch (error) {
-            console.error('Error polling import progress:', error);
+            // Close modal and refresh after 2 seconds
+            setTimeout(() => {
+                closeImportModal();
+                location.reload();
+            }, 2000);
         }
-    }, 2000);
+    });
 }
 
 /**
@@ -421,6 +421,16 @@ class STMDownloader:
             stream_log("No statements found to download.")
             return []
 
+        # Look up all statements in one batched query; the per-file
+        # _is_already_downloaded() checks below are then served from cache
+        try:
+            self._get_history_db().filter_not_downloaded('stm', [
+                f"STM_{stmt['download_params']['document_no']}.xls"
+                for stmt in statements if stmt.get('download_params')
+            ])
+        except Exception as e:
+            stream_log(f"Warning: Could not check download history: {e}", 'warning')
+
         downloaded_files = []
         skipped = 0
         errors = 0
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Test API Key Validation Cache and Batched Usage Logging
+
+Verifies (without a database - lookups and writes are patched):
+1. A validated key is looked up once and then served from memory
+2. revoke_api_key / delete_api_key drop the cached key immediately
+3. Usage logs and last_used_at are written in one batch on flush
+4. Usage queued for a deleted key does not block later flushes
+
+Run: python test_api_key_cache.py
+"""
+
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils import api_key_manager
+from utils.api_key_manager import APIKeyCache, APIKeyManager, APIUsageBuffer
+
+KEY = 'eck_' + 'a' * 48
+ROW = {
+    'id': 7, 'key_name': 'HIS', 'hospital_code': '10670', 'rate_limit': 100,
+    'allowed_ips': '["10.0.0.5"]', 'expires_at': None, 'is_active': True, 'last_used_at': None
+}
+
+
+def test_validation_cached():
+    """Test validated keys are served from the cache."""
+    print("\nTesting: Cached API key validation...")
+
+    with mock.patch.object(api_key_manager, 'api_key_cache', APIKeyCache(ttl=60)), \
+            mock.patch.object(api_key_manager, 'api_usage_buffer', APIUsageBuffer(flush_interval=3600)), \
+            mock.patch.object(api_key_manager, '_fetch_api_key', return_value=dict(ROW)) as fetch:
+        iterations = 10000
+        start = time.perf_counter()
+        for _ in range(iterations):
+            is_valid, key_data, error = APIKeyManager.validate_api_key(KEY, '10.0.0.5')
+        per_call_us = (time.perf_counter() - start) / iterations * 1_000_000
+
+        if is_valid and key_data['id'] == 7 and fetch.call_count == 1:
+            print(f"✓ 1 lookup for {iterations:,} validations ({per_call_us:.1f} us per call)")
+        else:
+            print(f"✗ valid={is_valid} error={error} lookups={fetch.call_count}")
+            return False
+
+        is_valid, _, error = APIKeyManager.validate_api_key(KEY, '10.0.0.9')
+        if not is_valid and 'not allowed' in error:
+            print("✓ IP whitelist still enforced for cached keys")
+            return True
+
+        print(f"✗ Unexpected result for disallowed IP: valid={is_valid} error={error}")
+        return False
+
+
+def test_revoke_and_delete_invalidate():
+    """Test revoke/delete drop the cached key."""
+    print("\nTesting: Revocation invalidates cache...")
+
+    revoked_row = {**ROW, 'is_active': False}
+    with mock.patch.object(api_key_manager, 'api_key_cache', APIKeyCache(ttl=60)), \
+            mock.patch.object(api_key_manager, 'api_usage_buffer', APIUsageBuffer(flush_interval=3600)), \
+            mock.patch.object(api_key_manager, 'get_connection', side_effect=FakeConnection), \
+            mock.patch.object(api_key_manager, 'return_connection'), \
+            mock.patch.object(api_key_manager, '_fetch_api_key', side_effect=[dict(ROW), revoked_row, None]):
+        APIKeyManager.validate_api_key(KEY)
+        APIKeyManager.revoke_api_key(7)
+        is_valid, _, error = APIKeyManager.validate_api_key(KEY)
+
+        if not is_valid and error == "API key is disabled":
+            print("✓ Revoked key rejected immediately")
+        else:
+            print(f"✗ Revoked key still accepted: valid={is_valid} error={error}")
+            return False
+
+        APIKeyManager.delete_api_key(7)
+        is_valid, _, error = APIKeyManager.validate_api_key(KEY)
+
+        if not is_valid and error == "Invalid API key":
+            print("✓ Deleted key rejected immediately")
+            return True
+
+        print(f"✗ Deleted key still accepted: valid={is_valid} error={error}")
+        return False
+
+
+def test_usage_batched():
+    """Test usage rows are written in one batch."""
+    print("\nTesting: Batched usage logging...")
+
+    buffer = APIUsageBuffer(flush_interval=3600)
+    with mock.patch.object(api_key_manager, 'api_usage_buffer', buffer), \
+            mock.patch.object(api_key_manager, '_write_usage',
+                              side_effect=lambda rows, last_used: len(rows)) as write_usage:
+        for i in range(50):
+            buffer.touch(7)
+            APIKeyManager.log_api_usage(7, '/api/v1/claims', 'GET', '10.0.0.5', 'HIS', 200, 3,
+                                        request_params={'query': {'page': str(i)}})
+
+        if write_usage.call_count != 0 or buffer.pending() != 50:
+            print(f"✗ Usage written synchronously ({write_usage.call_count} writes)")
+            return False
+
+        written = buffer.flush()
+        rows, last_used = write_usage.call_args[0]
+
+        if written == 50 and write_usage.call_count == 1 and len(rows) == 50 and list(last_used) == [7]:
+            print("✓ 50 usage rows and last_used_at written in one batch")
+        else:
+            print(f"✗ Unexpected flush: written={written} calls={write_usage.call_count}")
+            return False
+
+        write_usage.side_effect = RuntimeError('database down')
+        APIKeyManager.log_api_usage(7, '/api/v1/claims', 'GET', '10.0.0.5', 'HIS', 200, 3)
+        buffer.flush()
+
+        if buffer.pending() == 1:
+            print("✓ Rows kept for retry when the flush fails")
+            return True
+
+        print(f"✗ {buffer.pending()} rows pending after failed flush")
+        return False
+
+
+class IntegrityError(Exception):
+    """Stands in for psycopg2 / pymysql IntegrityError"""
+
+
+def test_deleted_key_usage():
+    """Test usage rows for a deleted key are dropped instead of blocking the buffer."""
+    print("\nTesting: Usage for deleted keys...")
+
+    keys = {7, 8, 9}
+
+    def delete_key(query, params):
+        keys.discard(params[0])
+        return []
+
+    def missing_key(query, params):
+        if 'INSERT INTO api_usage_logs' in query and any(row[0] not in keys for row in params):
+            return IntegrityError('violates foreign key constraint "api_usage_logs_api_key_id_fkey"')
+
+    conn = FakeConnection({
+        'DELETE FROM api_keys': delete_key,
+        'SELECT id FROM api_keys': lambda query, params: [(k,) for k in params if k in keys],
+    }, fail_on=missing_key)
+
+    buffer = APIUsageBuffer(flush_interval=3600)
+    with mock.patch.object(api_key_manager, 'api_key_cache', APIKeyCache(ttl=60)), \
+            mock.patch.object(api_key_manager, 'api_usage_buffer', buffer), \
+            mock.patch.object(api_key_manager, 'get_connection', return_value=conn), \
+            mock.patch.object(api_key_manager, 'return_connection'):
+        for key_id in (7, 9, 7, 9):
+            buffer.touch(key_id)
+            APIKeyManager.log_api_usage(key_id, '/api/v1/claims', 'GET', '10.0.0.5', 'HIS', 200, 3)
+        APIKeyManager.delete_api_key(9)
+
+        if buffer.pending() != 2 or 9 in buffer._last_used:
+            print(f"✗ {buffer.pending()} rows pending after delete_api_key")
+            return False
+        if buffer.flush() != 2 or conn.rollbacks:
+            print(f"✗ Flush after delete failed: {conn.batches}")
+            return False
+        print("✓ delete_api_key drops the key's queued usage; next flush writes the rest")
+
+        # Deleted by another worker: the insert hits the foreign key
+        keys.discard(8)
+        for key_id in (8, 7, 8):
+            APIKeyManager.log_api_usage(key_id, '/api/v1/claims', 'GET', '10.0.0.5', 'HIS', 200, 3)
+        written = buffer.flush()
+        APIKeyManager.log_api_usage(7, '/api/v1/claims', 'GET', '10.0.0.5', 'HIS', 200, 3)
+        inserted = [row[0] for _, rows in conn.batches[-1:] for row in rows]
+
+        if written != 1 or conn.rollbacks != 1 or buffer.flush() != 1 or buffer.pending() != 0:
+            print(f"✗ Flush with a deleted key wrote {written}, {buffer.pending()} rows pending")
+            return False
+        if inserted != [7]:
+            print(f"✗ Inserted rows for keys {inserted}")
+            return False
+
+        with mock.patch.object(api_key_manager, '_write_usage', side_effect=IntegrityError('duplicate')):
+            APIKeyManager.log_api_usage(7, '/api/v1/claims', 'GET', '10.0.0.5', 'HIS', 200, 3)
+            buffer.flush()
+
+        if buffer.pending() == 0:
+            print("✓ Rows for keys deleted elsewhere dropped; integrity errors are not re-queued")
+            return True
+
+        print(f"✗ {buffer.pending()} rows re-queued after an integrity error")
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("API KEY CACHE TEST")
+    print("="*60)
+
+    tests = [
+        ("Validation Cached", test_validation_cached),
+        ("Revoke and Delete Invalidate", test_revoke_and_delete_invalidate),
+        ("Usage Batched", test_usage_batched),
+        ("Deleted Key Usage", test_deleted_key_usage),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
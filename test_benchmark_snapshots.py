@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test Benchmark Snapshots
+
+Verifies that benchmark metrics are precomputed per fiscal year:
+1. Fiscal years are derived from SMT run dates (Oct-Sep, Buddhist Era)
+2. A fetch rebuilds only the fiscal years it touched, one transaction each
+3. Missing fiscal years are built on first read, existing ones are reused
+4. /api/benchmark/my-hospital reads the snapshot tables, not the transfers
+
+Run: python test_benchmark_snapshots.py
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.benchmark_snapshots import (
+    ensure_benchmark_snapshots,
+    fiscal_year_of,
+    fiscal_years_of_records,
+    rebuild_benchmark_snapshots,
+)
+
+
+def test_fiscal_years():
+    """Test fiscal year derivation."""
+    print("\nTesting: Fiscal years of SMT records...")
+
+    cases = {
+        date(2025, 9, 30): 2568,
+        date(2025, 10, 1): 2569,
+        '2026-01-15': 2569,
+        '2026-01-15T00:00:00': 2569,
+        'not a date': None,
+        None: None,
+    }
+    for value, expected in cases.items():
+        if fiscal_year_of(value) != expected:
+            print(f"✗ {value!r} -> {fiscal_year_of(value)}, expected {expected}")
+            return False
+
+    records = [{'runDt': '2025-09-01'}, {'runDt': '2025-10-02'}, {'runDt': ''}, {}]
+    if fiscal_years_of_records(records) == {2568, 2569}:
+        print("✓ Run dates map to Buddhist Era fiscal years (Oct-Sep)")
+        return True
+
+    print(f"✗ Touched years: {fiscal_years_of_records(records)}")
+    return False
+
+
+def test_rebuild_touched_years():
+    """Test a rebuild only touches the given fiscal years."""
+    print("\nTesting: Rebuild touched fiscal years...")
+
+    conn = FakeConnection(rowcount=3, fail_on=lambda query, params: 'INSERT INTO smt_benchmark_group_fy' in query
+                          and 2567 in params)
+    result = rebuild_benchmark_snapshots(conn, {2569, 2567})
+
+    transfer_scans = [params for query, params in conn.queries if 'FROM smt_budget_transfers' in query]
+    ranges = {params[1:] for params in transfer_scans}
+
+    if result['fiscal_years'] != [2569] or conn.rollbacks != 1 or conn.commits != 1:
+        print(f"✗ Unexpected result: {result}, commits={conn.commits}, rollbacks={conn.rollbacks}")
+        return False
+    if ranges != {('2023-10-01', '2024-09-30'), ('2025-10-01', '2026-09-30')}:
+        print(f"✗ Unexpected date ranges: {ranges}")
+        return False
+
+    runs = [params for query, params in conn.queries if query.startswith('INSERT INTO smt_benchmark_runs')]
+    if runs == [(2569, 3)]:
+        print("✓ FY 2569 built and recorded, failing FY 2567 rolled back alone")
+        return True
+
+    print(f"✗ Runs recorded: {runs}")
+    return False
+
+
+def test_ensure_builds_missing():
+    """Test only fiscal years without a snapshot are built."""
+    print("\nTesting: Build on first read...")
+
+    conn = FakeConnection({
+        'MIN(run_date)': [(date(2024, 3, 1), date(2025, 11, 5))],
+        'FROM smt_benchmark_runs': [(2568,)],
+    })
+    built = ensure_benchmark_snapshots(conn)
+    if built != [2567, 2569]:
+        print(f"✗ Built {built}, expected [2567, 2569]")
+        return False
+
+    conn = FakeConnection({'FROM smt_benchmark_runs': [(2569,), (2568,)]})
+    built = ensure_benchmark_snapshots(conn, [2569, 2568])
+    if built == [] and not any(query.startswith('INSERT') for query, _ in conn.queries):
+        print("✓ Missing years built once, existing snapshots reused")
+        return True
+
+    print(f"✗ Rebuilt existing snapshots: {conn.queries}")
+    return False
+
+
+def test_my_hospital_reads_snapshots():
+    """Test the hospital dashboard is served from snapshot tables."""
+    print("\nTesting: /api/benchmark/my-hospital from snapshots...")
+
+    from flask import Flask
+    import routes.benchmark_api as benchmark_api
+
+    conn = FakeConnection({
+        'FROM smt_benchmark_runs': [(2569,), (2568,)],
+        'FROM health_offices': [('รพ.ทดสอบ', 'A', 'Province', 'เขตสุขภาพที่ 1', '10670', 100)],
+        'COALESCE(SUM(records), 0) as records': [(40, 1000000, 100000, 50000, 0)],
+        'as prev_total': [(800000,)],
+        'as fund_category': [('IPD', 600000, 60000, 30000, 10)],
+        'fund_group_desc, COALESCE': [('IP_CF', 1, 'IPD', 600000, 10)],
+        'FROM smt_benchmark_vendor_month': [(2025, 10, 100000, 10000, 5000, 4)],
+        'as total_hospitals': [(900, 99)],
+    })
+
+    app = Flask(__name__)
+    app.register_blueprint(benchmark_api.benchmark_api_bp)
+    original = benchmark_api.get_db_connection
+    benchmark_api.get_db_connection = lambda: conn
+    try:
+        response = app.test_client().get('/api/benchmark/my-hospital?vendor_id=0000010670&fiscal_year=2569')
+    finally:
+        benchmark_api.get_db_connection = original
+
+    data = response.get_json()
+    scans = [query for query, _ in conn.queries if 'smt_budget_transfers' in query and 'MIN(run_date)' not in query]
+    if scans or not data or not data.get('success'):
+        print(f"✗ Response {data}, transfer scans: {scans}")
+        return False
+
+    summary = data['summary']
+    if summary['record_count'] == 40 and summary['growth_yoy'] == 25.0 \
+            and data['monthly_trend'][0]['month'] == '2025-10' and data['ranking']['national']['rank'] == 100:
+        print("✓ Summary, YoY, monthly trend and ranking served from snapshots")
+        return True
+
+    print(f"✗ Unexpected response: {data}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("BENCHMARK SNAPSHOTS TEST")
+    print("="*60)
+
+    tests = [
+        ("Fiscal Years", test_fiscal_years),
+        ("Rebuild Touched Years", test_rebuild_touched_years),
+        ("Ensure Builds Missing", test_ensure_builds_missing),
+        ("My Hospital Reads Snapshots", test_my_hospital_reads_snapshots),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
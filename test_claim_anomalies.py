@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Test Claim Anomaly Detection
+
+Verifies the single-pass anomaly statistics behind /api/predictive/anomalies:
+1. Streamed statistics match NumPy on the full data (PERCENTILE_CONT quartiles)
+2. Per-scheme / per-DRG bounds, outlier counts and z-score outliers
+3. Sketch quantiles beyond the exact row limit stay within the accuracy bound
+4. Results are cached until the import generation changes
+5. The endpoint validates the segment parameter
+
+Run: python test_claim_anomalies.py
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.import_generation import generation_cache
+from utils.ml.anomaly_detector import ClaimAnomalyDetector, get_claim_anomalies
+
+
+def make_claims(n=5000, seed=7):
+    """(id, claim, reimb, rw, scheme, drg) rows with a few extreme claims"""
+    rng = np.random.default_rng(seed)
+    claims = rng.lognormal(8, 1, n)
+    claims[:10] *= 50
+    reimbs = claims * rng.uniform(0.7, 1.0, n)
+    reimbs[::7] = np.nan
+    rws = rng.gamma(2, 0.5, n)
+    schemes = rng.choice(['UCS', 'OFC', 'LGO', None], n)
+    drgs = rng.choice([f"0{i}010" for i in range(1, 9)], n)
+    return [
+        (i + 1, float(claims[i]), None if np.isnan(reimbs[i]) else float(reimbs[i]), float(rws[i]), schemes[i], drgs[i])
+        for i in range(n)
+    ]
+
+
+def make_connection(claims, generation=(3, 1000, '2026-10-01 10:00:00')):
+    """Fake connection over the claims; set conn.generation to simulate an import"""
+    by_id = {row[0]: row for row in claims}
+
+    def details(query, params):
+        return [
+            (i, f"T{i}", f"HN{i}", 'Patient', date(2025, 11, 1), 'IP', by_id[i][5],
+             by_id[i][1], by_id[i][2], by_id[i][2], None, by_id[i][3], by_id[i][4])
+            for i in params
+        ]
+
+    conn = FakeConnection({
+        'FROM eclaim_imported_files': lambda query, params: [conn.generation],
+        'WHERE claim_drg IS NOT NULL': claims,
+        'WHERE id IN': details,
+    })
+    conn.generation = generation
+    return conn
+
+
+def scans(conn):
+    """Number of full claim scans run on the connection"""
+    return len(conn.statements('WHERE claim_drg IS NOT NULL'))
+
+
+def test_matches_numpy():
+    """Test streamed statistics match NumPy on the full arrays."""
+    print("\nTesting: Exact statistics...")
+
+    rows = make_claims()
+    conn = make_connection(rows)
+    result = ClaimAnomalyDetector(chunk_rows=700).analyze(conn)
+
+    claims = np.array([row[1] for row in rows])
+    q1, median, q3 = np.percentile(claims, [25, 50, 75])
+    upper = q3 + 1.5 * (q3 - q1)
+    stats = result['statistics']
+    expected = {'mean': claims.mean(), 'std': claims.std(ddof=1), 'median': median, 'q1': q1, 'q3': q3,
+                'min': claims.min(), 'max': claims.max()}
+    if result['method'] != 'exact' or any(not np.isclose(stats[k], v) for k, v in expected.items()):
+        print(f"✗ Statistics {stats}, expected {expected}")
+        return False
+    if scans(conn) != 1 or result['summary']['high_value_anomalies'] != int((claims > upper).sum()):
+        print(f"✗ Scans {scans(conn)}, summary {result['summary']}")
+        return False
+
+    top = [row[0] for row in sorted(rows, key=lambda r: -r[1]) if row[1] > upper][:20]
+    if result['high_value_ids'] != top:
+        print(f"✗ High-value ids {result['high_value_ids'][:5]}, expected {top[:5]}")
+        return False
+
+    print(f"✓ One scan, quartiles and {len(top)} high-value outliers match NumPy")
+    return True
+
+
+def test_segments():
+    """Test per-scheme and per-DRG statistics."""
+    print("\nTesting: Segment statistics...")
+
+    rows = make_claims()
+    result = ClaimAnomalyDetector(chunk_rows=1000).analyze(make_connection(rows))
+
+    for name, column in (('scheme', 4), ('drg', 5)):
+        groups = {g['segment']: g for g in result['segments'][name]['groups']}
+        for label in {row[column] for row in rows}:
+            values = np.array([row[1] for row in rows if row[column] == label])
+            q1, median, q3 = np.percentile(values, [25, 50, 75])
+            upper = q3 + 1.5 * (q3 - q1)
+            group = groups[label]
+            if not (np.isclose(group['median'], median) and np.isclose(group['upper'], upper)
+                    and group['count'] == len(values) and group['outlier_count'] == int((values > upper).sum())):
+                print(f"✗ {name} {label}: {group}, expected median {median}, upper {upper}")
+                return False
+
+    outlier_ids = result['segments']['drg']['outlier_ids']
+    if len(outlier_ids) == 20 and 1 in outlier_ids:
+        print("✓ Scheme and DRG quartiles, bounds and outlier counts match per group")
+        return True
+
+    print(f"✗ DRG outliers: {outlier_ids}")
+    return False
+
+
+def test_sketch_mode():
+    """Test quantiles stay within the sketch accuracy past the exact limit."""
+    print("\nTesting: Sketch quantiles...")
+
+    rows = make_claims(n=20000, seed=11)
+    exact = ClaimAnomalyDetector(chunk_rows=2000).analyze(make_connection(rows))
+    sketch = ClaimAnomalyDetector(chunk_rows=2000, exact_max_rows=5000).analyze(make_connection(rows))
+
+    if sketch['method'] != 'sketch' or sketch['statistics']['mean'] != exact['statistics']['mean']:
+        print(f"✗ Method {sketch['method']}, mean {sketch['statistics']['mean']}")
+        return False
+    for key in ('q1', 'median', 'q3'):
+        error = abs(sketch['statistics'][key] - exact['statistics'][key]) / exact['statistics'][key]
+        if error > 0.02:
+            print(f"✗ {key} off by {error:.2%}")
+            return False
+    if sketch['high_value_ids'][:5] != exact['high_value_ids'][:5]:
+        print("✗ Top outliers differ in sketch mode")
+        return False
+
+    print("✓ Sketch quartiles within 2% of exact, means and top outliers exact")
+    return True
+
+
+def test_cached_per_generation():
+    """Test the scan is reused until the import generation changes."""
+    print("\nTesting: Import generation cache...")
+
+    generation_cache.invalidate()
+    conn = make_connection(make_claims(n=500))
+    first = get_claim_anomalies(conn, segment='scheme')
+    get_claim_anomalies(conn)
+    if scans(conn) != 1:
+        print(f"✗ Scanned {scans(conn)} times for one generation")
+        return False
+
+    conn.generation = (4, 1200, '2026-10-02 09:00:00')
+    get_claim_anomalies(conn)
+    if scans(conn) != 2:
+        print(f"✗ Scanned {scans(conn)} times after a new import")
+        return False
+
+    segments = first['segments']
+    if segments['by'] == 'scheme' and segments['groups'] and first['high_value_claims'][0]['tran_id'].startswith('T'):
+        print("✓ One scan per import generation, details attached to outliers")
+        return True
+
+    print(f"✗ Unexpected result: {first}")
+    return False
+
+
+def test_endpoint():
+    """Test /api/predictive/anomalies parameters and response."""
+    print("\nTesting: /api/predictive/anomalies...")
+
+    from flask import Flask
+    import routes.analytics_api as analytics_api
+
+    generation_cache.invalidate()
+    conn = make_connection(make_claims(n=500))
+    app = Flask(__name__)
+    app.register_blueprint(analytics_api.analytics_api_bp)
+    original = analytics_api.get_db_connection
+    analytics_api.get_db_connection = lambda: conn
+    try:
+        client = app.test_client()
+        bad = client.get('/api/predictive/anomalies?segment=hospital')
+        response = client.get('/api/predictive/anomalies?segment=drg&limit=3')
+    finally:
+        analytics_api.get_db_connection = original
+
+    data = response.get_json().get('data', {})
+    if bad.status_code != 400:
+        print(f"✗ Invalid segment returned {bad.status_code}")
+        return False
+    if len(data.get('segments', {}).get('groups', [])) == 3 and 'high_value_claims' in data \
+            and 'rw_anomalies' in data:
+        print("✓ Invalid segment rejected, DRG segments limited to 3")
+        return True
+
+    print(f"✗ Unexpected response: {response.get_json()}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("CLAIM ANOMALIES TEST")
+    print("="*60)
+
+    tests = [
+        ("Matches NumPy", test_matches_numpy),
+        ("Segments", test_segments),
+        ("Sketch Mode", test_sketch_mode),
+        ("Cached Per Generation", test_cached_per_generation),
+        ("Endpoint", test_endpoint),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Test Claim Migrations 017-021 Against a Database
+
+Applies pending migrations to the test database and checks the features
+built on migrations 017-021 with real SQL:
+1. Search columns, generated columns, snapshot tables and score columns exist
+2. service_month / fiscal_year_be / posting_month are generated on insert
+3. search_claims() finds REP claims and SMT transfers exactly and partially
+4. Benchmark snapshots aggregate one fiscal year of SMT transfers
+5. score_claims() persists denial_risk_score and denial_risk_model
+
+Fixture rows use HN / ref_doc_no prefix DBT and fiscal year 2545, and are
+deleted afterwards. Skipped unless a test database is configured (see
+db_test_support.py).
+
+Run: TEST_DB_NAME=eclaim_test python test_claim_migrations_db.py
+"""
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import SkipTest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config.database import DB_TYPE
+from db_test_support import connect_test_db, migrate_test_db
+from utils.vendor_code import normalize_vendor_code
+
+PREFIX = 'DBT%'  # LIKE pattern of the fixture HNs / reference documents
+FISCAL_YEAR = 2545  # October 2001 - September 2002
+VENDOR_NO = '0000099991'
+
+REP_ROWS = [
+    # tran_id, hn, an, pid, dateadm, service_type, drg, main_fund, main_inscl, ptype, error_code, claim_drg, rw, adjrw
+    ('DBT00000001', 'DBT0001', 'DBTAN01', '9999999999991', '2001-10-05 08:00:00', 'IP', '01010', 'UCS', 'UCS',
+     '1', '998', 2500, 0.8, 0.9),
+    ('DBT00000002', 'DBT0002', 'DBT-AN-02', '9999999999992', '2002-09-30 08:00:00', 'OP', '02010', 'UCS', 'UCS',
+     '2', '0', 900, 0.3, 0.3),
+]
+
+SMT_ROWS = [
+    # run_date, posting_date, ref_doc_no, fund_group_desc, total_amount, wait_amount, debt_amount
+    ('2001-11-01', '25441101', 'DBT-REF-1', 'DBT FUND', 1000, 100, 10),
+    ('2002-03-01', '25450301', 'DBT-REF-2', 'DBT FUND', 500, 0, 0),
+]
+
+SNAPSHOT_TABLES = ('smt_benchmark_runs', 'smt_benchmark_vendor_fy', 'smt_benchmark_vendor_month',
+                   'smt_benchmark_vendor_fund', 'smt_benchmark_group_fy')
+
+_migrated = False
+
+
+def delete_fixtures(conn):
+    """Remove fixture claims, transfers and snapshot rows"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM claim_rep_opip_nhso_item WHERE hn LIKE %s", (PREFIX,))
+    cursor.execute("DELETE FROM smt_budget_transfers WHERE ref_doc_no LIKE %s", (PREFIX,))
+    for table in SNAPSHOT_TABLES:
+        cursor.execute(f"DELETE FROM {table} WHERE fiscal_year = %s", (FISCAL_YEAR,))
+    conn.commit()
+    cursor.close()
+
+
+@contextmanager
+def fixture_database():
+    """Migrated test database with the fixture rows"""
+    global _migrated
+
+    conn = connect_test_db()
+    try:
+        if not _migrated:
+            migrate_test_db(conn)
+            _migrated = True
+        delete_fixtures(conn)
+
+        cursor = conn.cursor()
+        for row in REP_ROWS:
+            cursor.execute("""
+                INSERT INTO claim_rep_opip_nhso_item (
+                    tran_id, hn, an, pid, name, dateadm, service_type, drg, main_fund,
+                    main_inscl, ptype, error_code, claim_drg, rw, adjrw_nhso
+                ) VALUES (%s, %s, %s, %s, 'Test Patient', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, row)
+        for row in SMT_ROWS:
+            cursor.execute("""
+                INSERT INTO smt_budget_transfers (
+                    run_date, posting_date, ref_doc_no, fund_group_desc, total_amount,
+                    wait_amount, debt_amount, vendor_no, vendor_code5, fund_name, fund_group
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'DBT', 1)
+            """, (*row, VENDOR_NO, normalize_vendor_code(VENDOR_NO)))
+        conn.commit()
+        cursor.close()
+
+        yield conn
+    finally:
+        try:
+            conn.rollback()
+            delete_fixtures(conn)
+        finally:
+            conn.close()
+
+
+def test_schema():
+    """Test migrations 017-021 created their columns and tables."""
+    print("\nTesting: Migrated schema...")
+
+    expected = {
+        ('claim_rep_opip_nhso_item', 'service_month'), ('claim_rep_opip_nhso_item', 'fiscal_year_be'),
+        ('claim_rep_opip_nhso_item', 'denial_risk_score'), ('claim_rep_opip_nhso_item', 'denial_risk_model'),
+        ('stm_claim_item', 'fiscal_year_be'), ('smt_budget_transfers', 'vendor_code5'),
+        ('smt_budget_transfers', 'posting_month'), ('smt_benchmark_vendor_fy', 'vendor_code5'),
+    }
+    if DB_TYPE == 'mysql':
+        expected.add(('claim_search_tokens', 'token'))
+
+    with fixture_database() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = """ + ("DATABASE()" if DB_TYPE == 'mysql' else "current_schema()"))
+        columns = {(row[0].lower(), row[1].lower()) for row in cursor.fetchall()}
+        if DB_TYPE == 'postgresql':
+            cursor.execute("SELECT COUNT(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+            trigram = cursor.fetchone()[0] == 1
+        else:
+            trigram = True
+        cursor.close()
+
+    missing = expected - columns
+    if not missing and trigram:
+        print(f"✓ {len(expected)} columns from migrations 017-021 present")
+        return True
+
+    print(f"✗ Missing {sorted(missing)}, pg_trgm {trigram}")
+    return False
+
+
+def test_generated_columns():
+    """Test generated month and fiscal-year columns."""
+    print("\nTesting: Generated columns...")
+
+    with fixture_database() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT hn, service_month, fiscal_year_be FROM claim_rep_opip_nhso_item
+            WHERE hn LIKE %s ORDER BY hn
+        """, (PREFIX,))
+        claims = [tuple(row) for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT ref_doc_no, posting_month FROM smt_budget_transfers
+            WHERE ref_doc_no LIKE %s ORDER BY ref_doc_no
+        """, (PREFIX,))
+        transfers = [tuple(row) for row in cursor.fetchall()]
+        cursor.close()
+
+    if claims == [('DBT0001', '2001-10', 2545), ('DBT0002', '2002-09', 2545)] \
+            and transfers == [('DBT-REF-1', '254411'), ('DBT-REF-2', '254503')]:
+        print("✓ October and September admissions fall in FY 2545, posting_month from posting_date")
+        return True
+
+    print(f"✗ Claims {claims}, transfers {transfers}")
+    return False
+
+
+def test_search():
+    """Test exact and partial search on REP claims and SMT transfers."""
+    print("\nTesting: Claim search...")
+
+    from utils.claim_search import search_claims
+
+    partial = 'prefix' if DB_TYPE == 'mysql' else 'trigram'
+    with fixture_database() as conn:
+        cursor = conn.cursor()
+        by_pid = search_claims(cursor, 'rep', '9-9999-99999-99-1', db_type=DB_TYPE)
+        by_hn = search_claims(cursor, 'rep', 'dbt000', db_type=DB_TYPE)
+        by_an = search_claims(cursor, 'rep', 'DBT-AN-02', db_type=DB_TYPE)
+        by_ref = search_claims(cursor, 'smt', 'DBT-REF-2', db_type=DB_TYPE)
+        by_fund = search_claims(cursor, 'smt', 'DBT FU', db_type=DB_TYPE)
+        cursor.close()
+
+    checks = [
+        (by_pid[1] == 'exact' and [row[0] for row in by_pid[0]] == ['DBT00000001'], f"PID {by_pid}"),
+        (by_hn[1] == partial and sorted(row[2] for row in by_hn[0]) == ['DBT0001', 'DBT0002'], f"HN {by_hn}"),
+        (by_an[1] == 'exact' and [row[0] for row in by_an[0]] == ['DBT00000002'], f"Dashed AN {by_an}"),
+        (by_ref[1] == 'exact' and [row[1] for row in by_ref[0]] == ['DBT-REF-2'], f"SMT ref {by_ref}"),
+        (by_fund[1] == partial and len(by_fund[0]) == 2, f"SMT fund {by_fund}"),
+    ]
+    for ok, detail in checks:
+        if not ok:
+            print(f"✗ Unexpected {detail}")
+            return False
+
+    print(f"✓ Exact PID / dashed AN / reference lookups, {partial} partial matches on HN and fund group")
+    return True
+
+
+def test_snapshots():
+    """Test one fiscal year of SMT transfers is aggregated into the snapshot tables."""
+    print("\nTesting: Benchmark snapshots...")
+
+    from utils.benchmark_snapshots import rebuild_benchmark_snapshots
+
+    with fixture_database() as conn:
+        result = rebuild_benchmark_snapshots(conn, {FISCAL_YEAR})
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT vendor_code5, records, total_amount, wait_amount, debt_amount
+            FROM smt_benchmark_vendor_fy WHERE fiscal_year = %s AND vendor_no = %s
+        """, (FISCAL_YEAR, VENDOR_NO))
+        vendor = cursor.fetchone()
+        cursor.execute("""
+            SELECT COUNT(*) FROM smt_benchmark_vendor_month WHERE fiscal_year = %s AND vendor_no = %s
+        """, (FISCAL_YEAR, VENDOR_NO))
+        months = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM smt_benchmark_runs WHERE fiscal_year = %s", (FISCAL_YEAR,))
+        runs = cursor.fetchone()[0]
+        cursor.close()
+
+    if result['fiscal_years'] == [FISCAL_YEAR] and vendor \
+            and (vendor[0], vendor[1], float(vendor[2]), float(vendor[3]), float(vendor[4])) == ('99991', 2, 1500, 100, 10) \
+            and months == 2 and runs == 1:
+        print("✓ FY 2545 snapshot: 2 transfers, 2 months, normalised vendor code")
+        return True
+
+    print(f"✗ Result {result}, vendor {vendor}, months {months}, runs {runs}")
+    return False
+
+
+def test_scoring():
+    """Test denial risk scores are persisted with the model version."""
+    print("\nTesting: Denial risk scoring...")
+
+    from utils.ml.predictor import get_predictor
+    from utils.ml.risk_scoring import score_claims
+
+    predictor = get_predictor()
+    if not predictor.ensure_loaded():
+        print("✗ Model file not available")
+        return False
+
+    with fixture_database() as conn:
+        result = score_claims(conn, 'hn LIKE %s', (PREFIX,), predictor=predictor, batch_size=1)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT denial_risk_score, denial_risk_model FROM claim_rep_opip_nhso_item
+            WHERE hn LIKE %s ORDER BY hn
+        """, (PREFIX,))
+        scores = [tuple(row) for row in cursor.fetchall()]
+        cursor.close()
+
+    if result['scored'] == 2 and len(scores) == 2 \
+            and all(score is not None and 0 <= float(score) <= 1 and model == predictor.model_version
+                    for score, model in scores):
+        print(f"✓ 2 claims scored in 2 batches with model {predictor.model_version}")
+        return True
+
+    print(f"✗ Result {result}, stored {scores}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("CLAIM MIGRATIONS DATABASE TEST")
+    print("="*60)
+
+    tests = [
+        ("Schema", test_schema),
+        ("Generated Columns", test_generated_columns),
+        ("Search", test_search),
+        ("Snapshots", test_snapshots),
+        ("Scoring", test_scoring),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except SkipTest as e:
+            print(f"- Skipped: {e}")
+            results.append((name, None))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    skipped = sum(1 for _, success in results if success is None)
+    total = len(results)
+
+    for name, success in results:
+        status = "- SKIP" if success is None else "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed, {skipped} skipped")
+    return 0 if passed + skipped == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Test Claim Search Routing
+
+Verifies that claim search uses indexed paths instead of '%q%' scans:
+1. Query shape detection (13-digit PID, TRAN_ID, numeric HN, text)
+2. Exact match runs first and short-circuits the partial match
+3. Partial match uses trigram ILIKE (PostgreSQL) or token prefix (MySQL)
+4. PostgreSQL matches dashed identifiers as typed and normalised
+5. SMT transfers match ref_doc_no / fund_group_desc the same way
+
+Run: python test_claim_search.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.claim_search import classify_query, normalize_identifier, search_claims
+
+
+def make_cursor(*results):
+    """Fake connection and cursor answering successive queries with the given result sets"""
+    results = list(results)
+    conn = FakeConnection(default=lambda query, params: results.pop(0) if results else [])
+    return conn, conn.cursor()
+
+
+def test_query_shapes():
+    """Test identifier shape detection."""
+    print("\nTesting: Query shape detection...")
+
+    cases = {
+        '1234567890123': ('pid', ('pid',)),
+        '1-2345-67890-12-3': ('pid', ('pid',)),
+        '68012345001': ('tran_id', ('tran_id', 'hn', 'an')),
+        '00123456': ('hn', ('hn', 'an')),
+        'an6612345': ('text', ('tran_id', 'hn', 'an', 'pid')),
+    }
+
+    for query, expected in cases.items():
+        if classify_query(query) != expected:
+            print(f"✗ {query!r} classified as {classify_query(query)}, expected {expected}")
+            return False
+
+    if normalize_identifier(' an-66 12345 ') == 'AN6612345':
+        print(f"✓ {len(cases)} query shapes detected, identifiers normalised")
+        return True
+
+    print(f"✗ Unexpected normalisation: {normalize_identifier(' an-66 12345 ')!r}")
+    return False
+
+
+def test_exact_first():
+    """Test an exact hit skips the partial match."""
+    print("\nTesting: Exact path first...")
+
+    row = ('68012345001', 'REP001', '123', 'Patient', None, 100)
+    conn, cursor = make_cursor([row])
+    rows, strategy = search_claims(cursor, 'rep', '1234567890123', db_type='postgresql')
+
+    query, params = conn.queries[0]
+    if rows == [row] and strategy == 'exact' and len(conn.queries) == 1 \
+            and 'WHERE pid IN (%s)' in query and 'LIKE' not in query and params == ('1234567890123', 50):
+        print("✓ PID looked up with one indexed equality query")
+    else:
+        print(f"✗ Unexpected queries: {conn.queries}")
+        return False
+
+    conn, cursor = make_cursor([])
+    rows, strategy = search_claims(cursor, 'stm', '12', db_type='postgresql')
+    if strategy == 'exact' and len(conn.queries) == 1:
+        print("✓ Queries shorter than 3 characters never scan")
+        return True
+
+    print(f"✗ Short query ran {len(conn.queries)} queries ({strategy})")
+    return False
+
+
+def test_partial_fallback():
+    """Test the partial match per database."""
+    print("\nTesting: Partial match fallback...")
+
+    conn, cursor = make_cursor([], [('row',)])
+    rows, strategy = search_claims(cursor, 'rep', '12_45', db_type='postgresql')
+    query, params = conn.queries[1]
+    if not (strategy == 'trigram' and rows == [('row',)] and 'pid ILIKE %s' in query
+            and params[0] == '%12\\_45%'):
+        print(f"✗ Unexpected PostgreSQL fallback: {strategy}, {conn.queries}")
+        return False
+    print("✓ PostgreSQL falls back to trigram-indexed ILIKE with escaped wildcards")
+
+    conn, cursor = make_cursor([], [('row',)])
+    rows, strategy = search_claims(cursor, 'stm', '6612', db_type='mysql')
+    exact_query, exact_params = conn.queries[0]
+    prefix_query, prefix_params = conn.queries[1]
+
+    if strategy == 'prefix' and 'FROM stm_claim_item' in exact_query \
+            and 'token = %s' in exact_query and exact_params == ('6612', 'stm', 'hn', 'an', 50) \
+            and 'token LIKE %s' in prefix_query and prefix_params == ('6612%', 'stm', 50) \
+            and 'ILIKE' not in prefix_query:
+        print("✓ MySQL uses claim_search_tokens for exact and prefix matches")
+        return True
+
+    print(f"✗ Unexpected MySQL queries: {conn.queries}")
+    return False
+
+
+def test_dashed_identifier():
+    """Test PostgreSQL compares raw columns with the query as typed and normalised."""
+    print("\nTesting: Dashed identifiers on PostgreSQL...")
+
+    row = ('68012345001', 'REP001', '123', 'Patient', None, 100)
+    conn, cursor = make_cursor([row])
+    rows, strategy = search_claims(cursor, 'rep', ' 66-00123 ', db_type='postgresql')
+    query, params = conn.queries[0]
+    if not (rows == [row] and strategy == 'exact' and 'an IN (%s, %s)' in query
+            and params == ('66-00123', '6600123', '66-00123', '6600123', 50)):
+        print(f"✗ Unexpected exact lookup: {conn.queries}")
+        return False
+    print("✓ AN 66-00123 looked up as typed and as 6600123 (classified as HN/AN)")
+
+    conn, cursor = make_cursor([], [])
+    search_claims(cursor, 'rep', 'an-66', db_type='postgresql')
+    query, params = conn.queries[1]
+    if query.count('ILIKE %s') == 8 and params[:2] == ('%an-66%', '%AN66%') and params[-1] == 50:
+        print("✓ Trigram fallback matches both forms")
+        return True
+
+    print(f"✗ Unexpected trigram fallback: {conn.queries}")
+    return False
+
+
+def test_smt_documents():
+    """Test SMT search by reference document and fund group."""
+    print("\nTesting: SMT document search...")
+
+    conn, cursor = make_cursor([('25681001', 'R-001', 'UC', 100, 'C')])
+    rows, strategy = search_claims(cursor, 'smt', ' R-001 ', db_type='postgresql')
+    query, params = conn.queries[0]
+    if not (strategy == 'exact' and len(conn.queries) == 1 and 'FROM smt_budget_transfers' in query
+            and 'ref_doc_no = %s OR fund_group_desc = %s' in query and params == ('R-001', 'R-001', 50)):
+        print(f"✗ Unexpected exact lookup: {strategy}, {conn.queries}")
+        return False
+    print("✓ Reference document looked up with an indexed equality query, dashes kept")
+
+    conn, cursor = make_cursor([], [])
+    search_claims(cursor, 'smt', 'ผู้ป่วย', db_type='postgresql')
+    _, trigram_params = conn.queries[1]
+    conn, cursor = make_cursor([], [])
+    rows, strategy = search_claims(cursor, 'smt', 'R-0', db_type='mysql')
+    prefix_query, prefix_params = conn.queries[1]
+
+    if trigram_params == ('%ผู้ป่วย%', '%ผู้ป่วย%', 50) and strategy == 'prefix' \
+            and 'ref_doc_no LIKE %s OR fund_group_desc LIKE %s' in prefix_query \
+            and prefix_params == ('R-0%', 'R-0%', 50):
+        print("✓ Partial match: trigram ILIKE on PostgreSQL, indexed prefix LIKE on MySQL")
+        return True
+
+    print(f"✗ Unexpected partial match: {trigram_params}, {conn.queries}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("CLAIM SEARCH TEST")
+    print("="*60)
+
+    tests = [
+        ("Query Shapes", test_query_shapes),
+        ("Exact First", test_exact_first),
+        ("Partial Fallback", test_partial_fallback),
+        ("Dashed Identifier", test_dashed_identifier),
+        ("SMT Documents", test_smt_documents),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
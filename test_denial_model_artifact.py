@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test Compact Denial Model Artefact
+
+Verifies the memory-mapped model format used by DenialPredictor:
+1. The flat-array forest scores exactly like the joblib RandomForest
+2. A stale artefact (other training run) falls back to the joblib bundle
+3. Loading maps the arrays and imports no sklearn
+4. preload_model() loads the shared predictor in a background thread
+
+Run: python test_denial_model_artifact.py
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import utils.ml.predictor as predictor_module
+from utils.ml.model_artifact import load_artifact
+from utils.ml.predictor import DenialPredictor
+from test_denial_predictor_batch import make_claims
+
+
+def load_metadata():
+    with open(predictor_module.METADATA_PATH) as f:
+        return json.load(f)
+
+
+def test_matches_joblib_forest():
+    """Test the exported forest returns the sklearn forest's probabilities."""
+    print("\nTesting: Flat forest vs joblib forest...")
+
+    import joblib
+
+    artifact = load_artifact(predictor_module.ARTIFACT_DIR, trained_at=load_metadata()['trained_at'])
+    if artifact is None:
+        print("✗ Artefact missing or stale (run scripts/export_denial_model.py)")
+        return False
+
+    predictor = DenialPredictor()
+    predictor.ensure_loaded()
+    X = predictor._prepare_batch([predictor._claim_values(claim) for claim in make_claims(predictor, 2000)])
+    forest = joblib.load(predictor_module.MODEL_PATH)['model']
+
+    expected, actual = forest.predict_proba(X), artifact['model'].predict_proba(X)
+    if np.allclose(expected, actual, rtol=0, atol=1e-12) and \
+            (forest.predict(X) == artifact['model'].predict(X)).all():
+        print(f"✓ 2000 claims, {artifact['manifest']['n_estimators']} trees: same probabilities and classes")
+        return True
+
+    print(f"✗ Max difference {np.abs(expected - actual).max()}")
+    return False
+
+
+def test_stale_artifact_falls_back():
+    """Test an artefact from another training run is ignored."""
+    print("\nTesting: Stale artefact...")
+
+    original = predictor_module.ARTIFACT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        stale = Path(tmp) / 'denial_predictor'
+        shutil.copytree(original, stale)
+        manifest = json.loads((stale / 'manifest.json').read_text())
+        manifest['trained_at'] = '2020-01-01T00:00:00'
+        (stale / 'manifest.json').write_text(json.dumps(manifest))
+
+        predictor_module.ARTIFACT_DIR = stale
+        try:
+            predictor = DenialPredictor()
+            loaded = predictor.ensure_loaded()
+        finally:
+            predictor_module.ARTIFACT_DIR = original
+
+    if loaded and predictor.model_format == 'joblib' and predictor.class_index['drg']:
+        print("✓ Stale artefact ignored, joblib bundle loaded")
+        return True
+
+    print(f"✗ Loaded {loaded} as {predictor.model_format}")
+    return False
+
+
+def test_cold_load_without_sklearn():
+    """Test a fresh process maps the model without importing sklearn."""
+    print("\nTesting: Cold load...")
+
+    code = (
+        "import sys\n"
+        "import numpy as np\n"
+        "from utils.ml.predictor import DenialPredictor\n"
+        "p = DenialPredictor()\n"
+        "assert p.ensure_loaded()\n"
+        "result = p.predict({'service_type': 'IP', 'drg': 'NEW', 'error_code': '998', 'claim_amount': 2500})\n"
+        "print(p.model_format, 'sklearn' in sys.modules, isinstance(p.model.value.base, np.memmap),\n"
+        "      p.model.value.flags.writeable, result['risk_level'] != 'unknown')\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, timeout=120)
+
+    if result.stdout.split() == ['mmap', 'False', 'True', 'False', 'True']:
+        print("✓ Read-only mapped tree arrays, sklearn not imported, claim scored")
+        return True
+
+    print(f"✗ Output {result.stdout!r} {result.stderr[-500:]}")
+    return False
+
+
+def test_background_preload():
+    """Test preload_model() loads the shared predictor off the calling thread."""
+    print("\nTesting: Background preload...")
+
+    predictor_module._predictor = None
+    thread = predictor_module.preload_model()
+    thread.join(timeout=30)
+    predictor = predictor_module.get_predictor()
+
+    # A fork while the lock is held must not leave the child locked out
+    predictor._load_lock.acquire()
+    predictor_module._reset_after_fork()
+
+    if thread.name == 'ml-preload' and predictor.is_loaded and predictor._load_lock.acquire(timeout=1):
+        predictor._load_lock.release()
+        print(f"✓ Loaded in the background in {predictor.load_seconds * 1000:.0f}ms")
+        return True
+
+    print(f"✗ Loaded {predictor.is_loaded}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("DENIAL MODEL ARTEFACT TEST")
+    print("="*60)
+
+    tests = [
+        ("Matches Joblib Forest", test_matches_joblib_forest),
+        ("Stale Artefact Falls Back", test_stale_artifact_falls_back),
+        ("Cold Load Without Sklearn", test_cold_load_without_sklearn),
+        ("Background Preload", test_background_preload),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test Vectorised Denial Prediction
+
+Verifies that DenialPredictor.predict_batch:
+1. Returns exactly what predict() returns for each claim
+2. Calls the model once for the whole batch
+3. Keeps invalid claims as per-claim errors without failing the batch
+
+Run: python test_denial_predictor_batch.py
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.ml.predictor import CATEGORICAL_COLS, DenialPredictor
+
+
+def make_claims(predictor, count, seed=7):
+    """Claims mixing known and unseen categories, error codes and missing fields"""
+    rng = random.Random(seed)
+    classes = {col: list(predictor.class_index[col])[:50] + ['UNSEEN'] for col in CATEGORICAL_COLS}
+    claims = []
+
+    for _ in range(count):
+        claim = {col: rng.choice(classes[col]) for col in CATEGORICAL_COLS}
+        claim.update({
+            'error_code': rng.choice(['0', '', '998', 'E998', '101,998', '305', 'C438', 'none']),
+            'claim_amount': rng.choice([0, 1200, 3499.5, 25000, rng.uniform(0, 200000)]),
+            'rw': rng.choice([0, 0.3, 1.5, rng.uniform(0, 5)]),
+            'adjrw': rng.uniform(0, 5),
+        })
+        for key in rng.sample(list(claim), rng.randint(0, 3)):
+            del claim[key]  # Defaults apply
+        claims.append(claim)
+
+    return claims
+
+
+def load_predictor():
+    predictor = DenialPredictor()
+    if not predictor.ensure_loaded():
+        raise RuntimeError("Model file not available")
+    return predictor
+
+
+def test_matches_single_predictions():
+    """Test batch results equal per-claim results."""
+    print("\nTesting: Batch matches per-claim scoring...")
+
+    predictor = load_predictor()
+    claims = make_claims(predictor, 500)
+
+    expected = [predictor.predict(claim) for claim in claims]
+    actual = predictor.predict_batch(claims)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(actual, expected)) if a != b]
+    if len(actual) == len(expected) and not mismatches:
+        levels = {r['risk_level'] for r in actual}
+        print(f"✓ 500 claims identical to predict() (risk levels: {', '.join(sorted(levels))})")
+        return True
+
+    i = mismatches[0]
+    print(f"✗ {len(mismatches)} mismatches, first: {claims[i]} -> {actual[i]} != {expected[i]}")
+    return False
+
+
+def test_single_model_call():
+    """Test the model is invoked once per batch."""
+    print("\nTesting: One model call per batch...")
+
+    predictor = load_predictor()
+    calls = []
+    predict_proba = predictor.model.predict_proba
+
+    def counting_predict_proba(X):
+        calls.append(len(X))
+        return predict_proba(X)
+
+    predictor.model.predict_proba = counting_predict_proba
+    predictor.predict_batch(make_claims(predictor, 1000))
+
+    if calls == [1000]:
+        print("✓ 1,000 claims scored by one predict_proba call")
+        return True
+
+    print(f"✗ predict_proba calls: {calls[:10]} ({len(calls)} total)")
+    return False
+
+
+def test_invalid_claims():
+    """Test invalid claims fail individually like predict()."""
+    print("\nTesting: Invalid claims in a batch...")
+
+    predictor = load_predictor()
+    claims = [
+        {'service_type': 'IP', 'claim_amount': 5000},
+        {'service_type': 'OP', 'claim_amount': 'not a number'},
+        {'claim_amount': None},
+        'not a claim',
+        {'rw': 0.2, 'error_code': 'E998'},
+    ]
+
+    actual = predictor.predict_batch(claims)
+    expected = [predictor.predict(claim) for claim in claims]
+
+    if actual == expected and [r['risk_level'] == 'unknown' for r in actual] == [False, True, True, True, False]:
+        print("✓ Invalid claims returned per-claim errors, valid claims scored")
+        return True
+
+    print(f"✗ Unexpected results: {actual}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("DENIAL PREDICTOR BATCH TEST")
+    print("="*60)
+
+    tests = [
+        ("Matches Single Predictions", test_matches_single_predictions),
+        ("Single Model Call", test_single_model_call),
+        ("Invalid Claims", test_invalid_claims),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
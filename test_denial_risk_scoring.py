@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test Denial Risk Scoring at Import
+
+Verifies that denial risk is scored once and persisted:
+1. score_claims batches by primary key and stores predict_batch() scores
+2. Re-scoring only selects claims of another model version
+3. A scoring failure never fails the REP import
+4. /api/predictive/ml-high-risk reads persisted scores without the model
+
+Run: python test_denial_risk_scoring.py
+"""
+
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.ml.predictor import DenialPredictor, get_predictor
+from utils.ml.risk_scoring import rescore_stale, score_claims
+
+
+def make_rows(predictor, count):
+    """SCORE_COLUMNS rows: id, service_type, drg, main_fund, main_inscl, ptype, error_code, claim, rw, adjrw"""
+    classes = {col: list(predictor.class_index[col])[:5] for col in ('service_type', 'drg', 'main_fund',
+                                                                      'main_inscl', 'ptype')}
+    rows = []
+    for i in range(count):
+        rows.append((
+            i * 3 + 1,
+            classes['service_type'][i % len(classes['service_type'])],
+            classes['drg'][i % len(classes['drg'])],
+            classes['main_fund'][i % len(classes['main_fund'])],
+            classes['main_inscl'][i % len(classes['main_inscl'])],
+            'UNSEEN' if i % 7 == 0 else classes['ptype'][i % len(classes['ptype'])],
+            ['0', '998', 'C438', '305'][i % 4],
+            Decimal(str(500 + 137 * i)),
+            Decimal('0.4500') if i % 3 else Decimal('1.2000'),
+            Decimal('0.5000'),
+        ))
+    return rows
+
+
+def claims_connection(claims):
+    """Fake connection paging through claim rows by keyset (id > %s ... LIMIT %s)"""
+    def page(query, params):
+        if 'id > %s' not in query:
+            return []
+        last_id, limit = params[-2], params[-1]
+        return [row for row in claims if row[0] > last_id][:limit]
+
+    return FakeConnection({'FROM claim_rep_opip_nhso_item WHERE': page})
+
+
+def updates(conn):
+    """Rows written with executemany()"""
+    return [row for _, rows in conn.batches for row in rows]
+
+
+def test_score_claims():
+    """Test scores are computed in batches and match predict_batch()."""
+    print("\nTesting: Batch scoring...")
+
+    predictor = DenialPredictor()
+    if not predictor.ensure_loaded():
+        print("✗ Model file not available")
+        return False
+
+    rows = make_rows(predictor, 250)
+    conn = claims_connection(rows)
+    result = score_claims(conn, 'file_id = %s', (42,), predictor=predictor, batch_size=100)
+
+    selects = [params for query, params in conn.queries if 'id > %s' in query]
+    if result['scored'] != 250 or conn.commits != 3 or [p[1] for p in selects] != [0, 298, 598]:
+        print(f"✗ Result {result}, commits {conn.commits}, selects {selects}")
+        return False
+
+    claims = [{
+        'service_type': r[1], 'drg': r[2], 'main_fund': r[3], 'main_inscl': r[4], 'ptype': r[5],
+        'error_code': r[6], 'claim_amount': float(r[7]), 'rw': float(r[8]), 'adjrw': float(r[9]),
+    } for r in rows]
+    expected = [(p['risk_score'], predictor.model_version, r[0]) for p, r in zip(predictor.predict_batch(claims), rows)]
+    if updates(conn) != expected or selects[0][0] != 42:
+        print(f"✗ Updates {updates(conn)[:3]}, expected {expected[:3]}")
+        return False
+
+    print(f"✓ 250 claims scored in 3 batches with model {predictor.model_version}")
+    return True
+
+
+def test_rescore_stale():
+    """Test re-scoring selects unscored or other-version claims only."""
+    print("\nTesting: Re-score stale claims...")
+
+    predictor = get_predictor()
+    if not predictor.ensure_loaded():
+        print("✗ Model file not available")
+        return False
+
+    conn = claims_connection(make_rows(predictor, 10))
+    result = rescore_stale(conn)
+    query, params = conn.queries[0]
+    if 'denial_risk_model IS NULL OR denial_risk_model <> %s' in query and params[0] == predictor.model_version \
+            and result['scored'] == 10:
+        print("✓ Only claims without a score from the current model are re-scored")
+        return True
+
+    print(f"✗ Query {query} {params}")
+    return False
+
+
+def test_import_survives_scoring_failure():
+    """Test a scoring error is logged, rolled back and returned."""
+    print("\nTesting: Import with failing scoring...")
+
+    from utils.eclaim.importer_v2 import EClaimImporterV2
+
+    importer = EClaimImporterV2.__new__(EClaimImporterV2)
+    importer.conn = FakeConnection(
+        fail_on=lambda query, params: RuntimeError('column "denial_risk_score" does not exist')
+    )
+    result = importer._score_denial_risk(7)
+
+    if result['scored'] == 0 and 'denial_risk_score' in result['skipped'] and importer.conn.rollbacks == 1:
+        print("✓ Missing column reported as skipped, transaction rolled back")
+        return True
+
+    print(f"✗ Result {result}, rollbacks {importer.conn.rollbacks}")
+    return False
+
+
+def test_high_risk_reads_scores():
+    """Test /api/predictive/ml-high-risk uses persisted scores."""
+    print("\nTesting: /api/predictive/ml-high-risk...")
+
+    from flask import Flask
+    import routes.analytics_api as analytics_api
+
+    predictor = get_predictor()
+    if not predictor.ensure_loaded():
+        print("✗ Model file not available")
+        return False
+
+    conn = FakeConnection({
+        'SELECT COUNT(denial_risk_score)': [(1200,)],
+        'ORDER BY denial_risk_score DESC': [
+            ('T1', 'HN1', 'Patient', 'IP', '01010', 'UCS', '998', Decimal('2500'), Decimal('0.3'), Decimal('0.8123'), '1.0.0@x'),
+            ('T2', 'HN2', 'Patient', 'OP', '02010', 'UCS', '0', Decimal('9000'), Decimal('1.2'), Decimal('0.4500'), '1.0.0@x'),
+        ],
+        'SELECT COUNT(*) FROM claim_rep_opip_nhso_item WHERE denial_risk_score >= %s': [(37,)],
+    })
+
+    app = Flask(__name__)
+    app.register_blueprint(analytics_api.analytics_api_bp)
+    original_conn = analytics_api.get_db_connection
+    original_proba = predictor.model.predict_proba
+    analytics_api.get_db_connection = lambda: conn
+
+    def no_inference(X):
+        raise AssertionError('model called')
+
+    predictor.model.predict_proba = no_inference
+    try:
+        response = app.test_client().get('/api/predictive/ml-high-risk')
+    finally:
+        analytics_api.get_db_connection = original_conn
+        predictor.model.predict_proba = original_proba
+
+    data = response.get_json().get('data', {})
+    claims = data.get('high_risk_claims', [])
+    if data.get('scored_at_import') and data['high_risk_count'] == 37 and data['total_analyzed'] == 1200 \
+            and [c['risk_level'] for c in claims] == ['high', 'medium'] \
+            and claims[0]['factors'][0]['factor'] == 'High Risk Error Code':
+        print("✓ Top claims, counts and risk factors served from denial_risk_score")
+        return True
+
+    print(f"✗ Unexpected response: {response.get_json()}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("DENIAL RISK SCORING TEST")
+    print("="*60)
+
+    tests = [
+        ("Score Claims", test_score_claims),
+        ("Rescore Stale", test_rescore_stale),
+        ("Import Survives Scoring Failure", test_import_survives_scoring_failure),
+        ("High Risk Reads Scores", test_high_risk_reads_scores),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
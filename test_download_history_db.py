@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Test Batched Download History Lookups
+
+Verifies the batched, cached DownloadHistoryDB paths used by the downloaders:
+1. filter_not_downloaded() queries in BATCH_SIZE chunks and keeps input order
+2. Records missing on disk are marked file_exists = FALSE in one UPDATE
+3. statuses / require_file_exists select the downloaded rule
+4. Cached lookups skip the database; writes keep the cache in sync
+5. record_downloads() writes one row per filename per multi-row upsert
+6. EClaimDownloader and ParallelDownloader go through these methods
+
+Run: python test_download_history_db.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.download_history_db import DownloadHistoryDB
+
+
+def make_history(conn, batch_size=None):
+    """DownloadHistoryDB on a fake PostgreSQL connection"""
+    db = DownloadHistoryDB(db_config={}, db_type='postgresql')
+    db.conn, db.cursor, db._connected = conn, conn.cursor(), True
+    if batch_size:
+        db.BATCH_SIZE = batch_size
+    return db
+
+
+def history_answers(records):
+    """Answer download_history lookups from {filename: record dict}"""
+    def lookup(query, params):
+        return [dict(records[f], filename=f) for f in params[1] if f in records]
+    return {'FROM download_history': lookup}
+
+
+def make_records(tmp_path):
+    """Records for a.xls..g.xls; b and f are recorded but gone from disk"""
+    records = {}
+    for i, name in enumerate('abcdefg'):
+        path = tmp_path / f'{name}.xls'
+        if name not in 'bf':
+            path.write_bytes(b'x' * 200)
+        records[f'{name}.xls'] = {
+            'id': i + 1, 'file_path': str(path), 'file_exists': True, 'download_status': 'success'
+        }
+    return records
+
+
+def test_batched_filter(tmp_path):
+    """Test lookups are chunked by BATCH_SIZE and results keep input order."""
+    print("\nTesting: Batched filter_not_downloaded...")
+
+    records = make_records(tmp_path)
+    del records['d.xls']
+    conn = FakeConnection(history_answers(records))
+    db = make_history(conn, batch_size=3)
+
+    filenames = ['g.xls', 'new1.xls', 'a.xls', 'b.xls', 'd.xls', 'c.xls', 'f.xls', 'e.xls', 'a.xls']
+    pending = db.filter_not_downloaded('rep', filenames)
+
+    selects = conn.statements('FROM download_history')
+    updates = conn.statements('SET file_exists')
+    if [len(params[1]) for _, params in selects] != [3, 3, 2]:
+        print(f"✗ Chunks {[params[1] for _, params in selects]}")
+        return False
+    if pending != ['new1.xls', 'b.xls', 'd.xls', 'f.xls']:
+        print(f"✗ Pending {pending}")
+        return False
+    if len(updates) != 1 or updates[0][1] != (False, [2, 6]) or conn.commits != 1:
+        print(f"✗ file_exists updates {updates}")
+        return False
+
+    print("✓ 8 distinct files in 3 queries, pending in input order, 2 missing files marked in one UPDATE")
+    return True
+
+
+def test_downloaded_rules(tmp_path):
+    """Test statuses and require_file_exists choose what counts as downloaded."""
+    print("\nTesting: Downloaded rules...")
+
+    records = make_records(tmp_path)
+    records['c.xls']['download_status'] = 'downloading'
+    records['d.xls']['file_exists'] = False  # On disk, flag not set
+    records['e.xls']['download_status'] = 'failed'
+    filenames = ['a.xls', 'c.xls', 'd.xls', 'e.xls']
+
+    db = make_history(FakeConnection(history_answers(records)))
+    default = db.filter_not_downloaded('rep', filenames)
+    strict = db.filter_not_downloaded('rep', filenames, statuses=('success',), require_file_exists=True)
+
+    if default == ['e.xls'] and strict == ['c.xls', 'd.xls', 'e.xls']:
+        print("✓ Default: success/downloading on disk; parallel rule: success with file_exists")
+        return True
+
+    print(f"✗ Default {default}, strict {strict}")
+    return False
+
+
+def test_cache(tmp_path):
+    """Test cached lookups skip the database and writes update the cache."""
+    print("\nTesting: Lookup cache...")
+
+    records = make_records(tmp_path)
+    conn = FakeConnection(history_answers(records))
+    db = make_history(conn)
+
+    db.filter_not_downloaded('rep', ['a.xls', 'b.xls', 'new.xls'])
+    lookups = len(conn.statements('FROM download_history'))
+    cached = db.is_downloaded('rep', 'a.xls') and not db.is_downloaded('rep', 'new.xls')
+    if len(conn.statements('FROM download_history')) != lookups or not cached:
+        print(f"✗ Cached lookups queried again: {conn.queries}")
+        return False
+
+    new_file = tmp_path / 'new.xls'
+    new_file.write_bytes(b'x' * 200)
+    conn.answers = {'RETURNING id': [{'id': 99}]}
+    db.record_download('rep', {'filename': 'new.xls', 'file_path': str(new_file)})
+    db.record_failed_download('rep', {'filename': 'a.xls'}, 'timeout')
+
+    queries = len(conn.queries)
+    pending = db.filter_not_downloaded('rep', ['a.xls', 'new.xls', 'b.xls'])
+    if len(conn.queries) == queries and pending == ['a.xls', 'b.xls']:
+        print("✓ Cache hits skip the DB; success/failed writes update cached status")
+        return True
+
+    print(f"✗ Pending {pending}, queries {conn.queries[queries:]}")
+    return False
+
+
+def test_record_downloads(tmp_path):
+    """Test record_downloads de-duplicates filenames and batches rows."""
+    print("\nTesting: record_downloads...")
+
+    conn = FakeConnection()
+    db = make_history(conn, batch_size=2)
+    path = tmp_path / 'a.xls'
+    path.write_bytes(b'x' * 200)
+
+    written = db.record_downloads('rep', [
+        {'filename': 'a.xls', 'file_size': 1},
+        {'filename': 'b.xls', 'file_size': 2},
+        {'filename': 'a.xls', 'file_size': 200, 'file_path': str(path)},
+        {'filename': 'c.xls', 'file_size': 3},
+    ])
+
+    upserts = conn.statements('INSERT INTO download_history')
+    rows = [params[i:i + 16] for _, params in upserts for i in range(0, len(params), 16)]
+    filenames = [row[1] for row in upserts and rows]
+    if written != 3 or [len(params) for _, params in upserts] != [32, 16] or filenames != ['a.xls', 'b.xls', 'c.xls']:
+        print(f"✗ Wrote {written}: {filenames}")
+        return False
+    if rows[0][8] != 200 or not rows[0][13] or conn.commits != 1 or 'ON CONFLICT' not in upserts[0][0]:
+        print(f"✗ Row for a.xls {rows[0]}")
+        return False
+
+    queries = len(conn.queries)
+    if db.filter_not_downloaded('rep', ['a.xls', 'b.xls']) != ['b.xls'] or len(conn.queries) != queries:
+        print("✗ Cache out of sync after record_downloads")
+        return False
+
+    print("✓ 4 records → 3 rows in 2 upserts (last duplicate wins), one commit, cache updated")
+    return True
+
+
+def test_downloaders_use_batched_lookup(tmp_path):
+    """Test EClaimDownloader and ParallelDownloader use filter_not_downloaded / record_downloads."""
+    print("\nTesting: Downloader wiring...")
+
+    from eclaim_downloader_http import EClaimDownloader
+    from utils.parallel_downloader import ParallelDownloader
+
+    records = make_records(tmp_path)
+    records['c.xls']['download_status'] = 'downloading'
+    conn = FakeConnection(history_answers(records))
+
+    downloader = EClaimDownloader.__new__(EClaimDownloader)
+    downloader._history_db = make_history(conn)
+    links = [{'filename': name, 'url': f'/{name}'} for name in ['new.xls', 'a.xls', 'b.xls', 'c.xls']]
+    new_links = downloader._filter_new_links(links)
+    if [link['filename'] for link in new_links] != ['new.xls', 'b.xls']:
+        print(f"✗ New links {new_links}")
+        return False
+
+    parallel = ParallelDownloader([{'username': 'u', 'password': 'p'}], 10, 2568, download_dir=str(tmp_path))
+    conn = FakeConnection(history_answers(records))
+    with patch('utils.download_history_db.DownloadHistoryDB', lambda: make_history(conn)):
+        parallel._load_download_history(links)
+    for name in ['new.xls', 'd.xls', 'new.xls']:
+        parallel._record_download(name, 200, f'/{name}')
+    parallel._close_download_history()
+
+    upserts = conn.statements('INSERT INTO download_history')
+    if parallel._already_downloaded != {'a.xls'} or len(upserts) != 1 or len(upserts[0][1]) != 32:
+        print(f"✗ Already downloaded {parallel._already_downloaded}, upserts {len(upserts)}")
+        return False
+
+    print("✓ Page links diffed with one lookup; parallel run skips only success + file_exists, "
+          "writes its downloads in one upsert")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("DOWNLOAD HISTORY BATCH TEST")
+    print("="*60)
+
+    tests = [
+        ("Batched Filter", test_batched_filter),
+        ("Downloaded Rules", test_downloaded_rules),
+        ("Lookup Cache", test_cache),
+        ("Record Downloads", test_record_downloads),
+        ("Downloader Wiring", test_downloaders_use_batched_lookup),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                success = test_func(Path(tmp))
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
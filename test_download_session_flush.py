@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test Download Session Write Coalescing
+
+Verifies that SessionManager batches progress writes:
+1. Worker progress updates are coalesced into one UPDATE per flush
+2. Status transitions are written immediately
+3. The background flusher persists the latest counters and then stops
+
+Run: python test_download_session_flush.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.download_manager.models import SessionStatus
+from utils.download_manager.session import SessionManager
+import utils.download_manager.session as session_module
+
+
+class FakeDatabase:
+    """Records download_sessions statements instead of executing them."""
+
+    def __init__(self):
+        self.inserts = 0
+        self.updates = []
+
+    def connect(self):
+        db = self
+
+        class Cursor:
+            def execute(self, query, params):
+                if query.strip().startswith('INSERT'):
+                    db.inserts += 1
+                else:
+                    db.updates.append(params)
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self):
+                return Cursor()
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+
+        return Connection()
+
+    def last_row(self):
+        """Columns of the most recent UPDATE, keyed like the table"""
+        names = ('status', 'total_discovered', 'already_downloaded', 'to_download', 'processed',
+                 'downloaded', 'skipped', 'failed', 'started_at', 'completed_at', 'updated_at', 'id')
+        return dict(zip(names, self.updates[-1]))
+
+
+def run_workers(manager, session_id, workers=10, updates=200):
+    """Simulate parallel workers each reporting progress on every file."""
+    counter = {'processed': 0}
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(updates):
+            with lock:
+                counter['processed'] += 1
+                processed = counter['processed']
+            manager.update_session_progress(
+                session_id, status=SessionStatus.DOWNLOADING, total_discovered=workers * updates,
+                processed=processed, downloaded=processed
+            )
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_coalesced_updates():
+    """Test worker updates become one write per flush."""
+    print("\nTesting: Coalesced progress writes...")
+
+    db = FakeDatabase()
+    with patch.object(session_module, 'get_db_connection', db.connect):
+        manager = SessionManager(flush_interval=3600)
+        session_id = manager.create_session('rep', {'fiscal_year': 2569})
+
+        # Transition to DOWNLOADING is written immediately
+        manager.update_session_progress(session_id, status=SessionStatus.DOWNLOADING)
+        if len(db.updates) != 1:
+            print(f"✗ Status transition wrote {len(db.updates)} rows")
+            return False
+        print("✓ Status transition written immediately")
+
+        run_workers(manager, session_id)
+        if len(db.updates) != 1:
+            print(f"✗ Counter updates wrote {len(db.updates) - 1} rows before flush")
+            return False
+
+        written = manager.flush()
+        row = db.last_row()
+        if written == 1 and len(db.updates) == 2 and row['processed'] == 2000:
+            print("✓ 2,000 worker updates persisted by one UPDATE")
+        else:
+            print(f"✗ Flush wrote {written} sessions, row={row}")
+            return False
+
+        if manager.flush() != 0:
+            print("✗ Clean session written again")
+            return False
+
+        manager.update_session_progress(session_id, skipped=5)
+        manager.complete_session(session_id)
+        row = db.last_row()
+        if row['status'] == 'completed' and row['skipped'] == 5 and manager.flush() == 0:
+            print("✓ Completion written immediately with pending counters")
+            return True
+
+        print(f"✗ Unexpected completion row: {row}")
+        return False
+
+
+def test_background_flush():
+    """Test the flusher writes the latest counters and then exits."""
+    print("\nTesting: Background flusher...")
+
+    db = FakeDatabase()
+    with patch.object(session_module, 'get_db_connection', db.connect):
+        manager = SessionManager(flush_interval=0.05)
+        session_id = manager.create_session('stm', {'fiscal_year': 2569})
+        manager.update_session_progress(session_id, status=SessionStatus.DOWNLOADING)
+
+        run_workers(manager, session_id, workers=4, updates=50)
+        time.sleep(0.3)
+
+        row = db.last_row()
+        if row['processed'] != 200 or len(db.updates) > 3:
+            print(f"✗ Expected latest counters in at most 2 flushes, got {len(db.updates) - 1}: {row}")
+            return False
+        print(f"✓ 200 updates persisted by {len(db.updates) - 1} background flush(es)")
+
+        if manager._flush_thread is None:
+            print("✓ Flusher stopped once nothing was dirty")
+            return True
+
+        print("✗ Flusher still running")
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("DOWNLOAD SESSION FLUSH TEST")
+    print("="*60)
+
+    tests = [
+        ("Coalesced Updates", test_coalesced_updates),
+        ("Background Flush", test_background_flush),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
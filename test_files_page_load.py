@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Load Test /files Page Query
+
+Verifies that the server-side /files query stays flat as history grows:
+1. Builds 1k, 10k, 100k and 500k download_history rows (half imported)
+2. Times the page query for the default date window, search and status tabs
+3. Checks the 500k timing stays within FLAT_FACTOR of the 1k timing
+
+Also checks that files without a file_date stay listed under a date filter.
+
+Rows are written to TEMP tables that shadow download_history and
+eclaim_imported_files on a dedicated connection, so real data is untouched.
+Skipped unless a test database is configured (see db_test_support.py).
+
+Run: TEST_DB_NAME=eclaim_test python test_files_page_load.py
+"""
+
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import SkipTest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config.database import DB_TYPE
+from db_test_support import connect_test_db
+from utils.history_manager_db import HistoryManagerDB
+
+SIZES = [1_000, 10_000, 100_000, 500_000]
+FILES_PER_DAY = 100      # History grows over time, not per day
+REPEAT = 5               # Timed runs per query (median is reported)
+FLAT_FACTOR = 3.0        # Allowed slowdown from smallest to largest size
+FLAT_FLOOR_MS = 50.0     # Timings below this are considered flat
+
+# Digits 0-9 as a derived table (MySQL temp tables cannot be self-joined)
+_DIGITS = '(SELECT 0 d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 ' \
+          'UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9)'
+
+
+def create_temp_tables(cursor):
+    """Create TEMP tables shadowing download_history and eclaim_imported_files."""
+    if DB_TYPE == 'postgresql':
+        cursor.execute("""
+            CREATE TEMP TABLE download_history (
+                id SERIAL PRIMARY KEY,
+                download_type VARCHAR(20) NOT NULL,
+                filename VARCHAR(255) NOT NULL,
+                document_no VARCHAR(50),
+                scheme VARCHAR(20),
+                fiscal_year INTEGER,
+                service_month INTEGER,
+                patient_type VARCHAR(10),
+                rep_no VARCHAR(50),
+                file_size BIGINT,
+                file_path TEXT,
+                file_hash VARCHAR(64),
+                file_exists BOOLEAN DEFAULT TRUE,
+                downloaded_at TIMESTAMP,
+                imported BOOLEAN DEFAULT FALSE,
+                imported_at TIMESTAMP,
+                source_url TEXT,
+                file_date DATE
+            )
+        """)
+        cursor.execute("""
+            CREATE TEMP TABLE eclaim_imported_files (
+                id SERIAL PRIMARY KEY,
+                filename VARCHAR(255) NOT NULL UNIQUE,
+                status VARCHAR(20),
+                import_completed_at TIMESTAMP,
+                imported_records INTEGER,
+                total_records INTEGER
+            )
+        """)
+    else:
+        cursor.execute("""
+            CREATE TEMPORARY TABLE download_history (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                download_type VARCHAR(20) NOT NULL,
+                filename VARCHAR(255) NOT NULL,
+                document_no VARCHAR(50),
+                scheme VARCHAR(20),
+                fiscal_year INT,
+                service_month INT,
+                patient_type VARCHAR(10),
+                rep_no VARCHAR(50),
+                file_size BIGINT,
+                file_path TEXT,
+                file_hash VARCHAR(64),
+                file_exists BOOLEAN DEFAULT TRUE,
+                downloaded_at DATETIME,
+                imported BOOLEAN DEFAULT FALSE,
+                imported_at DATETIME,
+                source_url TEXT,
+                file_date DATE
+            )
+        """)
+        cursor.execute("""
+            CREATE TEMPORARY TABLE eclaim_imported_files (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                filename VARCHAR(255) NOT NULL UNIQUE,
+                status VARCHAR(20),
+                import_completed_at DATETIME,
+                imported_records INT,
+                total_records INT
+            )
+        """)
+
+    # Same indexes as migration 014
+    cursor.execute('CREATE INDEX idx_tmp_dh_type_file_date ON download_history (download_type, file_date)')
+    cursor.execute('CREATE INDEX idx_tmp_dh_downloaded ON download_history (downloaded_at)')
+    cursor.execute('CREATE INDEX idx_tmp_if_filename_status ON eclaim_imported_files (filename, status)')
+
+
+def populate(cursor, rows: int):
+    """Fill the TEMP tables with `rows` history rows, every second one imported."""
+    cursor.execute('TRUNCATE TABLE eclaim_imported_files')
+    cursor.execute('TRUNCATE TABLE download_history')
+
+    if DB_TYPE == 'postgresql':
+        cursor.execute("""
+            INSERT INTO download_history
+                (download_type, filename, file_size, file_path, downloaded_at, file_date)
+            SELECT 'rep', s.filename, 50000, 'downloads/rep/' || s.filename,
+                   s.day + (s.g %% 86400) * INTERVAL '1 second', s.day
+            FROM (
+                SELECT g, day,
+                       'eclaim_10670_' || (ARRAY['OP', 'IP', 'ORF'])[1 + g %% 3] || '_'
+                       || (EXTRACT(YEAR FROM day)::INTEGER + 543) || to_char(day, 'MMDD')
+                       || '_' || g || '.xls' AS filename
+                FROM (
+                    SELECT g, (CURRENT_DATE - (g / %s))::DATE AS day
+                    FROM generate_series(1, %s) g
+                ) d
+            ) s
+        """, (FILES_PER_DAY, rows))
+        cursor.execute("""
+            INSERT INTO eclaim_imported_files
+                (filename, status, import_completed_at, imported_records, total_records)
+            SELECT filename, 'completed', downloaded_at, 100, 100
+            FROM download_history WHERE id % 2 = 0
+        """)
+        cursor.execute('ANALYZE download_history')
+        cursor.execute('ANALYZE eclaim_imported_files')
+    else:
+        digits = ' CROSS JOIN '.join(f'{_DIGITS} d{i}' for i in range(6))
+        number = ' + '.join(f'd{i}.d * {10 ** i}' for i in range(6))
+        cursor.execute(f"""
+            INSERT INTO download_history
+                (download_type, filename, file_size, file_path, downloaded_at, file_date)
+            SELECT 'rep', s.filename, 50000, CONCAT('downloads/rep/', s.filename),
+                   s.day + INTERVAL (s.g MOD 86400) SECOND, s.day
+            FROM (
+                SELECT g, day,
+                       CONCAT('eclaim_10670_', ELT(1 + g MOD 3, 'OP', 'IP', 'ORF'), '_',
+                              YEAR(day) + 543, LPAD(MONTH(day), 2, '0'), LPAD(DAY(day), 2, '0'),
+                              '_', g, '.xls') AS filename
+                FROM (
+                    SELECT n.g, CURRENT_DATE - INTERVAL (n.g DIV %s) DAY AS day
+                    FROM (SELECT {number} + 1 AS g FROM {digits}) n
+                    WHERE n.g <= %s
+                ) d
+            ) s
+        """, (FILES_PER_DAY, rows))
+        cursor.execute("""
+            INSERT INTO eclaim_imported_files
+                (filename, status, import_completed_at, imported_records, total_records)
+            SELECT filename, 'completed', downloaded_at, 100, 100
+            FROM download_history WHERE id MOD 2 = 0
+        """)
+        cursor.execute('ANALYZE TABLE download_history')
+        cursor.fetchall()
+        cursor.execute('ANALYZE TABLE eclaim_imported_files')
+        cursor.fetchall()
+
+
+def time_query(manager, cursor, **filters) -> float:
+    """Return median milliseconds for one page query."""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = manager._query_downloads_page(cursor, per_page=50, **filters)
+        timings.append((time.perf_counter() - start) * 1000)
+    assert len(result['files']) <= 50
+    return statistics.median(timings)
+
+
+def test_page_query_stays_flat():
+    """Test that /files page query time does not grow with history size."""
+    print("\nTesting: /files page query from 1k to 500k rows...")
+
+    today = date.today()
+    scenarios = {
+        'default window': {'date_from': (today - timedelta(days=30)).isoformat(), 'date_to': today.isoformat()},
+        'search': {'date_from': (today - timedelta(days=30)).isoformat(), 'date_to': today.isoformat(),
+                   'search': '_ip_'},
+        'pending tab': {'date_from': (today - timedelta(days=30)).isoformat(), 'date_to': today.isoformat(),
+                        'file_type': 'rep', 'import_status': 'pending'},
+    }
+
+    conn = connect_test_db()
+    manager = HistoryManagerDB(download_type='rep')
+    cursor = conn.cursor()
+    results = {name: {} for name in scenarios}
+
+    try:
+        create_temp_tables(cursor)
+        for rows in SIZES:
+            populate(cursor, rows)
+            conn.commit()
+            for name, filters in scenarios.items():
+                results[name][rows] = time_query(manager, cursor, **filters)
+            print(f"  {rows:>7,} rows: " + ', '.join(
+                f"{name} {results[name][rows]:.1f} ms" for name in scenarios
+            ))
+    finally:
+        cursor.close()
+        conn.close()
+
+    flat = True
+    for name, timings in results.items():
+        smallest = timings[SIZES[0]]
+        largest = timings[SIZES[-1]]
+        limit = max(smallest * FLAT_FACTOR, FLAT_FLOOR_MS)
+        if largest <= limit:
+            print(f"✓ {name}: {largest:.1f} ms at {SIZES[-1]:,} rows (limit {limit:.1f} ms)")
+        else:
+            print(f"✗ {name}: {largest:.1f} ms at {SIZES[-1]:,} rows exceeds {limit:.1f} ms")
+            flat = False
+
+    return flat
+
+
+def test_undated_files_listed():
+    """Test files without a file_date are not dropped by the date filter."""
+    print("\nTesting: Undated files under a date filter...")
+
+    conn = connect_test_db()
+    manager = HistoryManagerDB(download_type='rep')
+    cursor = conn.cursor()
+    try:
+        create_temp_tables(cursor)
+        cursor.execute("""
+            INSERT INTO download_history (download_type, filename, file_path, file_date)
+            VALUES ('rep', 'in_range.xls', 'downloads/rep/in_range.xls', '2026-01-15'),
+                   ('rep', 'too_old.xls', 'downloads/rep/too_old.xls', '2025-06-01'),
+                   ('rep', 'undated.xls', 'downloads/rep/undated.xls', NULL)
+        """)
+        conn.commit()
+        result = manager._query_downloads_page(cursor, date_from='2026-01-01', date_to='2026-01-31')
+    finally:
+        cursor.close()
+        conn.close()
+
+    filenames = sorted(f['filename'] for f in result['files'])
+    if filenames == ['in_range.xls', 'undated.xls'] and result['total_files'] == 2:
+        print("✓ Undated file listed, out-of-range file filtered")
+        return True
+
+    print(f"✗ Listed {filenames} (total {result['total_files']})")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("FILES PAGE LOAD TEST")
+    print("="*60)
+
+    tests = [
+        ("Undated Files Listed", test_undated_files_listed),
+        ("Page Query Stays Flat", test_page_query_stays_flat),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except SkipTest as e:
+            print(f"- Skipped: {e}")
+            results.append((name, None))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    skipped = sum(1 for _, success in results if success is None)
+    total = len(results)
+
+    for name, success in results:
+        status = "- SKIP" if success is None else "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed, {skipped} skipped")
+    return 0 if passed + skipped == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
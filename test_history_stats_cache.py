@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test Download History Statistics Cache
+
+Verifies that history statistics are cached per download_type:
+1. Repeated reads are served from cache
+2. Invalidating one type leaves other types cached
+3. Values rejected by cache_if are not cached
+4. Callers get copies and cannot corrupt cached values
+5. A value loaded while the type was invalidated is not cached
+
+Run: python test_history_stats_cache.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.history_stats_cache import HistoryStatsCache
+
+
+class CountingLoader:
+    """Loader that counts how often it is called."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_cache_and_invalidate():
+    """Test caching and per-type invalidation."""
+    print("\nTesting: Cache hits and invalidation...")
+
+    cache = HistoryStatsCache(ttl=3600)
+    rep_loader = CountingLoader({'total_files': 10})
+    stm_loader = CountingLoader({'total_files': 3})
+
+    for _ in range(3):
+        cache.get_or_load('rep', 'statistics', rep_loader)
+        cache.get_or_load('stm', 'statistics', stm_loader)
+
+    if rep_loader.calls == 1 and stm_loader.calls == 1:
+        print("✓ Repeated reads served from cache")
+    else:
+        print(f"✗ Loader called rep={rep_loader.calls} stm={stm_loader.calls}")
+        return False
+
+    cache.invalidate('rep')
+    cache.get_or_load('rep', 'statistics', rep_loader)
+    cache.get_or_load('stm', 'statistics', stm_loader)
+
+    if rep_loader.calls == 2 and stm_loader.calls == 1:
+        print("✓ Invalidation only reloads the written type")
+    else:
+        print(f"✗ Loader called rep={rep_loader.calls} stm={stm_loader.calls}")
+        return False
+
+    cache.invalidate()
+    cache.get_or_load('stm', 'statistics', stm_loader)
+
+    if stm_loader.calls == 2:
+        print("✓ Invalidating all types reloads everything")
+        return True
+
+    print(f"✗ Loader called stm={stm_loader.calls}")
+    return False
+
+
+def test_cache_if_and_copies():
+    """Test cache_if predicate and copy-on-read."""
+    print("\nTesting: cache_if and copies...")
+
+    cache = HistoryStatsCache(ttl=3600)
+    empty_loader = CountingLoader({})
+
+    cache.get_or_load('rep', 'by_scheme', empty_loader, cache_if=bool)
+    cache.get_or_load('rep', 'by_scheme', empty_loader, cache_if=bool)
+
+    if empty_loader.calls == 2:
+        print("✓ Values rejected by cache_if are reloaded")
+    else:
+        print(f"✗ Empty value was cached ({empty_loader.calls} calls)")
+        return False
+
+    loader = CountingLoader({'ucs': {'files': 1}})
+    first = cache.get_or_load('rep', 'by_scheme', loader, cache_if=bool)
+    first['ucs']['files'] = 999
+    second = cache.get_or_load('rep', 'by_scheme', loader, cache_if=bool)
+
+    if second['ucs']['files'] == 1:
+        print("✓ Callers receive copies of cached values")
+        return True
+
+    print("✗ Cached value was modified through returned copy")
+    return False
+
+
+def test_invalidate_during_load():
+    """Test a load that overlaps invalidate() does not cache its stale value."""
+    print("\nTesting: Invalidate during load...")
+
+    cache = HistoryStatsCache(ttl=3600)
+    rows = {'total_files': 10}
+
+    def slow_load():
+        value = dict(rows)
+        # A download is recorded after the query read its rows
+        rows['total_files'] = 11
+        cache.invalidate('rep')
+        return value
+
+    stale = cache.get_or_load('rep', 'statistics', slow_load)
+    fresh = cache.get_or_load('rep', 'statistics', lambda: dict(rows))
+
+    def load_all():
+        cache.invalidate()
+        return {'total_files': 12}
+
+    cache.get_or_load('stm', 'statistics', load_all)
+    stm_loader = CountingLoader({'total_files': 13})
+    after_clear = cache.get_or_load('stm', 'statistics', stm_loader)
+
+    if stale['total_files'] == 10 and fresh['total_files'] == 11 \
+            and after_clear['total_files'] == 13 and stm_loader.calls == 1:
+        print("✓ Stale value returned once but not cached; next read reloads")
+        return True
+
+    print(f"✗ Stale value cached: {stale}, {fresh}, {after_clear}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("HISTORY STATS CACHE TEST")
+    print("="*60)
+
+    tests = [
+        ("Cache and Invalidate", test_cache_and_invalidate),
+        ("cache_if and Copies", test_cache_if_and_copies),
+        ("Invalidate During Load", test_invalidate_during_load),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test App Import Time Budget
+
+Verifies that heavy dependencies stay deferred at app start:
+1. Importing app loads none of the budget's deferred modules
+2. Deferred modules still load on first use (health offices import)
+
+Timing itself is machine dependent; check it with
+python scripts/importtime_report.py
+
+Run: python test_import_time.py
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Add project root and scripts to path
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from importtime_report import BUDGET_FILE, profile
+
+
+def test_deferred_modules_not_loaded():
+    """Test import app does not import pandas, sklearn, openpyxl, ..."""
+    print("\nTesting: Deferred modules at app start...")
+
+    budget = json.loads(BUDGET_FILE.read_text(encoding='utf-8'))
+    entries, loaded = profile(budget['module'])
+
+    eager = sorted(set(budget['deferred_modules']) & loaded)
+    if eager:
+        print(f"✗ Imported at start: {', '.join(eager)}")
+        return False
+
+    total_ms = next(cum for name, _, cum, depth in entries if name == budget['module'] and depth == 0) / 1000
+    print(f"✓ None of {len(budget['deferred_modules'])} deferred modules imported ({total_ms:.0f}ms)")
+    return True
+
+
+def test_deferred_modules_load_on_use():
+    """Test the health offices import endpoint still resolves pandas/openpyxl."""
+    print("\nTesting: Deferred modules load on first use...")
+
+    code = (
+        "import sys, io\n"
+        "from flask import Flask\n"
+        "from routes.master_data_api import master_data_api_bp\n"
+        "app = Flask(__name__)\n"
+        "app.register_blueprint(master_data_api_bp)\n"
+        "client = app.test_client()\n"
+        "response = client.post('/api/health-offices/import',\n"
+        "                       data={'file': (io.BytesIO(b'not a workbook'), 'offices.xlsx')})\n"
+        "print(response.status_code, 'pandas' in sys.modules, 'openpyxl' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, timeout=120)
+    output = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else result.stderr[-500:]
+
+    if output == '500 True True':
+        print("✓ pandas and openpyxl imported when the endpoint ran")
+        return True
+
+    print(f"✗ Unexpected result: {output}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("IMPORT TIME BUDGET TEST")
+    print("="*60)
+
+    tests = [
+        ("Deferred Modules Not Loaded", test_deferred_modules_not_loaded),
+        ("Deferred Modules Load On Use", test_deferred_modules_load_on_use),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Test In-Process Job Executor
+
+Verifies that JobExecutor replaces subprocess + PID-file runners:
+1. Jobs run on warm worker threads and record their result
+2. Exclusive submits are refused while the pool is busy
+3. Cancellation stops running jobs between units of work
+4. Pool limits hold across executors sharing one queue file
+5. Queued jobs survive a restart; jobs of dead processes are interrupted
+6. UnifiedImportRunner imports in-process and stop() cancels between files
+7. DownloaderRunner downloads in-process and stop() cancels between files
+8. active_job() reads without taking the write lock
+9. Importing app starts no workers and creates no queue file
+
+Run: python test_job_executor.py
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.job_executor import JobExecutor
+
+
+def make_executor(path, **kwargs):
+    """Executor on a temporary queue with a short poll interval"""
+    return JobExecutor(path=str(path), poll_interval=0.05, **kwargs)
+
+
+def test_runs_in_process(tmp_path):
+    """Test jobs run on a worker thread and record their result."""
+    print("\nTesting: In-process execution...")
+
+    executor = make_executor(tmp_path / 'jobs.sqlite3')
+    threads = []
+
+    def handler(context):
+        threads.append(threading.current_thread().name)
+        context.update_progress(done=context.params['count'])
+        return {'imported': context.params['count']}
+
+    executor.register('import', handler, pool='import')
+    start = time.monotonic()
+    job_ids = [executor.submit('import', {'count': i}) for i in range(5)]
+    jobs = [executor.wait(job_id, timeout=5) for job_id in job_ids]
+    elapsed = time.monotonic() - start
+    executor.shutdown()
+
+    if not all(job['status'] == 'completed' for job in jobs):
+        print(f"✗ Jobs did not complete: {[job['status'] for job in jobs]}")
+        return False
+
+    if [job['result']['imported'] for job in jobs] == list(range(5)) and jobs[4]['progress'] == {'done': 4}:
+        print(f"✓ 5 jobs completed in {elapsed:.2f}s with results and progress recorded")
+    else:
+        print(f"✗ Unexpected results: {jobs}")
+        return False
+
+    if set(threads) == {'job-import-0'}:
+        print("✓ All jobs ran on one warm worker thread")
+        return True
+
+    print(f"✗ Jobs ran on {set(threads)}")
+    return False
+
+
+def test_exclusive_and_cancel(tmp_path):
+    """Test exclusive submits are refused and running jobs can be cancelled."""
+    print("\nTesting: Exclusive submit and cancellation...")
+
+    executor = make_executor(tmp_path / 'jobs.sqlite3')
+    started = threading.Event()
+    files_done = []
+
+    def handler(context):
+        started.set()
+        for i in range(1000):
+            if context.cancelled:
+                break
+            files_done.append(i)
+            time.sleep(0.01)
+        return {'imported': len(files_done)}
+
+    executor.register('import', handler, pool='import')
+    running_id = executor.submit('import', exclusive=True)
+    started.wait(5)
+
+    try:
+        executor.submit('import', exclusive=True)
+        print("✗ Second exclusive import was accepted")
+        return False
+    except ValueError as e:
+        print(f"✓ Second import refused: {e}")
+
+    queued_id = executor.submit('import')
+    if not (executor.cancel(queued_id) and executor.get_job(queued_id)['status'] == 'cancelled'):
+        print("✗ Queued job not cancelled")
+        return False
+    print("✓ Queued job cancelled before it started")
+
+    executor.cancel(running_id)
+    job = executor.wait(running_id, timeout=5)
+    executor.shutdown()
+
+    if job['status'] == 'cancelled' and len(files_done) < 1000 and executor.active_job('import') is None:
+        print(f"✓ Running job stopped after {len(files_done)} files")
+        return True
+
+    print(f"✗ Unexpected state after cancel: {job['status']}, {len(files_done)} files")
+    return False
+
+
+def test_pool_limit_across_executors(tmp_path):
+    """Test two executors on one queue file never exceed the pool limit."""
+    print("\nTesting: Pool limit across processes...")
+
+    path = tmp_path / 'jobs.sqlite3'
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def handler(context):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.05)
+        with lock:
+            state['running'] -= 1
+
+    executors = [make_executor(path, pools={'import': 2}) for _ in range(2)]
+    for executor in executors:
+        executor.register('import', handler, pool='import')
+
+    job_ids = [executors[i % 2].submit('import') for i in range(8)]
+    jobs = [executors[0].wait(job_id, timeout=10) for job_id in job_ids]
+    for executor in executors:
+        executor.shutdown()
+
+    if all(job['status'] == 'completed' for job in jobs) and state['peak'] <= 2:
+        print(f"✓ 8 jobs on 4 workers ran at most {state['peak']} at a time")
+        return True
+
+    print(f"✗ Peak concurrency {state['peak']}, statuses {[job['status'] for job in jobs]}")
+    return False
+
+
+def test_restart_recovery(tmp_path):
+    """Test queued jobs run after a restart and orphaned jobs are interrupted."""
+    print("\nTesting: Restart recovery...")
+
+    path = tmp_path / 'jobs.sqlite3'
+    release = threading.Event()
+
+    # First "process": one job stuck running, one queued behind it
+    first = make_executor(path)
+    first.register('import', lambda context: release.wait(5), pool='import')
+    orphan_id = first.submit('import')
+    time.sleep(0.3)
+    queued_id = first.submit('import', {'file': 'rep.xls'})
+    first.shutdown()
+
+    # Simulate the process exiting: its job is owned by a PID that is gone
+    first._connection().execute('UPDATE jobs SET owner_pid = ?, owner_id = ? WHERE id = ?',
+                                (2 ** 22 + 1, 'exited', orphan_id))
+
+    second = make_executor(path)
+    second.register('import', lambda context: context.params, pool='import')
+    second.start()
+    job = second.wait(queued_id, timeout=5)
+    orphan = second.get_job(orphan_id)
+    second.shutdown()
+    release.set()
+
+    if orphan['status'] == 'interrupted' and job['status'] == 'completed' and job['result'] == {'file': 'rep.xls'}:
+        print("✓ Orphaned job interrupted and queued job ran after restart")
+        return True
+
+    print(f"✗ Orphan {orphan['status']}, queued job {job['status']}")
+    return False
+
+
+def test_unified_import_runner(tmp_path):
+    """Test UnifiedImportRunner runs imports as jobs and stops between files."""
+    print("\nTesting: UnifiedImportRunner on the executor...")
+
+    import unified_import_batch
+    from utils.unified_import_runner import UnifiedImportRunner
+
+    files = []
+    for i in range(50):
+        path = tmp_path / f'eclaim_{i}.xls'
+        path.touch()
+        files.append(path.name)
+
+    imported = []
+    first_file = threading.Event()
+
+    def fake_import(import_type, filepath, track_progress=True):
+        imported.append(Path(filepath).name)
+        first_file.set()
+        time.sleep(0.02)
+        return {'success': True}
+
+    runner = UnifiedImportRunner(executor=make_executor(tmp_path / 'jobs.sqlite3'))
+    runner.CONFIG = {**runner.CONFIG, 'rep': {**runner.CONFIG['rep'], 'directory': str(tmp_path)}}
+
+    with patch.object(unified_import_batch, 'import_single_file', fake_import), \
+            patch.object(unified_import_batch, 'PROGRESS_FILE', tmp_path / 'import_progress.json'), \
+            patch.object(unified_import_batch, 'stream_log'):
+        result = runner.start_import('rep', files)
+        first_file.wait(5)
+
+        busy = runner.start_import('stm')
+        if busy['success'] or 'rep' not in busy['error'] or runner.get_current_import_type() != 'rep':
+            print(f"✗ Concurrent import not refused: {busy}")
+            return False
+        print(f"✓ Concurrent import refused: {busy['error']}")
+
+        stopped = runner.stop()
+        job = runner.executor.wait(result['job_id'], timeout=5)
+        runner.executor.shutdown()
+
+    if stopped['success'] and job['status'] == 'cancelled' and 0 < len(imported) < 50 \
+            and job['result']['cancelled'] and not runner.is_running():
+        print(f"✓ Import stopped after {len(imported)} of 50 files without a subprocess")
+        return True
+
+    print(f"✗ Unexpected outcome: {stopped}, {job['status']}, {len(imported)} files")
+    return False
+
+
+def test_downloader_runner(tmp_path):
+    """Test DownloaderRunner runs downloads as jobs and stops between files."""
+    print("\nTesting: DownloaderRunner on the executor...")
+
+    import eclaim_downloader_http
+    from utils.downloader_runner import DownloaderRunner
+
+    downloaded = []
+    first_file = threading.Event()
+
+    class FakeDownloader:
+        def __init__(self, month=None, year=None, scheme='ucs', import_each=False, should_stop=None):
+            self.scheme, self.import_each, self.should_stop = scheme, import_each, should_stop
+            self.cancelled = False
+
+        def run(self):
+            for i in range(50):
+                if self.should_stop():
+                    self.cancelled = True
+                    break
+                downloaded.append((self.scheme, self.import_each, i))
+                first_file.set()
+                time.sleep(0.02)
+            return {'downloaded': len(downloaded), 'cancelled': self.cancelled}
+
+        def close(self):
+            pass
+
+    runner = DownloaderRunner(executor=make_executor(tmp_path / 'jobs.sqlite3'))
+
+    with patch.object(eclaim_downloader_http, 'EClaimDownloader', FakeDownloader), \
+            patch('utils.downloader_runner._write_realtime_log'):
+        result = runner.start(month=1, year=2568, schemes=['ofc'], auto_import=True)
+        first_file.wait(5)
+
+        busy = runner.start_bulk(1, 2568, 3, 2568)
+        status = runner.get_status()
+        if busy['success'] or not status['running'] or status['job_id'] != result['job_id']:
+            print(f"✗ Concurrent download not refused: {busy}, {status}")
+            return False
+        print(f"✓ Concurrent bulk download refused: {busy['error']}")
+
+        stopped = runner.stop()
+        job = runner.executor.wait(result['job_id'], timeout=5)
+        runner.executor.shutdown()
+
+    if stopped['success'] and job['status'] == 'cancelled' and 0 < len(downloaded) < 50 \
+            and downloaded[0] == ('ofc', True, 0) and job['result']['cancelled'] and not runner.is_running():
+        print(f"✓ Download stopped after {len(downloaded)} of 50 files without a subprocess")
+        return True
+
+    print(f"✗ Unexpected outcome: {stopped}, {job['status']}, {len(downloaded)} files")
+    return False
+
+
+def test_active_job_read_only(tmp_path):
+    """Test active_job() answers while another connection holds the write lock."""
+    print("\nTesting: active_job() without a write lock...")
+
+    path = tmp_path / 'jobs.sqlite3'
+    executor = make_executor(path)
+    executor.register('import', lambda context: None, pool='import')
+    job_id = executor.submit('import')  # No workers started: stays queued
+
+    writer = sqlite3.connect(str(path), isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        start = time.monotonic()
+        job = executor.active_job('import')
+        elapsed = time.monotonic() - start
+    finally:
+        writer.execute('ROLLBACK')
+        writer.close()
+    executor.shutdown()
+
+    if job and job['id'] == job_id and elapsed < 1:
+        print(f"✓ Queued job read in {elapsed * 1000:.1f}ms during another writer's transaction")
+        return True
+
+    print(f"✗ Job {job}, took {elapsed:.2f}s")
+    return False
+
+
+def test_app_import_starts_no_workers(tmp_path):
+    """Test importing app (tests, tooling, reloader watcher) starts no job workers."""
+    print("\nTesting: Importing app...")
+
+    queue_path = tmp_path / 'jobs.sqlite3'
+    code = (
+        "import os, threading\n"
+        "import app\n"
+        "print(sorted(t.name for t in threading.enumerate() if t.name.startswith('job-')),\n"
+        "      os.path.exists(os.environ['JOB_QUEUE_PATH']))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent,
+                            env={**os.environ, 'JOB_QUEUE_PATH': str(queue_path), 'ML_PRELOAD': 'off'},
+                            capture_output=True, text=True, timeout=120)
+    output = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else result.stderr[-500:]
+
+    if output == '[] False':
+        print("✓ No worker threads and no queue file after import app")
+        return True
+
+    print(f"✗ Unexpected result: {output}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("JOB EXECUTOR TEST")
+    print("="*60)
+
+    tests = [
+        ("In-Process Execution", test_runs_in_process),
+        ("Exclusive and Cancel", test_exclusive_and_cancel),
+        ("Pool Limit Across Executors", test_pool_limit_across_executors),
+        ("Restart Recovery", test_restart_recovery),
+        ("Unified Import Runner", test_unified_import_runner),
+        ("Downloader Runner", test_downloader_runner),
+        ("Active Job Read Only", test_active_job_read_only),
+        ("App Import Starts No Workers", test_app_import_starts_no_workers),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                success = test_func(Path(tmp))
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
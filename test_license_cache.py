@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test License Verification Cache
+
+Verifies that LicenseChecker verifies the signed license once and reuses it:
+1. Repeated checks do not re-verify the license
+2. Saving settings (hospital code) re-verifies on the next check
+3. invalidate() and a changed license file re-verify
+
+Run: python test_license_cache.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from scripts.benchmark_license_check import create_test_license
+
+
+def make_checker(tmp_dir: Path):
+    """Create a checker for a freshly signed license, counting verifications."""
+    settings_file = tmp_dir / 'settings.json'
+    settings_file.write_text(json.dumps({'hospital_code': '10670'}), encoding='utf-8')
+    os.environ['SETTINGS_FILE'] = str(settings_file)
+
+    license_file = create_test_license(tmp_dir, '10670')
+
+    from utils.license_checker import LicenseChecker
+    checker = LicenseChecker(license_file=str(license_file), license_lic_file=str(tmp_dir / 'license.lic'))
+
+    calls = {'count': 0}
+    verify = checker._verify_license_uncached
+
+    def counting_verify():
+        calls['count'] += 1
+        return verify()
+
+    checker._verify_license_uncached = counting_verify
+    return checker, calls, license_file
+
+
+def test_repeated_checks_cached():
+    """Test repeated checks reuse the verified state."""
+    print("\nTesting: Repeated license checks...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checker, calls, _ = make_checker(Path(tmp))
+
+        for _ in range(100):
+            checker.verify_license()
+            checker.get_license_info()
+            checker.get_license_state()
+            checker.check_feature_access('rep_access')
+
+        if checker.verify_license()[0] and calls['count'] == 1:
+            print("✓ License verified once for 400 checks")
+            return True
+
+        print(f"✗ License verified {calls['count']} times")
+        return False
+
+
+def test_invalidation():
+    """Test settings writes, invalidate() and file changes re-verify."""
+    print("\nTesting: Cache invalidation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checker, calls, license_file = make_checker(Path(tmp))
+
+        from utils.settings_manager import SettingsManager
+        settings_manager = SettingsManager()
+
+        checker.verify_license()
+        settings_manager.set_hospital_code('12345')
+        is_valid, _, error = checker.verify_license()
+
+        if not is_valid and calls['count'] == 2:
+            print(f"✓ Hospital code change re-verified: {error}")
+        else:
+            print(f"✗ Hospital code change not applied (valid={is_valid}, calls={calls['count']})")
+            return False
+
+        settings_manager.set_hospital_code('10670')
+        checker.verify_license()
+        checker.invalidate()
+        checker.verify_license()
+
+        if calls['count'] == 4:
+            print("✓ invalidate() re-verified")
+        else:
+            print(f"✗ invalidate() not applied ({calls['count']} calls)")
+            return False
+
+        # Rewrite the license file and skip past the mtime check throttle
+        stat = license_file.stat()
+        os.utime(license_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        time.sleep(checker.FILE_CHECK_INTERVAL + 0.1)
+        checker.verify_license()
+
+        if calls['count'] == 5:
+            print("✓ Changed license file re-verified")
+            return True
+
+        print(f"✗ Changed license file not detected ({calls['count']} calls)")
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("LICENSE CACHE TEST")
+    print("="*60)
+
+    tests = [
+        ("Repeated Checks Cached", test_repeated_checks_cached),
+        ("Invalidation", test_invalidation),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
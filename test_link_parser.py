@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test Validation Page Link Parser
+
+Verifies that download links are extracted correctly:
+1. Filenames come from fn / filename / file parameters
+2. rep_eclaim link in the same row is used as fallback
+3. Links outside table rows and non-excel links are ignored
+4. Duplicate filenames are removed, page order is kept
+
+Run: python test_link_parser.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.eclaim.links import parse_download_links
+
+BASE_URL = 'https://eclaim.nhso.go.th'
+
+SAMPLE_PAGE = b"""
+<html><body>
+<a href="/x?fn=outside_table.xls">download excel</a>
+<table>
+  <tr><td>
+    <a href="/webComponent/download?fn=eclaim_10670_OP_25680122_205506156.xls">Download Excel</a>
+  </td></tr>
+  <tr><td>
+    <a href="/webComponent/download?filename=eclaim_10670_IP_25680122_205506157.ecd">DOWNLOAD EXCEL</a>
+  </td></tr>
+  <tr><td>
+    <a href="/files/rep_eclaim_10670_ORF_25680122_205506158.ecd">rep_eclaim_10670</a>
+    <a href="/webComponent/download?id=3">download excel</a>
+  </td></tr>
+  <tr><td>
+    <a href="/webComponent/download?fn=eclaim_10670_OP_25680122_205506156.xls">download excel</a>
+    <a href="/webComponent/other?fn=not_excel.xls">view</a>
+  </td></tr>
+</table>
+</body></html>
+"""
+
+
+def test_filenames():
+    """Test filename extraction and fallbacks."""
+    print("\nTesting: Filename extraction...")
+
+    links = parse_download_links(SAMPLE_PAGE, BASE_URL)
+    filenames = [link['filename'] for link in links]
+
+    expected = [
+        'eclaim_10670_OP_25680122_205506156.xls',
+        'eclaim_10670_IP_25680122_205506157.xls',
+        'rep_eclaim_10670_ORF_25680122_205506158.xls',
+    ]
+
+    if filenames == expected:
+        print("✓ Filenames extracted in page order without duplicates")
+    else:
+        print(f"✗ Unexpected filenames: {filenames}")
+        return False
+
+    if links[0]['url'].startswith(BASE_URL + '/webComponent/download'):
+        print("✓ Relative hrefs resolved against base URL")
+    else:
+        print(f"✗ URL not resolved: {links[0]['url']}")
+        return False
+
+    return True
+
+
+def test_empty_page():
+    """Test pages without download links."""
+    print("\nTesting: Empty page...")
+
+    if parse_download_links(b'', BASE_URL) == [] and \
+            parse_download_links(b'<html><body><table></table></body></html>', BASE_URL) == []:
+        print("✓ No links returned for empty page")
+        return True
+
+    print("✗ Links returned for empty page")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("LINK PARSER TEST")
+    print("="*60)
+
+    tests = [
+        ("Filename Extraction", test_filenames),
+        ("Empty Page", test_empty_page),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Test Progress Push Stream
+
+Verifies that ProgressHub pushes progress without per-watcher work:
+1. Bursts of updates are coalesced to the latest snapshot per push interval
+2. Many watchers of a polled channel share one producer
+3. Download manager updates are published in the legacy UI format
+4. Import jobs and the bulk downloader publish as they write progress
+
+Run: python test_progress_stream.py
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.progress_stream import ProgressHub
+
+
+def parse_event(event: str):
+    """Return (channel, data) for an SSE event, or None for heartbeats"""
+    if event.startswith(':'):
+        return None
+    lines = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+
+def test_coalescing():
+    """Test bursts are coalesced and rate limited per watcher."""
+    print("\nTesting: Coalescing and rate limiting...")
+
+    hub = ProgressHub(push_interval=0.2, heartbeat=5)
+    hub.publish('download:rep', {'processed': 0})
+
+    stream = hub.stream(['download:rep'])
+    first = parse_event(next(stream))
+
+    if first != ('download:rep', {'processed': 0}):
+        print(f"✗ Initial snapshot not sent: {first}")
+        return False
+
+    # 1,000 updates while the watcher is rate limited
+    def burst():
+        for i in range(1, 1001):
+            hub.publish('download:rep', {'processed': i})
+            hub.publish('download:rep', {'processed': i})  # Unchanged, dropped
+
+    producer = threading.Thread(target=burst)
+    producer.start()
+    producer.join()
+
+    start = time.monotonic()
+    second = parse_event(next(stream))
+    elapsed = time.monotonic() - start
+
+    if second == ('download:rep', {'processed': 1000}) and hub._version == 1001:
+        print(f"✓ 1,000 updates coalesced into one event after {elapsed:.2f}s")
+    else:
+        print(f"✗ Expected latest snapshot, got {second} (version {hub._version})")
+        return False
+
+    stream.close()
+    if hub.watcher_count('download:rep') == 0:
+        print("✓ Closed stream unregistered its watcher")
+        return True
+
+    print("✗ Watcher still registered after close")
+    return False
+
+
+def test_shared_producer():
+    """Test N watchers of a polled channel cost one producer."""
+    print("\nTesting: Shared producer for many watchers...")
+
+    hub = ProgressHub(push_interval=0.01, poll_interval=0.05, heartbeat=5)
+    calls = {'count': 0}
+
+    def load_progress():
+        calls['count'] += 1
+        return {'running': True, 'imported_records': calls['count']}
+
+    hub.register_source('import', load_progress)
+
+    if calls['count'] != 0:
+        print("✗ Source polled without watchers")
+        return False
+
+    watchers = 20
+    streams = [hub.stream(['import']) for _ in range(watchers)]
+    received = [parse_event(next(s)) for s in streams]
+    time.sleep(0.5)
+    polls = calls['count']
+
+    for s in streams:
+        s.close()
+
+    if not all(event and event[0] == 'import' for event in received):
+        print(f"✗ Not every watcher received a snapshot: {received}")
+        return False
+
+    # One poll per interval regardless of the number of watchers
+    if polls <= 0.5 / 0.05 + 3:
+        print(f"✓ {watchers} watchers served by {polls} polls in 0.5s")
+    else:
+        print(f"✗ {polls} polls for {watchers} watchers")
+        return False
+
+    time.sleep(0.2)
+    stopped_at = calls['count']
+    time.sleep(0.2)
+
+    if calls['count'] == stopped_at and hub.latest('import') is None:
+        print("✓ Polling stopped and stale snapshot dropped after last watcher left")
+        return True
+
+    print(f"✗ Source still polled ({stopped_at} -> {calls['count']}) or snapshot kept")
+    return False
+
+
+def test_download_manager_publishes():
+    """Test DownloadManager pushes session progress without DB reads."""
+    print("\nTesting: DownloadManager publishes progress...")
+
+    from utils.download_manager.manager import DownloadManager
+    from utils.download_manager.models import SessionStatus
+    from utils.download_manager.session import SessionManager
+    import utils.download_manager.manager as manager_module
+
+    hub = ProgressHub(push_interval=0.01, heartbeat=5)
+
+    with patch.object(manager_module, 'progress_hub', hub), \
+            patch.object(SessionManager, '_save_session_to_db'), \
+            patch.object(SessionManager, '_update_session_in_db'), \
+            patch.object(SessionManager, '_mark_dirty'), \
+            patch.object(SessionManager, '_load_session_from_db') as load_from_db:
+        manager = DownloadManager()
+        session_id = manager.create_session('rep', {'fiscal_year': 2569, 'service_month': 1})
+        manager.update_progress(session_id, status=SessionStatus.DOWNLOADING, total_discovered=10)
+        manager.update_progress(session_id, processed=4, downloaded=3, skipped=1)
+
+        progress = hub.latest('download:rep')
+        if not (progress['running'] and progress['processed'] == 4 and progress['total'] == 10
+                and progress['completed'] == 3 and progress['session_id'] == session_id):
+            print(f"✗ Unexpected running snapshot: {progress}")
+            return False
+        print("✓ Running progress published in legacy format")
+
+        manager.complete_session(session_id)
+        progress = hub.latest('download:rep')
+
+        if progress['status'] == 'completed' and not progress['running'] and not load_from_db.called:
+            print("✓ Completion published without reading the database")
+            return True
+
+        print(f"✗ Unexpected final snapshot: {progress} (db reads: {load_from_db.call_count})")
+        return False
+
+
+def test_import_publishes():
+    """Test import jobs push per-file progress, starting from a fresh snapshot."""
+    print("\nTesting: Import job publishes progress...")
+
+    import unified_import_batch
+
+    hub = ProgressHub(push_interval=0.01, heartbeat=5)
+    hub.publish('import', {'status': 'completed', 'running': False})  # Last import
+    seen = []
+
+    def fake_import(import_type, filepath, track_progress=True):
+        seen.append(hub.latest('import'))
+        return {'success': True, 'imported_records': 10}
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            patch.object(unified_import_batch, 'progress_hub', hub), \
+            patch.object(unified_import_batch, 'PROGRESS_FILE', Path(tmp) / 'import_progress.json'), \
+            patch.object(unified_import_batch, 'import_single_file', fake_import):
+        unified_import_batch.start_progress('rep', status='pending')
+        pending = hub.latest('import')
+        unified_import_batch.start_progress('rep')
+        unified_import_batch.import_files('rep', ['a.xls', 'b.xls', 'c.xls'])
+        final = hub.latest('import')
+
+    if not (pending['running'] and pending['status'] == 'pending' and pending['completed_files'] == 0):
+        print(f"✗ Last import's snapshot not replaced: {pending}")
+        return False
+
+    during = [(p['running'], p['current_file'], p['completed_files'], p['total_files']) for p in seen]
+    if during != [(True, 'a.xls', 0, 3), (True, 'b.xls', 1, 3), (True, 'c.xls', 2, 3)]:
+        print(f"✗ Per-file snapshots {during}")
+        return False
+    print("✓ Fresh snapshot on submit, one snapshot per file while running")
+
+    if final['status'] == 'completed' and not final['running'] and final['completed_files'] == 3 \
+            and final['total_records_imported'] == 30:
+        print("✓ Completion published with file and record totals")
+        return True
+
+    print(f"✗ Unexpected final snapshot: {final}")
+    return False
+
+
+def test_bulk_downloader_publishes():
+    """Test BulkDownloader pushes each progress write on download:bulk."""
+    print("\nTesting: BulkDownloader publishes progress...")
+
+    import bulk_downloader
+    from utils import downloader_runner
+
+    hub = ProgressHub(push_interval=0.01, heartbeat=5)
+    with tempfile.TemporaryDirectory() as tmp, \
+            patch.object(bulk_downloader, 'progress_hub', hub), \
+            patch.object(downloader_runner, 'progress_hub', hub):
+        runner = downloader_runner.DownloaderRunner.__new__(downloader_runner.DownloaderRunner)
+        runner.executor = type('Executor', (), {'submit': lambda self, *args, **kwargs: 'job-1'})()
+        runner._submit(downloader_runner.BULK_DOWNLOAD_JOB, {'schemes': ['ucs']})
+        queued = hub.latest('download:bulk')
+
+        downloader = bulk_downloader.BulkDownloader()
+        downloader.progress_file = Path(tmp) / 'bulk_download_progress.json'
+        progress = {'status': 'running', 'current_month': {'month': 1, 'year': 2569},
+                    'completed_months': 0, 'total_months': 3}
+        downloader.save_progress(progress)
+        running = hub.latest('download:bulk')
+        downloader.save_progress({**progress, 'status': 'completed', 'completed_months': 3})
+        done = hub.latest('download:bulk')
+
+    if queued != {'running': True, 'status': 'queued', 'job_id': 'job-1'}:
+        print(f"✗ Queued snapshot {queued}")
+        return False
+    if running['running'] and running['current_month'] == {'month': 1, 'year': 2569} \
+            and done['status'] == 'completed' and not done['running']:
+        print("✓ Queued, running and completed snapshots published in the bulk progress format")
+        return True
+
+    print(f"✗ Unexpected snapshots: {running}, {done}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("PROGRESS STREAM TEST")
+    print("="*60)
+
+    tests = [
+        ("Coalescing", test_coalescing),
+        ("Shared Producer", test_shared_producer),
+        ("Download Manager Publishes", test_download_manager_publishes),
+        ("Import Publishes", test_import_publishes),
+        ("Bulk Downloader Publishes", test_bulk_downloader_publishes),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Test Query Fanout
+
+Verifies that independent analytics aggregates run concurrently:
+1. Statements run in parallel on separate pooled connections
+2. A call never holds more connections than its concurrency cap
+3. An exhausted pool falls back to the caller's connection
+4. Optional failures are logged, required failures are re-raised
+5. Per-query timings are sent as a Server-Timing header
+
+Run: python test_query_fanout.py
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.query_fanout import init_query_timing, run_queries
+
+
+class PooledConnection(FakeConnection):
+    """Fake connection that returns itself to its pool on close."""
+
+    def __init__(self, pool):
+        super().__init__(default=pool.answer, fail_on=lambda query, params: 'FAIL' in query)
+        self.pool = pool
+
+    def close(self):
+        super().close()
+        self.pool.release()
+
+
+class FakePool:
+    """Hands out up to `size` connections and tracks how many are in use."""
+
+    def __init__(self, size=10, rows=None, delay=0):
+        self.size = size
+        self.rows = rows
+        self.delay = delay
+        self.in_use = 0
+        self.peak = 0
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            if self.in_use >= self.size:
+                return None
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+            conn = PooledConnection(self)
+            self.connections.append(conn)
+            return conn
+
+    def release(self):
+        with self.lock:
+            self.in_use -= 1
+
+    def answer(self, query, params):
+        """Fixed rows if given, else echo the statement"""
+        if 'SLEEP' in query:
+            time.sleep(0.2)
+        if self.rows is not None:
+            time.sleep(self.delay)
+            return self.rows
+        return [(query, params)]
+
+
+def test_runs_concurrently():
+    """Test slow statements overlap instead of adding up."""
+    print("\nTesting: Concurrent execution...")
+
+    pool = FakePool()
+    queries = {f"q{i}": (f"SELECT SLEEP {i}", [i]) for i in range(4)}
+
+    start = time.perf_counter()
+    results = run_queries(queries, connect=pool.connect, max_workers=4)
+    elapsed = time.perf_counter() - start
+
+    if elapsed > 0.6:
+        print(f"✗ Took {elapsed:.2f}s, queries ran sequentially")
+        return False
+    if results['q2'] != [('SELECT SLEEP 2', (2,))] or set(results.timings) != set(queries):
+        print(f"✗ Unexpected results: {dict(results)}, timings {results.timings}")
+        return False
+    if pool.in_use != 0 or not all(conn.closed for conn in pool.connections):
+        print("✗ Connections not returned to the pool")
+        return False
+
+    print(f"✓ 4 x 200ms statements finished in {elapsed * 1000:.0f}ms on 4 connections")
+    return True
+
+
+def test_concurrency_cap():
+    """Test a call never holds more connections than max_workers."""
+    print("\nTesting: Concurrency cap...")
+
+    pool = FakePool()
+    queries = {f"q{i}": (f"SELECT SLEEP {i}", None) for i in range(6)}
+    results = run_queries(queries, connect=pool.connect, max_workers=2)
+
+    if pool.peak == 2 and len(results) == 6:
+        print("✓ 6 statements ran on at most 2 pooled connections")
+        return True
+
+    print(f"✗ Peak connections {pool.peak}, results {len(results)}")
+    return False
+
+
+def test_exhausted_pool_falls_back():
+    """Test statements run on the caller's connection when the pool is empty."""
+    print("\nTesting: Exhausted pool...")
+
+    pool = FakePool(size=0)
+    caller = FakeConnection()
+    queries = {'totals': ("SELECT 1", None), 'by_month': ("SELECT 2", None)}
+    results = run_queries(queries, connect=pool.connect, fallback_conn=caller)
+
+    if [query for query, _ in caller.queries] == ["SELECT 1", "SELECT 2"] and not caller.closed and len(results) == 2:
+        print("✓ Both statements ran sequentially on the caller's open connection")
+        return True
+
+    print(f"✗ Caller queries {caller.queries}, closed={caller.closed}")
+    return False
+
+
+def test_optional_failures():
+    """Test optional failures are swallowed and required ones re-raised."""
+    print("\nTesting: Query failures...")
+
+    pool = FakePool()
+    queries = {'ok': ("SELECT 1", None), 'files': ("SELECT FAIL", None)}
+    results = run_queries(queries, connect=pool.connect, optional=['files'])
+    if 'files' in results or 'files' not in results.errors or results.one('ok') is None:
+        print(f"✗ Optional failure handling: {dict(results)}, errors {results.errors}")
+        return False
+    if results.one('files', default=(0,)) != (0,):
+        print("✗ one() should return the default for a failed query")
+        return False
+
+    try:
+        run_queries(queries, connect=pool.connect)
+    except RuntimeError:
+        failed = [conn for conn in pool.connections if conn.statements('SELECT FAIL')]
+        if all(conn.rollbacks == 1 for conn in failed):
+            print("✓ Optional failure logged, required failure re-raised after rollback")
+            return True
+        print("✗ Failed connection was not rolled back")
+        return False
+
+    print("✗ Required failure was not raised")
+    return False
+
+
+def test_server_timing_header():
+    """Test per-query timings are exposed when enabled."""
+    print("\nTesting: Server-Timing header...")
+
+    from flask import Flask, jsonify
+
+    pool = FakePool()
+    app = Flask(__name__)
+    init_query_timing(app)
+
+    @app.route('/report')
+    def report():
+        results = run_queries({'totals': ("SELECT 1", None), 'monthly': ("SELECT 2", None)},
+                              connect=pool.connect)
+        return jsonify(len(results))
+
+    client = app.test_client()
+    if 'Server-Timing' in client.get('/report').headers:
+        print("✗ Header sent while disabled")
+        return False
+
+    app.config['QUERY_TIMING_HEADER'] = True
+    header = client.get('/report').headers.get('Server-Timing', '')
+    names = sorted(part.split(';')[0] for part in header.split(', '))
+    if names == ['monthly', 'totals'] and 'dur=' in header:
+        print(f"✓ Server-Timing: {header}")
+        return True
+
+    print(f"✗ Unexpected header: {header!r}")
+    return False
+
+
+def test_efficiency_uses_fanout():
+    """Test /api/analytics/efficiency spreads its aggregates over connections."""
+    print("\nTesting: /api/analytics/efficiency fanout...")
+
+    from flask import Flask
+    import routes.analytics_api as analytics_api
+
+    pool = FakePool(rows=[(0,) * 5], delay=0.05)
+    app = Flask(__name__)
+    app.config['QUERY_TIMING_HEADER'] = True
+    app.register_blueprint(analytics_api.analytics_api_bp)
+    init_query_timing(app)
+
+    original = analytics_api.get_db_connection
+    analytics_api.get_db_connection = pool.connect
+    try:
+        response = app.test_client().get('/api/analytics/efficiency')
+    finally:
+        analytics_api.get_db_connection = original
+
+    header = response.headers.get('Server-Timing', '')
+    used = [conn for conn in pool.connections if conn.queries]
+    if response.get_json().get('success') and len(used) > 1 and all(name in header for name in ('overall', 'by_service', 'by_fund', 'monthly')):
+        print(f"✓ 4 aggregates ran on {len(used)} connections")
+        return True
+
+    print(f"✗ Connections used: {len(used)}, header {header!r}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("QUERY FANOUT TEST")
+    print("="*60)
+
+    tests = [
+        ("Runs Concurrently", test_runs_concurrently),
+        ("Concurrency Cap", test_concurrency_cap),
+        ("Exhausted Pool Falls Back", test_exhausted_pool_falls_back),
+        ("Optional Failures", test_optional_failures),
+        ("Server-Timing Header", test_server_timing_header),
+        ("Efficiency Uses Fanout", test_efficiency_uses_fanout),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,22 +4,34 @@ Test API Rate Limiting
 
 Verifies that rate limiting is working correctly:
 1. Token bucket algorithm works
-2. Rate limits are enforced
-3. Tokens refill correctly
-4. Headers are set correctly
-5. Per-user and per-IP limits work
+2. Sliding window limits are enforced and recover
+3. Memory and SQLite backends make the same decisions
+4. Memory backend stays bounded (LRU eviction)
+5. Convenience decorators exist
 
 Run: python test_rate_limit.py
 """
 
 import sys
+import tempfile
 import time
 from pathlib import Path
+from unittest import mock
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from utils.rate_limiter import TokenBucket, rate_limiter
+from utils.rate_limiter import MemoryBackend, RateLimiter, SQLiteBackend, TokenBucket, rate_limiter
+
+
+class FakeClock:
+    """Controllable replacement for time.time() in utils.rate_limiter."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self):
+        return self.now
 
 
 def test_token_bucket():
@@ -102,86 +114,126 @@ def test_rate_limiter_basic():
         print("✗ Different bucket key for same user!")
         return False
 
-    # Test bucket creation
-    bucket = rate_limiter._get_bucket(key1, capacity=10, refill_rate=1.0)
+    # Separate identifiers are limited separately
+    limiter = RateLimiter(backend=MemoryBackend())
+    limiter.hit('/api/test', 'user:1', requests=1, window=60)
+    allowed, remaining, _ = limiter.hit('/api/test', 'user:2', requests=1, window=60)
 
-    if bucket.capacity == 10 and bucket.refill_rate == 1.0:
-        print("✓ Bucket created with correct parameters")
+    if allowed and remaining == 0:
+        print("✓ Each identifier has its own counter")
     else:
-        print(f"✗ Bucket parameters wrong: capacity={bucket.capacity}, rate={bucket.refill_rate}")
+        print(f"✗ user:2 affected by user:1 (allowed={allowed}, remaining={remaining})")
         return False
 
     return True
 
 
 def test_rate_limiter_limits():
-    """Test rate limit enforcement."""
+    """Test sliding window enforcement."""
     print("\nTesting: Rate Limit Enforcement...")
 
-    # Create a test bucket: 3 requests, 10 second window
-    test_key = rate_limiter._get_bucket_key('/test', 'user:test')
-    bucket = rate_limiter._get_bucket(test_key, capacity=3, refill_rate=0.3)
+    clock = FakeClock(1_000_030.0)  # 10s into a 60s window
+    limiter = RateLimiter(backend=MemoryBackend())
 
-    # Should allow 3 requests
-    success_count = 0
-    for i in range(5):
-        if bucket.consume():
-            success_count += 1
-
-    if success_count == 3:
-        print("✓ Allowed exactly 3 requests (limit enforced)")
-    else:
-        print(f"✗ Should allow 3 requests, allowed {success_count}")
-        return False
+    with mock.patch('utils.rate_limiter.time', clock):
+        # Should allow 3 requests
+        results = [limiter.hit('/test', 'user:test', requests=3, window=60) for _ in range(5)]
+        allowed = [r[0] for r in results]
 
-    # Wait and verify refill
-    print("  Waiting 1 second for partial refill...")
-    time.sleep(1)
+        if allowed == [True, True, True, False, False]:
+            print("✓ Allowed exactly 3 requests (limit enforced)")
+        else:
+            print(f"✗ Should allow 3 requests, got {allowed}")
+            return False
 
-    # Should have ~0.3 tokens refilled (not enough for full request yet)
-    remaining_before = bucket.get_remaining()
-    print(f"  Tokens after 1s: {remaining_before:.2f}")
+        # Next window: the previous window's 3 requests still weigh 5/6 at 10s in
+        clock.now += 60
+        allowed, _, retry_after = limiter.hit('/test', 'user:test', requests=3, window=60)
+        if not allowed:
+            print("✓ Previous window still counts early in the next window")
+        else:
+            print("✗ Burst allowed right after window boundary")
+            return False
 
-    # Wait another 3 seconds (total 4 seconds = 1.2 tokens)
-    print("  Waiting 3 more seconds...")
-    time.sleep(3)
+        if abs(retry_after - 10) < 0.01:
+            print(f"✓ Retry-After computed ({retry_after:.0f}s)")
+        else:
+            print(f"✗ Retry-After incorrect: {retry_after}")
+            return False
 
-    if bucket.consume():
-        print("✓ Request allowed after token refill")
-    else:
-        print("✗ Request should be allowed after refill")
-        return False
+        # Once the previous window's weight has decayed, requests are allowed again
+        clock.now += retry_after
+        allowed, _, _ = limiter.hit('/test', 'user:test', requests=3, window=60)
+        if allowed:
+            print("✓ Request allowed after the window slides")
+        else:
+            print("✗ Request should be allowed after the window slides")
+            return False
 
     return True
 
 
-def test_cleanup():
-    """Test bucket cleanup."""
-    print("\nTesting: Bucket Cleanup...")
+def test_backend_parity():
+    """Test SQLite backend (shared upsert) matches the memory backend."""
+    print("\nTesting: Backend Parity...")
 
-    # Get initial bucket count
-    initial_count = len(rate_limiter.buckets)
-    print(f"  Initial buckets: {initial_count}")
+    clock = FakeClock(2_000_000.0)
+    with tempfile.TemporaryDirectory() as tmp, mock.patch('utils.rate_limiter.time', clock):
+        memory = MemoryBackend()
+        sqlite = SQLiteBackend(str(Path(tmp) / 'rate_limits.sqlite3'))
+
+        # Steady traffic above the limit across several windows
+        mismatches = 0
+        for step in range(400):
+            clock.now += 0.7
+            key = f'key{step % 2}'
+            if memory.hit(key, 20, 30)[:2] != sqlite.hit(key, 20, 30)[:2]:
+                mismatches += 1
+
+        if mismatches == 0:
+            print("✓ SQLite and memory backends agree on 400 checks")
+        else:
+            print(f"✗ Backends disagree on {mismatches} checks")
+            return False
 
-    # Create several buckets
-    for i in range(10):
-        key = rate_limiter._get_bucket_key(f'/test{i}', f'user:{i}')
-        rate_limiter._get_bucket(key, capacity=10, refill_rate=1.0)
+        # A second SQLiteBackend on the same file (another worker) shares counters
+        other_worker = SQLiteBackend(sqlite.path)
+        sqlite.reset('shared')
+        for _ in range(5):
+            sqlite.hit('shared', 5, 60)
+        allowed, _, _ = other_worker.hit('shared', 5, 60)
 
-    new_count = len(rate_limiter.buckets)
-    print(f"  After creating 10 buckets: {new_count}")
+        if not allowed:
+            print("✓ Limit shared between workers through the SQLite file")
+            return True
 
-    if new_count >= initial_count + 10:
-        print("✓ Buckets created successfully")
+        print("✗ Second worker did not see the first worker's requests")
+        return False
+
+
+def test_cleanup():
+    """Test memory backend stays bounded."""
+    print("\nTesting: LRU Eviction...")
+
+    backend = MemoryBackend(max_keys=100)
+    for i in range(1000):
+        backend.hit(f'ip:{i}', 10, 60)
+
+    if len(backend) == 100:
+        print("✓ 1,000 unique keys kept within max_keys=100")
     else:
-        print(f"✗ Expected at least {initial_count + 10} buckets, got {new_count}")
+        print(f"✗ Expected 100 keys, got {len(backend)}")
         return False
 
-    # Note: Cleanup only happens after 1 hour of inactivity
-    # So we can't test actual cleanup without mocking time
-    print("✓ Cleanup function exists (full test requires time mocking)")
+    # Recently used keys survive, least recently used are evicted
+    backend.hit('ip:900', 10, 60)
+    backend.hit('ip:new', 10, 60)
+    if 'ip:900' in backend._windows and 'ip:901' not in backend._windows:
+        print("✓ Least recently used key evicted first")
+        return True
 
-    return True
+    print("✗ Eviction order is not LRU")
+    return False
 
 
 def test_convenience_decorators():
@@ -218,7 +270,8 @@ def main():
         ("Token Bucket", test_token_bucket),
         ("Rate Limiter Basic", test_rate_limiter_basic),
         ("Rate Limit Enforcement", test_rate_limiter_limits),
-        ("Bucket Cleanup", test_cleanup),
+        ("Backend Parity", test_backend_parity),
+        ("LRU Eviction", test_cleanup),
         ("Convenience Decorators", test_convenience_decorators),
     ]
 
@@ -252,9 +305,9 @@ def main():
         print("\n✅ Rate limiting is working correctly.")
         print("\n🛡️  Features verified:")
         print("   - Token bucket algorithm")
-        print("   - Rate limit enforcement")
-        print("   - Token refill mechanism")
-        print("   - Bucket cleanup")
+        print("   - Sliding window enforcement")
+        print("   - Shared SQLite backend")
+        print("   - LRU eviction")
         print("   - Convenience decorators")
         print("\n📚 See docs/technical/RATE_LIMITING.md for usage guide")
         return 0
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Test Revenue Forecast
+
+Verifies the forecasting engine behind /api/analytics/forecast:
+1. A batch least-squares fit recovers trend and fiscal-year seasonality
+2. The rolling-origin backtest reports forecast error
+3. Monthly series are built per fund and scheme with gaps filled, from
+   complete months only
+4. Fits are cached per import generation; requests only project
+
+Run: python test_revenue_forecast.py
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.import_generation import generation_cache
+from utils.ml.forecaster import (
+    SeasonalTrendModel,
+    backtest,
+    load_monthly_series,
+    month_index,
+    month_label,
+)
+
+FIRST_MONTH = month_index('2023-10')
+SEASON = np.array([5, -3, 0, 2, -4, 1, 3, -2, 0, -1, 4, -5], dtype=float)  # Oct..Sep
+
+
+def seasonal_series(n_months, level, slope, scale=1.0):
+    """Noise-free trend + fiscal seasonality starting October 2023"""
+    t = np.arange(n_months)
+    return level + slope * t + scale * SEASON[t % 12]
+
+
+def make_connection(monthly, generation=(1, 100, '2026-10-01')):
+    """Fake connection answering the import generation and monthly aggregate"""
+    return FakeConnection({
+        'FROM eclaim_imported_files': [generation],
+        'GROUP BY service_month': monthly,
+    })
+
+
+def monthly_rows(n_months=30):
+    """(service_month, fund, scheme, claims, claimed, reimb, paid) for two funds"""
+    rows = []
+    ucs = seasonal_series(n_months, 1000, 10, 20)
+    ofc = seasonal_series(n_months, 400, -2, 5)
+    for i in range(n_months):
+        month = month_label(FIRST_MONTH + i)
+        rows.append((month, 'UCS', 'UCS', 100 + i, ucs[i] * 1.1, ucs[i], ucs[i]))
+        rows.append((month, 'OFC', None, 40, ofc[i] * 1.1, ofc[i], ofc[i]))
+    return rows
+
+
+def test_batch_fit():
+    """Test one batch fit recovers every series' trend and seasonality."""
+    print("\nTesting: Batch least-squares fit...")
+
+    values = np.array([seasonal_series(36, 1000, 10), seasonal_series(36, 50, -1, 0.5)])
+    model = SeasonalTrendModel.fit(values, FIRST_MONTH)
+    months, mean, half_width = model.predict(6)
+    expected = np.array([seasonal_series(42, 1000, 10)[36:], seasonal_series(42, 50, -1, 0.5)[36:]]).T
+
+    if not model.seasonal or not np.allclose(mean, expected) or not np.allclose(half_width, 0, atol=1e-6):
+        print(f"✗ Projection {mean[:, 0]}, expected {expected[:, 0]}")
+        return False
+    if month_label(months[0]) != '2026-10':
+        print(f"✗ First projected month {month_label(months[0])}")
+        return False
+
+    components = model.components(0)
+    if np.isclose(components['trend_per_month'], 10) and np.allclose(components['seasonal'], SEASON - SEASON.mean()):
+        print("✓ Trend and Oct-Sep seasonal indexes recovered for both series in one fit")
+        return True
+
+    print(f"✗ Components {components}")
+    return False
+
+
+def test_short_history_trend_only():
+    """Test short histories fit a trend with widening intervals."""
+    print("\nTesting: Short history...")
+
+    rng = np.random.default_rng(3)
+    values = (200 + 5 * np.arange(12) + rng.normal(0, 4, 12))[None, :]
+    model = SeasonalTrendModel.fit(values, FIRST_MONTH)
+    _, mean, half_width = model.predict(6)
+
+    if model.seasonal or not np.all(np.diff(half_width[:, 0]) > 0) or abs(mean[0, 0] - 260) > 15:
+        print(f"✗ seasonal={model.seasonal}, mean {mean[:, 0]}, half widths {half_width[:, 0]}")
+        return False
+
+    print("✓ 12 months fit a trend only, intervals widen with distance")
+    return True
+
+
+def test_backtest():
+    """Test the rolling-origin backtest reports forecast error."""
+    print("\nTesting: Backtest...")
+
+    rng = np.random.default_rng(5)
+    exact = seasonal_series(36, 1000, 10)[None, :]
+    noisy = exact + rng.normal(0, 50, (1, 36))
+
+    clean = backtest(exact, FIRST_MONTH, horizon=6, folds=3)
+    rough = backtest(noisy, FIRST_MONTH, horizon=6, folds=3)
+    if clean['folds'] != 3 or clean['mape'][0] > 1e-6 or clean['mape_by_step'].shape != (6, 1):
+        print(f"✗ Clean backtest {clean}")
+        return False
+    if not 0 < rough['mape'][0] < 20:
+        print(f"✗ Noisy MAPE {rough['mape'][0]}")
+        return False
+    if backtest(exact[:, :8], FIRST_MONTH)['folds'] != 0:
+        print("✗ Backtest ran without enough history")
+        return False
+
+    print(f"✓ 3 origins, MAPE 0% on exact data and {rough['mape'][0]:.1f}% with noise")
+    return True
+
+
+def test_monthly_series():
+    """Test series are built per fund and scheme with missing months filled."""
+    print("\nTesting: Monthly series...")
+
+    rows = [row for row in monthly_rows(6) if row[0] != '2024-01']
+    conn = make_connection(rows)
+    data = load_monthly_series(conn, history_months=36, today=date(2026, 10, 15))
+
+    query, params = conn.queries[0]
+    if params != ('2023-10', '2026-10') or 'service_month >= %s AND service_month < %s' not in query:
+        print(f"✗ History filter {params}")
+        return False
+
+    keys = data['keys']
+    if keys[0] != ('total', None) or ('fund', 'UCS') not in keys or ('scheme', 'UNKNOWN') not in keys:
+        print(f"✗ Keys {keys}")
+        return False
+
+    values = data['values']
+    ucs = keys.index(('fund', 'UCS'))
+    if data['months'] == 6 and values[0, 1, 3] == 0 and values[ucs, 0, 0] == 100 \
+            and np.isclose(values[0, 1, 0], values[ucs, 1, 0] + values[keys.index(('fund', 'OFC')), 1, 0]):
+        print("✓ Total, fund and scheme series with January 2024 filled as zero")
+        return True
+
+    print(f"✗ Values {values[:, :, :4]}")
+    return False
+
+
+def test_partial_month_excluded():
+    """Test rows of the current, partly imported month do not change the fit."""
+    print("\nTesting: Partial current month...")
+
+    from utils.ml.forecaster import fit_forecasts
+
+    def months_between(rows):
+        # Apply the service_month range the way the database would
+        return lambda query, params: [row for row in rows if params[0] <= row[0] < params[1]]
+
+    complete = monthly_rows(30)  # 2023-10 .. 2026-03
+    partial = complete + [('2026-04', 'UCS', 'UCS', 3, 110, 100, 100)]
+    fits = []
+    for rows, today in ((complete, date(2026, 4, 2)), (partial, date(2026, 4, 2)), (partial, date(2026, 5, 2))):
+        conn = FakeConnection({'GROUP BY service_month': months_between(rows)})
+        fits.append(fit_forecasts(conn, today=today))
+
+    before, during, after = fits
+    months, _, _ = during['model'].predict(1)
+    if during['months'] != 30 or month_label(months[0]) != '2026-04' \
+            or not np.array_equal(before['model'].coefficients, during['model'].coefficients):
+        print(f"✗ Partial month fitted: {during['months']} months, origin {month_label(months[0])}")
+        return False
+
+    if after['months'] == 31 and after['values'][0, 1, -1] == 100:
+        print("✓ April 2026 ignored while in progress, forecast starts at April; loaded once complete")
+        return True
+
+    print(f"✗ Completed month not loaded: {after['months']} months")
+    return False
+
+
+def test_endpoint_cached():
+    """Test /api/analytics/forecast fits once per import generation."""
+    print("\nTesting: /api/analytics/forecast...")
+
+    from flask import Flask
+    import routes.analytics_api as analytics_api
+
+    generation_cache.invalidate()
+    conn = make_connection(monthly_rows(30))
+    app = Flask(__name__)
+    app.register_blueprint(analytics_api.analytics_api_bp)
+    original = analytics_api.get_db_connection
+    analytics_api.get_db_connection = lambda: conn
+    try:
+        client = app.test_client()
+        first = client.get('/api/analytics/forecast').get_json()['data']
+        by_fund = client.get('/api/analytics/forecast?by=fund&months=3').get_json()['data']
+        bad = client.get('/api/analytics/forecast?by=hospital')
+    finally:
+        analytics_api.get_db_connection = original
+
+    loads = conn.statements('GROUP BY service_month')
+    if len(loads) != 1 or bad.status_code != 400:
+        print(f"✗ {len(loads)} loads, invalid breakdown returned {bad.status_code}")
+        return False
+
+    forecast = first['forecast']
+    if len(forecast) != 6 or forecast[0]['month'] != '2026-04' or \
+            not forecast[0]['lower_bound'] <= forecast[0]['projected_reimb'] <= forecast[0]['upper_bound']:
+        print(f"✗ Forecast {forecast[:1]}")
+        return False
+
+    funds = {s['fund']: s for s in by_fund['series']}
+    expected = seasonal_series(33, 1000, 10, 20)[30:]
+    if set(funds) == {'UCS', 'OFC'} and len(funds['UCS']['forecast']) == 3 \
+            and np.allclose([f['projected_reimb'] for f in funds['UCS']['forecast']], expected, atol=0.01) \
+            and first['backtest']['folds'] == 3:
+        print("✓ One fit serves every horizon and breakdown; fund forecasts follow their own season")
+        return True
+
+    print(f"✗ Series {by_fund['series']}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("REVENUE FORECAST TEST")
+    print("="*60)
+
+    tests = [
+        ("Batch Fit", test_batch_fit),
+        ("Short History Trend Only", test_short_history_trend_only),
+        ("Backtest", test_backtest),
+        ("Monthly Series", test_monthly_series),
+        ("Partial Month Excluded", test_partial_month_excluded),
+        ("Endpoint Cached", test_endpoint_cached),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
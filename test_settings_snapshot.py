@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test Settings Snapshot Cache and Atomic Writes
+
+Verifies SettingsManager's in-memory settings snapshot:
+1. Repeated getters do not re-read settings.json
+2. Writes by another process (new mtime/inode) are picked up
+3. Callers cannot modify the shared snapshot
+4. Concurrent read-modify-write updates from several processes are not lost
+
+Run: python test_settings_snapshot.py
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.settings_manager import SettingsManager
+
+WORKERS = 4
+CREDENTIALS_PER_WORKER = 10
+
+
+def test_reads_cached_until_file_changes():
+    """Test getters reuse the snapshot and reload after an external write."""
+    print("\nTesting: Snapshot reuse and reload...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings_file = Path(tmp) / 'settings.json'
+        settings_file.write_text(json.dumps({'hospital_code': '10670'}), encoding='utf-8')
+        manager = SettingsManager(settings_file=str(settings_file))
+
+        with mock.patch('utils.settings_manager.json.load', wraps=json.load) as json_load:
+            for _ in range(100):
+                manager.get_hospital_code()
+                manager.get_enabled_schemes()
+                manager.get_setting('download_dir')
+                manager.get_schedule_settings()
+
+        if json_load.call_count == 1:
+            print("✓ 400 getter calls parsed settings.json once")
+        else:
+            print(f"✗ settings.json parsed {json_load.call_count} times")
+            return False
+
+        # Simulate a downloader subprocess replacing the file
+        other_file = Path(tmp) / 'other.json'
+        other_file.write_text(json.dumps({'hospital_code': '12345'}), encoding='utf-8')
+        os.replace(other_file, settings_file)
+
+        if manager.get_hospital_code() == '12345':
+            print("✓ External write picked up")
+            return True
+
+        print(f"✗ Stale hospital code: {manager.get_hospital_code()}")
+        return False
+
+
+def test_snapshot_isolated_from_callers():
+    """Test returned settings are copies."""
+    print("\nTesting: Snapshot isolation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SettingsManager(settings_file=str(Path(tmp) / 'settings.json'))
+        manager.update_enabled_schemes(['ucs', 'ofc'])
+
+        manager.load_settings()['enabled_schemes'].append('sss')
+        manager.get_enabled_schemes().append('lgo')
+
+        if manager.get_enabled_schemes() == ['ucs', 'ofc']:
+            print("✓ Caller changes do not leak into the snapshot")
+        else:
+            print(f"✗ Snapshot modified: {manager.get_enabled_schemes()}")
+            return False
+
+        leftovers = [p.name for p in Path(tmp).iterdir() if p.suffix == '.tmp']
+        if not leftovers:
+            print("✓ Atomic write left no temp files")
+            return True
+
+        print(f"✗ Temp files left behind: {leftovers}")
+        return False
+
+
+def add_credentials(settings_file: str, worker: int):
+    """Add credentials from a separate process."""
+    manager = SettingsManager(settings_file=settings_file)
+    for i in range(CREDENTIALS_PER_WORKER):
+        manager.add_credential(f'user{worker}_{i}', 'secret')
+
+
+def test_concurrent_process_writes():
+    """Test read-modify-write updates from several processes are serialized."""
+    print("\nTesting: Concurrent writers...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings_file = str(Path(tmp) / 'settings.json')
+        processes = [
+            multiprocessing.Process(target=add_credentials, args=(settings_file, worker))
+            for worker in range(WORKERS)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        count = SettingsManager(settings_file=settings_file).get_credentials_count()['total']
+        expected = WORKERS * CREDENTIALS_PER_WORKER
+
+        if count == expected:
+            print(f"✓ All {expected} credentials saved")
+            return True
+
+        print(f"✗ Lost updates: {count}/{expected} credentials saved")
+        return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("SETTINGS SNAPSHOT TEST")
+    print("="*60)
+
+    tests = [
+        ("Reads Cached Until File Changes", test_reads_cached_until_file_changes),
+        ("Snapshot Isolated From Callers", test_snapshot_isolated_from_callers),
+        ("Concurrent Process Writes", test_concurrent_process_writes),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test Sargable Date Predicates
+
+Verifies that month and fiscal-year predicates use the generated columns
+from migration 020:
+1. Claims tables filter on fiscal_year_be, other tables keep a date range
+2. BE / Gregorian month conversions match posting_month and service_month
+3. ReconciliationReport groups on service_month / posting_month
+4. Analytics overview keeps eclaim_* filters on their own dateadm
+
+Run: python test_sql_helpers.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils.sql_helpers import (
+    be_month_to_service_month,
+    fiscal_year_of_be_month,
+    service_month_to_be,
+    sql_fiscal_year_filter,
+    sql_posting_fiscal_year_filter,
+    sql_service_month,
+)
+
+
+def test_fiscal_year_filters():
+    """Test fiscal-year predicates per table."""
+    print("\nTesting: Fiscal-year predicates...")
+
+    checks = [
+        (sql_fiscal_year_filter(2569), ('fiscal_year_be = %s', [2569])),
+        (sql_fiscal_year_filter(2569, 'stm_claim_item', 'date_admit', alias='s'), ('s.fiscal_year_be = %s', [2569])),
+        (sql_fiscal_year_filter(2569, 'eclaim_drug'), ('dateadm >= %s AND dateadm <= %s', ['2025-10-01', '2026-09-30'])),
+        (sql_posting_fiscal_year_filter(2569), ('posting_month BETWEEN %s AND %s', ['256810', '256909'])),
+    ]
+    for actual, expected in checks:
+        if actual != expected:
+            print(f"✗ Got {actual}, expected {expected}")
+            return False
+
+    if sql_service_month(alias='c') != 'c.service_month' or 'service_month' in sql_service_month('eclaim_drug'):
+        print(f"✗ Service month expressions: {sql_service_month(alias='c')}, {sql_service_month('eclaim_drug')}")
+        return False
+
+    print("✓ Claims tables use fiscal_year_be / service_month, others a dateadm range")
+    return True
+
+
+def test_month_conversions():
+    """Test BE and Gregorian month conversions."""
+    print("\nTesting: Month conversions...")
+
+    if service_month_to_be('2025-10') != '256810' or be_month_to_service_month('256901') != '2026-01':
+        print("✗ Month conversion mismatch")
+        return False
+    if fiscal_year_of_be_month('256810') != 2569 or fiscal_year_of_be_month('256909') != 2569:
+        print("✗ Fiscal year of BE month mismatch")
+        return False
+    if any(value is not None for value in (service_month_to_be(None), be_month_to_service_month(''),
+                                           fiscal_year_of_be_month('2568'))):
+        print("✗ Invalid months should map to None")
+        return False
+
+    print("✓ '2025-10' <-> '256810', FY 2569 = 256810..256909")
+    return True
+
+
+def test_reconciliation_uses_generated_columns():
+    """Test reconciliation groups and filters on the generated columns."""
+    print("\nTesting: Reconciliation by fiscal year...")
+
+    from utils.reconciliation import ReconciliationReport
+
+    conn = FakeConnection({
+        'FROM claim_rep_opip_nhso_item': [('2025-10', 10, 9, 1000, 0)],
+        'FROM smt_budget_transfers': [('256810', 5, 800, 0, 0)],
+    })
+    results = ReconciliationReport(conn).get_monthly_reconciliation_by_fy(2569)
+
+    (rep_query, rep_params), (smt_query, smt_params) = conn.queries
+    if 'fiscal_year_be = %s' not in rep_query or 'GROUP BY service_month' not in rep_query \
+            or rep_params != (2569,) or 'dateadm' in rep_query:
+        print(f"✗ REP query: {rep_query} {rep_params}")
+        return False
+    if 'posting_month BETWEEN %s AND %s' not in smt_query or 'LEFT(' in smt_query \
+            or smt_params != ('256810', '256909'):
+        print(f"✗ SMT query: {smt_query} {smt_params}")
+        return False
+
+    october = results[0]
+    if october['month_be'] == '256810' and october['claim_count'] == 10 and october['payment_count'] == 5:
+        print("✓ REP and SMT rows matched on BE month from the generated columns")
+        return True
+
+    print(f"✗ Unexpected results: {results[:2]}")
+    return False
+
+
+def test_overview_eclaim_filters():
+    """Test the overview keeps eclaim_* filters on their own dateadm."""
+    print("\nTesting: /api/analytics/overview date filters...")
+
+    from flask import Flask
+    import routes.analytics_api as analytics_api
+
+    conn = FakeConnection({
+        'as total_claims': [(10, 1000, 900, 1200, 8, 1)],
+        'FROM eclaim_': [(0, 0, 0, 0)],
+    })
+    app = Flask(__name__)
+    app.register_blueprint(analytics_api.analytics_api_bp)
+    original = analytics_api.get_db_connection
+    analytics_api.get_db_connection = lambda: conn
+    try:
+        response = app.test_client().get('/api/analytics/overview?fiscal_year=2569')
+    finally:
+        analytics_api.get_db_connection = original
+
+    if not response.get_json().get('success'):
+        print(f"✗ Response: {response.get_json()}")
+        return False
+
+    claims = [params for query, params in conn.queries if 'FROM claim_rep_opip_nhso_item' in query]
+    eclaim = [(query, params) for query, params in conn.queries if 'FROM eclaim_' in query]
+    if not claims or any(params[-1:] != (2569,) for params in claims):
+        print(f"✗ Claims queries: {conn.queries}")
+        return False
+    if len(eclaim) != 3 or any('fiscal_year_be' in query or params != ('2025-10-01', '2026-09-30')
+                               for query, params in eclaim):
+        print(f"✗ eclaim queries: {eclaim}")
+        return False
+
+    print("✓ Claims filter on fiscal_year_be, eclaim_* tables on a dateadm range")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("SQL HELPERS TEST")
+    print("="*60)
+
+    tests = [
+        ("Fiscal Year Filters", test_fiscal_year_filters),
+        ("Month Conversions", test_month_conversions),
+        ("Reconciliation Generated Columns", test_reconciliation_uses_generated_columns),
+        ("Overview eclaim Filters", test_overview_eclaim_filters),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test Streaming Denial Model Training
+
+Verifies the out-of-core training pipeline in utils/ml/train_denial_model.py:
+1. Claims are streamed in chunks into float32 features encoded like the predictor
+2. Stratified / sampled modes keep every denied claim or about max_rows claims
+3. A trained model saves its memory and wall-time statistics and loads in DenialPredictor
+
+Run: python test_train_denial_model.py
+"""
+
+import random
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+import utils.ml.predictor as predictor_module
+import utils.ml.train_denial_model as trainer
+from utils.ml.predictor import DenialPredictor
+
+
+def make_claims(count, denial_rate=0.06, seed=11):
+    """Training query rows: 5 categoricals, error_code, claim, rw, adjrw, is_denied"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        denied = rng.random() < denial_rate
+        rows.append((
+            rng.choice(['OP', 'IP', 'UN']),
+            rng.choice(['01010', '02020', '05531', 'UNKNOWN', '14500']),
+            rng.choice(['UCS', 'OFC', 'SSS', 'LGO']),
+            rng.choice(['UCS', 'WEL', 'UNKNOWN']),
+            rng.choice(['1', '2', 'UNKNOWN']),
+            rng.choice(['998', 'E998', '101,998', 'C438']) if denied else rng.choice(['0', '0', '305']),
+            round(rng.uniform(100, 90000), 2),
+            round(rng.uniform(0, 4), 4),
+            round(rng.uniform(0, 4), 4),
+            int(denied),
+        ))
+    return rows
+
+
+def claims_connection(claims):
+    """Fake connection answering the label count and the training scan"""
+    return FakeConnection({
+        'SELECT COUNT(*)': [(len(claims), sum(row[9] for row in claims))],
+    }, default=claims)
+
+
+def test_streamed_features():
+    """Test chunked loading produces the predictor's features in float32."""
+    print("\nTesting: Streamed feature matrix...")
+
+    claims = make_claims(1000)
+    conn = claims_connection(claims)
+    X, y, label_encoders, stats = trainer.load_training_data(conn, chunk_rows=128)
+
+    if 'denial_training_scan' not in conn.cursor_names or set(conn.fetch_sizes) != {128} \
+            or len(conn.fetch_sizes) != 9:
+        print(f"✗ Cursors {conn.cursor_names}, fetches {conn.fetch_sizes}")
+        return False
+    if X.shape != (1000, 11) or set(X.dtypes) != {np.dtype('float32')} or y.dtype != np.int8:
+        print(f"✗ Shape {X.shape}, dtypes {set(X.dtypes)}, labels {y.dtype}")
+        return False
+
+    # Same encoding DenialPredictor applies to the stored classes
+    predictor = DenialPredictor()
+    predictor.feature_cols = trainer.FEATURE_COLS
+    predictor.class_index = {col: {cls: i for i, cls in enumerate(enc.classes_)}
+                             for col, enc in label_encoders.items()}
+    expected = predictor._prepare_batch([tuple(row[:6]) + tuple(float(v) for v in row[6:9]) for row in claims])
+
+    if list(label_encoders['drg'].classes_) == sorted({row[1] for row in claims}) \
+            and np.allclose(X.to_numpy(), expected.to_numpy(dtype=np.float32)) \
+            and list(y) == [row[9] for row in claims] and stats['rows_used'] == 1000:
+        print(f"✓ 1000 claims in 8 chunks, {stats['feature_matrix_mb']} MB float32 matrix, "
+              "codes match LabelEncoder")
+        return True
+
+    print(f"✗ Features differ:\n{X.head()}\n{expected.head()}")
+    return False
+
+
+def test_sampling_modes():
+    """Test stratified mode keeps all denied claims and sample mode about max_rows."""
+    print("\nTesting: Stratified and sampled modes...")
+
+    claims = make_claims(20000)
+    denied = sum(row[9] for row in claims)
+
+    _, y, _, stats = trainer.load_training_data(claims_connection(claims), mode='stratified', negative_ratio=4)
+    approved = len(y) - int(y.sum())
+    if int(y.sum()) != denied or not 3.5 * denied < approved < 4.5 * denied or stats['rows_read'] != 20000:
+        print(f"✗ Stratified kept {int(y.sum())}/{denied} denied, {approved} approved")
+        return False
+
+    _, y, _, stats = trainer.load_training_data(claims_connection(claims), mode='sample', max_rows=2000)
+    if not 1800 < len(y) < 2200 or stats['keep_rate_approved'] != 0.1:
+        print(f"✗ Sample kept {len(y)} rows, stats {stats}")
+        return False
+
+    try:
+        trainer.sampling_rates('weighted', 10, 1)
+        print("✗ Unknown mode accepted")
+        return False
+    except ValueError:
+        pass
+
+    print(f"✓ Stratified: {denied} denied + {approved} approved of 20000; sample: {len(y)} rows")
+    return True
+
+
+def test_train_and_save():
+    """Test training records its statistics and the bundle loads in DenialPredictor."""
+    print("\nTesting: Train, save and load...")
+
+    claims = make_claims(3000)
+    X, y, label_encoders, training = trainer.load_training_data(claims_connection(claims))
+    model, metrics, _ = trainer.train_model(X, y, n_jobs=2, cv_folds=2)
+    training['peak_rss_mb'] = trainer.peak_memory_mb()
+
+    originals = (trainer.MODEL_DIR, trainer.MODEL_PATH, trainer.METADATA_PATH, trainer.ARTIFACT_DIR,
+                 predictor_module.MODEL_PATH, predictor_module.METADATA_PATH, predictor_module.ARTIFACT_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = Path(tmp)
+        trainer.MODEL_DIR = model_dir
+        trainer.MODEL_PATH = predictor_module.MODEL_PATH = model_dir / 'denial_predictor.joblib'
+        trainer.METADATA_PATH = predictor_module.METADATA_PATH = model_dir / 'model_metadata.json'
+        trainer.ARTIFACT_DIR = predictor_module.ARTIFACT_DIR = model_dir / 'denial_predictor'
+        try:
+            trainer.save_model(model, label_encoders, trainer.FEATURE_COLS, metrics, training)
+            predictor = DenialPredictor()
+            loaded = predictor.ensure_loaded()
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                results = predictor.predict_batch([
+                    {'service_type': 'IP', 'drg': '05531', 'error_code': '998', 'claim_amount': 5000},
+                    {'service_type': 'OP', 'drg': 'NEW', 'error_code': '0', 'claim_amount': 800},
+                ])
+        finally:
+            (trainer.MODEL_DIR, trainer.MODEL_PATH, trainer.METADATA_PATH, trainer.ARTIFACT_DIR,
+             predictor_module.MODEL_PATH, predictor_module.METADATA_PATH, predictor_module.ARTIFACT_DIR) = originals
+
+    saved = predictor.metadata.get('training', {})
+    if not loaded or predictor.model_format != 'mmap' or model.n_jobs != 2 or 'fit_seconds' not in metrics:
+        print(f"✗ Loaded {loaded}, n_jobs {model.n_jobs}, metrics {metrics}")
+        return False
+    if saved.get('rows_used') != 3000 or saved.get('peak_rss_mb', 0) <= 0 or 'load_seconds' not in saved:
+        print(f"✗ Training statistics {saved}")
+        return False
+    if results[0]['risk_score'] > results[1]['risk_score']:
+        print(f"✓ Saved with {saved['peak_rss_mb']} MB peak memory, model scores new claims")
+        return True
+
+    print(f"✗ Predictions {results}")
+    return False
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("DENIAL MODEL TRAINING TEST")
+    print("="*60)
+
+    tests = [
+        ("Streamed Features", test_streamed_features),
+        ("Sampling Modes", test_sampling_modes),
+        ("Train And Save", test_train_and_save),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test Flask-Login User Cache
+
+Verifies (without a database - connections are patched):
+1. load_user lookups with use_cache=True query the users table once
+2. User-changing AuthManager methods drop the cached user
+3. Uncached lookups still query every time
+
+Run: python test_user_cache.py
+"""
+
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_db import FakeConnection
+from utils import auth
+from utils.auth import AuthManager
+
+USER_ROW = (1, 'admin', 'admin@hospital.local', 'Admin', 'admin', '10670', True, False)
+
+
+def selects(conn):
+    """Number of SELECTs run on the fake connection"""
+    return sum(1 for query, _ in conn.queries if query.upper().startswith('SELECT'))
+
+
+def make_manager():
+    """Create an AuthManager whose connections are fakes."""
+    conn = FakeConnection(default=[USER_ROW])
+    patches = [
+        mock.patch.object(auth, 'get_connection', return_value=conn),
+        mock.patch.object(auth, 'return_connection'),
+        mock.patch.object(auth.audit_logger, 'log'),
+    ]
+    return AuthManager(), conn, patches
+
+
+def test_load_user_cached():
+    """Test repeated cached lookups query once."""
+    print("\nTesting: Cached user lookups...")
+
+    manager, conn, patches = make_manager()
+    with patches[0], patches[1], patches[2]:
+        users = [manager.get_user_by_id(1, use_cache=True) for _ in range(100)]
+
+        if selects(conn) == 1 and all(u.username == 'admin' for u in users) and users[0] is not users[1]:
+            print("✓ 100 lookups ran 1 query (fresh User objects)")
+        else:
+            print(f"✗ {selects(conn)} queries for 100 lookups")
+            return False
+
+        manager.get_user_by_id(1)
+        manager.get_user_by_id(1)
+        if selects(conn) == 3:
+            print("✓ Uncached lookups still query")
+            return True
+
+        print(f"✗ Uncached lookups ran {selects(conn) - 1} queries")
+        return False
+
+
+def test_invalidation():
+    """Test every user-changing method drops the cached user."""
+    print("\nTesting: Cache invalidation on user changes...")
+
+    manager, conn, patches = make_manager()
+    changes = {
+        'update_user': lambda: manager.update_user(1, role='viewer', updated_by='root'),
+        'toggle_user_status': lambda: manager.toggle_user_status(1, updated_by='root'),
+        'change_password': lambda: manager.change_password(1, 'N3w-passw0rd!'),
+        'reset_user_password': lambda: manager.reset_user_password(1, 'N3w-passw0rd!', reset_by='root'),
+        'delete_user': lambda: manager.delete_user(1, deleted_by='root'),
+    }
+
+    with patches[0], patches[1], patches[2]:
+        for name, change in changes.items():
+            manager.get_user_by_id(1, use_cache=True)
+            before = selects(conn)
+            change()
+            manager.get_user_by_id(1, use_cache=True)
+
+            if selects(conn) == before + 1:
+                print(f"✓ {name} invalidated the cached user")
+            else:
+                print(f"✗ {name} left a stale cached user")
+                return False
+
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("="*60)
+    print("USER CACHE TEST")
+    print("="*60)
+
+    tests = [
+        ("Load User Cached", test_load_user_cached),
+        ("Invalidation", test_invalidation),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"✗ Test failed with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+
+    passed = sum(1 for _, success in results if success)
+    total = len(results)
+
+    for name, success in results:
+        status = "✓ PASS" if success else "✗ FAIL"
+        print(f"{status}: {name}")
+
+    print(f"\nResult: {passed}/{total} tests passed")
+    return 0 if passed == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,14 +17,10 @@ import argparse
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+from typing import Callable, Dict, List, Optional
+
+from utils.progress_stream import progress_hub
+
 logger = logging.getLogger(__name__)
 
 # Progress file path (shared with UnifiedImportRunner)
@@ -51,22 +47,47 @@ def stream_log(message: str, level: str = 'info', source: str = 'import'):
         pass
 
 
-def update_progress(updates: dict):
-    """Update progress file with new values"""
+def update_progress(updates: dict, reset: bool = False):
+    """
+    Update progress file with new values and push them to the 'import' progress channel
+
+    Args:
+        updates: Progress fields to set
+        reset: Start from an empty progress file (a new import)
+    """
+    progress = {}
     try:
-        if PROGRESS_FILE.exists():
+        if not reset and PROGRESS_FILE.exists():
             with open(PROGRESS_FILE, 'r') as f:
                 progress = json.load(f)
-        else:
-            progress = {}
+    except Exception as e:
+        logger.warning(f"Could not read progress file: {e}")
 
-        progress.update(updates)
+    progress.update(updates)
 
+    try:
         with open(PROGRESS_FILE, 'w') as f:
             json.dump(progress, f, indent=2)
     except Exception as e:
         logger.warning(f"Could not update progress file: {e}")
 
+    progress_hub.publish('import', {
+        **progress,
+        'running': progress.get('status') in ('pending', 'processing'),
+        'total_records_imported': progress.get('records_imported', 0),
+    })
+
+
+def start_progress(import_type: str, status: str = 'processing'):
+    """Reset progress for a new import ('pending' while it waits for a worker)"""
+    update_progress({
+        'import_type': import_type,
+        'status': status,
+        'completed_files': 0,
+        'records_imported': 0,
+        'started_at': datetime.now().isoformat()
+    }, reset=True)
+
 
 # === REP Import Functions ===
 
@@ -106,7 +127,7 @@ def import_rep_file(filepath: str) -> dict:
     return import_eclaim_file(filepath, db_config, DB_TYPE)
 
 
-def import_rep_directory(dirpath: str) -> dict:
+def import_rep_directory(dirpath: str, should_stop: Optional[Callable[[], bool]] = None) -> dict:
     """Import all REP files in directory with progress tracking"""
     path = Path(dirpath)
     if not path.is_dir():
@@ -163,6 +184,11 @@ def import_rep_directory(dirpath: str) -> dict:
     }
 
     for idx, filepath in enumerate(files_to_import):
+        if should_stop and should_stop():
+            results['cancelled'] = True
+            stream_log(f"Import cancelled after {idx}/{total_files} files", 'warning', 'import')
+            break
+
         filename = filepath.name
         logger.info(f"\n[{idx + 1}/{total_files}] Importing: {filename}")
 
@@ -207,9 +233,9 @@ def import_rep_directory(dirpath: str) -> dict:
 
     # Final update
     update_progress({
-        'status': 'completed',
+        'status': 'cancelled' if results.get('cancelled') else 'completed',
         'running': False,
-        'completed_files': total_files,
+        'completed_files': results['imported'] + results['failed'],
         'records_imported': results['total_records'],
         'failed_files': results['failed_files'],
         'completed_at': datetime.now().isoformat()
@@ -267,7 +293,7 @@ def import_stm_file(filepath: str) -> dict:
         importer.disconnect()
 
 
-def import_stm_directory(dirpath: str) -> dict:
+def import_stm_directory(dirpath: str, should_stop: Optional[Callable[[], bool]] = None) -> dict:
     """Import all STM files in directory with progress tracking"""
     path = Path(dirpath)
     if not path.is_dir():
@@ -324,6 +350,11 @@ def import_stm_directory(dirpath: str) -> dict:
     }
 
     for idx, filepath in enumerate(files_to_import):
+        if should_stop and should_stop():
+            results['cancelled'] = True
+            stream_log(f"Import cancelled after {idx}/{total_files} files", 'warning', 'import')
+            break
+
         filename = filepath.name
         logger.info(f"\n[{idx + 1}/{total_files}] Importing: {filename}")
 
@@ -369,9 +400,9 @@ def import_stm_directory(dirpath: str) -> dict:
 
     # Final update
     update_progress({
-        'status': 'completed',
+        'status': 'cancelled' if results.get('cancelled') else 'completed',
         'running': False,
-        'completed_files': total_files,
+        'completed_files': results['imported'] + results['failed'],
         'records_imported': results['total_records'],
         'failed_files': results['failed_files'],
         'completed_at': datetime.now().isoformat()
@@ -448,7 +479,7 @@ def import_smt_file(filepath: str) -> dict:
         return {'success': False, 'error': str(e)}
 
 
-def import_smt_directory(dirpath: str) -> dict:
+def import_smt_directory(dirpath: str, should_stop: Optional[Callable[[], bool]] = None) -> dict:
     """Import all SMT files (CSV and Excel) in directory with progress tracking"""
     path = Path(dirpath)
     if not path.is_dir():
@@ -490,6 +521,11 @@ def import_smt_directory(dirpath: str) -> dict:
     }
 
     for idx, filepath in enumerate(smt_files):
+        if should_stop and should_stop():
+            results['cancelled'] = True
+            stream_log(f"Import cancelled after {idx}/{total_files} files", 'warning', 'import')
+            break
+
         filename = filepath.name
         logger.info(f"\n[{idx + 1}/{total_files}] Importing: {filename}")
 
@@ -534,9 +570,9 @@ def import_smt_directory(dirpath: str) -> dict:
 
     # Final update
     update_progress({
-        'status': 'completed',
+        'status': 'cancelled' if results.get('cancelled') else 'completed',
         'running': False,
-        'completed_files': total_files,
+        'completed_files': results['imported'] + results['failed'],
         'records_imported': results['total_records'],
         'failed_files': results['failed_files'],
         'completed_at': datetime.now().isoformat()
@@ -551,11 +587,20 @@ def import_smt_directory(dirpath: str) -> dict:
 
 # === Main Entry Point ===
 
-def import_single_file(import_type: str, filepath: str) -> dict:
-    """Import a single file based on type"""
+def import_single_file(import_type: str, filepath: str, track_progress: bool = True) -> dict:
+    """
+    Import a single file based on type
+
+    Args:
+        import_type: 'rep', 'stm', or 'smt'
+        filepath: File to import
+        track_progress: Report this file as the whole import (import_files reports its own)
+    """
+    report = update_progress if track_progress else (lambda updates: None)
+
     path = Path(filepath)
     if not path.exists():
-        update_progress({
+        report({
             'status': 'error',
             'error': f'File not found: {filepath}',
             'completed_at': datetime.now().isoformat()
@@ -565,7 +610,7 @@ def import_single_file(import_type: str, filepath: str) -> dict:
     filename = path.name
     logger.info(f"Importing single {import_type.upper()} file: {filename}")
 
-    update_progress({
+    report({
         'current_file': filename,
         'completed_files': 0
     })
@@ -587,7 +632,7 @@ def import_single_file(import_type: str, filepath: str) -> dict:
                 result.get('records', 0) or 0
             )
             stream_log(f"✓ {filename}: {records} records", 'success', 'import')
-            update_progress({
+            report({
                 'status': 'completed',
                 'running': False,
                 'completed_files': 1,
@@ -597,7 +642,7 @@ def import_single_file(import_type: str, filepath: str) -> dict:
         else:
             error = result.get('error', 'Unknown error')
             stream_log(f"✗ {filename}: {error}", 'error', 'import')
-            update_progress({
+            report({
                 'status': 'completed',
                 'running': False,
                 'completed_files': 1,
@@ -609,7 +654,7 @@ def import_single_file(import_type: str, filepath: str) -> dict:
 
     except Exception as e:
         logger.error(f"Exception: {e}")
-        update_progress({
+        report({
             'status': 'error',
             'running': False,
             'error': str(e),
@@ -618,18 +663,76 @@ def import_single_file(import_type: str, filepath: str) -> dict:
         return {'success': False, 'error': str(e)}
 
 
-def import_directory(import_type: str, dirpath: str) -> dict:
-    """Import all files in directory based on type"""
+def import_directory(import_type: str, dirpath: str, should_stop: Optional[Callable[[], bool]] = None) -> dict:
+    """
+    Import all files in directory based on type
+
+    Args:
+        import_type: 'rep', 'stm', or 'smt'
+        dirpath: Directory to import
+        should_stop: Optional callable checked before each file; import stops when it returns True
+    """
     if import_type == 'rep':
-        return import_rep_directory(dirpath)
+        return import_rep_directory(dirpath, should_stop)
     elif import_type == 'stm':
-        return import_stm_directory(dirpath)
+        return import_stm_directory(dirpath, should_stop)
     elif import_type == 'smt':
-        return import_smt_directory(dirpath)
+        return import_smt_directory(dirpath, should_stop)
     else:
         return {'success': False, 'error': f'Invalid import type: {import_type}'}
 
 
+def import_files(import_type: str, filepaths: List[str], should_stop: Optional[Callable[[], bool]] = None) -> dict:
+    """Import specific files one by one based on type"""
+    total_files = len(filepaths)
+    results = {
+        'success': True,
+        'total_files': total_files,
+        'imported': 0,
+        'failed': 0,
+        'total_records': 0,
+        'failed_files': []
+    }
+    update_progress({'total_files': total_files})
+
+    for idx, filepath in enumerate(filepaths):
+        if should_stop and should_stop():
+            results['cancelled'] = True
+            stream_log(f"Import cancelled after {idx}/{total_files} files", 'warning', 'import')
+            break
+
+        update_progress({
+            'current_file': Path(filepath).name,
+            'completed_files': idx,
+            'records_imported': results['total_records']
+        })
+
+        result = import_single_file(import_type, filepath, track_progress=False)
+        if result.get('success'):
+            results['imported'] += 1
+            results['total_records'] += (
+                result.get('imported_records', 0) or
+                result.get('claim_records', 0) or
+                result.get('records', 0) or 0
+            )
+        else:
+            results['failed'] += 1
+            results['failed_files'].append({
+                'filename': Path(filepath).name,
+                'error': result.get('error', 'Unknown error')
+            })
+
+    update_progress({
+        'status': 'cancelled' if results.get('cancelled') else 'completed',
+        'completed_files': results['imported'] + results['failed'],
+        'records_imported': results['total_records'],
+        'failed_files': results['failed_files'],
+        'completed_at': datetime.now().isoformat()
+    })
+
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Unified Import Batch Script for REP, STM, and SMT files'
@@ -647,9 +750,13 @@ def main():
     args = parser.parse_args()
 
     stream_log(f"Unified Import Batch started: type={args.type}", 'info', 'import')
+    start_progress(args.type)
 
     if args.file:
         result = import_single_file(args.type, args.file)
+    elif args.files:
+        base = Path(args.directory) if args.directory else Path('.')
+        result = import_files(args.type, [f if Path(f).exists() else str(base / f) for f in args.files])
     elif args.directory:
         result = import_directory(args.type, args.directory)
     else:
@@ -669,4 +776,10 @@ def main():
 
 
 if __name__ == '__main__':
+    # Configure logging (only when run as a script; the job executor imports this module)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
     main()
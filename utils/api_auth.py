@@ -70,7 +70,7 @@ def require_api_key(f):
         # Call the actual endpoint
         response = f(*args, **kwargs)
 
-        # Log API usage (async would be better for production)
+        # Log API usage (queued, written in batches)
         response_time = int((time.time() - start_time) * 1000)
         status_code = response[1] if isinstance(response, tuple) else 200
 
@@ -1,22 +1,289 @@
 """
 API Key Management Utility
 Handles generation, validation, and management of API keys
+
+Validated keys are cached for API_KEY_CACHE_TTL seconds (revoke/delete drop
+them immediately in this process), and usage logs plus last_used_at updates
+are buffered and written in batches by a background thread, so an external
+API call costs no database round trip for authentication.
 """
 
+import atexit
 import secrets
 import hashlib
 import json
+import logging
+import os
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Tuple
-from config.database import get_db_config, DB_TYPE
+from config.database import DB_TYPE
+from config.db_pool import get_connection, return_connection
 
 if DB_TYPE == 'postgresql':
-    import psycopg2
     from psycopg2.extras import RealDictCursor
 else:
-    import pymysql
     import pymysql.cursors
 
+logger = logging.getLogger(__name__)
+
+# Seconds a validated key is served from memory (bounds revocation delay across workers)
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', 30))
+
+# Usage logs are flushed every USAGE_FLUSH_INTERVAL seconds or USAGE_FLUSH_SIZE rows
+USAGE_FLUSH_INTERVAL = float(os.getenv('API_USAGE_FLUSH_INTERVAL', 5))
+USAGE_FLUSH_SIZE = int(os.getenv('API_USAGE_FLUSH_SIZE', 200))
+USAGE_MAX_PENDING = USAGE_FLUSH_SIZE * 50  # Drop rows beyond this if the database is down
+
+
+def _dict_cursor(conn):
+    """Open a cursor returning rows as dicts"""
+    if DB_TYPE == 'postgresql':
+        return conn.cursor(cursor_factory=RealDictCursor)
+    return conn.cursor(pymysql.cursors.DictCursor)
+
+
+def _fetch_api_key(api_key: str) -> Optional[Dict]:
+    """Look up an API key row, or None if the key does not exist"""
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        if conn is None:
+            raise RuntimeError("Database connection unavailable")
+        cursor = _dict_cursor(conn)
+        cursor.execute("""
+            SELECT id, key_name, hospital_code, rate_limit, allowed_ips,
+                   expires_at, is_active, last_used_at
+            FROM api_keys
+            WHERE api_key = %s
+        """, (api_key,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+
+class APIKeyCache:
+    """Thread-safe cache of api_keys rows keyed by the SHA-256 of the key"""
+
+    def __init__(self, ttl: int = API_KEY_CACHE_TTL):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds before a key is re-read from the database (0 disables caching)
+        """
+        self.ttl = ttl
+        self._entries: Dict[bytes, Tuple[float, Dict, Optional[set]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(api_key: str) -> bytes:
+        return hashlib.sha256(api_key.encode('utf-8')).digest()
+
+    def get(self, api_key: str) -> Optional[Tuple[Dict, Optional[set]]]:
+        """
+        Return (key_data, allowed_ips) for a cached key, or None on miss/expiry
+        """
+        digest = self._digest(api_key)
+        with self._lock:
+            entry = self._entries.get(digest)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        return entry[1], entry[2]
+
+    def put(self, api_key: str, key_data: Dict) -> Tuple[Dict, Optional[set]]:
+        """
+        Cache an api_keys row
+
+        Returns:
+            (key_data, allowed_ips) with allowed_ips parsed into a set
+        """
+        allowed_ips = set(json.loads(key_data['allowed_ips'])) if key_data.get('allowed_ips') else None
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[self._digest(api_key)] = (time.monotonic(), key_data, allowed_ips)
+        return key_data, allowed_ips
+
+    def invalidate(self, api_key_id: Optional[int] = None):
+        """
+        Drop cached keys
+
+        Args:
+            api_key_id: ID of the key to drop, or None for all keys
+        """
+        with self._lock:
+            if api_key_id is None:
+                self._entries.clear()
+            else:
+                for digest in [d for d, entry in self._entries.items() if entry[1]['id'] == api_key_id]:
+                    del self._entries[digest]
+
+
+class APIUsageBuffer:
+    """Buffers api_usage_logs rows and last_used_at times, writing them in batches"""
+
+    def __init__(self, flush_interval: float = USAGE_FLUSH_INTERVAL, flush_size: int = USAGE_FLUSH_SIZE):
+        """
+        Initialize buffer
+
+        Args:
+            flush_interval: Seconds between background flushes
+            flush_size: Pending rows that trigger an early flush
+        """
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._rows: List[Tuple] = []
+        self._last_used: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, row: Tuple):
+        """Queue one api_usage_logs row"""
+        with self._lock:
+            if len(self._rows) >= USAGE_MAX_PENDING:
+                logger.warning("API usage buffer full, dropping log row")
+                return
+            self._rows.append(row)
+            pending = len(self._rows)
+        self._ensure_thread()
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def touch(self, api_key_id: int):
+        """Record that a key was used now (written as last_used_at on flush)"""
+        with self._lock:
+            self._last_used[api_key_id] = datetime.now()
+        self._ensure_thread()
+
+    def pending(self) -> int:
+        """Number of usage rows waiting to be written"""
+        with self._lock:
+            return len(self._rows)
+
+    def discard(self, api_key_id: int):
+        """Drop pending rows and last_used_at for a deleted key"""
+        with self._lock:
+            self._rows = [row for row in self._rows if row[0] != api_key_id]
+            self._last_used.pop(api_key_id, None)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='api-usage-flush', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write pending rows and last_used_at times
+
+        Returns:
+            Number of usage rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                last_used, self._last_used = self._last_used, {}
+            if not rows and not last_used:
+                return 0
+
+            try:
+                return _write_usage(rows, last_used)
+            except Exception as e:
+                logger.error(f"Error flushing {len(rows)} API usage logs: {e}")
+                if _is_integrity_error(e):
+                    # Retrying would fail the same way and block every later flush
+                    return 0
+                # Keep them for the next flush (bounded by USAGE_MAX_PENDING)
+                with self._lock:
+                    self._rows = (rows + self._rows)[-USAGE_MAX_PENDING:]
+                    for key_id, used_at in last_used.items():
+                        self._last_used.setdefault(key_id, used_at)
+                return 0
+
+
+def _is_integrity_error(error: Exception) -> bool:
+    """True for psycopg2 / pymysql IntegrityError (e.g. a foreign key violation)"""
+    return any(cls.__name__ == 'IntegrityError' for cls in type(error).__mro__)
+
+
+def _insert_usage_rows(cursor, rows: List[Tuple]):
+    cursor.executemany("""
+        INSERT INTO api_usage_logs
+        (api_key_id, endpoint, method, ip_address, user_agent,
+         status_code, response_time_ms, request_params, error_message)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+
+
+def _write_usage(rows: List[Tuple], last_used: Dict[int, datetime]) -> int:
+    """
+    Insert usage rows and update last_used_at in one transaction
+
+    Rows for keys deleted since they were queued (api_usage_logs.api_key_id
+    foreign key) are dropped and the rest written.
+
+    Returns:
+        Number of usage rows written
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        if conn is None:
+            raise RuntimeError("Database connection unavailable")
+        cursor = conn.cursor()
+        if rows:
+            try:
+                _insert_usage_rows(cursor, rows)
+            except Exception as e:
+                if not _is_integrity_error(e):
+                    raise
+                conn.rollback()
+                key_ids = list({row[0] for row in rows})
+                cursor.execute(
+                    f"SELECT id FROM api_keys WHERE id IN ({', '.join(['%s'] * len(key_ids))})",
+                    key_ids
+                )
+                existing = {record[0] for record in cursor.fetchall()}
+                kept = [row for row in rows if row[0] in existing]
+                logger.warning(f"Dropping {len(rows) - len(kept)} API usage logs for deleted keys")
+                rows = kept
+                if rows:
+                    _insert_usage_rows(cursor, rows)
+        if last_used:
+            cursor.executemany("""
+                UPDATE api_keys
+                SET last_used_at = %s
+                WHERE id = %s
+            """, [(used_at, key_id) for key_id, used_at in last_used.items()])
+        conn.commit()
+        return len(rows)
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+
+api_key_cache = APIKeyCache()
+api_usage_buffer = APIUsageBuffer()
+atexit.register(api_usage_buffer.flush)
+
 
 class APIKeyManager:
     """Manager for API keys"""
@@ -78,37 +345,22 @@ class APIKeyManager:
             allowed_ips_json = json.dumps(allowed_ips) if allowed_ips else None
 
             # Insert into database
-            conn = None
-            cursor = None
-
-            if DB_TYPE == 'postgresql':
-                conn = psycopg2.connect(**get_db_config())
+            conn = get_connection()
+            if conn is None:
+                return False, None, "Database connection unavailable"
+            try:
                 cursor = conn.cursor()
-
                 cursor.execute("""
                     INSERT INTO api_keys
                     (key_name, api_key, hospital_code, description, rate_limit,
                      allowed_ips, expires_at, created_by)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
                 """, (key_name, api_key, hospital_code, description, rate_limit,
                       allowed_ips_json, expires_at, created_by))
-
-            else:  # MySQL
-                conn = pymysql.connect(**get_db_config())
-                cursor = conn.cursor()
-
-                cursor.execute("""
-                    INSERT INTO api_keys
-                    (key_name, api_key, hospital_code, description, rate_limit,
-                     allowed_ips, expires_at, created_by)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (key_name, api_key, hospital_code, description, rate_limit,
-                      allowed_ips_json, expires_at, created_by))
-
-            conn.commit()
-            cursor.close()
-            conn.close()
+                conn.commit()
+                cursor.close()
+            finally:
+                return_connection(conn)
 
             return True, api_key, None
 
@@ -128,67 +380,28 @@ class APIKeyManager:
             (is_valid, key_data, error_message)
         """
         try:
-            conn = None
-            cursor = None
-
-            if DB_TYPE == 'postgresql':
-                conn = psycopg2.connect(**get_db_config())
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-            else:
-                conn = pymysql.connect(**get_db_config())
-                cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-            # Get key details
-            cursor.execute("""
-                SELECT id, key_name, hospital_code, rate_limit, allowed_ips,
-                       expires_at, is_active, last_used_at
-                FROM api_keys
-                WHERE api_key = %s
-            """, (api_key,))
-
-            key_data = cursor.fetchone()
-
-            if not key_data:
-                cursor.close()
-                conn.close()
-                return False, None, "Invalid API key"
+            cached = api_key_cache.get(api_key)
+            if cached is None:
+                key_data = _fetch_api_key(api_key)
+                if not key_data:
+                    return False, None, "Invalid API key"
+                cached = api_key_cache.put(api_key, key_data)
+            key_data, allowed_ips = cached
 
             # Check if active
             if not key_data['is_active']:
-                cursor.close()
-                conn.close()
                 return False, None, "API key is disabled"
 
             # Check expiration
-            if key_data['expires_at']:
-                if DB_TYPE == 'postgresql':
-                    expires_at = key_data['expires_at']
-                else:
-                    expires_at = key_data['expires_at']
-
-                if expires_at < datetime.now():
-                    cursor.close()
-                    conn.close()
-                    return False, None, "API key has expired"
+            if key_data['expires_at'] and key_data['expires_at'] < datetime.now():
+                return False, None, "API key has expired"
 
             # Check IP whitelist
-            if key_data['allowed_ips'] and ip_address:
-                allowed_ips = json.loads(key_data['allowed_ips'])
-                if ip_address not in allowed_ips:
-                    cursor.close()
-                    conn.close()
-                    return False, None, f"IP address {ip_address} not allowed"
-
-            # Update last_used_at
-            cursor.execute("""
-                UPDATE api_keys
-                SET last_used_at = %s
-                WHERE id = %s
-            """, (datetime.now(), key_data['id']))
+            if allowed_ips is not None and ip_address and ip_address not in allowed_ips:
+                return False, None, f"IP address {ip_address} not allowed"
 
-            conn.commit()
-            cursor.close()
-            conn.close()
+            # last_used_at is written by the next usage flush
+            api_usage_buffer.touch(key_data['id'])
 
             return True, dict(key_data), None
 
@@ -198,16 +411,10 @@ class APIKeyManager:
     @staticmethod
     def get_all_keys() -> List[Dict]:
         """Get all API keys"""
+        conn = None
         try:
-            conn = None
-            cursor = None
-
-            if DB_TYPE == 'postgresql':
-                conn = psycopg2.connect(**get_db_config())
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-            else:
-                conn = pymysql.connect(**get_db_config())
-                cursor = conn.cursor(pymysql.cursors.DictCursor)
+            conn = get_connection()
+            cursor = _dict_cursor(conn)
 
             cursor.execute("""
                 SELECT id, key_name, api_key, hospital_code, description,
@@ -219,13 +426,15 @@ class APIKeyManager:
 
             keys = cursor.fetchall()
             cursor.close()
-            conn.close()
 
             return [dict(k) for k in keys] if keys else []
 
         except Exception as e:
             print(f"Error getting API keys: {e}")
             return []
+        finally:
+            if conn:
+                return_connection(conn)
 
     @staticmethod
     def revoke_api_key(api_key_id: int) -> Tuple[bool, Optional[str]]:
@@ -238,16 +447,10 @@ class APIKeyManager:
         Returns:
             (success, error_message)
         """
+        conn = None
         try:
-            conn = None
-            cursor = None
-
-            if DB_TYPE == 'postgresql':
-                conn = psycopg2.connect(**get_db_config())
-                cursor = conn.cursor()
-            else:
-                conn = pymysql.connect(**get_db_config())
-                cursor = conn.cursor()
+            conn = get_connection()
+            cursor = conn.cursor()
 
             cursor.execute("""
                 UPDATE api_keys
@@ -257,12 +460,17 @@ class APIKeyManager:
 
             conn.commit()
             cursor.close()
-            conn.close()
+
+            # Stop accepting the revoked key immediately
+            api_key_cache.invalidate(api_key_id)
 
             return True, None
 
         except Exception as e:
             return False, str(e)
+        finally:
+            if conn:
+                return_connection(conn)
 
     @staticmethod
     def delete_api_key(api_key_id: int) -> Tuple[bool, Optional[str]]:
@@ -275,27 +483,27 @@ class APIKeyManager:
         Returns:
             (success, error_message)
         """
+        conn = None
         try:
-            conn = None
-            cursor = None
-
-            if DB_TYPE == 'postgresql':
-                conn = psycopg2.connect(**get_db_config())
-                cursor = conn.cursor()
-            else:
-                conn = pymysql.connect(**get_db_config())
-                cursor = conn.cursor()
+            conn = get_connection()
+            cursor = conn.cursor()
 
             cursor.execute("DELETE FROM api_keys WHERE id = %s", (api_key_id,))
 
             conn.commit()
             cursor.close()
-            conn.close()
+
+            # Stop accepting the deleted key immediately and drop its queued usage
+            api_key_cache.invalidate(api_key_id)
+            api_usage_buffer.discard(api_key_id)
 
             return True, None
 
         except Exception as e:
             return False, str(e)
+        finally:
+            if conn:
+                return_connection(conn)
 
     @staticmethod
     def log_api_usage(
@@ -309,32 +517,16 @@ class APIKeyManager:
         request_params: Optional[Dict] = None,
         error_message: Optional[str] = None
     ) -> bool:
-        """Log API usage"""
-        try:
-            conn = None
-            cursor = None
+        """
+        Queue an API usage log row (written in batches by api_usage_buffer)
 
+        Returns:
+            True if the row was queued
+        """
+        try:
             request_params_json = json.dumps(request_params) if request_params else None
-
-            if DB_TYPE == 'postgresql':
-                conn = psycopg2.connect(**get_db_config())
-                cursor = conn.cursor()
-            else:
-                conn = pymysql.connect(**get_db_config())
-                cursor = conn.cursor()
-
-            cursor.execute("""
-                INSERT INTO api_usage_logs
-                (api_key_id, endpoint, method, ip_address, user_agent,
-                 status_code, response_time_ms, request_params, error_message)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (api_key_id, endpoint, method, ip_address, user_agent,
-                  status_code, response_time_ms, request_params_json, error_message))
-
-            conn.commit()
-            cursor.close()
-            conn.close()
-
+            api_usage_buffer.add((api_key_id, endpoint, method, ip_address, user_agent,
+                                  status_code, response_time_ms, request_params_json, error_message))
             return True
 
         except Exception as e:
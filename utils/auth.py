@@ -19,6 +19,10 @@ Usage:
         pass
 """
 
+import os
+import threading
+import time
+
 import bcrypt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
@@ -31,6 +35,9 @@ from config.database import get_db_config, DB_TYPE
 from config.db_pool import get_connection, return_connection
 from utils.audit_logger import audit_logger
 
+# Seconds a user loaded for Flask-Login is reused (bounds staleness across workers)
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 30))
+
 
 class User(UserMixin):
     """
@@ -111,6 +118,65 @@ class User(UserMixin):
         }
 
 
+class UserCache:
+    """
+    Per-process cache of users loaded by Flask-Login.
+
+    Avoids a users query on every authenticated request (progress polling,
+    SSE reconnects). AuthManager drops a user's entry whenever it changes
+    the user; changes made by other processes show up after the TTL.
+    """
+
+    def __init__(self, ttl: int = USER_CACHE_TTL):
+        """
+        Initialize cache.
+
+        Args:
+            ttl: Seconds before a user is re-read (0 disables caching)
+        """
+        self.ttl = ttl
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Return a fresh User built from the cached row, or None on miss/expiry."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        return User(**entry[1])
+
+    def put(self, user: User):
+        """Cache a loaded user."""
+        if self.ttl <= 0:
+            return
+        fields = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'full_name': user.full_name,
+            'role': user.role,
+            'hospital_code': user.hospital_code,
+            'is_active': user.is_active,
+            'must_change_password': user.must_change_password
+        }
+        with self._lock:
+            self._entries[user.id] = (time.monotonic(), fields)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """
+        Drop cached users.
+
+        Args:
+            user_id: User to drop, or None for all users
+        """
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(user_id), None)
+
+
 class AuthManager:
     """
     Manages user authentication and authorization.
@@ -126,6 +192,7 @@ class AuthManager:
     def __init__(self):
         """Initialize auth manager."""
         self.db_type = DB_TYPE
+        self.user_cache = UserCache()
 
     def hash_password(self, password: str) -> str:
         """
@@ -155,16 +222,22 @@ class AuthManager:
         except Exception:
             return False
 
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
+    def get_user_by_id(self, user_id: int, use_cache: bool = False) -> Optional[User]:
         """
         Get user by ID (for Flask-Login user_loader).
 
         Args:
             user_id: User ID
+            use_cache: Serve from the per-process user cache (up to USER_CACHE_TTL old)
 
         Returns:
             User object or None
         """
+        if use_cache:
+            user = self.user_cache.get(user_id)
+            if user is not None:
+                return user
+
         conn = None
         cursor = None
 
@@ -183,7 +256,7 @@ class AuthManager:
             row = cursor.fetchone()
 
             if row:
-                return User(
+                user = User(
                     id=row[0],
                     username=row[1],
                     email=row[2],
@@ -193,6 +266,9 @@ class AuthManager:
                     is_active=row[6],
                     must_change_password=row[7]
                 )
+                if use_cache:
+                    self.user_cache.put(user)
+                return user
 
             return None
 
@@ -479,6 +555,7 @@ class AuthManager:
             """
             cursor.execute(query, (password_hash, changed_by, user_id))
             conn.commit()
+            self.user_cache.invalidate(user_id)
 
             # Log password change
             audit_logger.log(
@@ -677,6 +754,7 @@ class AuthManager:
 
             cursor.execute(query, tuple(params))
             conn.commit()
+            self.user_cache.invalidate(user_id)
 
             # Log user update
             audit_logger.log(
@@ -727,6 +805,7 @@ class AuthManager:
             """
             cursor.execute(query, (updated_by, user_id))
             conn.commit()
+            self.user_cache.invalidate(user_id)
 
             # Log status change
             audit_logger.log(
@@ -778,6 +857,7 @@ class AuthManager:
             """
             cursor.execute(query, (deleted_by, user_id))
             conn.commit()
+            self.user_cache.invalidate(user_id)
 
             # Log user deletion
             audit_logger.log(
@@ -839,6 +919,7 @@ class AuthManager:
             """
             cursor.execute(query, (password_hash, require_change, reset_by, user_id))
             conn.commit()
+            self.user_cache.invalidate(user_id)
 
             # Log password reset
             audit_logger.log(
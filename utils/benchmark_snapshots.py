@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmark Snapshots - Precomputed fiscal-year SMT metrics for /api/benchmark/*
+
+The benchmark endpoints used to aggregate smt_budget_transfers over a whole
+fiscal year on every request. The builder aggregates each fiscal year once
+into compact tables (migration 019):
+
+- smt_benchmark_vendor_fy: totals per vendor
+- smt_benchmark_vendor_month: totals per vendor and calendar month
+- smt_benchmark_vendor_fund: totals per vendor and fund
+- smt_benchmark_group_fy: national / per-region / per-level hospital averages
+- smt_benchmark_runs: which fiscal years are built, and when
+
+SMTBudgetFetcher.save_to_database rebuilds the fiscal years touched by each
+fetch; a fiscal year that was never built is built on first read. Hospital
+names, regions and levels are joined from health_offices at read time, so
+only the group rows need a refresh after a master data import.
+
+Usage:
+    from utils.benchmark_snapshots import rebuild_benchmark_snapshots
+
+    rebuild_benchmark_snapshots(conn, fiscal_years={2568, 2569})
+    rebuild_benchmark_snapshots(conn)  # all fiscal years
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.fiscal_year import get_fiscal_year_range_gregorian
+
+logger = logging.getLogger(__name__)
+
+VENDOR_TABLES = ('smt_benchmark_vendor_fy', 'smt_benchmark_vendor_month', 'smt_benchmark_vendor_fund')
+GROUP_TABLE = 'smt_benchmark_group_fy'
+RUNS_TABLE = 'smt_benchmark_runs'
+
+# group_type -> health_offices column (None = all hospitals)
+GROUP_COLUMNS = {
+    'national': None,
+    'region': 'health_region',
+    'level': 'hospital_level',
+}
+NATIONAL_KEY = 'all'
+
+_build_lock = threading.Lock()
+
+
+def fiscal_year_of(value) -> Optional[int]:
+    """Buddhist Era fiscal year (Oct-Sep) of a Gregorian date or 'YYYY-MM-DD' string"""
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+        except ValueError:
+            return None
+    if not isinstance(value, date):
+        return None
+    return value.year + 543 + (1 if value.month >= 10 else 0)
+
+
+def fiscal_years_of_records(records: Iterable[Dict]) -> Set[int]:
+    """Fiscal years touched by SMT API records (runDt)"""
+    years = {fiscal_year_of(record.get('runDt')) for record in records}
+    years.discard(None)
+    return years
+
+
+def data_fiscal_years(cursor) -> List[int]:
+    """Fiscal years spanned by smt_budget_transfers (MIN/MAX on the run_date index)"""
+    cursor.execute("SELECT MIN(run_date), MAX(run_date) FROM smt_budget_transfers")
+    row = cursor.fetchone()
+    if not row or row[0] is None:
+        return []
+    return list(range(fiscal_year_of(row[0]), fiscal_year_of(row[1]) + 1))
+
+
+def built_fiscal_years(cursor) -> List[int]:
+    """Fiscal years with a snapshot, newest first"""
+    cursor.execute(f"SELECT fiscal_year FROM {RUNS_TABLE} ORDER BY fiscal_year DESC")
+    return [int(row[0]) for row in cursor.fetchall()]
+
+
+def _build_vendor_rows(cursor, fiscal_year: int) -> int:
+    """Aggregate one fiscal year of smt_budget_transfers into the vendor tables"""
+    start_date, end_date = get_fiscal_year_range_gregorian(fiscal_year)
+    params = (fiscal_year, start_date, end_date)
+
+    for table in VENDOR_TABLES:
+        cursor.execute(f"DELETE FROM {table} WHERE fiscal_year = %s", (fiscal_year,))
+
+    cursor.execute("""
+        INSERT INTO smt_benchmark_vendor_fy (
+            fiscal_year, vendor_no, vendor_code5, records, total_amount,
+            wait_amount, debt_amount, bond_amount, first_date, last_date
+        )
+        SELECT
+            %s, vendor_no, MAX(vendor_code5), COUNT(*),
+            COALESCE(SUM(total_amount), 0), COALESCE(SUM(wait_amount), 0),
+            COALESCE(SUM(debt_amount), 0), COALESCE(SUM(bond_amount), 0),
+            MIN(run_date), MAX(run_date)
+        FROM smt_budget_transfers
+        WHERE run_date >= %s AND run_date <= %s AND vendor_no IS NOT NULL
+        GROUP BY vendor_no
+    """, params)
+    vendor_count = cursor.rowcount
+
+    cursor.execute("""
+        INSERT INTO smt_benchmark_vendor_month (
+            fiscal_year, vendor_no, vendor_code5, year, month, records,
+            total_amount, wait_amount, debt_amount
+        )
+        SELECT
+            %s, vendor_no, MAX(vendor_code5),
+            EXTRACT(YEAR FROM run_date), EXTRACT(MONTH FROM run_date), COUNT(*),
+            COALESCE(SUM(total_amount), 0), COALESCE(SUM(wait_amount), 0),
+            COALESCE(SUM(debt_amount), 0)
+        FROM smt_budget_transfers
+        WHERE run_date >= %s AND run_date <= %s AND vendor_no IS NOT NULL
+        GROUP BY vendor_no, EXTRACT(YEAR FROM run_date), EXTRACT(MONTH FROM run_date)
+    """, params)
+
+    cursor.execute("""
+        INSERT INTO smt_benchmark_vendor_fund (
+            fiscal_year, vendor_no, vendor_code5, fund_name, fund_group,
+            fund_group_desc, records, total_amount, wait_amount, debt_amount
+        )
+        SELECT
+            %s, vendor_no, MAX(vendor_code5), fund_name, fund_group,
+            fund_group_desc, COUNT(*), COALESCE(SUM(total_amount), 0),
+            COALESCE(SUM(wait_amount), 0), COALESCE(SUM(debt_amount), 0)
+        FROM smt_budget_transfers
+        WHERE run_date >= %s AND run_date <= %s AND vendor_no IS NOT NULL
+        GROUP BY vendor_no, fund_name, fund_group, fund_group_desc
+    """, params)
+
+    return vendor_count
+
+
+def _build_group_rows(cursor, fiscal_year: int):
+    """Average the vendor totals of one fiscal year nationally, per region and per level"""
+    cursor.execute(f"DELETE FROM {GROUP_TABLE} WHERE fiscal_year = %s", (fiscal_year,))
+
+    for group_type, column in GROUP_COLUMNS.items():
+        key_expr = f"h.{column}" if column else "%s"
+        join = "JOIN health_offices h ON h.hcode5 = v.vendor_code5" if column else ""
+        where = f"AND h.{column} IS NOT NULL" if column else ""
+        group_by = f", h.{column}" if column else ""
+        params = (group_type, NATIONAL_KEY, fiscal_year) if not column else (group_type, fiscal_year)
+
+        cursor.execute(f"""
+            INSERT INTO {GROUP_TABLE} (
+                fiscal_year, group_type, group_key, hospital_count, total_amount,
+                avg_total_amount, avg_wait_amount, avg_debt_amount
+            )
+            SELECT
+                v.fiscal_year, %s, {key_expr}, COUNT(*), SUM(v.total_amount),
+                AVG(v.total_amount), AVG(v.wait_amount), AVG(v.debt_amount)
+            FROM smt_benchmark_vendor_fy v
+            {join}
+            WHERE v.fiscal_year = %s {where}
+            GROUP BY v.fiscal_year{group_by}
+        """, params)
+
+
+def _build(conn, fiscal_years: Iterable[int]) -> Dict:
+    """Build the given fiscal years, one transaction each"""
+    start = time.perf_counter()
+    built = []
+    vendors = 0
+
+    with _build_lock:
+        for fiscal_year in sorted(set(fiscal_years)):
+            cursor = conn.cursor()
+            try:
+                vendor_count = _build_vendor_rows(cursor, fiscal_year)
+                _build_group_rows(cursor, fiscal_year)
+                cursor.execute(f"DELETE FROM {RUNS_TABLE} WHERE fiscal_year = %s", (fiscal_year,))
+                cursor.execute(
+                    f"INSERT INTO {RUNS_TABLE} (fiscal_year, vendor_count) VALUES (%s, %s)",
+                    (fiscal_year, vendor_count)
+                )
+                conn.commit()
+                built.append(fiscal_year)
+                vendors += vendor_count
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Benchmark snapshot for FY {fiscal_year} failed: {e}")
+            finally:
+                cursor.close()
+
+    duration_ms = (time.perf_counter() - start) * 1000
+    if built:
+        logger.info(f"Built benchmark snapshots for FY {built} ({vendors} vendor rows, {duration_ms:.0f}ms)")
+    return {'success': True, 'fiscal_years': built, 'vendor_rows': vendors, 'duration_ms': round(duration_ms, 1)}
+
+
+def rebuild_benchmark_snapshots(conn, fiscal_years: Optional[Iterable[int]] = None) -> Dict:
+    """
+    Rebuild snapshots from smt_budget_transfers
+
+    Args:
+        conn: Database connection (committed per fiscal year)
+        fiscal_years: Fiscal years to rebuild (e.g. those touched by a fetch);
+            None rebuilds every fiscal year and drops snapshots without data
+
+    Returns:
+        dict with success, fiscal_years built, vendor_rows and duration_ms
+    """
+    if fiscal_years is None:
+        cursor = conn.cursor()
+        try:
+            fiscal_years = data_fiscal_years(cursor)
+            stale = set(built_fiscal_years(cursor)) - set(fiscal_years)
+            for fiscal_year in stale:
+                for table in VENDOR_TABLES + (GROUP_TABLE, RUNS_TABLE):
+                    cursor.execute(f"DELETE FROM {table} WHERE fiscal_year = %s", (fiscal_year,))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    return _build(conn, fiscal_years)
+
+
+def ensure_benchmark_snapshots(conn, fiscal_years: Optional[Iterable[int]] = None) -> List[int]:
+    """
+    Build fiscal years that have no snapshot yet
+
+    Args:
+        conn: Database connection
+        fiscal_years: Fiscal years a request needs; None means all with data
+
+    Returns:
+        Fiscal years that were built
+    """
+    cursor = conn.cursor()
+    try:
+        wanted = data_fiscal_years(cursor) if fiscal_years is None else fiscal_years
+        missing = set(wanted) - set(built_fiscal_years(cursor))
+    finally:
+        cursor.close()
+
+    if not missing:
+        return []
+    return _build(conn, missing)['fiscal_years']
+
+
+def refresh_group_snapshots(conn) -> List[int]:
+    """Recompute region/level averages of built fiscal years (after a health_offices import)"""
+    cursor = conn.cursor()
+    try:
+        fiscal_years = built_fiscal_years(cursor)
+        with _build_lock:
+            for fiscal_year in fiscal_years:
+                _build_group_rows(cursor, fiscal_year)
+        conn.commit()
+        return fiscal_years
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def clear_benchmark_snapshots(cursor):
+    """Delete all snapshots (caller commits, e.g. together with clearing SMT data)"""
+    for table in VENDOR_TABLES + (GROUP_TABLE, RUNS_TABLE):
+        cursor.execute(f"DELETE FROM {table}")
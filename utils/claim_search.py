@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Claim Search - Indexed TRAN_ID / HN / AN / PID lookup for REP and STM claims
+
+Searches route on the shape of the query and try the cheapest path first:
+
+1. Exact match on the identifier columns the query can be (a 13-digit
+   number is a PID; 9-12 digits a TRAN_ID, HN or AN; shorter numbers an HN
+   or AN; anything else any of them)
+2. If nothing matched exactly, a partial match:
+   - PostgreSQL: substring ILIKE, served by pg_trgm GIN indexes (migration 017)
+     (PostgreSQL compares the raw columns with both the query as typed and
+     its normalised form, since identifiers may be stored with dashes)
+   - MySQL: prefix match on claim_search_tokens, a side table of normalised
+     identifiers maintained by triggers (migration 017)
+
+SMT budget transfers have no claim identifiers; they are matched on
+ref_doc_no / fund_group_desc the same way (exact on the btree indexes, then
+trigram ILIKE on PostgreSQL or an indexed prefix LIKE on MySQL).
+
+Partial matching needs at least MIN_PARTIAL_LENGTH characters; shorter
+queries only match exactly.
+
+Usage:
+    from utils.claim_search import search_claims
+
+    rows, strategy = search_claims(cursor, 'rep', '1234567890123')
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from config.database import DB_TYPE
+
+SEARCH_LIMIT = 50
+MIN_PARTIAL_LENGTH = 3
+
+IDENTIFIER_FIELDS = ('tran_id', 'hn', 'an', 'pid')
+
+# source -> (table, selected columns)
+SOURCES = {
+    'rep': ('claim_rep_opip_nhso_item', 'tran_id, rep_no, hn, name, dateadm, reimb_nhso'),
+    'stm': ('stm_claim_item', 'tran_id, rep_no, hn, patient_name, date_admit, paid_after_deduction'),
+    'smt': ('smt_budget_transfers', 'posting_date, ref_doc_no, fund_group_desc, total_amount, payment_status'),
+}
+
+# SMT columns searched instead of the claim identifiers
+DOCUMENT_FIELDS = ('ref_doc_no', 'fund_group_desc')
+
+PID_RE = re.compile(r'^\d{13}$')
+TRAN_ID_RE = re.compile(r'^\d{9,12}$')
+NUMERIC_RE = re.compile(r'^\d+$')
+
+
+def normalize_identifier(value: Optional[str]) -> str:
+    """Normalise an identifier the same way the claim_search_tokens triggers do"""
+    if value is None:
+        return ''
+    return str(value).strip().replace('-', '').replace(' ', '').upper()
+
+
+def classify_query(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Detect what kind of identifier a query is
+
+    Returns:
+        (shape, fields) - shape is 'pid', 'tran_id', 'hn' or 'text'; fields
+        are the identifier columns worth an exact match, most likely first
+    """
+    token = normalize_identifier(query)
+    if PID_RE.match(token):
+        return 'pid', ('pid',)
+    if TRAN_ID_RE.match(token):
+        return 'tran_id', ('tran_id', 'hn', 'an')
+    if NUMERIC_RE.match(token):
+        return 'hn', ('hn', 'an')
+    return 'text', IDENTIFIER_FIELDS
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_claims(cursor, source: str, query: str, limit: int = SEARCH_LIMIT,
+                  db_type: str = DB_TYPE) -> Tuple[List[tuple], str]:
+    """
+    Find claims of one source by TRAN_ID, HN, AN or PID
+
+    Args:
+        cursor: Database cursor
+        source: 'rep', 'stm' or 'smt' (by ref_doc_no / fund_group_desc)
+        query: Search text
+        limit: Maximum rows
+        db_type: 'postgresql' or 'mysql'
+
+    Returns:
+        (rows, strategy) - rows have the columns in SOURCES[source];
+        strategy is 'exact', 'trigram', 'prefix' or 'none'
+    """
+    if source == 'smt':
+        return _search_documents(cursor, query, limit, db_type)
+
+    table, columns = SOURCES[source]
+    token = normalize_identifier(query)
+    if not token:
+        return [], 'none'
+
+    _, fields = classify_query(token)
+
+    # 1. Exact match (btree indexes / token primary key)
+    if db_type == 'mysql':
+        cursor.execute(f"""
+            SELECT {columns} FROM {table}
+            WHERE id IN (
+                SELECT claim_id FROM claim_search_tokens
+                WHERE token = %s AND source = %s AND field IN ({', '.join(['%s'] * len(fields))})
+            )
+            LIMIT %s
+        """, (token, source, *fields, limit))
+    else:
+        # Columns hold identifiers as imported, so match the query as typed
+        # and in normalised form ('66-00123' and '6600123')
+        terms = list(dict.fromkeys([query.strip(), token]))
+        placeholders = ', '.join(['%s'] * len(terms))
+        cursor.execute(f"""
+            SELECT {columns} FROM {table}
+            WHERE {' OR '.join(f'{field} IN ({placeholders})' for field in fields)}
+            LIMIT %s
+        """, (*terms * len(fields), limit))
+    rows = cursor.fetchall()
+    if rows or len(token) < MIN_PARTIAL_LENGTH:
+        return rows, 'exact'
+
+    # 2. Partial match
+    if db_type == 'mysql':
+        cursor.execute(f"""
+            SELECT {columns} FROM {table}
+            WHERE id IN (
+                SELECT claim_id FROM claim_search_tokens
+                WHERE token LIKE %s AND source = %s
+            )
+            LIMIT %s
+        """, (f'{escape_like(token)}%', source, limit))
+        return cursor.fetchall(), 'prefix'
+
+    patterns = [f'%{escape_like(term)}%' for term in terms]
+    cursor.execute(f"""
+        SELECT {columns} FROM {table}
+        WHERE {' OR '.join(f'{field} ILIKE %s' for field in IDENTIFIER_FIELDS for _ in patterns)}
+        LIMIT %s
+    """, (*patterns * len(IDENTIFIER_FIELDS), limit))
+    return cursor.fetchall(), 'trigram'
+
+
+def _search_documents(cursor, query: str, limit: int, db_type: str) -> Tuple[List[tuple], str]:
+    """SMT transfers by reference document or fund group (see search_claims)"""
+    table, columns = SOURCES['smt']
+    term = (query or '').strip()
+    if not term:
+        return [], 'none'
+
+    # 1. Exact match (idx_smt_budget_unique leads with ref_doc_no, idx_smt_budget_fund_group)
+    cursor.execute(f"""
+        SELECT {columns} FROM {table}
+        WHERE {' OR '.join(f'{field} = %s' for field in DOCUMENT_FIELDS)}
+        LIMIT %s
+    """, (*[term] * len(DOCUMENT_FIELDS), limit))
+    rows = cursor.fetchall()
+    if rows or len(term) < MIN_PARTIAL_LENGTH:
+        return rows, 'exact'
+
+    # 2. Partial match: prefix on the same btree indexes (MySQL), trigram (PostgreSQL)
+    if db_type == 'mysql':
+        pattern, operator, strategy = f'{escape_like(term)}%', 'LIKE', 'prefix'
+    else:
+        pattern, operator, strategy = f'%{escape_like(term)}%', 'ILIKE', 'trigram'
+    cursor.execute(f"""
+        SELECT {columns} FROM {table}
+        WHERE {' OR '.join(f'{field} {operator} %s' for field in DOCUMENT_FIELDS)}
+        LIMIT %s
+    """, (*[pattern] * len(DOCUMENT_FIELDS), limit))
+    return cursor.fetchall(), strategy
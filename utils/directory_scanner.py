@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Incremental Directory Scanner
+
+Takes cheap snapshots (filename -> size/mtime) of download directories and
+diffs them against a cached manifest, so history reconciliation only hashes
+and writes files that are new or changed since the last scan.
+
+Usage:
+    from utils.directory_scanner import DirectoryScanner
+
+    scanner = DirectoryScanner('downloads/rep')
+    changes = scanner.scan()
+    hashes = scanner.hash_files(changes['added'] + changes['changed'])
+    ...
+    scanner.commit(changes['snapshot'], hashes)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PREFIX = '.scan_manifest_'
+DEFAULT_HASH_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+
+def file_sha256(filepath: str) -> str:
+    """Calculate SHA256 hash of file"""
+    sha256_hash = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for byte_block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+
+def snapshot_directory(directory: str, suffix: str = '.xls') -> Dict[str, Dict]:
+    """
+    List files in a directory with size and mtime (single scandir pass)
+
+    Args:
+        directory: Directory to list
+        suffix: Only include files ending with this suffix
+
+    Returns:
+        Dict mapping filename -> {'size': int, 'mtime_ns': int}
+    """
+    snapshot = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(suffix) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                snapshot[entry.name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+
+class DirectoryScanner:
+    """
+    Snapshot/manifest diff for one download directory
+
+    The manifest is kept in memory and persisted beside the directory
+    (downloads/rep -> downloads/.scan_manifest_rep.json), so repeated scans
+    (including after a restart) only see files whose size or mtime changed.
+    """
+
+    # In-process manifests shared by all scanners of the same directory
+    _manifests: Dict[str, Dict[str, Dict]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, directory: str, suffix: str = '.xls',
+                 max_workers: int = None):
+        """
+        Initialize scanner
+
+        Args:
+            directory: Directory to scan
+            suffix: File suffix to include
+            max_workers: Thread pool size for hashing
+        """
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.max_workers = max_workers or DEFAULT_HASH_WORKERS
+        self.manifest_path = self.directory.parent / f'{MANIFEST_PREFIX}{self.directory.name}.json'
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        """Return the cached manifest (memory first, then disk)"""
+        key = str(self.directory.resolve())
+        with self._lock:
+            manifest = self._manifests.get(key)
+        if manifest is not None:
+            return manifest
+
+        manifest = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f).get('files', {})
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable scan manifest {self.manifest_path}: {e}")
+                manifest = {}
+
+        with self._lock:
+            self._manifests[key] = manifest
+        return manifest
+
+    def scan(self) -> Dict:
+        """
+        Snapshot the directory and diff it against the manifest
+
+        Returns:
+            Dict with:
+                snapshot: current filename -> {'size', 'mtime_ns'}
+                added: filenames not in the manifest
+                changed: filenames whose size or mtime differ
+                removed: filenames in the manifest but gone from disk
+                unchanged: filenames identical to the manifest
+        """
+        snapshot = snapshot_directory(str(self.directory), self.suffix)
+        manifest = self.load_manifest()
+
+        added, changed, unchanged = [], [], []
+        for filename, entry in snapshot.items():
+            previous = manifest.get(filename)
+            if previous is None:
+                added.append(filename)
+            elif previous.get('size') != entry['size'] or previous.get('mtime_ns') != entry['mtime_ns']:
+                changed.append(filename)
+            else:
+                unchanged.append(filename)
+
+        removed = [filename for filename in manifest if filename not in snapshot]
+
+        return {
+            'snapshot': snapshot,
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'unchanged': unchanged,
+        }
+
+    def hash_files(self, filenames: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Hash files in a thread pool
+
+        Args:
+            filenames: Filenames relative to the scanned directory
+
+        Returns:
+            Dict mapping filename -> sha256 (None if the file could not be read)
+        """
+        if not filenames:
+            return {}
+
+        def _hash(filename):
+            try:
+                return filename, file_sha256(str(self.directory / filename))
+            except OSError as e:
+                logger.warning(f"Could not hash {filename}: {e}")
+                return filename, None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(executor.map(_hash, filenames))
+
+    def commit(self, snapshot: Dict[str, Dict], hashes: Dict[str, Optional[str]] = None):
+        """
+        Store the snapshot as the new manifest
+
+        Call only after the database changes were committed, so a failed
+        apply is retried on the next scan.
+
+        Args:
+            snapshot: Snapshot returned by scan()
+            hashes: Hashes computed for new/changed files
+        """
+        previous = self.load_manifest()
+        hashes = hashes or {}
+
+        manifest = {}
+        for filename, entry in snapshot.items():
+            file_hash = hashes.get(filename)
+            if file_hash is None:
+                file_hash = previous.get(filename, {}).get('sha256')
+            manifest[filename] = {**entry, 'sha256': file_hash}
+
+        with self._lock:
+            self._manifests[str(self.directory.resolve())] = manifest
+
+        # Atomic replace so a crash never leaves a half-written manifest
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'files': manifest}, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(f"Could not write scan manifest {self.manifest_path}: {e}")
+
+    def invalidate(self):
+        """Drop the cached manifest (next scan treats every file as new)"""
+        with self._lock:
+            self._manifests.pop(str(self.directory.resolve()), None)
+        try:
+            self.manifest_path.unlink()
+        except FileNotFoundError:
+            pass
@@ -15,6 +15,9 @@ Usage:
     if history.is_downloaded('stm', 'STM_10670_IPUCS256810_01.xls'):
         print("Already downloaded")
 
+    # Check a whole listing at once (batched query, cached for this instance)
+    pending = history.filter_not_downloaded('rep', filenames)
+
     # Record new download
     history.record_download('stm', {
         'filename': 'STM_10670_IPUCS256810_01.xls',
@@ -35,6 +38,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from utils.history_stats_cache import history_stats_cache
+
 logger = logging.getLogger(__name__)
 
 # Database driver imports
@@ -63,6 +68,12 @@ class DownloadHistoryDB:
     - SMT files (smt_download_history.json)
     """
 
+    # Max filenames / rows per batched query
+    BATCH_SIZE = 500
+
+    # Statuses that count as downloaded by default (failed can be retried)
+    DOWNLOADED_STATUSES = ('success', 'downloading')
+
     def __init__(self, db_config: Dict = None, db_type: str = None):
         """
         Initialize download history manager
@@ -81,6 +92,9 @@ class DownloadHistoryDB:
         self.conn = None
         self.cursor = None
         self._connected = False
+        # (download_type, filename) -> (download_status, file_exists, file on disk),
+        # None if there is no record; kept for this run
+        self._downloaded_cache: Dict[Tuple[str, str], Optional[Tuple[str, bool, bool]]] = {}
 
     def connect(self):
         """Establish database connection"""
@@ -138,6 +152,10 @@ class DownloadHistoryDB:
         Returns:
             True if downloaded successfully (and file exists if check_file_exists=True)
         """
+        if check_file_exists and not include_failed:
+            # Common case goes through the batched lookup and its cache
+            return not self.filter_not_downloaded(download_type, [filename])
+
         self.connect()
 
         # Only check successful downloads by default (failed can be retried)
@@ -211,6 +229,95 @@ class DownloadHistoryDB:
         self._update_file_exists(record['id'], False)
         return False, filename
 
+    def filter_not_downloaded(self, download_type: str, filenames: List[str],
+                              statuses: Tuple[str, ...] = DOWNLOADED_STATUSES,
+                              require_file_exists: bool = False) -> List[str]:
+        """
+        Return the filenames that still need downloading
+
+        Looks up all filenames in batched ANY/IN queries instead of one
+        is_downloaded() call per file. Records whose file is missing on disk
+        are marked file_exists = FALSE in one UPDATE. Records are cached on
+        this instance, so later is_downloaded() / filter_not_downloaded()
+        calls for the same files do not hit the database.
+
+        Args:
+            download_type: Type of download ('rep', 'stm', 'smt')
+            filenames: Filenames to check
+            statuses: Download statuses that count as downloaded
+            require_file_exists: Also require the record's file_exists flag
+
+        Returns:
+            Filenames not yet downloaded (or missing on disk), in input order
+        """
+        unknown = [
+            f for f in dict.fromkeys(filenames)
+            if (download_type, f) not in self._downloaded_cache
+        ]
+
+        if unknown:
+            self.connect()
+            missing_ids = []
+
+            for start in range(0, len(unknown), self.BATCH_SIZE):
+                chunk = unknown[start:start + self.BATCH_SIZE]
+
+                if self.db_type == 'postgresql':
+                    filename_condition = "filename = ANY(%s)"
+                    params = (download_type, chunk)
+                else:
+                    filename_condition = f"filename IN ({', '.join(['%s'] * len(chunk))})"
+                    params = (download_type, *chunk)
+
+                query = f"""
+                    SELECT id, filename, file_path, file_exists, download_status
+                    FROM download_history
+                    WHERE download_type = %s AND {filename_condition}
+                """
+
+                self.cursor.execute(query, params)
+                found = {}
+                for record in self.cursor.fetchall():
+                    file_path = record.get('file_path')
+                    on_disk = bool(file_path and Path(file_path).exists())
+                    if record['file_exists'] and not on_disk:
+                        missing_ids.append(record['id'])
+                    found[record['filename']] = (
+                        record['download_status'], bool(record['file_exists']) and on_disk, on_disk
+                    )
+
+                for filename in chunk:
+                    self._downloaded_cache[(download_type, filename)] = found.get(filename)
+
+            if missing_ids:
+                self._set_file_exists_bulk(missing_ids, False)
+
+        return [
+            f for f in filenames
+            if not self._counts_as_downloaded(self._downloaded_cache.get((download_type, f)),
+                                              statuses, require_file_exists)
+        ]
+
+    @staticmethod
+    def _counts_as_downloaded(state: Optional[Tuple[str, bool, bool]], statuses: Tuple[str, ...],
+                              require_file_exists: bool) -> bool:
+        """Apply the downloaded rule to a cached (status, file_exists, on disk) record"""
+        if state is None:
+            return False
+        status, file_exists, on_disk = state
+        return status in statuses and on_disk and (file_exists or not require_file_exists)
+
+    def clear_cache(self):
+        """Forget cached download lookups (e.g. after files were removed)"""
+        self._downloaded_cache.clear()
+
+    def _remember(self, download_type: str, row: tuple):
+        """Keep the lookup cache in sync with a write (row from _download_values)"""
+        filename, file_path, file_exists, status = row[1], row[9], row[13], row[14]
+        if filename:
+            on_disk = bool(file_path and Path(file_path).exists())
+            self._downloaded_cache[(download_type, filename)] = (status, bool(file_exists), on_disk)
+
     def _update_file_exists(self, record_id: int, exists: bool):
         """Update file_exists status for a record"""
         query = """
@@ -221,6 +328,26 @@ class DownloadHistoryDB:
         self.cursor.execute(query, (exists, record_id))
         self.conn.commit()
 
+    def _set_file_exists_bulk(self, record_ids: List[int], exists: bool):
+        """Update file_exists for many records in one transaction"""
+        for start in range(0, len(record_ids), self.BATCH_SIZE):
+            chunk = record_ids[start:start + self.BATCH_SIZE]
+
+            if self.db_type == 'postgresql':
+                id_condition = "id = ANY(%s)"
+                params = (chunk,)
+            else:
+                id_condition = f"id IN ({', '.join(['%s'] * len(chunk))})"
+                params = tuple(chunk)
+
+            self.cursor.execute(f"""
+                UPDATE download_history
+                SET file_exists = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE {id_condition}
+            """, (exists, *params))
+
+        self.conn.commit()
+
     # ==========================================================================
     # Record Methods
     # ==========================================================================
@@ -253,6 +380,71 @@ class DownloadHistoryDB:
         """
         self.connect()
 
+        query = self._build_upsert_query(1, returning=self.db_type == 'postgresql')
+        values = self._download_values(download_type, data, status)
+
+        self.cursor.execute(query, values)
+
+        if self.db_type == 'postgresql':
+            record_id = self.cursor.fetchone()['id']
+        else:
+            record_id = self.cursor.lastrowid
+            if record_id == 0:
+                self.cursor.execute(
+                    "SELECT id FROM download_history WHERE download_type = %s AND filename = %s",
+                    (download_type, data.get('filename'))
+                )
+                record_id = self.cursor.fetchone()['id']
+
+        self.conn.commit()
+        self._remember(download_type, values)
+        history_stats_cache.invalidate(download_type)
+        logger.debug(f"Recorded download ({status}): {download_type}/{data.get('filename')} (id={record_id})")
+        return record_id
+
+    def record_downloads(self, download_type: str, records: List[Dict],
+                         status: str = 'success') -> int:
+        """
+        Record many downloads with multi-row upserts in one transaction
+
+        Args:
+            download_type: Type of download ('rep', 'stm', 'smt')
+            records: List of download data dicts (same keys as record_download)
+            status: Download status applied to all records
+
+        Returns:
+            Number of records written
+        """
+        if not records:
+            return 0
+
+        # One row per filename (last one wins): a multi-row upsert may not
+        # hit the same key twice
+        records = list({data.get('filename'): data for data in records}.values())
+
+        self.connect()
+
+        try:
+            for start in range(0, len(records), self.BATCH_SIZE):
+                chunk = records[start:start + self.BATCH_SIZE]
+                rows = [self._download_values(download_type, data, status) for data in chunk]
+                query = self._build_upsert_query(len(rows))
+                self.cursor.execute(query, [value for row in rows for value in row])
+                for row in rows:
+                    self._remember(download_type, row)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            self.clear_cache()
+            raise
+        finally:
+            history_stats_cache.invalidate(download_type)
+
+        logger.debug(f"Recorded {len(records)} downloads ({status}): {download_type}")
+        return len(records)
+
+    def _download_values(self, download_type: str, data: Dict, status: str) -> tuple:
+        """Build the parameter tuple for one download_history upsert row"""
         # Calculate file hash if file exists and hash not provided
         file_path = data.get('file_path')
         file_hash = data.get('file_hash')
@@ -264,16 +456,49 @@ class DownloadHistoryDB:
             download_params = json.dumps(download_params)
 
         # Determine file_exists based on status
-        file_exists = status == 'success' and file_path and Path(file_path).exists()
+        file_exists = bool(status == 'success' and file_path and Path(file_path).exists())
+
+        return (
+            download_type,
+            data.get('filename'),
+            data.get('document_no'),
+            data.get('scheme'),
+            data.get('fiscal_year'),
+            data.get('service_month'),
+            data.get('patient_type'),
+            data.get('rep_no'),
+            data.get('file_size'),
+            file_path,
+            file_hash,
+            data.get('source_url'),
+            download_params,
+            file_exists,
+            status,
+            data.get('error_message'),
+        )
+
+    def _build_upsert_query(self, row_count: int, returning: bool = False) -> str:
+        """
+        Build a download_history upsert for row_count value rows
+
+        Args:
+            row_count: Number of VALUES rows
+            returning: Append RETURNING id (PostgreSQL only)
+
+        Returns:
+            SQL string with 16 placeholders per row
+        """
+        row = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)"
+        values = ",\n                ".join([row] * row_count)
 
         if self.db_type == 'postgresql':
-            query = """
+            return f"""
                 INSERT INTO download_history
                 (download_type, filename, document_no, scheme, fiscal_year,
                  service_month, patient_type, rep_no, file_size, file_path,
                  file_hash, source_url, download_params, file_exists,
                  download_status, error_message, last_attempt_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                VALUES {values}
                 ON CONFLICT (download_type, filename) DO UPDATE SET
                     file_size = COALESCE(EXCLUDED.file_size, download_history.file_size),
                     file_path = COALESCE(EXCLUDED.file_path, download_history.file_path),
@@ -292,71 +517,35 @@ class DownloadHistoryDB:
                         ELSE download_history.downloaded_at
                     END,
                     updated_at = CURRENT_TIMESTAMP
-                RETURNING id
-            """
-        else:
-            query = """
-                INSERT INTO download_history
-                (download_type, filename, document_no, scheme, fiscal_year,
-                 service_month, patient_type, rep_no, file_size, file_path,
-                 file_hash, source_url, download_params, file_exists,
-                 download_status, error_message, last_attempt_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                ON DUPLICATE KEY UPDATE
-                    file_size = COALESCE(VALUES(file_size), file_size),
-                    file_path = COALESCE(VALUES(file_path), file_path),
-                    file_hash = COALESCE(VALUES(file_hash), file_hash),
-                    file_exists = VALUES(file_exists),
-                    download_status = VALUES(download_status),
-                    error_message = VALUES(error_message),
-                    retry_count = CASE
-                        WHEN VALUES(download_status) = 'failed' THEN retry_count + 1
-                        WHEN VALUES(download_status) = 'success' THEN 0
-                        ELSE retry_count
-                    END,
-                    last_attempt_at = CURRENT_TIMESTAMP,
-                    downloaded_at = CASE
-                        WHEN VALUES(download_status) = 'success' THEN CURRENT_TIMESTAMP
-                        ELSE downloaded_at
-                    END,
-                    updated_at = CURRENT_TIMESTAMP
+                {'RETURNING id' if returning else ''}
             """
 
-        values = (
-            download_type,
-            data.get('filename'),
-            data.get('document_no'),
-            data.get('scheme'),
-            data.get('fiscal_year'),
-            data.get('service_month'),
-            data.get('patient_type'),
-            data.get('rep_no'),
-            data.get('file_size'),
-            file_path,
-            file_hash,
-            data.get('source_url'),
-            download_params,
-            file_exists,
-            status,
-            data.get('error_message'),
-        )
-
-        self.cursor.execute(query, values)
-
-        if self.db_type == 'postgresql':
-            record_id = self.cursor.fetchone()['id']
-        else:
-            record_id = self.cursor.lastrowid
-            if record_id == 0:
-                self.cursor.execute(
-                    "SELECT id FROM download_history WHERE download_type = %s AND filename = %s",
-                    (download_type, data.get('filename'))
-                )
-                record_id = self.cursor.fetchone()['id']
-
-        self.conn.commit()
-        logger.debug(f"Recorded download ({status}): {download_type}/{data.get('filename')} (id={record_id})")
-        return record_id
+        return f"""
+            INSERT INTO download_history
+            (download_type, filename, document_no, scheme, fiscal_year,
+             service_month, patient_type, rep_no, file_size, file_path,
+             file_hash, source_url, download_params, file_exists,
+             download_status, error_message, last_attempt_at)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE
+                file_size = COALESCE(VALUES(file_size), file_size),
+                file_path = COALESCE(VALUES(file_path), file_path),
+                file_hash = COALESCE(VALUES(file_hash), file_hash),
+                file_exists = VALUES(file_exists),
+                download_status = VALUES(download_status),
+                error_message = VALUES(error_message),
+                retry_count = CASE
+                    WHEN VALUES(download_status) = 'failed' THEN retry_count + 1
+                    WHEN VALUES(download_status) = 'success' THEN 0
+                    ELSE retry_count
+                END,
+                last_attempt_at = CURRENT_TIMESTAMP,
+                downloaded_at = CASE
+                    WHEN VALUES(download_status) = 'success' THEN CURRENT_TIMESTAMP
+                    ELSE downloaded_at
+                END,
+                updated_at = CURRENT_TIMESTAMP
+        """
 
     def record_failed_download(self, download_type: str, data: Dict,
                                error_message: str) -> int:
@@ -399,6 +588,7 @@ class DownloadHistoryDB:
 
         self.cursor.execute(query, (import_file_id, import_table, download_type, filename))
         self.conn.commit()
+        history_stats_cache.invalidate(download_type)
         logger.debug(f"Marked as imported: {download_type}/{filename}")
 
     def delete_record(self, download_type: str, filename: str):
@@ -412,6 +602,8 @@ class DownloadHistoryDB:
 
         self.cursor.execute(query, (download_type, filename))
         self.conn.commit()
+        self._downloaded_cache.pop((download_type, filename), None)
+        history_stats_cache.invalidate(download_type)
         logger.debug(f"Deleted record: {download_type}/{filename}")
 
     # ==========================================================================
@@ -666,6 +858,7 @@ class DownloadHistoryDB:
         self.cursor.execute(query, params)
         count = self.cursor.rowcount
         self.conn.commit()
+        history_stats_cache.invalidate(download_type)
 
         logger.info(f"Deleted {count} failed download records")
         return count
@@ -694,25 +887,37 @@ class DownloadHistoryDB:
 
         self.cursor.execute(query, params)
         records = self.cursor.fetchall()
+        self.clear_cache()
 
-        updated = 0
-        missing = 0
+        # List each directory once instead of stat-ing every file
+        listings = {}
+        now_present = []
+        now_missing = []
 
         for record in records:
             file_path = record.get('file_path')
-            current_exists = record.get('file_exists')
-            actual_exists = file_path and Path(file_path).exists()
-
-            if current_exists != actual_exists:
-                self._update_file_exists(record['id'], actual_exists)
-                updated += 1
-                if not actual_exists:
-                    missing += 1
+            actual_exists = False
+            if file_path:
+                directory, name = os.path.split(file_path)
+                if directory not in listings:
+                    try:
+                        listings[directory] = set(os.listdir(directory or '.'))
+                    except OSError:
+                        listings[directory] = set()
+                actual_exists = name in listings[directory]
+
+            if bool(record.get('file_exists')) != actual_exists:
+                (now_present if actual_exists else now_missing).append(record['id'])
+
+        if now_present:
+            self._set_file_exists_bulk(now_present, True)
+        if now_missing:
+            self._set_file_exists_bulk(now_missing, False)
 
         return {
             'checked': len(records),
-            'updated': updated,
-            'missing': missing
+            'updated': len(now_present) + len(now_missing),
+            'missing': len(now_missing)
         }
 
     def cleanup_orphaned_records(self, download_type: str = None) -> int:
@@ -738,6 +943,7 @@ class DownloadHistoryDB:
         self.cursor.execute(query, params)
         deleted = self.cursor.rowcount
         self.conn.commit()
+        history_stats_cache.invalidate(download_type)
 
         logger.info(f"Cleaned up {deleted} orphaned records")
         return deleted
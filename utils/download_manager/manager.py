@@ -11,6 +11,7 @@ from datetime import datetime
 
 from .session import SessionManager, DownloadSession
 from .models import ProgressInfo, SessionStatus, SessionSummary
+from utils.progress_stream import progress_hub
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +61,7 @@ class DownloadManager:
         try:
             session_id = self.session_manager.create_session(source_type, params)
             logger.info(f"Created session {session_id} for {source_type}")
+            self._publish_progress(self.get_session(session_id))
             return session_id
 
         except ValueError as e:
@@ -114,7 +116,9 @@ class DownloadManager:
             ...     processed=394
             ... )
         """
+        session = self.get_session(session_id)
         self.session_manager.update_session_progress(session_id, **kwargs)
+        self._publish_progress(session)
 
     def cancel_session(self, session_id: str):
         """
@@ -124,7 +128,9 @@ class DownloadManager:
             session_id: Session UUID
         """
         logger.info(f"Cancelling session {session_id}")
+        session = self.get_session(session_id)
         self.session_manager.cancel_session(session_id)
+        self._publish_progress(session)
 
     def complete_session(self, session_id: str, error: Optional[str] = None):
         """
@@ -139,7 +145,14 @@ class DownloadManager:
         else:
             logger.info(f"Session {session_id} completed")
 
+        session = self.get_session(session_id)
         self.session_manager.complete_session(session_id, error)
+        self._publish_progress(session)
+
+    def _publish_progress(self, session: Optional[DownloadSession]):
+        """Push the session's progress to watchers of its source channel"""
+        if session:
+            progress_hub.publish(f"download:{session.source_type}", session.get_progress().to_legacy_dict())
 
     def get_active_sessions(self) -> List[ProgressInfo]:
         """
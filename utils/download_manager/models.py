@@ -138,6 +138,26 @@ class ProgressInfo:
             }
         }
 
+    def to_legacy_dict(self) -> Dict[str, Any]:
+        """Convert to the flat format used by the download progress UI"""
+        return {
+            'running': self.status in (SessionStatus.DISCOVERING, SessionStatus.DOWNLOADING),
+            'status': self.status.value,
+            'total': self.total_discovered,
+            'completed': self.downloaded,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'processed': self.processed,
+            # Legacy compatibility
+            'current_files': {},
+            'workers': [],
+            'session_id': self.session_id,
+            'source_type': self.source_type,
+            'discovery_completed': self.discovery_completed,
+            'already_downloaded': self.already_downloaded,
+            'to_download': self.to_download
+        }
+
 
 @dataclass
 class SessionSummary:
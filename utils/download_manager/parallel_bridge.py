@@ -161,23 +161,7 @@ class ParallelDownloadBridge:
             return None
 
         # Convert to legacy format
-        return {
-            'running': progress_info.status in (SessionStatus.DISCOVERING, SessionStatus.DOWNLOADING),
-            'status': progress_info.status.value,
-            'total': progress_info.total_discovered,
-            'completed': progress_info.downloaded,
-            'skipped': progress_info.skipped,
-            'failed': progress_info.failed,
-            'processed': progress_info.processed,  # NEW: for accurate UI
-            # Legacy compatibility
-            'current_files': {},
-            'workers': [],
-            # New fields
-            'session_id': session_id,
-            'discovery_completed': progress_info.discovery_completed,
-            'already_downloaded': progress_info.already_downloaded,
-            'to_download': progress_info.to_download
-        }
+        return progress_info.to_legacy_dict()
 
     def cancel_download(self, session_id: str):
         """Cancel active download"""
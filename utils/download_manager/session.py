@@ -2,8 +2,17 @@
 Session Management for Download Manager
 
 Handles download session lifecycle, state persistence, and isolation.
+
+Progress counters are kept in memory and written to download_sessions at most
+every SESSION_FLUSH_INTERVAL seconds; status transitions (started, completed,
+failed, cancelled) are written immediately. After a crash the row holds the
+counters of the last flush.
 """
 
+import atexit
+import logging
+import os
+import time
 import uuid
 import threading
 from datetime import datetime
@@ -13,6 +22,10 @@ import json
 from .models import SessionStatus, ProgressInfo, FileStatus
 from config.database import get_db_connection, DB_TYPE
 
+logger = logging.getLogger(__name__)
+
+SESSION_FLUSH_INTERVAL = float(os.getenv('DOWNLOAD_SESSION_FLUSH_INTERVAL', 5))
+
 
 class DownloadSession:
     """Represents a single download session"""
@@ -43,6 +56,9 @@ class DownloadSession:
         self.resumable = True
         self.cancelled = False
 
+        # In-memory changes not yet written to the database
+        self.dirty = False
+
         # Lock for thread-safe updates
         self._lock = threading.Lock()
 
@@ -75,6 +91,7 @@ class DownloadSession:
                 if hasattr(self, key):
                     setattr(self, key, value)
             self.updated_at = datetime.now()
+            self.dirty = True
 
     def is_active(self) -> bool:
         """Check if session is currently active (not completed, failed, or cancelled)"""
@@ -100,10 +117,11 @@ class SessionManager:
     Key features:
     - One active session per source type (REP/STM/SMT run independently)
     - Database-backed state (survives server restarts)
+    - Coalesced progress writes (one UPDATE per session per flush interval)
     - Thread-safe operations
     """
 
-    def __init__(self):
+    def __init__(self, flush_interval: float = SESSION_FLUSH_INTERVAL):
         # Active sessions by source type
         self._active_sessions: Dict[str, Optional[DownloadSession]] = {
             'rep': None,
@@ -118,6 +136,14 @@ class SessionManager:
             'smt': threading.Lock()
         }
 
+        # Sessions with progress waiting for the next flush
+        self.flush_interval = flush_interval
+        self._dirty: Dict[str, DownloadSession] = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_thread: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
     def can_start_session(self, source_type: str) -> bool:
         """Check if new session can start for this source"""
         with self._session_locks[source_type]:
@@ -170,16 +196,25 @@ class SessionManager:
         return self._load_session_from_db(session_id)
 
     def update_session_progress(self, session_id: str, **kwargs):
-        """Update session progress and persist to database"""
+        """
+        Update session progress
+
+        Status transitions are persisted immediately; counter-only updates are
+        flushed to the database by the background flusher.
+        """
         session = self.get_session(session_id)
         if not session:
             return
 
+        previous_status = session.status
+
         # Update in-memory
         session.update_progress(**kwargs)
 
-        # Persist to database
-        self._update_session_in_db(session)
+        if session.status != previous_status:
+            self._update_session_in_db(session)
+        else:
+            self._mark_dirty(session)
 
     def complete_session(self, session_id: str, error: Optional[str] = None):
         """Mark session as complete or failed"""
@@ -222,6 +257,53 @@ class SessionManager:
         """Get all currently active sessions"""
         return [s for s in self._active_sessions.values() if s and s.is_active()]
 
+    def flush(self) -> int:
+        """
+        Write progress of all dirty sessions to the database
+
+        Returns:
+            Number of sessions written
+        """
+        with self._flush_lock:
+            with self._dirty_lock:
+                sessions, self._dirty = list(self._dirty.values()), {}
+
+            written = 0
+            for session in sessions:
+                if not session.dirty:
+                    continue  # Already written by a status transition
+                try:
+                    self._update_session_in_db(session)
+                except Exception as e:
+                    logger.error(f"Error flushing progress for session {session.session_id}: {e}")
+
+                if session.dirty:
+                    # Not written (database unavailable); retry on the next flush
+                    self._mark_dirty(session, start_flusher=False)
+                else:
+                    written += 1
+            return written
+
+    def _mark_dirty(self, session: DownloadSession, start_flusher: bool = True):
+        """Queue a session for the next flush"""
+        with self._dirty_lock:
+            self._dirty[session.session_id] = session
+            if start_flusher and (self._flush_thread is None or not self._flush_thread.is_alive()):
+                self._flush_thread = threading.Thread(
+                    target=self._run_flusher, name='download-session-flush', daemon=True
+                )
+                self._flush_thread.start()
+
+    def _run_flusher(self):
+        """Flush periodically until no session is dirty"""
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            with self._dirty_lock:
+                if not self._dirty:
+                    self._flush_thread = None
+                    return
+
     # Database operations
 
     def _save_session_to_db(self, session: DownloadSession):
@@ -285,6 +367,25 @@ class SessionManager:
         if not conn:
             return
 
+        # Snapshot under the session lock so a concurrent update is either
+        # written now or leaves the session dirty for the next flush
+        with session._lock:
+            values = (
+                session.status.value,
+                session.total_discovered,
+                session.already_downloaded,
+                session.to_download,
+                session.processed,
+                session.downloaded,
+                session.skipped,
+                session.failed,
+                session.started_at,
+                session.completed_at,
+                session.updated_at,
+                session.session_id
+            )
+            session.dirty = False
+
         try:
             cursor = conn.cursor()
 
@@ -304,23 +405,13 @@ class SessionManager:
                 WHERE id = %s
             """
 
-            cursor.execute(query, (
-                session.status.value,
-                session.total_discovered,
-                session.already_downloaded,
-                session.to_download,
-                session.processed,
-                session.downloaded,
-                session.skipped,
-                session.failed,
-                session.started_at,
-                session.completed_at,
-                session.updated_at,
-                session.session_id
-            ))
+            cursor.execute(query, values)
 
             conn.commit()
             cursor.close()
+        except Exception:
+            session.dirty = True
+            raise
         finally:
             conn.close()
 
@@ -1350,6 +1350,11 @@ class EClaimImporterV2:
                 column_map = self.get_column_map_for_type(file_type)
                 imported_records = self.import_opip_batch(file_id, df, column_map=column_map, file_type=file_type)
 
+            # Score the new OP/IP claims with the denial model (ORF claims live elsewhere)
+            denial_risk = None
+            if imported_records and 'ORF' not in file_type:
+                denial_risk = self._score_denial_risk(file_id)
+
             # Import additional sheets (Summary, Drug, Instrument, Deny, Zero)
             if import_additional_sheets:
                 try:
@@ -1376,7 +1381,8 @@ class EClaimImporterV2:
                 'total_records': total_records,
                 'imported_records': imported_records,
                 'failed_records': failed_records,
-                'additional_sheets': additional_results
+                'additional_sheets': additional_results,
+                'denial_risk': denial_risk
             }
 
         except Exception as e:
@@ -1403,6 +1409,21 @@ class EClaimImporterV2:
                 'additional_sheets': additional_results
             }
 
+    def _score_denial_risk(self, file_id: int) -> Optional[Dict]:
+        """
+        Persist denial risk scores for the claims of an imported file
+
+        Scoring problems (no trained model, missing columns before migration
+        021) are logged and never fail the import.
+        """
+        try:
+            from utils.ml.risk_scoring import score_file
+            return score_file(self.conn, file_id)
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"Denial risk scoring skipped for file {file_id}: {e}")
+            return {'scored': 0, 'skipped': str(e)}
+
     def __enter__(self):
         """Context manager entry"""
         self.connect()
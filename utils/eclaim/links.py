@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+E-Claim Validation Page Link Parser
+Extract "download excel" links from the NHSO validation page using lxml XPath
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlparse, parse_qs
+
+from lxml import etree, html as lxml_html
+
+_UPPER = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_LOWER = 'abcdefghijklmnopqrstuvwxyz'
+
+# Anchors inside table rows whose text contains "download excel" (case-insensitive)
+_EXCEL_LINKS = etree.XPath(
+    f"//tr//a[@href][contains(translate(normalize-space(.), '{_UPPER}', '{_LOWER}'), 'download excel')]"
+)
+
+# First "rep_eclaim" anchor in the same row (fallback for filename)
+_REP_LINK_IN_ROW = etree.XPath(
+    f"ancestor::tr[1]//a[@href][contains(translate(., '{_UPPER}', '{_LOWER}'), 'rep_eclaim')]/@href"
+)
+
+
+def _filename_from_href(href: str) -> Optional[str]:
+    """
+    Extract filename from a download href query string
+
+    Args:
+        href: Link href (relative or absolute)
+
+    Returns:
+        Filename or None if the href carries no filename parameter
+    """
+    params = parse_qs(urlparse(href).query)
+
+    if 'fn' in params:
+        return params['fn'][0]
+    if 'filename' in params:
+        # 'filename' points to the .ecd source; the Excel export is .xls
+        return params['filename'][0].replace('.ecd', '.xls')
+    if 'file' in params:
+        return params['file'][0]
+    return None
+
+
+def parse_download_links(content, base_url: str) -> List[Dict]:
+    """
+    Parse validation page HTML into unique download links
+
+    Only anchors inside table rows are visited, so the page is walked once
+    with compiled XPath instead of a per-row regex search.
+
+    Args:
+        content: Page HTML (bytes or str)
+        base_url: Base URL used to resolve relative hrefs
+
+    Returns:
+        list: Dicts with 'url' and 'filename', de-duplicated by filename
+            in page order
+    """
+    if not content:
+        return []
+
+    tree = lxml_html.fromstring(content)
+
+    links = []
+    seen = set()
+
+    for anchor in _EXCEL_LINKS(tree):
+        href = anchor.get('href')
+        if not href:
+            continue
+
+        filename = _filename_from_href(href)
+
+        # Try the rep_eclaim link in the same row
+        if not filename:
+            rep_hrefs = _REP_LINK_IN_ROW(anchor)
+            if rep_hrefs:
+                filename = rep_hrefs[0].split('/')[-1].replace('.ecd', '.xls')
+
+        # Last resort - generate filename
+        if not filename:
+            filename = f"eclaim_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xls"
+
+        if filename in seen:
+            continue
+        seen.add(filename)
+
+        links.append({
+            'url': urljoin(base_url, href),
+            'filename': filename
+        })
+
+    return links
@@ -16,17 +16,39 @@ Usage:
 import logging
 import os
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import humanize
 import re
 
 from config.db_pool import get_connection, return_connection
+from utils.history_stats_cache import history_stats_cache
 
 logger = logging.getLogger(__name__)
 
 # Get database type from environment
 DB_TYPE = os.environ.get('DB_TYPE', 'postgresql').lower()
 
+# Filename patterns used when registering scanned files
+REP_FILENAME_PATTERN = re.compile(r'eclaim_(\d+)_(\w+)_(\d{4})(\d{2})\d{2}_')
+STM_FILENAME_PATTERN = re.compile(r'STM_(\d+)_(\w+)(\d{4})(\d{2})_')
+
+# Type filter for get_downloads_page: (file_path LIKE, LOWER(filename) LIKE)
+FILE_TYPE_PATTERNS = {
+    'rep': ('%/rep/%', '%eclaim\\_%'),
+    'stm': ('%/stm/%', '%stm\\_%'),
+    'smt': ('%/smt/%', '%smt\\_budget\\_%'),
+}
+
+# REP file type filter for get_downloads_page: UPPER(filename) LIKE
+REP_FILE_TYPE_PATTERNS = {
+    'op': '%\\_OP\\_%',
+    'ip': '%\\_IP\\_%',
+    'orf': '%\\_ORF\\_%',
+    'appeal': '%APPEAL%',
+}
+
+MAX_PAGE_SIZE = 500
+
 
 class HistoryManagerDB:
     """
@@ -96,12 +118,16 @@ class HistoryManagerDB:
         if last_run:
             self._update_last_run(last_run)
 
-    def get_all_downloads(self) -> List[Dict]:
+    def get_all_downloads(self, limit: int = None, offset: int = 0) -> List[Dict]:
         """
         Get all download records for this type
 
+        Args:
+            limit: Max records to return (None for all)
+            offset: Offset for pagination
+
         Returns:
-            List of download record dicts
+            List of download record dicts, newest first
         """
         conn = None
         try:
@@ -119,7 +145,8 @@ class HistoryManagerDB:
                 WHERE download_type = %s
                 ORDER BY downloaded_at DESC
             """
-            cursor.execute(query, (self.download_type,))
+            page_clause, page_params = self._page_clause(limit, offset)
+            cursor.execute(query + page_clause, (self.download_type,) + page_params)
 
             columns = [desc[0] for desc in cursor.description]
             downloads = []
@@ -210,6 +237,7 @@ class HistoryManagerDB:
             deleted = cursor.rowcount > 0
             conn.commit()
             cursor.close()
+            history_stats_cache.invalidate(self.download_type)
 
             logger.debug(f"Deleted download record: {filename}")
             return deleted
@@ -285,6 +313,7 @@ class HistoryManagerDB:
 
             conn.commit()
             cursor.close()
+            history_stats_cache.invalidate(self.download_type)
             logger.debug(f"Added download record: {data.get('filename')}")
             return True
 
@@ -307,6 +336,17 @@ class HistoryManagerDB:
         Returns:
             Dict with total_files, total_size, last_run, file_types
         """
+        stats = history_stats_cache.get_or_load(
+            self.download_type, 'statistics', self._query_statistics,
+            cache_if=lambda stats: stats.get('last_run') != 'Error'
+        )
+        # Relative time must not age with the cache entry
+        if stats.get('last_run_raw'):
+            stats['last_run'] = humanize.naturaltime(datetime.fromisoformat(stats['last_run_raw']))
+        return stats
+
+    def _query_statistics(self) -> Dict:
+        """Query statistics (uncached)"""
         conn = None
         try:
             conn = self._get_connection()
@@ -329,9 +369,13 @@ class HistoryManagerDB:
             last_download = row[2]
 
             # Get file type breakdown
-            type_query = """
+            if self.db_type == 'mysql':
+                file_type_expr = "REGEXP_SUBSTR(REGEXP_SUBSTR(filename, 'eclaim_[0-9]+_[A-Z]+_'), '[A-Z]+', 8)"
+            else:
+                file_type_expr = "SUBSTRING(filename FROM 'eclaim_[0-9]+_([A-Z]+)_')"
+            type_query = f"""
                 SELECT
-                    SUBSTRING(filename FROM 'eclaim_[0-9]+_([A-Z]+)_') as file_type,
+                    {file_type_expr} as file_type,
                     COUNT(*) as count
                 FROM download_history
                 WHERE download_type = %s
@@ -423,6 +467,12 @@ class HistoryManagerDB:
         Returns:
             Dict organized by year and month
         """
+        return history_stats_cache.get_or_load(
+            self.download_type, 'date_range', self._query_date_range_statistics, cache_if=bool
+        )
+
+    def _query_date_range_statistics(self) -> Dict:
+        """Query date range statistics (uncached)"""
         conn = None
         try:
             conn = self._get_connection()
@@ -474,6 +524,12 @@ class HistoryManagerDB:
         Returns:
             List of dicts with month, year, count, label
         """
+        return history_stats_cache.get_or_load(
+            self.download_type, 'available_dates', self._query_available_dates, cache_if=bool
+        )
+
+    def _query_available_dates(self) -> List[Dict]:
+        """Query available dates (uncached)"""
         conn = None
         try:
             conn = self._get_connection()
@@ -518,8 +574,9 @@ class HistoryManagerDB:
         finally:
             self._release_connection(conn)
 
-    def get_downloads_by_date(self, month: int, year: int) -> List[Dict]:
-        """Get all downloads for specific month/year"""
+    def get_downloads_by_date(self, month: int, year: int,
+                              limit: int = None, offset: int = 0) -> List[Dict]:
+        """Get downloads for specific month/year (optionally one page)"""
         conn = None
         try:
             conn = self._get_connection()
@@ -536,7 +593,8 @@ class HistoryManagerDB:
                   AND service_month = %s
                 ORDER BY downloaded_at DESC
             """
-            cursor.execute(query, (self.download_type, year, month))
+            page_clause, page_params = self._page_clause(limit, offset)
+            cursor.execute(query + page_clause, (self.download_type, year, month) + page_params)
 
             columns = [desc[0] for desc in cursor.description]
             downloads = []
@@ -556,8 +614,9 @@ class HistoryManagerDB:
         finally:
             self._release_connection(conn)
 
-    def get_downloads_by_scheme(self, scheme: str) -> List[Dict]:
-        """Get all downloads for a specific scheme"""
+    def get_downloads_by_scheme(self, scheme: str,
+                                limit: int = None, offset: int = 0) -> List[Dict]:
+        """Get downloads for a specific scheme (optionally one page)"""
         conn = None
         try:
             conn = self._get_connection()
@@ -572,7 +631,8 @@ class HistoryManagerDB:
                 WHERE download_type = %s AND scheme = %s
                 ORDER BY downloaded_at DESC
             """
-            cursor.execute(query, (self.download_type, scheme))
+            page_clause, page_params = self._page_clause(limit, offset)
+            cursor.execute(query + page_clause, (self.download_type, scheme) + page_params)
 
             columns = [desc[0] for desc in cursor.description]
             downloads = []
@@ -594,6 +654,12 @@ class HistoryManagerDB:
 
     def get_statistics_by_scheme(self) -> Dict:
         """Get statistics grouped by insurance scheme"""
+        return history_stats_cache.get_or_load(
+            self.download_type, 'by_scheme', self._query_statistics_by_scheme, cache_if=bool
+        )
+
+    def _query_statistics_by_scheme(self) -> Dict:
+        """Query statistics by scheme (uncached)"""
         conn = None
         try:
             conn = self._get_connection()
@@ -628,6 +694,70 @@ class HistoryManagerDB:
         finally:
             self._release_connection(conn)
 
+    def get_file_type_statistics(self) -> Dict:
+        """
+        Get file counts, sizes and import status grouped by REP file type
+
+        The file type is the part between the hospital code and the date
+        (eclaim_10670_IP_APPEAL_25690106_xxx.xls -> IP_APPEAL).
+
+        Returns:
+            Dict mapping file type -> {'count', 'imported', 'pending', 'size'}
+        """
+        return history_stats_cache.get_or_load(
+            self.download_type, 'by_file_type', self._query_file_type_statistics, cache_if=bool
+        )
+
+    def _query_file_type_statistics(self) -> Dict:
+        """Query file type statistics (uncached)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+
+            if self.db_type == 'mysql':
+                file_type_expr = (
+                    "CASE WHEN REGEXP_LIKE(d.filename, '^eclaim_[0-9]+_[A-Z_]+_[0-9]{8}_[0-9]+[.]xls', 'c') "
+                    "THEN REGEXP_REPLACE(d.filename, '^eclaim_[0-9]+_([A-Z_]+)_[0-9]{8}_.*$', '$1') END"
+                )
+            else:
+                file_type_expr = "SUBSTRING(d.filename FROM '^eclaim_[0-9]+_([A-Z_]+)_[0-9]{8}_[0-9]+[.]xls')"
+
+            query = f"""
+                SELECT
+                    t.file_type,
+                    COUNT(*) as files,
+                    SUM(CASE WHEN t.import_status = 'completed' THEN 1 ELSE 0 END) as imported,
+                    COALESCE(SUM(t.file_size), 0) as size
+                FROM (
+                    SELECT {file_type_expr} as file_type, d.file_size, f.status as import_status
+                    FROM download_history d
+                    LEFT JOIN eclaim_imported_files f ON f.filename = d.filename
+                    WHERE d.download_type = %s
+                ) t
+                WHERE t.file_type IS NOT NULL
+                GROUP BY t.file_type
+            """
+            cursor.execute(query, (self.download_type,))
+
+            stats = {}
+            for file_type, files, imported, size in cursor.fetchall():
+                stats[file_type] = {
+                    'count': files,
+                    'imported': int(imported or 0),
+                    'pending': files - int(imported or 0),
+                    'size': int(size)
+                }
+
+            cursor.close()
+            return stats
+
+        except Exception as e:
+            logger.error(f"Error getting file type stats: {e}")
+            return {}
+        finally:
+            self._release_connection(conn)
+
     def get_available_schemes(self) -> List[Dict]:
         """Get list of schemes that have downloaded files"""
         stats = self.get_statistics_by_scheme()
@@ -711,10 +841,214 @@ class HistoryManagerDB:
         finally:
             self._release_connection(conn)
 
+    def get_downloads_page(self, page: int = 1, per_page: int = 50,
+                           date_from: str = None, date_to: str = None,
+                           month: int = None, year: int = None,
+                           file_type: str = None, search: str = None,
+                           import_status: str = None,
+                           period_start: Tuple[int, int] = None,
+                           period_end: Tuple[int, int] = None,
+                           scheme: str = None, rep_file_type: str = None) -> Dict:
+        """
+        Get one page of downloads with filters applied in SQL
+
+        Filtering, import status (join on eclaim_imported_files), counting,
+        sorting and LIMIT/OFFSET all run in the database, so the cost of the
+        /files page depends on the page size, not on the size of the history.
+
+        Args:
+            page: Page number (1-based, clamped to the last page)
+            per_page: Rows per page (max MAX_PAGE_SIZE)
+            date_from: Earliest file date 'YYYY-MM-DD' (Gregorian)
+            date_to: Latest file date 'YYYY-MM-DD' (Gregorian)
+            month: Service month (used with year)
+            year: Service year in Buddhist Era (used with month)
+            file_type: 'rep', 'stm' or 'smt'
+            search: Case-insensitive filename substring
+            import_status: 'imported' or 'pending'
+            period_start: Earliest (year BE, month), inclusive
+            period_end: Latest (year BE, month), inclusive
+            scheme: Scheme code contained in the filename (e.g. 'ucs')
+            rep_file_type: 'op', 'ip', 'orf' or 'appeal'
+
+        Returns:
+            Dict with files, total_files, total_size, imported_count,
+            not_imported_count, page, per_page and total_pages
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            result = self._query_downloads_page(
+                cursor, page=page, per_page=per_page,
+                date_from=date_from, date_to=date_to, month=month, year=year,
+                file_type=file_type, search=search, import_status=import_status,
+                period_start=period_start, period_end=period_end,
+                scheme=scheme, rep_file_type=rep_file_type
+            )
+            cursor.close()
+            return result
+
+        except Exception as e:
+            logger.error(f"Error getting downloads page: {e}")
+            return {
+                'files': [], 'total_files': 0, 'total_size': 0, 'imported_count': 0,
+                'not_imported_count': 0, 'page': 1, 'per_page': per_page, 'total_pages': 0
+            }
+        finally:
+            self._release_connection(conn)
+
+    def _query_downloads_page(self, cursor, page: int = 1, per_page: int = 50,
+                              date_from: str = None, date_to: str = None,
+                              month: int = None, year: int = None,
+                              file_type: str = None, search: str = None,
+                              import_status: str = None,
+                              period_start: Tuple[int, int] = None,
+                              period_end: Tuple[int, int] = None,
+                              scheme: str = None, rep_file_type: str = None) -> Dict:
+        """Run the count and page queries for get_downloads_page() on a cursor"""
+        per_page = max(1, min(per_page or 50, MAX_PAGE_SIZE))
+
+        conditions = ['d.download_type = %s']
+        params = [self.download_type]
+
+        for value, operator in ((date_from, '>='), (date_to, '<=')):
+            if not value:
+                continue
+            try:
+                parsed = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                logger.warning(f"Ignoring invalid date filter: {value}")
+                continue
+            # Files without a date are always listed (as before the SQL filter)
+            conditions.append(f'(d.file_date {operator} %s OR d.file_date IS NULL)')
+            params.append(parsed)
+
+        # Fall back to the filename date when year/month metadata is missing
+        year_expr = 'COALESCE(d.fiscal_year, EXTRACT(YEAR FROM d.file_date) + 543)'
+        month_expr = 'COALESCE(d.service_month, EXTRACT(MONTH FROM d.file_date))'
+
+        if month is not None and year is not None:
+            conditions.append(f'{year_expr} = %s')
+            conditions.append(f'{month_expr} = %s')
+            params.extend([year, month])
+
+        for period, operator in ((period_start, '>='), (period_end, '<=')):
+            if period:
+                conditions.append(f'{year_expr} * 12 + {month_expr} {operator} %s')
+                params.append(period[0] * 12 + period[1])
+
+        type_patterns = FILE_TYPE_PATTERNS.get(file_type)
+        if type_patterns:
+            path_pattern, name_pattern = type_patterns
+            conditions.append('(d.file_path LIKE %s OR LOWER(d.filename) LIKE %s)')
+            params.extend([path_pattern, name_pattern])
+
+        for text in (search, scheme):
+            if text:
+                escaped = text.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                conditions.append('LOWER(d.filename) LIKE %s')
+                params.append(f'%{escaped}%')
+
+        rep_type_pattern = REP_FILE_TYPE_PATTERNS.get(rep_file_type)
+        if rep_type_pattern:
+            conditions.append('UPPER(d.filename) LIKE %s')
+            params.append(rep_type_pattern)
+
+        from_clause = """
+            FROM download_history d
+            LEFT JOIN eclaim_imported_files f
+              ON f.filename = d.filename AND f.status = 'completed'
+        """
+        where_clause = 'WHERE ' + ' AND '.join(conditions)
+
+        # Counts ignore the import status filter so both tab counters stay visible
+        cursor.execute(
+            f"SELECT COUNT(*), COUNT(f.id), COALESCE(SUM(d.file_size), 0) {from_clause} {where_clause}",
+            params
+        )
+        total_all, imported_count, total_size = cursor.fetchone()
+        not_imported_count = total_all - imported_count
+
+        if import_status == 'imported':
+            where_clause += ' AND f.id IS NOT NULL'
+            total_files = imported_count
+        elif import_status == 'pending':
+            where_clause += ' AND f.id IS NULL'
+            total_files = not_imported_count
+        else:
+            total_files = total_all
+
+        total_pages = (total_files + per_page - 1) // per_page
+        page = max(1, min(page or 1, total_pages if total_pages > 0 else 1))
+
+        nulls_last = ' NULLS LAST' if self.db_type == 'postgresql' else ''
+        query = f"""
+            SELECT
+                d.filename, d.document_no, d.scheme, d.fiscal_year as year,
+                d.service_month as month, d.patient_type, d.rep_no,
+                d.file_size, d.file_path, d.file_hash, d.file_exists,
+                d.downloaded_at as download_date, d.imported,
+                d.imported_at, d.source_url,
+                f.id as import_file_id, f.import_completed_at as import_imported_at,
+                f.imported_records, f.total_records
+            {from_clause}
+            {where_clause}
+            ORDER BY d.downloaded_at DESC{nulls_last}, d.id DESC
+            LIMIT %s OFFSET %s
+        """
+        cursor.execute(query, params + [per_page, (page - 1) * per_page])
+
+        columns = [desc[0] for desc in cursor.description]
+        files = []
+        for row in cursor.fetchall():
+            record = dict(zip(columns, row))
+            import_file_id = record.pop('import_file_id')
+            import_imported_at = record.pop('import_imported_at')
+            imported_records = record.pop('imported_records')
+            total_records = record.pop('total_records')
+
+            if record.get('download_date'):
+                record['download_date'] = record['download_date'].isoformat()
+            if record.get('imported_at'):
+                record['imported_at'] = record['imported_at'].isoformat()
+
+            if import_file_id is not None:
+                record['imported'] = True
+                record['import_status'] = {
+                    'imported': True,
+                    'file_id': import_file_id,
+                    'imported_at': import_imported_at.isoformat() if import_imported_at else None,
+                    'imported_records': imported_records or 0,
+                    'total_records': total_records or 0
+                }
+            else:
+                record['imported'] = False
+                record['import_status'] = None
+            files.append(record)
+
+        return {
+            'files': files,
+            'total_files': total_files,
+            'total_size': int(total_size),
+            'imported_count': imported_count,
+            'not_imported_count': not_imported_count,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': total_pages
+        }
+
     # ==========================================================================
     # Helper Methods
     # ==========================================================================
 
+    @staticmethod
+    def _page_clause(limit: Optional[int], offset: int = 0) -> Tuple[str, tuple]:
+        """Build LIMIT/OFFSET clause and params (empty when limit is None)"""
+        if limit is None:
+            return '', ()
+        return ' LIMIT %s OFFSET %s', (limit, offset or 0)
+
     def _get_last_run(self) -> Optional[str]:
         """Get last download timestamp"""
         conn = None
@@ -756,18 +1090,21 @@ class HistoryManagerDB:
 
     def scan_and_register_files(self, directory: str = None) -> Dict:
         """
-        Scan a directory for .xls files and register them in database.
-        Files not in database will be added with metadata extracted from filename.
+        Scan a directory for .xls files and reconcile them with the database.
+
+        Incremental: the directory snapshot (size/mtime) is diffed against the
+        manifest from the previous scan and against the known records in one
+        query. Only new or changed files are hashed (in a thread pool), and all
+        inserts/updates are applied in one batched transaction.
 
         Args:
             directory (str): Path to scan for files. Defaults based on download_type.
 
         Returns:
-            dict: Report with added, skipped, and error counts
+            dict: Report with added, updated, removed, skipped, and error counts
         """
-        import re
         from pathlib import Path
-        from datetime import datetime
+        from utils.directory_scanner import DirectoryScanner
 
         # Default directories based on download_type
         if directory is None:
@@ -780,6 +1117,8 @@ class HistoryManagerDB:
 
         report = {
             'added': 0,
+            'updated': 0,
+            'removed': 0,
             'skipped': 0,
             'errors': 0,
             'error_files': [],
@@ -793,77 +1132,160 @@ class HistoryManagerDB:
             report['error_files'].append(f'Directory not found: {directory}')
             return report
 
-        # Get all .xls files
-        xls_files = list(scan_dir.glob('*.xls'))
+        scanner = DirectoryScanner(directory)
+        changes = scanner.scan()
+        snapshot = changes['snapshot']
 
-        for file_path in xls_files:
-            try:
-                filename = file_path.name
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
 
-                # Check if already in history
-                if self.get_download(filename) is not None:
-                    report['skipped'] += 1
+            # All known records for this type in one query
+            cursor.execute("""
+                SELECT id, filename, file_path, file_exists, file_size
+                FROM download_history
+                WHERE download_type = %s
+            """, (self.download_type,))
+            known = {row[1]: row for row in cursor.fetchall()}
+
+            new_files = [f for f in snapshot if f not in known]
+            changed = set(changes['changed'])
+            refresh = []
+            for filename in snapshot:
+                record = known.get(filename)
+                if record is None:
                     continue
+                _, _, _, file_exists, file_size = record
+                if filename in changed or not file_exists or file_size != snapshot[filename]['size']:
+                    refresh.append(filename)
+
+            # Known records in this directory whose file is gone
+            scan_root = os.path.abspath(directory)
+            missing_ids = [
+                record[0] for filename, record in known.items()
+                if record[3] and filename not in snapshot
+                and (not record[2] or os.path.dirname(os.path.abspath(record[2])) == scan_root)
+            ]
+
+            hashes = scanner.hash_files(new_files + refresh)
+
+            insert_rows = []
+            for filename in new_files:
+                try:
+                    insert_rows.append(
+                        self._scan_record_values(filename, scan_dir, snapshot[filename], hashes.get(filename))
+                    )
+                except Exception as e:
+                    report['errors'] += 1
+                    report['error_files'].append(f'{filename}: {str(e)}')
+
+            self._insert_scanned_records(cursor, insert_rows)
+
+            if refresh:
+                cursor.executemany("""
+                    UPDATE download_history
+                    SET file_size = %s,
+                        file_hash = COALESCE(%s, file_hash),
+                        file_exists = TRUE,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, [
+                    (snapshot[f]['size'], hashes.get(f), known[f][0]) for f in refresh
+                ])
+
+            for start in range(0, len(missing_ids), 500):
+                chunk = missing_ids[start:start + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"""
+                    UPDATE download_history
+                    SET file_exists = FALSE, updated_at = CURRENT_TIMESTAMP
+                    WHERE id IN ({placeholders})
+                """, chunk)
 
-                # Extract metadata from filename
-                month = None
-                year = None
-                file_type = None
-                scheme = 'ucs'
-
-                # Try eclaim REP format: eclaim_10670_OP_25681001_xxx.xls
-                match = re.search(r'eclaim_(\d+)_(\w+)_(\d{4})(\d{2})\d{2}_', filename)
-                if match:
-                    hospital_code = match.group(1)
-                    file_type = match.group(2)  # OP, IP, ORF
-                    year = int(match.group(3))  # 2568
-                    month = int(match.group(4))  # 10
-
-                # Try STM format: STM_10670_IPUCS256810_01.xls
-                stm_match = re.search(r'STM_(\d+)_(\w+)(\d{4})(\d{2})_', filename)
-                if stm_match and not match:
-                    hospital_code = stm_match.group(1)
-                    file_type = stm_match.group(2)  # IPUCS, OPUCS
-                    year = int(stm_match.group(3))  # 2568
-                    month = int(stm_match.group(4))  # 10
-
-                # Get file size and modification time
-                stat = file_path.stat()
-                file_size = stat.st_size
-                mtime = datetime.fromtimestamp(stat.st_mtime)
-
-                # Create download record
-                download_record = {
-                    'filename': filename,
-                    'file_size': file_size,
-                    'download_date': mtime.isoformat(),
-                    'file_path': str(file_path),
-                    'source': 'file_scan',
-                }
+            conn.commit()
+            cursor.close()
+            if insert_rows or refresh or missing_ids:
+                history_stats_cache.invalidate(self.download_type)
 
-                if month:
-                    download_record['month'] = month
-                    download_record['service_month'] = month
-                if year:
-                    download_record['year'] = year
-                    download_record['fiscal_year'] = year
-                if file_type:
-                    download_record['file_type'] = file_type
-                if scheme:
-                    download_record['scheme'] = scheme
-
-                # Add to history
-                if self.add_download(download_record):
-                    report['added'] += 1
-                else:
-                    report['skipped'] += 1
-
-            except Exception as e:
-                report['errors'] += 1
-                report['error_files'].append(f'{filename}: {str(e)}')
+            report['added'] = len(insert_rows)
+            report['updated'] = len(refresh)
+            report['removed'] = len(missing_ids)
+            report['skipped'] = len(snapshot) - len(insert_rows) - len(refresh) - report['errors']
 
+        except Exception as e:
+            logger.error(f"Error scanning {directory}: {e}")
+            if conn:
+                conn.rollback()
+            report['errors'] += 1
+            report['error_files'].append(f'{directory}: {str(e)}')
+            return report
+        finally:
+            self._release_connection(conn)
+
+        # Only remember the snapshot once the database reflects it
+        scanner.commit(snapshot, hashes)
         return report
 
+    def _scan_record_values(self, filename: str, scan_dir, entry: Dict,
+                            file_hash: Optional[str]) -> tuple:
+        """Build download_history values for a file found by scanning"""
+        month = None
+        year = None
+
+        # Try eclaim REP format: eclaim_10670_OP_25681001_xxx.xls
+        match = REP_FILENAME_PATTERN.search(filename)
+        if not match:
+            # Try STM format: STM_10670_IPUCS256810_01.xls
+            match = STM_FILENAME_PATTERN.search(filename)
+        if match:
+            year = int(match.group(3))   # 2568
+            month = int(match.group(4))  # 10
+
+        return (
+            self.download_type,
+            filename,
+            year,
+            month,
+            'ucs',
+            entry['size'],
+            str(scan_dir / filename),
+            file_hash,
+            True,  # file_exists
+        )
+
+    def _insert_scanned_records(self, cursor, rows: List[tuple]):
+        """Insert scanned files with multi-row upserts"""
+        if self.db_type == 'mysql':
+            conflict = """
+                ON DUPLICATE KEY UPDATE
+                    file_size = VALUES(file_size),
+                    file_path = VALUES(file_path),
+                    file_hash = COALESCE(VALUES(file_hash), file_hash),
+                    file_exists = VALUES(file_exists),
+                    updated_at = CURRENT_TIMESTAMP
+            """
+        else:
+            conflict = """
+                ON CONFLICT (download_type, filename) DO UPDATE SET
+                    file_size = EXCLUDED.file_size,
+                    file_path = EXCLUDED.file_path,
+                    file_hash = COALESCE(EXCLUDED.file_hash, download_history.file_hash),
+                    file_exists = EXCLUDED.file_exists,
+                    updated_at = CURRENT_TIMESTAMP
+            """
+
+        for start in range(0, len(rows), 500):
+            chunk = rows[start:start + 500]
+            values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(chunk))
+            cursor.execute(f"""
+                INSERT INTO download_history
+                (download_type, filename, fiscal_year, service_month, scheme,
+                 file_size, file_path, file_hash, file_exists)
+                VALUES {values}
+                {conflict}
+            """, [value for row in chunk for value in row])
+
 
 # Factory function for easy initialization
 def get_history_manager(download_type: str = 'rep') -> HistoryManagerDB:
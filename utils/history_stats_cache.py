@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Download History Statistics Cache
+
+Per download_type cache for aggregate history statistics (dashboard totals,
+per-scheme and per-month breakdowns). Entries are dropped by every write
+path that changes download_history in this process, and expire after
+STATS_CACHE_TTL seconds so writes from downloader subprocesses show up too.
+
+Usage:
+    from utils.history_stats_cache import history_stats_cache
+
+    stats = history_stats_cache.get_or_load('rep', 'statistics', load_fn)
+    history_stats_cache.invalidate('rep')
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_TTL = int(os.getenv('HISTORY_STATS_CACHE_TTL', 60))
+
+
+class HistoryStatsCache:
+    """Thread-safe cache of statistics keyed by (download_type, name)"""
+
+    def __init__(self, ttl: int = STATS_CACHE_TTL):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds before an entry is reloaded (0 disables caching)
+        """
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        # Bumped by invalidate() so loads that started earlier are not stored
+        self._generations: Dict[str, int] = {}
+        self._generation_all = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, download_type: str) -> Tuple[int, int]:
+        """Invalidation generation of a type (caller holds the lock)"""
+        return self._generation_all, self._generations.get(download_type, 0)
+
+    def get_or_load(self, download_type: str, name: str, load_fn: Callable[[], Any],
+                    cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return a cached value, loading it on miss or expiry
+
+        Args:
+            download_type: 'rep', 'stm' or 'smt'
+            name: Statistic name (e.g. 'statistics', 'by_scheme')
+            load_fn: Callable that queries the value
+            cache_if: Optional predicate; values failing it are not cached
+                (used to skip error fallbacks)
+
+        Returns:
+            A copy of the cached value, safe for callers to modify
+        """
+        key = (download_type, name)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation(download_type)
+        if entry and now - entry[0] < self.ttl:
+            return copy.deepcopy(entry[1])
+
+        value = load_fn()
+        if self.ttl > 0 and (cache_if is None or cache_if(value)):
+            with self._lock:
+                # An invalidate() during the load means the value may predate the write
+                if self._generation(download_type) == generation:
+                    self._entries[key] = (now, value)
+        return copy.deepcopy(value)
+
+    def invalidate(self, download_type: str = None):
+        """
+        Drop cached statistics
+
+        Args:
+            download_type: Type to drop, or None for all types
+        """
+        with self._lock:
+            if download_type is None:
+                self._generation_all += 1
+                self._entries.clear()
+            else:
+                self._generations[download_type] = self._generations.get(download_type, 0) + 1
+                for key in [k for k in self._entries if k[0] == download_type]:
+                    del self._entries[key]
+        logger.debug(f"Invalidated history stats cache: {download_type or 'all'}")
+
+
+# Shared by HistoryManagerDB and DownloadHistoryDB
+history_stats_cache = HistoryStatsCache()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Import Generation - Cache results that only change when new claims are imported
+
+The import generation is a cheap fingerprint of eclaim_imported_files
+(file count, imported records, last update). It changes whenever an import
+finishes, a file is re-imported or deleted, in this process or any other, so
+expensive whole-table analytics can be cached until the next import instead
+of for a fixed TTL.
+
+Usage:
+    from utils.import_generation import generation_cache, get_import_generation
+
+    generation = get_import_generation(conn)
+    result = generation_cache.get_or_compute('anomalies', generation, compute_fn)
+"""
+
+import copy
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def get_import_generation(conn) -> Tuple:
+    """
+    Fingerprint of the imported REP files
+
+    Args:
+        conn: Database connection
+
+    Returns:
+        (file_count, imported_records, last_updated) - equal tuples mean no
+        import has finished in between
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(imported_records), 0), MAX(updated_at)
+            FROM eclaim_imported_files
+        """)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return (int(row[0] or 0), int(row[1] or 0), str(row[2])) if row else (0, 0, None)
+
+
+class GenerationCache:
+    """Thread-safe cache whose entries are valid for one import generation"""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[Tuple, Any]] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, generation: Tuple, compute_fn: Callable[[], Any]) -> Any:
+        """
+        Return the value cached for this generation, computing it on a miss
+
+        Concurrent misses for the same key compute it once; other callers
+        wait for the result.
+
+        Args:
+            key: Cache key (e.g. 'anomalies')
+            generation: Value from get_import_generation()
+            compute_fn: Callable that computes the value
+
+        Returns:
+            A copy of the cached value, safe for callers to modify
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        if entry and entry[0] == generation:
+            return copy.deepcopy(entry[1])
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if not entry or entry[0] != generation:
+                entry = (generation, compute_fn())
+                with self._lock:
+                    self._entries[key] = entry
+                logger.debug(f"Computed {key} for import generation {generation}")
+        return copy.deepcopy(entry[1])
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one cached key, or all keys"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# Shared by the predictive analytics endpoints
+generation_cache = GenerationCache()
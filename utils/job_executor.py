@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Job Executor - In-process background jobs with a persistent queue
+
+Jobs are stored in a SQLite queue (JOB_QUEUE_PATH) shared by all workers on
+the host, and run by a fixed pool of warm threads per pool, so a job starts
+without spawning an interpreter or re-importing pandas and the database
+drivers. Each pool's concurrency limit (JOB_POOLS) is enforced across
+processes when jobs are claimed.
+
+Handlers receive a JobContext with a cancellation token that they check
+between units of work; cancel() sets the token instead of sending SIGTERM.
+Jobs still queued when the process stops run after a restart; jobs that were
+running in a process that no longer exists are marked interrupted.
+
+Usage:
+    from utils.job_executor import job_executor
+
+    job_executor.register('import', run_import_job, pool='import')
+    job_id = job_executor.submit('import', {'import_type': 'rep'}, exclusive=True)
+    job_executor.get_job(job_id)
+    job_executor.cancel(job_id)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'data/job_queue.sqlite3')
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))
+JOB_POOLS = {
+    'import': int(os.getenv('JOB_IMPORT_WORKERS', 1)),
+    'download': int(os.getenv('JOB_DOWNLOAD_WORKERS', 1)),
+}
+DEFAULT_POOL_SIZE = 1
+
+# Seconds between checks for cancel requests made by other processes
+CANCEL_CHECK_INTERVAL = 1.0
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+INTERRUPTED = 'interrupted'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_COLUMNS = ('id', 'job_type', 'pool', 'status', 'params', 'progress', 'result', 'error',
+            'cancel_requested', 'owner_pid', 'created_at', 'started_at', 'finished_at')
+
+
+class JobCancelled(Exception):
+    """Raised by CancellationToken.raise_if_cancelled()"""
+
+
+class CancellationToken:
+    """Cooperative cancellation flag checked by job handlers"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Request cancellation"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancellation was requested"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class JobContext:
+    """Job parameters, cancellation token and progress reporting for a handler"""
+
+    def __init__(self, executor: 'JobExecutor', job_id: str, params: Dict[str, Any], token: CancellationToken):
+        self.executor = executor
+        self.job_id = job_id
+        self.params = params
+        self.token = token
+        self.progress: Dict[str, Any] = {}
+        self._last_cancel_check = time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        """True if the job was cancelled here or (checked at most every second) by another process"""
+        if self.token.cancelled:
+            return True
+        now = time.monotonic()
+        if now - self._last_cancel_check >= CANCEL_CHECK_INTERVAL:
+            self._last_cancel_check = now
+            if self.executor._cancel_requested(self.job_id):
+                self.token.cancel()
+        return self.token.cancelled
+
+    def update_progress(self, **fields):
+        """Merge fields into the job's stored progress"""
+        self.progress.update(fields)
+        if self.executor._save_progress(self.job_id, self.progress):
+            self.token.cancel()
+
+
+# Executors created in this process, by instance ID
+_live_executors: 'weakref.WeakValueDictionary[str, JobExecutor]' = weakref.WeakValueDictionary()
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """Check whether a process exists (signal 0)"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class JobExecutor:
+    """Persistent job queue with fixed per-pool worker threads"""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, pools: Optional[Dict[str, int]] = None,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        """
+        Initialize executor (the queue file is created on first use)
+
+        Args:
+            path: SQLite queue file
+            pools: Worker count per pool (unlisted pools get DEFAULT_POOL_SIZE)
+            poll_interval: Seconds idle workers wait before checking the queue
+                for jobs submitted by other processes
+        """
+        self.path = str(path)
+        self.pools = dict(JOB_POOLS if pools is None else pools)
+        self.poll_interval = poll_interval
+
+        self._handlers: Dict[str, Tuple[Callable[[JobContext], Any], str]] = {}
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._workers: Dict[str, List[threading.Thread]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._local = threading.local()
+        self._schema_ready = False
+        self._stopping = False
+        # Distinguishes this executor from an earlier process that had the same PID
+        self._instance_id = uuid.uuid4().hex
+        _live_executors[self._instance_id] = self
+
+    def register(self, job_type: str, handler: Callable[[JobContext], Any], pool: str = 'default'):
+        """
+        Register the handler for a job type
+
+        Args:
+            job_type: Job type name
+            handler: Callable taking a JobContext; its return value is stored as the result
+            pool: Worker pool that runs this job type
+        """
+        with self._lock:
+            self._handlers[job_type] = (handler, pool)
+
+    def start(self):
+        """Start worker pools for registered job types (runs jobs queued before a restart)"""
+        with self._lock:
+            pools = {pool for _, pool in self._handlers.values()}
+        for pool in pools:
+            self._ensure_workers(pool)
+
+    def shutdown(self):
+        """Stop workers after their current job"""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+
+    def submit(self, job_type: str, params: Optional[Dict[str, Any]] = None, exclusive: bool = False) -> str:
+        """
+        Queue a job
+
+        Args:
+            job_type: Registered job type
+            params: JSON-serializable parameters passed to the handler
+            exclusive: Refuse if the job type's pool already has a queued or running job
+
+        Returns:
+            job_id: UUID of the queued job
+
+        Raises:
+            ValueError: If the job type is unknown, or exclusive and the pool is busy
+        """
+        with self._lock:
+            if job_type not in self._handlers:
+                raise ValueError(f"Unknown job type: {job_type}")
+            pool = self._handlers[job_type][1]
+
+        job_id = str(uuid.uuid4())
+        conn = self._connection()
+        with self._transaction(conn):
+            if exclusive:
+                self._expire_dead_owners(conn, pool)
+                busy = conn.execute(
+                    'SELECT job_type FROM jobs WHERE pool = ? AND status IN (?, ?) LIMIT 1',
+                    (pool, *ACTIVE_STATUSES)
+                ).fetchone()
+                if busy:
+                    raise ValueError(f"A {busy[0]} job is already queued or running")
+
+            conn.execute(
+                'INSERT INTO jobs (id, job_type, pool, status, params, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, job_type, pool, QUEUED, json.dumps(params or {}, default=str), _now())
+            )
+
+        self._ensure_workers(pool)
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job, or ask a running job to stop
+
+        Returns:
+            True if the job was queued or running
+        """
+        conn = self._connection()
+        with self._transaction(conn):
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if not row or row[0] not in ACTIVE_STATUSES:
+                return False
+            if row[0] == QUEUED:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ?',
+                    (CANCELLED, _now(), job_id)
+                )
+            else:
+                conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+
+        with self._lock:
+            token = self._tokens.get(job_id)
+        if token:
+            token.cancel()
+        return True
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def list_jobs(self, job_type: Optional[str] = None, pool: Optional[str] = None,
+                  statuses: Optional[Iterable[str]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """List jobs, newest first"""
+        conditions, params = [], []
+        if job_type:
+            conditions.append('job_type = ?')
+            params.append(job_type)
+        if pool:
+            conditions.append('pool = ?')
+            params.append(pool)
+        if statuses:
+            statuses = list(statuses)
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self._connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs {where} ORDER BY created_at DESC, rowid DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def active_job(self, pool: str) -> Optional[Dict[str, Any]]:
+        """Oldest queued or running job in a pool (read-only; workers expire jobs of dead processes)"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE pool = ? AND status IN (?, ?) "
+            f"ORDER BY created_at, rowid LIMIT 1",
+            (pool, *ACTIVE_STATUSES)
+        ).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes (or timeout) and return it"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if not job or job['status'] not in ACTIVE_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(0.05)
+
+    # Workers
+
+    def _ensure_workers(self, pool: str):
+        """Start the pool's worker threads if they are not running"""
+        with self._lock:
+            if self._stopping:
+                return
+            workers = [t for t in self._workers.get(pool, []) if t.is_alive()]
+            for i in range(len(workers), self.pools.get(pool, DEFAULT_POOL_SIZE)):
+                thread = threading.Thread(target=self._work, args=(pool,), name=f'job-{pool}-{i}', daemon=True)
+                thread.start()
+                workers.append(thread)
+            self._workers[pool] = workers
+
+    def _work(self, pool: str):
+        """Worker loop: claim and run jobs until shutdown"""
+        while not self._stopping:
+            try:
+                job = self._claim(pool)
+            except sqlite3.Error as e:
+                logger.error(f"Error claiming {pool} job: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+
+            self._run(*job)
+
+    def _claim(self, pool: str) -> Optional[Tuple[str, str, str]]:
+        """Mark the oldest runnable job as running, respecting the pool limit across processes"""
+        with self._lock:
+            job_types = [t for t, (_, p) in self._handlers.items() if p == pool]
+        if not job_types:
+            return None
+
+        conn = self._connection()
+        with self._transaction(conn):
+            self._expire_dead_owners(conn, pool)
+
+            running = conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE pool = ? AND status = ?', (pool, RUNNING)
+            ).fetchone()[0]
+            if running >= self.pools.get(pool, DEFAULT_POOL_SIZE):
+                return None
+
+            row = conn.execute(
+                f"SELECT id, job_type, params FROM jobs WHERE pool = ? AND status = ? "
+                f"AND job_type IN ({', '.join('?' * len(job_types))}) ORDER BY created_at, rowid LIMIT 1",
+                (pool, QUEUED, *job_types)
+            ).fetchone()
+            if not row:
+                return None
+
+            conn.execute(
+                'UPDATE jobs SET status = ?, started_at = ?, owner_pid = ?, owner_id = ? WHERE id = ?',
+                (RUNNING, _now(), os.getpid(), self._instance_id, row[0])
+            )
+            # Registered before commit so _expire_dead_owners never sees it unowned
+            with self._lock:
+                self._tokens[row[0]] = CancellationToken()
+            return row
+
+    def _run(self, job_id: str, job_type: str, params: str):
+        """Run one claimed job and record its outcome"""
+        with self._lock:
+            handler = self._handlers[job_type][0]
+            token = self._tokens[job_id]
+
+        context = JobContext(self, job_id, json.loads(params or '{}'), token)
+        status, result, error = COMPLETED, None, None
+
+        try:
+            if self._cancel_requested(job_id):
+                token.cancel()
+            token.raise_if_cancelled()
+            logger.info(f"Job {job_id} ({job_type}) started")
+            result = handler(context)
+            if token.cancelled:
+                status = CANCELLED
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job_type}) failed: {e}", exc_info=True)
+            status, error = FAILED, str(e)
+
+        try:
+            self._connection().execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, progress = ?, finished_at = ? WHERE id = ?',
+                (status, json.dumps(result, default=str), error,
+                 json.dumps(context.progress, default=str), _now(), job_id)
+            )
+            logger.info(f"Job {job_id} ({job_type}) {status}")
+        except sqlite3.Error as e:
+            logger.error(f"Error recording outcome of job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._tokens.pop(job_id, None)
+
+    def _expire_dead_owners(self, conn: sqlite3.Connection, pool: str):
+        """Mark running jobs whose process is gone as interrupted (caller holds a transaction)"""
+        rows = conn.execute(
+            'SELECT id, owner_pid, owner_id FROM jobs WHERE pool = ? AND status = ?', (pool, RUNNING)
+        ).fetchall()
+
+        for job_id, owner_pid, owner_id in rows:
+            owner = _live_executors.get(owner_id)
+            if owner is not None:
+                with owner._lock:
+                    alive = job_id in owner._tokens
+            elif owner_pid == os.getpid():
+                alive = False  # Left behind by an earlier process with our PID
+            else:
+                alive = _pid_alive(owner_pid)
+
+            if not alive:
+                logger.warning(f"Job {job_id} was running in a process that exited, marking interrupted")
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                    (INTERRUPTED, 'Worker process exited while the job was running', _now(), job_id)
+                )
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = self._connection().execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _save_progress(self, job_id: str, progress: Dict[str, Any]) -> bool:
+        """Store progress and return whether cancellation was requested"""
+        try:
+            row = self._connection().execute(
+                'UPDATE jobs SET progress = ? WHERE id = ? RETURNING cancel_requested',
+                (json.dumps(progress, default=str), job_id)
+            ).fetchone()
+            return bool(row and row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Could not save progress for job {job_id}: {e}")
+            return False
+
+    # Storage
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            if not self._schema_ready:
+                self._create_schema(conn)
+                self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                pool TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner_pid INTEGER,
+                owner_id TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_pool_status ON jobs (pool, status, created_at)')
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn: sqlite3.Connection):
+        """Write transaction that serializes claims across processes"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _row_to_dict(row: Tuple) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS, row))
+    for key in ('params', 'progress', 'result'):
+        job[key] = json.loads(job[key]) if job[key] else ({} if key != 'result' else None)
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+
+# Shared by the import runner and the app
+job_executor = JobExecutor()
@@ -12,7 +12,8 @@ import os
 import jwt
 import json
 import socket
-import requests
+import threading
+import time
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -39,8 +40,22 @@ class LicenseChecker:
     - JWT-based license tokens (RS256)
     - Tier-based feature restrictions
     - Grace period for expired licenses
+
+    The signature is verified once and the result kept in memory. It is
+    re-verified when the license or settings file changes (mtime/size), on
+    install/remove, at expiry boundaries, or after _cache_ttl seconds, so
+    per-request checks are dictionary lookups.
     """
 
+    # Days before expiry when status becomes 'expiring_soon'
+    EXPIRING_SOON_DAYS = 30
+
+    # Seconds between license/settings file mtime checks
+    FILE_CHECK_INTERVAL = 1.0
+
+    # Bumped by SettingsManager.save_settings so in-process changes apply at once
+    settings_generation = 0
+
     # License tiers and their features
     TIER_FEATURES = {
         'free': {
@@ -138,14 +153,20 @@ class LicenseChecker:
         }
     }
 
-    def __init__(self, license_file='config/license.json'):
+    def __init__(self, license_file='config/license.json', license_lic_file='config/license.lic'):
         self.license_file = Path(license_file)
-        self.license_lic_file = Path('config/license.lic')  # JWT RS256 format
+        self.license_lic_file = Path(license_lic_file)  # JWT RS256 format
         self.license_file.parent.mkdir(exist_ok=True)
         self._cached_license = None
         self._cache_time = None
         self._cache_ttl = 3600  # Cache for 1 hour
 
+        # Verified license state (see _get_state)
+        self._state = None
+        self._state_lock = threading.Lock()
+        self._settings_file = None
+        self.revision = 0  # Incremented every time the license is re-verified
+
         # License server URL for activation notifications (hardcoded for production)
         self.license_server_url = 'https://license.aegisxplatform.com'
 
@@ -180,6 +201,8 @@ class LicenseChecker:
         Returns:
             Tuple of (success: bool, message: str)
         """
+        import requests  # Deferred: only needed when talking to the license server
+
         try:
             url = f"{self.license_server_url}/api/license/activate"
 
@@ -227,6 +250,8 @@ class LicenseChecker:
         Returns:
             Tuple of (success: bool, message: str)
         """
+        import requests
+
         try:
             url = f"{self.license_server_url}/api/license/deactivate"
 
@@ -373,9 +398,7 @@ class LicenseChecker:
             with open(self.license_file, 'w', encoding='utf-8') as f:
                 json.dump(license_data, f, ensure_ascii=False, indent=2)
 
-            # Clear cache
-            self._cached_license = None
-            self._cache_time = None
+            self.invalidate()
 
             return True
         except Exception as e:
@@ -456,9 +479,7 @@ class LicenseChecker:
             if self.license_file.exists():
                 self.license_file.unlink()
 
-            # Clear cache
-            self._cached_license = None
-            self._cache_time = None
+            self.invalidate()
 
             # Get license info
             metadata = license_package.get('metadata', {})
@@ -478,6 +499,7 @@ class LicenseChecker:
                 # Remove the installed file since server rejected it
                 if self.license_lic_file.exists():
                     self.license_lic_file.unlink()
+                self.invalidate()
                 return False, f"License rejected by server: {activation_msg}"
 
             # Build success message with activation status
@@ -496,9 +518,106 @@ class LicenseChecker:
         except Exception as e:
             return False, f"Error installing license: {str(e)}"
 
+    # ==========================================================================
+    # Verified State Cache
+    # ==========================================================================
+
+    def invalidate(self):
+        """Drop cached license data so the next check re-reads and re-verifies"""
+        with self._state_lock:
+            self._cached_license = None
+            self._cache_time = None
+            self._state = None
+
+    def _get_settings_file(self) -> Optional[Path]:
+        """Settings file path (hospital code is part of license validation)"""
+        if self._settings_file is None:
+            try:
+                self._settings_file = get_settings_manager().settings_file
+            except Exception:
+                return None
+        return self._settings_file
+
+    def _file_signature(self) -> Tuple:
+        """mtime/size of license and settings files; any change forces re-verification"""
+        signature = []
+        for path in (self.license_lic_file, self.license_file, self._get_settings_file()):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except (OSError, TypeError):
+                signature.append(None)
+        return tuple(signature)
+
+    def _next_refresh(self, payload: Dict) -> float:
+        """Epoch time of the next status boundary (expiring soon, expired, grace ended)"""
+        now = time.time()
+        boundaries = [now + self._cache_ttl]
+
+        exp = payload.get('exp')
+        if exp:
+            grace_days = payload.get('grace_period_days', 90)
+            for boundary in (exp - self.EXPIRING_SOON_DAYS * 86400, exp, exp + grace_days * 86400):
+                if boundary > now:
+                    boundaries.append(boundary)
+
+        return min(boundaries)
+
+    def _get_state(self) -> Dict:
+        """
+        Return the verified license state, re-verifying only when needed
+
+        Returns:
+            Dict with verified (is_valid, payload, error), info, state,
+            signature, settings_generation, checked_at and refresh_at
+        """
+        now = time.time()
+        state = self._state
+        if state is not None and now < state['refresh_at'] \
+                and state['settings_generation'] == LicenseChecker.settings_generation:
+            # stat() the files at most once per FILE_CHECK_INTERVAL
+            if now - state['checked_at'] < self.FILE_CHECK_INTERVAL:
+                return state
+            if state['signature'] == self._file_signature():
+                state['checked_at'] = now
+                return state
+
+        with self._state_lock:
+            signature = self._file_signature()
+            generation = LicenseChecker.settings_generation
+            state = self._state
+            if state is not None and time.time() < state['refresh_at'] and state['signature'] == signature \
+                    and state['settings_generation'] == generation:
+                return state
+
+            # Files changed or boundary passed - read from disk again
+            self._cached_license = None
+            self._cache_time = None
+
+            is_valid, payload, error = self._verify_license_uncached()
+            if not is_valid:
+                license_state = 'free'
+            elif payload.get('_grace_period', False):
+                license_state = 'grace_period'
+            else:
+                license_state = 'active'
+
+            self.revision += 1
+            state = {
+                'signature': signature,
+                'settings_generation': generation,
+                'checked_at': time.time(),
+                'refresh_at': self._next_refresh(payload),
+                'verified': (is_valid, payload, error),
+                'info': self._build_license_info(is_valid, payload, error),
+                'state': license_state,
+            }
+            self._state = state
+            return state
+
     def verify_license(self) -> Tuple[bool, Dict, Optional[str]]:
         """
-        Verify license token using public key
+        Verify license token using public key (cached, see _get_state)
 
         Returns:
             (is_valid, license_info, error_message)
@@ -506,6 +625,11 @@ class LicenseChecker:
             - license_info: Decoded license payload
             - error_message: Error description if invalid
         """
+        is_valid, payload, error = self._get_state()['verified']
+        return is_valid, dict(payload), error
+
+    def _verify_license_uncached(self) -> Tuple[bool, Dict, Optional[str]]:
+        """Read the license file and verify its signature and hospital code"""
         license_data = self.load_license()
 
         if not license_data:
@@ -586,8 +710,10 @@ class LicenseChecker:
         Returns:
             Dict with license status, tier, features, expiration, etc.
         """
-        is_valid, payload, error = self.verify_license()
+        return dict(self._get_state()['info'])
 
+    def _build_license_info(self, is_valid: bool, payload: Dict, error: Optional[str]) -> Dict:
+        """Build the get_license_info() dict from a verification result"""
         if not is_valid:
             # No license or invalid → Free tier (SMT only)
             return {
@@ -620,7 +746,7 @@ class LicenseChecker:
         status = 'active'
         if payload.get('_grace_period'):
             status = 'grace_period'
-        elif days_until_expiry is not None and days_until_expiry <= 30:
+        elif days_until_expiry is not None and days_until_expiry <= self.EXPIRING_SOON_DAYS:
             status = 'expiring_soon'
 
         return {
@@ -653,18 +779,7 @@ class LicenseChecker:
         Returns:
             License state string ('active', 'grace_period', or 'free')
         """
-        is_valid, payload, error = self.verify_license()
-
-        # If verification failed completely (no license or invalid)
-        if not is_valid:
-            return 'free'
-
-        # Check if in grace period
-        if payload.get('_grace_period', False):
-            return 'grace_period'
-
-        # Valid and not expired
-        return 'active'
+        return self._get_state()['state']
 
     def check_feature_access(self, feature: str) -> bool:
         """
@@ -676,7 +791,7 @@ class LicenseChecker:
         Returns:
             True if feature is accessible
         """
-        info = self.get_license_info()
+        info = self._get_state()['info']
 
         if not info['is_valid']:
             # Free tier - limited features (SMT only)
@@ -696,7 +811,7 @@ class LicenseChecker:
         Returns:
             True if within limits
         """
-        info = self.get_license_info()
+        info = self._get_state()['info']
 
         # Check custom limits first
         custom_limits = info.get('custom_limits', {})
@@ -761,9 +876,7 @@ class LicenseChecker:
             if self.license_file.exists():
                 self.license_file.unlink()
 
-            # Clear cache
-            self._cached_license = None
-            self._cache_time = None
+            self.invalidate()
 
             # Notify license server about deactivation
             if license_key:
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+Claim Anomaly Detection - Single-pass statistics over claim amounts
+
+Streams (id, claim, reimbursement, RW, scheme, DRG) from
+claim_rep_opip_nhso_item once through a server-side cursor into NumPy
+chunks and computes everything /api/predictive/anomalies needs from that
+pass: mean/std/min/max, quartiles and IQR bounds (overall and per scheme or
+DRG), z-scores, and the top high-value, high-variance and high-RW claims.
+Only the few outlier rows are read again, by primary key, for display.
+
+Quartiles are exact (same as PERCENTILE_CONT) up to ANOMALY_EXACT_MAX_ROWS
+claims. Beyond that the amounts are folded into log-spaced buckets
+(relative error ANOMALY_SKETCH_ACCURACY) so memory no longer grows with the
+table; means, counts and the top-N lists stay exact.
+
+Results are cached per import generation (see utils.import_generation).
+
+Usage:
+    from utils.ml.anomaly_detector import get_claim_anomalies
+
+    result = get_claim_anomalies(conn, segment='drg')
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.database import DB_TYPE
+from utils.import_generation import generation_cache, get_import_generation
+from utils.sql_helpers import sql_cast_float
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_CHUNK_ROWS = int(os.getenv('ANOMALY_CHUNK_ROWS', 50000))
+ANOMALY_EXACT_MAX_ROWS = int(os.getenv('ANOMALY_EXACT_MAX_ROWS', 2000000))
+ANOMALY_SKETCH_ACCURACY = float(os.getenv('ANOMALY_SKETCH_ACCURACY', 0.01))
+
+TOP_N = 20
+RW_TOP_N = 15
+SEGMENT_OUTLIERS_TOP_N = 20
+
+# segment name -> column
+SEGMENT_COLUMNS = {
+    'scheme': 'main_inscl',
+    'drg': 'drg',
+}
+
+
+class LogBucketSketch:
+    """
+    Quantile sketch with log-spaced buckets per segment
+
+    A value v > 1 goes to bucket ceil(log(v) / log(gamma)); values <= 1 share
+    bucket 0. Any quantile is returned within relative_accuracy of a value in
+    that bucket, independent of how many values were added.
+    """
+
+    MAX_VALUE = 1e10
+
+    def __init__(self, relative_accuracy: float = ANOMALY_SKETCH_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.n_buckets = int(np.ceil(np.log(self.MAX_VALUE) / self.log_gamma)) + 1
+        self.counts = np.zeros((1, self.n_buckets), dtype=np.int64)
+
+    def _buckets(self, values: np.ndarray) -> np.ndarray:
+        clipped = np.clip(values, 1.0, self.MAX_VALUE)
+        return np.ceil(np.log(clipped) / self.log_gamma).astype(np.int64)
+
+    def _value(self, bucket: np.ndarray) -> np.ndarray:
+        """Representative value of a bucket"""
+        return np.where(bucket == 0, 0.0, 2 * self.gamma ** bucket / (self.gamma + 1))
+
+    def add(self, values: np.ndarray, segments: Optional[np.ndarray] = None):
+        """Add values, optionally per segment code"""
+        if segments is None:
+            segments = np.zeros(len(values), dtype=np.int64)
+        n_segments = int(segments.max()) + 1 if len(segments) else 1
+        if n_segments > self.counts.shape[0]:
+            grown = np.zeros((n_segments, self.n_buckets), dtype=np.int64)
+            grown[:self.counts.shape[0]] = self.counts
+            self.counts = grown
+        keys = segments * self.n_buckets + self._buckets(values)
+        flat = np.bincount(keys, minlength=self.counts.size)
+        self.counts += flat[:self.counts.size].reshape(self.counts.shape)
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Quantiles per segment, shape (n_segments, len(qs))"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        totals = cumulative[:, -1:]
+        result = np.zeros((self.counts.shape[0], len(qs)))
+        for i, q in enumerate(qs):
+            rank = np.floor(q * np.maximum(totals - 1, 0))
+            bucket = (cumulative <= rank).sum(axis=1)
+            result[:, i] = self._value(np.minimum(bucket, self.n_buckets - 1))
+        return result
+
+    def count_above(self, bounds: np.ndarray) -> np.ndarray:
+        """Approximate number of values above a bound, per segment"""
+        bucket = self._buckets(np.maximum(np.asarray(bounds, dtype=np.float64), 1.0))
+        columns = np.arange(self.n_buckets)
+        return (self.counts * (columns[None, :] > bucket[:, None])).sum(axis=1)
+
+    def count_below(self, bounds: np.ndarray) -> np.ndarray:
+        """Approximate number of values below a bound, per segment"""
+        bounds = np.asarray(bounds, dtype=np.float64)
+        bucket = self._buckets(np.maximum(bounds, 1.0))
+        columns = np.arange(self.n_buckets)
+        below = (self.counts * (columns[None, :] < bucket[:, None])).sum(axis=1)
+        return np.where(bounds > 0, below, 0)
+
+
+class _Moments:
+    """Count, sum, sum of squares, min and max per segment"""
+
+    def __init__(self):
+        self.count = np.zeros(0)
+        self.total = np.zeros(0)
+        self.squares = np.zeros(0)
+        self.low = np.zeros(0)
+        self.high = np.zeros(0)
+
+    def add(self, values: np.ndarray, segments: np.ndarray, n_segments: int):
+        if n_segments > len(self.count):
+            grow = n_segments - len(self.count)
+            self.count = np.concatenate([self.count, np.zeros(grow)])
+            self.total = np.concatenate([self.total, np.zeros(grow)])
+            self.squares = np.concatenate([self.squares, np.zeros(grow)])
+            self.low = np.concatenate([self.low, np.full(grow, np.inf)])
+            self.high = np.concatenate([self.high, np.full(grow, -np.inf)])
+        self.count += np.bincount(segments, minlength=n_segments)
+        self.total += np.bincount(segments, weights=values, minlength=n_segments)
+        self.squares += np.bincount(segments, weights=values * values, minlength=n_segments)
+        np.minimum.at(self.low, segments, values)
+        np.maximum.at(self.high, segments, values)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return np.divide(self.total, self.count, out=np.zeros_like(self.total), where=self.count > 0)
+
+    @property
+    def std(self) -> np.ndarray:
+        """Sample standard deviation (as SQL STDDEV on PostgreSQL)"""
+        n = self.count
+        variance = np.divide(self.squares - self.total * self.mean, n - 1,
+                             out=np.zeros_like(self.total), where=n > 1)
+        return np.sqrt(np.maximum(variance, 0))
+
+
+class _TopN:
+    """Largest n values seen so far, with their claim ids"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.values = np.zeros(0)
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    def add(self, values: np.ndarray, ids: np.ndarray):
+        values = np.concatenate([self.values, values])
+        ids = np.concatenate([self.ids, ids])
+        if len(values) > self.n:
+            keep = np.argpartition(values, -self.n)[-self.n:]
+            values, ids = values[keep], ids[keep]
+        self.values, self.ids = values, ids
+
+    def sorted(self):
+        order = np.argsort(-self.values, kind='stable')
+        return self.values[order], self.ids[order]
+
+
+class _SegmentCodes:
+    """Encodes segment values (scheme, DRG) as dense integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, values: List) -> np.ndarray:
+        unique, inverse = np.unique(np.array([v or '' for v in values], dtype=str), return_inverse=True)
+        mapped = np.array([self.codes.setdefault(u, len(self.codes)) for u in unique], dtype=np.int64)
+        return mapped[inverse] if len(mapped) else np.zeros(0, dtype=np.int64)
+
+    def labels(self) -> List[str]:
+        return list(self.codes)
+
+
+def _quartiles(values: np.ndarray, segments: np.ndarray, n_segments: int) -> np.ndarray:
+    """Exact (linear) quartiles per segment, shape (n_segments, 3)"""
+    order = np.lexsort((values, segments))
+    ordered = values[order]
+    counts = np.bincount(segments, minlength=n_segments)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    result = np.zeros((n_segments, 3))
+    present = counts > 0
+    for i, q in enumerate((0.25, 0.5, 0.75)):
+        position = starts + q * np.maximum(counts - 1, 0)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        fraction = position - low
+        low, high = np.minimum(low, len(ordered) - 1), np.minimum(high, len(ordered) - 1)
+        if len(ordered):
+            result[:, i] = np.where(present, ordered[low] + (ordered[high] - ordered[low]) * fraction, 0)
+    return result
+
+
+class ClaimAnomalyDetector:
+    """Computes claim amount statistics and outliers in one pass over the claims table"""
+
+    def __init__(self, chunk_rows: int = ANOMALY_CHUNK_ROWS, exact_max_rows: int = ANOMALY_EXACT_MAX_ROWS):
+        self.chunk_rows = chunk_rows
+        self.exact_max_rows = exact_max_rows
+
+    def _stream_cursor(self, conn):
+        """Server-side cursor so the table is never materialised client-side"""
+        try:
+            if DB_TYPE == 'mysql':
+                import pymysql.cursors
+                return conn.cursor(pymysql.cursors.SSCursor)
+            cursor = conn.cursor(name='claim_anomaly_scan')
+            cursor.itersize = self.chunk_rows
+            return cursor
+        except (ImportError, TypeError) as e:
+            logger.debug(f"Server-side cursor unavailable, using a client cursor: {e}")
+            return conn.cursor()
+
+    def analyze(self, conn) -> Dict:
+        """Stream the claims once and compute overall and per-segment statistics"""
+        claim = sql_cast_float('claim_drg')
+        reimb = sql_cast_float('reimb_nhso')
+        rw = sql_cast_float('rw')
+
+        encoders = {name: _SegmentCodes() for name in SEGMENT_COLUMNS}
+        overall = _Moments()
+        segment_moments = {name: _Moments() for name in SEGMENT_COLUMNS}
+        variance_moments = _Moments()
+        rw_moments = _Moments()
+        top_claims, top_variance, top_rw = _TopN(TOP_N), _TopN(TOP_N), _TopN(RW_TOP_N)
+
+        kept = {'ids': [], 'claims': [], **{name: [] for name in SEGMENT_COLUMNS}}
+        sketch = None
+        total_rows = 0
+
+        cursor = self._stream_cursor(conn)
+        try:
+            cursor.execute(f"""
+                SELECT id, {claim}, {reimb}, {rw}, {', '.join(SEGMENT_COLUMNS.values())}
+                FROM claim_rep_opip_nhso_item
+                WHERE claim_drg IS NOT NULL
+            """)
+            while True:
+                rows = cursor.fetchmany(self.chunk_rows)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                ids = np.array(columns[0], dtype=np.int64)
+                claims = np.array(columns[1], dtype=np.float64)
+                reimbs = np.array(columns[2], dtype=np.float64)
+                rws = np.array(columns[3], dtype=np.float64)
+                codes = {name: encoders[name].encode(columns[4 + i])
+                         for i, name in enumerate(SEGMENT_COLUMNS)}
+                zeros = np.zeros(len(ids), dtype=np.int64)
+                total_rows += len(ids)
+
+                overall.add(claims, zeros, 1)
+                top_claims.add(claims, ids)
+                for name, segment_codes in codes.items():
+                    segment_moments[name].add(claims, segment_codes, len(encoders[name].codes))
+
+                has_reimb = ~np.isnan(reimbs)
+                variance = np.abs(claims[has_reimb] - reimbs[has_reimb])
+                variance_moments.add(variance, zeros[has_reimb], 1)
+                top_variance.add(variance, ids[has_reimb])
+
+                has_rw = ~np.isnan(rws)
+                rw_moments.add(rws[has_rw], zeros[has_rw], 1)
+                top_rw.add(rws[has_rw], ids[has_rw])
+
+                if sketch is None:
+                    kept['ids'].append(ids)
+                    kept['claims'].append(claims)
+                    for name, segment_codes in codes.items():
+                        kept[name].append(segment_codes)
+                    if total_rows > self.exact_max_rows:
+                        logger.info(f"Anomaly scan passed {self.exact_max_rows:,} claims, switching to sketch quantiles")
+                        sketch = self._fold_into_sketches(kept)
+                        kept = None
+                else:
+                    sketch['overall'].add(claims)
+                    for name, segment_codes in codes.items():
+                        sketch[name].add(claims, segment_codes)
+        finally:
+            cursor.close()
+
+        exact = None
+        if sketch is None:
+            exact = {key: np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float64 if key == 'claims' else np.int64)
+                     for key, chunks in kept.items()}
+
+        stats, bounds, summary = self._overall(overall, exact, sketch)
+
+        high_values, high_ids = top_claims.sorted()
+        high_ids = high_ids[high_values > bounds['upper']]
+
+        variance_threshold = 3 * float(variance_moments.mean[0]) if len(variance_moments.count) else 0
+        variance_values, variance_ids = top_variance.sorted()
+        variance_ids = variance_ids[variance_values > variance_threshold]
+
+        rw_ids = np.zeros(0, dtype=np.int64)
+        if len(rw_moments.count) and rw_moments.mean[0] > 0:
+            rw_std = float(rw_moments.std[0]) or 1
+            rw_values, rw_ids = top_rw.sorted()
+            rw_ids = rw_ids[rw_values > rw_moments.mean[0] + 2 * rw_std]
+
+        segments = {
+            name: self._segments(name, encoders[name].labels(), segment_moments[name], exact, sketch)
+            for name in SEGMENT_COLUMNS
+        }
+
+        return {
+            'method': 'exact' if exact is not None else 'sketch',
+            'statistics': stats,
+            'bounds': bounds,
+            'summary': summary,
+            'high_value_ids': high_ids.tolist(),
+            'variance_ids': variance_ids.tolist(),
+            'rw_ids': rw_ids.tolist(),
+            'segments': segments,
+        }
+
+    def _fold_into_sketches(self, kept: Dict) -> Dict[str, LogBucketSketch]:
+        """Move the amounts kept so far into per-segment sketches"""
+        claims = np.concatenate(kept['claims'])
+        sketch = {'overall': LogBucketSketch()}
+        sketch['overall'].add(claims)
+        for name in SEGMENT_COLUMNS:
+            sketch[name] = LogBucketSketch()
+            sketch[name].add(claims, np.concatenate(kept[name]))
+        return sketch
+
+    def _overall(self, moments: _Moments, exact: Optional[Dict], sketch: Optional[Dict]):
+        """Overall statistics, IQR bounds and outlier counts"""
+        if not len(moments.count) or moments.count[0] == 0:
+            empty = {'mean': 0, 'median': 0, 'std': 0, 'min': 0, 'max': 0, 'q1': 0, 'q3': 0}
+            return empty, {'lower': 0, 'upper': 0, 'iqr': 0}, \
+                {'total_claims': 0, 'high_value_anomalies': 0, 'low_value_anomalies': 0}
+
+        if exact is not None:
+            claims = exact['claims']
+            q1, median, q3 = np.percentile(claims, [25, 50, 75])
+        else:
+            q1, median, q3 = sketch['overall'].quantiles([0.25, 0.5, 0.75])[0]
+
+        iqr = q3 - q1
+        lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        if exact is not None:
+            high_count = int((claims > upper).sum())
+            low_count = int((claims < lower).sum()) if lower > 0 else 0
+        else:
+            high_count = int(sketch['overall'].count_above([upper])[0])
+            low_count = int(sketch['overall'].count_below([lower])[0])
+
+        stats = {
+            'mean': float(moments.mean[0]),
+            'median': float(median),
+            'std': float(moments.std[0]),
+            'min': float(moments.low[0]),
+            'max': float(moments.high[0]),
+            'q1': float(q1),
+            'q3': float(q3),
+        }
+        bounds = {'lower': max(0.0, float(lower)), 'upper': float(upper), 'iqr': float(iqr)}
+        summary = {
+            'total_claims': int(moments.count[0]),
+            'high_value_anomalies': high_count,
+            'low_value_anomalies': low_count,
+        }
+        return stats, bounds, summary
+
+    def _segments(self, name: str, labels: List[str], moments: _Moments,
+                  exact: Optional[Dict], sketch: Optional[Dict]) -> Dict:
+        """Per-segment statistics, outlier counts and (exact mode) top outliers by z-score"""
+        n_segments = len(labels)
+        if n_segments == 0:
+            return {'groups': [], 'outlier_ids': []}
+
+        if exact is not None:
+            quartiles = _quartiles(exact['claims'], exact[name], n_segments)
+        else:
+            quartiles = sketch[name].quantiles([0.25, 0.5, 0.75])[:n_segments]
+        q1, median, q3 = quartiles[:, 0], quartiles[:, 1], quartiles[:, 2]
+        iqr = q3 - q1
+        lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        mean, std = moments.mean, moments.std
+
+        outlier_ids = []
+        if exact is not None:
+            codes, claims = exact[name], exact['claims']
+            outliers = claims > upper[codes]
+            outlier_counts = np.bincount(codes[outliers], minlength=n_segments)
+            segment_std = std[codes[outliers]]
+            z = np.divide(claims[outliers] - mean[codes[outliers]], segment_std,
+                          out=np.zeros(int(outliers.sum())), where=segment_std > 0)
+            top = _TopN(SEGMENT_OUTLIERS_TOP_N)
+            top.add(z, exact['ids'][outliers])
+            _, top_ids = top.sorted()
+            outlier_ids = top_ids.tolist()
+        else:
+            outlier_counts = sketch[name].count_above(upper)[:n_segments]
+
+        groups = [{
+            'segment': labels[i] or None,
+            'count': int(moments.count[i]),
+            'mean': float(mean[i]),
+            'std': float(std[i]),
+            'median': float(median[i]),
+            'q1': float(q1[i]),
+            'q3': float(q3[i]),
+            'lower': max(0.0, float(lower[i])),
+            'upper': float(upper[i]),
+            'outlier_count': int(outlier_counts[i]),
+        } for i in range(n_segments)]
+        groups.sort(key=lambda g: (-g['outlier_count'], -g['count']))
+        return {'groups': groups, 'outlier_ids': outlier_ids}
+
+
+def _claim_details(conn, ids: List[int]) -> Dict[int, tuple]:
+    """Display columns for the outlier claims, read by primary key"""
+    if not ids:
+        return {}
+    cursor = conn.cursor()
+    try:
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            SELECT id, tran_id, hn, name, dateadm, service_type, drg,
+                   claim_drg, reimb_nhso, paid, error_code, rw, main_inscl
+            FROM claim_rep_opip_nhso_item
+            WHERE id IN ({placeholders})
+        """, ids)
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _number(value) -> float:
+    return float(value) if value else 0
+
+
+def _compute(conn) -> Dict:
+    """Analyze the claims and attach display rows for the outliers"""
+    result = ClaimAnomalyDetector().analyze(conn)
+    ids = set(result['high_value_ids']) | set(result['variance_ids']) | set(result['rw_ids'])
+    for segment in result['segments'].values():
+        ids.update(segment['outlier_ids'])
+    details = _claim_details(conn, sorted(ids))
+
+    stats = result['statistics']
+
+    def claim_row(claim_id, anomaly_type):
+        tran_id, hn, name, dateadm, service_type, drg, claim_drg, reimb_nhso, paid, error_code, rw, scheme = \
+            details[claim_id]
+        return {
+            'tran_id': tran_id,
+            'hn': hn,
+            'name': name,
+            'dateadm': dateadm.strftime('%Y-%m-%d') if dateadm else None,
+            'service_type': service_type,
+            'drg': drg,
+            'scheme': scheme,
+            'claim_drg': _number(claim_drg),
+            'reimb_nhso': _number(reimb_nhso),
+            'paid': _number(paid),
+            'rw': _number(rw),
+            'error_code': error_code,
+            'anomaly_type': anomaly_type,
+            'deviation': round((_number(claim_drg) - stats['mean']) / stats['std'], 2) if stats['std'] > 0 else 0,
+        }
+
+    high_value = [claim_row(i, 'high_value') for i in result.pop('high_value_ids') if i in details]
+    variance = []
+    for i in result.pop('variance_ids'):
+        if i in details:
+            row = claim_row(i, 'high_variance')
+            row['variance'] = row['claim_drg'] - row['reimb_nhso']
+            variance.append(row)
+    rw = [claim_row(i, 'high_rw') for i in result.pop('rw_ids') if i in details]
+
+    for name, segment in result['segments'].items():
+        by_label = {group['segment']: group for group in segment['groups']}
+        outliers = []
+        for i in segment.pop('outlier_ids'):
+            if i not in details:
+                continue
+            row = claim_row(i, 'segment_outlier')
+            group = by_label.get(row[name] or None)
+            if group:
+                row['segment'] = group['segment']
+                row['segment_upper'] = group['upper']
+                row['deviation'] = round((row['claim_drg'] - group['mean']) / group['std'], 2) if group['std'] > 0 else 0
+            outliers.append(row)
+        segment['outliers'] = outliers
+
+    result['high_value_claims'] = high_value
+    result['variance_anomalies'] = variance
+    result['rw_anomalies'] = rw
+    return result
+
+
+def get_claim_anomalies(conn, segment: Optional[str] = None, limit: int = 50) -> Dict:
+    """
+    Claim anomalies for the dashboard, computed once per import generation
+
+    Args:
+        conn: Database connection
+        segment: 'scheme' or 'drg' to include per-segment statistics
+        limit: Maximum number of segments returned
+
+    Returns:
+        statistics, bounds, summary, high_value_claims, variance_anomalies,
+        rw_anomalies, method ('exact' or 'sketch') and, with a segment,
+        segments = {'by': segment, 'groups': [...], 'outliers': [...]}
+    """
+    result = generation_cache.get_or_compute('claim_anomalies', get_import_generation(conn), lambda: _compute(conn))
+    segments = result.pop('segments')
+    if segment in segments:
+        selected = segments[segment]
+        result['segments'] = {
+            'by': segment,
+            'total_segments': len(selected['groups']),
+            'groups': selected['groups'][:limit],
+            'outliers': selected['outliers'],
+        }
+    return result
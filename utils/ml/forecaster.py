@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Revenue Forecasting - Trend + fiscal-year seasonality fitted by least squares
+
+Every series (hospital total, each main_fund, each main_inscl scheme; claim
+count and NHSO reimbursement) is modelled as
+
+    y[t] = level + slope * t + season[fiscal month of t] + noise
+
+with one seasonal term per month of the October-September fiscal year. All
+series share the same design matrix, so the whole batch is fitted with one
+np.linalg.lstsq call. Prediction intervals use the residual standard error
+and the leverage of each future month.
+
+Fits (and their rolling-origin backtest) are cached per import generation,
+so a request is a cache lookup plus a matrix product for the horizon.
+
+Usage:
+    from utils.ml.forecaster import get_revenue_forecast
+
+    result = get_revenue_forecast(conn, horizon=6, by='fund')
+"""
+
+import logging
+import os
+import warnings
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.import_generation import generation_cache, get_import_generation
+from utils.sql_helpers import sql_cast_float
+
+logger = logging.getLogger(__name__)
+
+FORECAST_HISTORY_MONTHS = int(os.getenv('FORECAST_HISTORY_MONTHS', 36))
+FORECAST_MAX_SERIES = int(os.getenv('FORECAST_MAX_SERIES', 20))
+# Fewer months than this fit a trend only (seasonal terms would overfit)
+MIN_SEASONAL_MONTHS = 24
+MIN_MONTHS = 6
+MAX_HORIZON = 12
+BACKTEST_FOLDS = 3
+Z_95 = 1.96
+
+# breakdown -> column
+BREAKDOWN_COLUMNS = {
+    'fund': 'main_fund',
+    'scheme': 'main_inscl',
+}
+METRICS = ('claims', 'reimb')
+
+
+def month_index(month: str) -> int:
+    """'2025-10' -> months since year 0"""
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def month_label(index: int) -> str:
+    """Months since year 0 -> '2025-10'"""
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def design_matrix(offsets: np.ndarray, first_month: int, seasonal: bool) -> np.ndarray:
+    """
+    Columns: level, trend, and 11 fiscal-month indicators (October is the baseline)
+
+    Args:
+        offsets: Months since the start of the fitted history
+        first_month: month_index of offset 0
+        seasonal: Include the fiscal-month indicators
+    """
+    columns = [np.ones(len(offsets)), offsets.astype(np.float64)]
+    if seasonal:
+        fiscal_month = ((offsets + first_month) % 12 + 3) % 12  # Oct=0 ... Sep=11
+        columns.extend((fiscal_month == m).astype(np.float64) for m in range(1, 12))
+    return np.column_stack(columns)
+
+
+class SeasonalTrendModel:
+    """Least-squares trend + fiscal seasonality, fitted for many series at once"""
+
+    def __init__(self, first_month: int, n_months: int, coefficients: np.ndarray,
+                 sigma: np.ndarray, xtx_inv: np.ndarray, seasonal: bool):
+        self.first_month = first_month
+        self.n_months = n_months
+        self.coefficients = coefficients  # (n_columns, n_series)
+        self.sigma = sigma                # (n_series,)
+        self.xtx_inv = xtx_inv
+        self.seasonal = seasonal
+
+    @classmethod
+    def fit(cls, values: np.ndarray, first_month: int) -> 'SeasonalTrendModel':
+        """
+        Fit every row of values (n_series, n_months) in one batch
+
+        Args:
+            values: Monthly totals, one row per series, consecutive months
+            first_month: month_index of column 0
+        """
+        n_months = values.shape[1]
+        seasonal = n_months >= MIN_SEASONAL_MONTHS
+        X = design_matrix(np.arange(n_months), first_month, seasonal)
+
+        coefficients, _, _, _ = np.linalg.lstsq(X, values.T, rcond=None)
+        residuals = values.T - X @ coefficients
+        dof = max(n_months - X.shape[1], 1)
+        sigma = np.sqrt((residuals ** 2).sum(axis=0) / dof)
+        return cls(first_month, n_months, coefficients, sigma, np.linalg.pinv(X.T @ X), seasonal)
+
+    def predict(self, horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Project every series horizon months past the fitted history
+
+        Returns:
+            (months, mean, half_width): month indexes (horizon,), and
+            (horizon, n_series) arrays of projections and 95% interval half-widths
+        """
+        offsets = np.arange(self.n_months, self.n_months + horizon)
+        months = offsets + self.first_month
+        X = design_matrix(offsets, self.first_month, self.seasonal)
+        mean = X @ self.coefficients
+        leverage = np.einsum('ij,jk,ik->i', X, self.xtx_inv, X)
+        half_width = Z_95 * self.sigma[None, :] * np.sqrt(1 + leverage)[:, None]
+        return months, mean, half_width
+
+    def components(self, series: int = 0) -> Dict:
+        """Trend and seasonal indexes (mean zero, Oct..Sep) of one series"""
+        coefficients = self.coefficients[:, series]
+        season = np.zeros(12)
+        if self.seasonal:
+            season[1:] = coefficients[2:]
+        season -= season.mean()
+        return {
+            'trend_per_month': float(coefficients[1]),
+            'seasonal': [round(float(s), 2) for s in season],
+        }
+
+
+def backtest(values: np.ndarray, first_month: int, horizon: int = 6,
+             folds: int = BACKTEST_FOLDS) -> Dict:
+    """
+    Rolling-origin backtest: refit on history ending 1..folds months earlier
+    than the last possible origin and score the next horizon months
+
+    Returns:
+        folds, horizon, and per series (n_series,) arrays of MAE and MAPE (%),
+        plus the MAPE per forecast step for every series (horizon, n_series)
+    """
+    n_series, n_months = values.shape
+    errors, actuals = [], []
+    for fold in range(folds):
+        cut = n_months - horizon - fold
+        if cut < MIN_MONTHS:
+            break
+        model = SeasonalTrendModel.fit(values[:, :cut], first_month)
+        _, mean, _ = model.predict(horizon)
+        errors.append(np.maximum(mean, 0) - values[:, cut:cut + horizon].T)
+        actuals.append(values[:, cut:cut + horizon].T)
+
+    if not errors:
+        return {'folds': 0, 'horizon': horizon, 'mae': None, 'mape': None, 'mape_by_step': None}
+
+    errors, actuals = np.array(errors), np.array(actuals)  # (folds, horizon, n_series)
+    absolute = np.abs(errors)
+    percent = np.divide(absolute, np.abs(actuals), out=np.full_like(absolute, np.nan), where=actuals != 0) * 100
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # series with no non-zero actuals
+        return {
+            'folds': len(errors),
+            'horizon': horizon,
+            'mae': absolute.mean(axis=(0, 1)),
+            'mape': np.nanmean(percent, axis=(0, 1)),
+            'mape_by_step': np.nanmean(percent, axis=0),
+        }
+
+
+def _round(value, digits: int = 2) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def load_monthly_series(conn, history_months: int = FORECAST_HISTORY_MONTHS, today: date = None) -> Dict:
+    """
+    Monthly claim count and reimbursement per fund and scheme
+
+    The current month is still being imported, so only complete months
+    (before the month of today) are loaded and the forecast starts after
+    the last of them.
+
+    Returns:
+        {'first_month', 'months', 'keys': [(breakdown, label)], 'values':
+        (n_keys, n_metrics, n_months), 'totals': {claimed, paid}} where key
+        ('total', None) is the hospital total
+    """
+    today = today or date.today()
+    current_month = today.year * 12 + today.month - 1
+    first_month = current_month - history_months
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT service_month, main_fund, main_inscl,
+                   COUNT(*),
+                   COALESCE(SUM({sql_cast_float('claim_drg')}), 0),
+                   COALESCE(SUM({sql_cast_float('reimb_nhso')}), 0),
+                   COALESCE(SUM({sql_cast_float('paid')}), 0)
+            FROM claim_rep_opip_nhso_item
+            WHERE service_month >= %s AND service_month < %s
+            GROUP BY service_month, main_fund, main_inscl
+        """, (month_label(first_month), month_label(current_month)))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    rows = [row for row in rows if row[0]]
+    if not rows:
+        return {'first_month': first_month, 'months': 0, 'keys': [], 'values': np.zeros((0, 2, 0)),
+                'totals': {'claimed': np.zeros(0), 'paid': np.zeros(0)}}
+
+    indexes = np.array([month_index(row[0]) for row in rows])
+    first, last = int(indexes.min()), int(indexes.max())
+    columns = indexes - first
+    n_months = last - first + 1
+    amounts = np.array([row[3:7] for row in rows], dtype=np.float64)  # claims, claimed, reimb, paid
+
+    keys = [('total', None)]
+    groups = [np.zeros(len(rows), dtype=np.int64)]
+    for breakdown, position in (('fund', 1), ('scheme', 2)):
+        labels = [row[position] or 'UNKNOWN' for row in rows]
+        reimb_by_label: Dict[str, float] = {}
+        for label, reimb in zip(labels, amounts[:, 2]):
+            reimb_by_label[label] = reimb_by_label.get(label, 0) + reimb
+        top = sorted(reimb_by_label, key=lambda k: -reimb_by_label[k])[:FORECAST_MAX_SERIES]
+        code = {label: len(keys) + i for i, label in enumerate(top)}
+        keys.extend((breakdown, label) for label in top)
+        groups.append(np.array([code.get(label, -1) for label in labels]))
+
+    values = np.zeros((len(keys), len(METRICS), n_months))
+    for group in groups:
+        kept = group >= 0
+        for m, amount_column in enumerate((0, 2)):
+            np.add.at(values, (group[kept], m, columns[kept]), amounts[kept, amount_column])
+
+    totals = {name: np.bincount(columns, weights=amounts[:, i], minlength=n_months)
+              for name, i in (('claimed', 1), ('paid', 3))}
+    return {'first_month': first, 'months': n_months, 'keys': keys, 'values': values, 'totals': totals}
+
+
+def fit_forecasts(conn, horizon: int = 6, today: date = None) -> Dict:
+    """Load the monthly series and fit / backtest all of them in one batch"""
+    data = load_monthly_series(conn, today=today)
+    if data['months'] < MIN_MONTHS:
+        return {**data, 'model': None, 'backtest': None}
+
+    flat = data['values'].reshape(-1, data['months'])  # (n_keys * n_metrics, n_months)
+    model = SeasonalTrendModel.fit(flat, data['first_month'])
+    return {**data, 'model': model, 'backtest': backtest(flat, data['first_month'], horizon)}
+
+
+def get_revenue_forecast(conn, horizon: int = 6, by: Optional[str] = None) -> Dict:
+    """
+    Revenue projection for /api/analytics/forecast
+
+    Args:
+        conn: Database connection
+        horizon: Months to project (1-12)
+        by: 'fund' or 'scheme' to add one forecast per fund / scheme
+
+    Returns:
+        historical (last 12 months), forecast, method, data_points,
+        components, backtest and, with by, series
+    """
+    horizon = max(1, min(horizon, MAX_HORIZON))
+    today = date.today()
+    # Refit when a new month completes, even without a new import
+    generation = get_import_generation(conn) + (f"{today.year:04d}-{today.month:02d}",)
+    fitted = generation_cache.get_or_compute('revenue_forecast', generation,
+                                             lambda: fit_forecasts(conn, today=today))
+
+    first, n_months, values = fitted['first_month'], fitted['months'], fitted['values']
+    historical = [{
+        'month': month_label(first + i),
+        'claims': int(values[0, 0, i]),
+        'claimed': float(fitted['totals']['claimed'][i]),
+        'reimb': float(values[0, 1, i]),
+        'paid': float(fitted['totals']['paid'][i]),
+    } for i in range(n_months)]
+
+    result = {
+        'historical': historical[-12:],
+        'forecast': [],
+        'method': 'least_squares_trend_with_fiscal_seasonality',
+        'data_points': n_months,
+    }
+    model = fitted['model']
+    if model is None:
+        return result
+
+    months, mean, half_width = model.predict(horizon)
+    mean = mean.reshape(horizon, len(fitted['keys']), len(METRICS))
+    half_width = half_width.reshape(horizon, len(fitted['keys']), len(METRICS))
+    claims, reimb = METRICS.index('claims'), METRICS.index('reimb')
+
+    def projection(key: int) -> List[Dict]:
+        rows = []
+        for step, month in enumerate(months):
+            projected = max(0.0, float(mean[step, key, reimb]))
+            spread = float(half_width[step, key, reimb])
+            rows.append({
+                'month': month_label(month),
+                'month_name': date(month // 12, month % 12 + 1, 1).strftime('%b %Y'),
+                'projected_reimb': round(projected, 2),
+                'projected_claims': max(0, round(float(mean[step, key, claims]))),
+                'confidence': 95,
+                'lower_bound': round(max(0.0, projected - spread), 2),
+                'upper_bound': round(projected + spread, 2),
+            })
+        return rows
+
+    tested = fitted['backtest']
+
+    def accuracy(key: int) -> Dict:
+        series = key * len(METRICS) + reimb
+        if not tested['folds']:
+            return {'folds': 0}
+        return {
+            'folds': tested['folds'],
+            'horizon': tested['horizon'],
+            'mae': _round(tested['mae'][series]),
+            'mape': _round(tested['mape'][series]),
+        }
+
+    result['forecast'] = projection(0)
+    result['components'] = model.components(reimb)
+    result['backtest'] = accuracy(0)
+    if tested['folds']:
+        result['backtest']['mape_by_step'] = [_round(v) for v in tested['mape_by_step'][:, reimb]]
+
+    if by in BREAKDOWN_COLUMNS:
+        result['series'] = [{
+            by: label,
+            'forecast': projection(key),
+            'backtest': accuracy(key),
+        } for key, (breakdown, label) in enumerate(fitted['keys']) if breakdown == by]
+    return result
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Compact Denial Model Artefact - Flat tree arrays loaded with mmap
+
+The trained RandomForest is exported as one set of flat node arrays for all
+trees (feature, threshold, child table, leaf flags, class probabilities, tree
+roots) stored as .npy files, plus a manifest.json with the feature columns
+and the categorical lookup tables (class lists, code = position).
+
+Loading maps the arrays read-only (np.load mmap_mode='r') instead of
+unpickling 100 sklearn trees, so it takes milliseconds, does not import
+sklearn, and every process serving the model (gunicorn workers included)
+shares the same page-cache pages. FlatForest.predict_proba walks all trees
+at once with NumPy and returns the same probabilities as the forest.
+
+Usage:
+    from utils.ml.model_artifact import export_forest, load_artifact
+
+    export_forest(model, class_index, feature_cols, metadata, ARTIFACT_DIR)
+    artifact = load_artifact(ARTIFACT_DIR, trained_at=metadata['trained_at'])
+"""
+
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1
+
+ARRAYS = ('feature', 'threshold', 'children', 'leaf', 'value', 'roots')
+
+# Samples walked through the trees at a time (keeps the working set in cache)
+APPLY_CHUNK_ROWS = 4096
+
+
+class FlatForest:
+    """Tree ensemble over flat node arrays with sklearn's predict_proba semantics"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], classes: List):
+        self.feature = arrays['feature']      # int64, 0 for leaves
+        self.threshold = arrays['threshold']  # float64, go left if x <= threshold
+        self.children = arrays['children']    # int64, [2i] right / [2i + 1] left child; leaves point to themselves
+        self.leaf = arrays['leaf']            # bool
+        self.value = arrays['value']          # float64 (n_classes, n_nodes), class probabilities
+        self.roots = arrays['roots']          # int64, first node of each tree
+        self.classes_ = np.array(classes)
+        self.n_estimators = len(self.roots)
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node per (sample, tree), sample-major"""
+        n_samples, n_features = X.shape
+        flat_x = X.ravel()
+        nodes = np.tile(self.roots, n_samples)
+        # Offset of each pair's sample row in flat_x
+        row_offset = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, self.n_estimators)
+
+        # Only pairs still at an internal node take another step
+        active = np.flatnonzero(~self.leaf[nodes])
+        while len(active):
+            current = nodes[active]
+            go_left = flat_x[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            step = self.children[2 * current + go_left]
+            nodes[active] = step
+            active = active[~self.leaf[step]]
+
+        return nodes
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index of every sample in every tree, shape (n_samples, n_trees)"""
+        # Trees compare float32 features, like sklearn
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if not len(X):
+            return np.zeros((0, self.n_estimators), dtype=np.int64)
+        return np.concatenate([
+            self._apply_chunk(X[start:start + APPLY_CHUNK_ROWS])
+            for start in range(0, len(X), APPLY_CHUNK_ROWS)
+        ]).reshape(len(X), self.n_estimators)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean of the trees' leaf class probabilities"""
+        leaves = self.apply(X)
+        return np.stack([values[leaves].sum(axis=1) for values in self.value], axis=1) / self.n_estimators
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def flatten_forest(model) -> Dict:
+    """Flat node arrays of a fitted sklearn forest of classification trees"""
+    parts = {name: [] for name in ARRAYS if name != 'roots'}
+    roots, offset, max_depth = [], 0, 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        node = np.arange(tree.node_count) + offset
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, None]
+        normalizer[normalizer == 0.0] = 1.0
+
+        parts['feature'].append(np.where(leaf, 0, tree.feature).astype(np.int64))
+        parts['threshold'].append(tree.threshold.astype(np.float64))
+        parts['children'].append(np.column_stack([
+            np.where(leaf, node, tree.children_right + offset),
+            np.where(leaf, node, tree.children_left + offset),
+        ]).astype(np.int64).ravel())
+        parts['leaf'].append(leaf)
+        parts['value'].append((value / normalizer).T)
+
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {name: np.concatenate(chunks, axis=-1) for name, chunks in parts.items()}
+    arrays['roots'] = np.array(roots, dtype=np.int64)
+    return {'arrays': arrays, 'max_depth': int(max_depth), 'classes': [c.item() for c in model.classes_]}
+
+
+def export_forest(model, class_index: Dict[str, Dict[str, int]], feature_cols: List[str],
+                  metadata: Dict, directory: Path) -> Path:
+    """
+    Write the compact artefact for a fitted forest
+
+    Written to a sibling directory first and swapped in, so a serving
+    process never maps a half-written set of arrays.
+
+    Args:
+        model: Fitted RandomForestClassifier
+        class_index: {column: {class: code}} as used for encoding
+        feature_cols: Model feature columns, in order
+        metadata: Model metadata (trained_at, version)
+        directory: Artefact directory
+    """
+    directory = Path(directory)
+    flat = flatten_forest(model)
+    staging = directory.with_name(f'{directory.name}.tmp-{os.getpid()}')
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    for name, array in flat['arrays'].items():
+        np.save(staging / f'{name}.npy', np.ascontiguousarray(array))
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'trained_at': metadata.get('trained_at'),
+        'version': metadata.get('version'),
+        'feature_cols': list(feature_cols),
+        'classes': flat['classes'],
+        'max_depth': flat['max_depth'],
+        'n_estimators': len(flat['arrays']['roots']),
+        'n_nodes': int(len(flat['arrays']['feature'])),
+        # Lookup tables: code = position in the list
+        'categories': {col: sorted(index, key=index.get) for col, index in class_index.items()},
+    }
+    with open(staging / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    previous = directory.with_name(f'{directory.name}.old-{os.getpid()}')
+    if directory.exists():
+        directory.rename(previous)
+    staging.rename(directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return directory
+
+
+def load_artifact(directory: Path, trained_at: Optional[str] = None) -> Optional[Dict]:
+    """
+    Map a compact artefact
+
+    Args:
+        directory: Artefact directory
+        trained_at: Expected training timestamp (model metadata); a
+            different artefact is stale and ignored
+
+    Returns:
+        {'model': FlatForest, 'class_index': ..., 'feature_cols': ..., 'manifest': ...}
+        or None if missing, stale or of another format
+    """
+    manifest_path = Path(directory) / 'manifest.json'
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        logger.warning(f"Model artefact format {manifest.get('format')} not supported, ignoring {directory}")
+        return None
+    if trained_at and manifest.get('trained_at') != trained_at:
+        logger.warning(f"Model artefact {directory} is from {manifest.get('trained_at')}, "
+                       f"model metadata from {trained_at}; ignoring the artefact")
+        return None
+
+    # Plain ndarray views of the read-only maps
+    arrays = {name: np.asarray(np.load(Path(directory) / f'{name}.npy', mmap_mode='r')) for name in ARRAYS}
+    return {
+        'model': FlatForest(arrays, manifest['classes']),
+        'class_index': {col: {cls: i for i, cls in enumerate(classes)}
+                        for col, classes in manifest['categories'].items()},
+        'feature_cols': manifest['feature_cols'],
+        'manifest': manifest,
+    }
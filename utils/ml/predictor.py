@@ -3,17 +3,25 @@
 Denial Prediction Module
 
 Loads trained model and provides prediction functions for the API
+
+The model is read from the compact artefact in models/denial_predictor/
+(memory-mapped flat tree arrays, see utils.ml.model_artifact) and falls
+back to the joblib bundle when the artefact is missing or from another
+training run.
 """
 
 import os
 import json
+import time
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
 import pandas as pd
 import numpy as np
-import joblib
+
+from utils.ml.model_artifact import load_artifact
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +29,9 @@ logger = logging.getLogger(__name__)
 MODEL_DIR = Path(__file__).parent / 'models'
 MODEL_PATH = MODEL_DIR / 'denial_predictor.joblib'
 METADATA_PATH = MODEL_DIR / 'model_metadata.json'
+ARTIFACT_DIR = MODEL_DIR / 'denial_predictor'
+
+CATEGORICAL_COLS = ['service_type', 'drg', 'main_fund', 'main_inscl', 'ptype']
 
 
 class DenialPredictor:
@@ -28,31 +39,58 @@ class DenialPredictor:
 
     def __init__(self):
         self.model = None
-        self.label_encoders = None
         self.feature_cols = None
         self.metadata = None
         self.is_loaded = False
+        # col -> {class: encoded value}, same codes as LabelEncoder.transform
+        self.class_index: Dict[str, Dict[str, int]] = {}
+        self.load_seconds = None
+        self.model_format = None
+        self._load_lock = threading.Lock()
+
+    def ensure_loaded(self) -> bool:
+        """Load the model once, even when several requests need it at the same time"""
+        if self.is_loaded:
+            return True
+        with self._load_lock:
+            return self.is_loaded or self.load_model()
 
     def load_model(self) -> bool:
-        """Load the trained model"""
+        """Load the trained model (compact artefact, else the joblib bundle)"""
         try:
-            if not MODEL_PATH.exists():
-                logger.warning(f"Model file not found: {MODEL_PATH}")
-                return False
-
-            # Load model bundle
-            bundle = joblib.load(MODEL_PATH)
-            self.model = bundle['model']
-            self.label_encoders = bundle['label_encoders']
-            self.feature_cols = bundle['feature_cols']
+            started = time.perf_counter()
 
             # Load metadata
+            metadata = None
             if METADATA_PATH.exists():
                 with open(METADATA_PATH) as f:
-                    self.metadata = json.load(f)
+                    metadata = json.load(f)
+
+            artifact = load_artifact(ARTIFACT_DIR, trained_at=(metadata or {}).get('trained_at'))
+            if artifact:
+                self.model = artifact['model']
+                self.feature_cols = artifact['feature_cols']
+                self.class_index = artifact['class_index']
+                self.model_format = 'mmap'
+            elif MODEL_PATH.exists():
+                # Unpickles the sklearn forest (imports sklearn)
+                import joblib
+                bundle = joblib.load(MODEL_PATH)
+                self.model = bundle['model']
+                self.feature_cols = bundle['feature_cols']
+                self.class_index = {
+                    col: {cls: i for i, cls in enumerate(encoder.classes_)}
+                    for col, encoder in bundle['label_encoders'].items() if encoder
+                }
+                self.model_format = 'joblib'
+            else:
+                logger.warning(f"Model file not found: {MODEL_PATH}")
+                return False
 
+            self.metadata = metadata
+            self.load_seconds = time.perf_counter() - started
             self.is_loaded = True
-            logger.info("Model loaded successfully")
+            logger.info(f"Model loaded successfully ({self.model_format}, {self.load_seconds * 1000:.0f}ms)")
             return True
 
         except Exception as e:
@@ -76,16 +114,11 @@ class DenialPredictor:
             }])
 
             # Encode categorical variables
-            for col in ['service_type', 'drg', 'main_fund', 'main_inscl', 'ptype']:
-                encoder = self.label_encoders.get(col)
-                if encoder:
-                    # Handle unseen labels
-                    value = features[col].iloc[0]
-                    if value in encoder.classes_:
-                        features[f'{col}_encoded'] = encoder.transform(features[col])
-                    else:
-                        # Use -1 for unknown categories
-                        features[f'{col}_encoded'] = -1
+            for col in CATEGORICAL_COLS:
+                index = self.class_index.get(col)
+                if index is not None:
+                    # Use -1 for unknown categories
+                    features[f'{col}_encoded'] = index.get(features[col].iloc[0], -1)
                 else:
                     features[f'{col}_encoded'] = 0
 
@@ -109,6 +142,40 @@ class DenialPredictor:
             logger.error(f"Feature preparation failed: {e}")
             return None
 
+    @staticmethod
+    def _claim_values(data: Dict[str, Any]) -> tuple:
+        """Raw feature values of one claim, converted like _prepare_features"""
+        return (
+            str(data.get('service_type', 'UN')),
+            str(data.get('drg', 'UNKNOWN')),
+            str(data.get('main_fund', 'UNKNOWN')),
+            str(data.get('main_inscl', 'UNKNOWN')),
+            str(data.get('ptype', 'UNKNOWN')),
+            str(data.get('error_code', '0')),
+            float(data.get('claim_amount', 0)),
+            float(data.get('rw', 0)),
+            float(data.get('adjrw', 0))
+        )
+
+    def _prepare_batch(self, rows: List[tuple]) -> pd.DataFrame:
+        """Prepare features for many claims at once (rows from _claim_values)"""
+        features = pd.DataFrame(rows, columns=CATEGORICAL_COLS + ['error_code', 'claim_amount', 'rw', 'adjrw'])
+
+        for col in CATEGORICAL_COLS:
+            index = self.class_index.get(col)
+            if index is not None:
+                # Unseen categories encode as -1
+                features[f'{col}_encoded'] = features[col].map(index).fillna(-1).astype('int64')
+            else:
+                features[f'{col}_encoded'] = 0
+
+        error_code = features['error_code']
+        features['error_code_num'] = error_code.str.extract(r'(\d+)', expand=False).fillna('0').astype(float)
+        features['high_risk_error'] = error_code.str.contains('998', regex=False).astype('int64')
+        features['claim_amount_log'] = np.log1p(features['claim_amount'])
+
+        return features[self.feature_cols]
+
     def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Predict denial risk for a single claim
@@ -126,115 +193,118 @@ class DenialPredictor:
         Returns:
             Dictionary with prediction results
         """
-        if not self.is_loaded:
-            if not self.load_model():
-                return {
-                    'error': 'Model not loaded',
-                    'risk_score': 0.5,
-                    'risk_level': 'unknown',
-                    'confidence': 0
-                }
+        if not self.ensure_loaded():
+            return _unknown_risk('Model not loaded')
 
         try:
             X = self._prepare_features(data)
             if X is None:
-                return {
-                    'error': 'Feature preparation failed',
-                    'risk_score': 0.5,
-                    'risk_level': 'unknown',
-                    'confidence': 0
-                }
+                return _unknown_risk('Feature preparation failed')
 
             # Predict probability
             proba = self.model.predict_proba(X)[0]
             denial_prob = float(proba[1])
 
-            # Determine risk level
-            if denial_prob >= 0.7:
-                risk_level = 'high'
-            elif denial_prob >= 0.4:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
-
-            # Calculate confidence (how sure the model is)
-            confidence = float(max(proba))
-
             # Get top contributing factors
             factors = self._get_risk_factors(X, denial_prob)
 
-            return {
-                'risk_score': round(denial_prob, 4),
-                'risk_level': risk_level,
-                'confidence': round(confidence, 4),
-                'factors': factors,
-                'model_version': self.metadata.get('version', '1.0.0') if self.metadata else '1.0.0'
-            }
+            return self._build_result(denial_prob, float(max(proba)), factors)
 
         except Exception as e:
             logger.error(f"Prediction failed: {e}")
-            return {
-                'error': str(e),
-                'risk_score': 0.5,
-                'risk_level': 'unknown',
-                'confidence': 0
-            }
+            return _unknown_risk(str(e))
+
+    def _build_result(self, denial_prob: float, confidence: float, factors: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Prediction result for a denial probability"""
+        # Determine risk level
+        if denial_prob >= 0.7:
+            risk_level = 'high'
+        elif denial_prob >= 0.4:
+            risk_level = 'medium'
+        else:
+            risk_level = 'low'
+
+        return {
+            'risk_score': round(denial_prob, 4),
+            'risk_level': risk_level,
+            'confidence': round(confidence, 4),  # How sure the model is
+            'factors': factors,
+            'model_version': self.metadata.get('version', '1.0.0') if self.metadata else '1.0.0'
+        }
 
     def _get_risk_factors(self, X: pd.DataFrame, denial_prob: float) -> List[Dict[str, str]]:
         """Identify key risk factors for this prediction"""
-        factors = []
-
         try:
-            # Get feature importances
-            importances = dict(zip(self.feature_cols, self.model.feature_importances_))
-
-            # Check high risk error
-            if X['high_risk_error'].iloc[0] == 1:
-                factors.append({
-                    'factor': 'High Risk Error Code',
-                    'description': 'Error code 998 detected (72% denial rate)',
-                    'impact': 'high'
-                })
-
-            # Check claim amount
-            claim_amt = X['claim_amount'].iloc[0]
-            if claim_amt < 3500 and claim_amt > 0:
-                factors.append({
-                    'factor': 'Low Claim Amount',
-                    'description': f'Amount {claim_amt:,.0f} is below average',
-                    'impact': 'medium'
-                })
-
-            # Check RW
-            rw = X['rw'].iloc[0]
-            if rw < 0.5 and rw > 0:
-                factors.append({
-                    'factor': 'Low Relative Weight',
-                    'description': f'RW {rw:.2f} indicates lower complexity',
-                    'impact': 'low'
-                })
-
-            # If high probability but no specific factors
-            if denial_prob > 0.5 and len(factors) == 0:
-                factors.append({
-                    'factor': 'Pattern Match',
-                    'description': 'Claim matches historical denial patterns',
-                    'impact': 'medium'
-                })
-
+            return _risk_factors(X['high_risk_error'].iloc[0], X['claim_amount'].iloc[0],
+                                 X['rw'].iloc[0], denial_prob)
         except Exception as e:
             logger.error(f"Failed to get risk factors: {e}")
-
-        return factors
+            return []
 
     def predict_batch(self, claims: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Predict denial risk for multiple claims"""
-        return [self.predict(claim) for claim in claims]
+        """
+        Predict denial risk for multiple claims
+
+        Builds one feature frame for all claims and calls the model once;
+        results match predict() for each claim.
+        """
+        if not claims:
+            return []
+        if not self.ensure_loaded():
+            return [_unknown_risk('Model not loaded') for _ in claims]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(claims)
+        rows, positions = [], []
+        for i, claim in enumerate(claims):
+            try:
+                rows.append(self._claim_values(claim))
+                positions.append(i)
+            except Exception as e:
+                logger.error(f"Feature preparation failed: {e}")
+                results[i] = _unknown_risk('Feature preparation failed')
+
+        if rows:
+            try:
+                X = self._prepare_batch(rows)
+                proba = self.model.predict_proba(X)
+            except Exception as e:
+                logger.error(f"Batch prediction failed: {e}")
+                for i in positions:
+                    results[i] = _unknown_risk(str(e))
+                return results
+
+            denial_probs = proba[:, 1].tolist()
+            confidences = proba.max(axis=1).tolist()
+            columns = zip(X['high_risk_error'].tolist(), X['claim_amount'].tolist(), X['rw'].tolist())
+
+            for i, denial_prob, confidence, (high_risk_error, claim_amt, rw) in zip(
+                    positions, denial_probs, confidences, columns):
+                factors = _risk_factors(high_risk_error, claim_amt, rw, denial_prob)
+                results[i] = self._build_result(denial_prob, confidence, factors)
+
+        return results
+
+    @property
+    def model_version(self) -> str:
+        """Version tag stored with persisted scores (changes on every retrain)"""
+        metadata = self.metadata or {}
+        return f"{metadata.get('version', '1.0.0')}@{str(metadata.get('trained_at', ''))[:19]}"
+
+    def score_rows(self, rows: List[tuple]) -> np.ndarray:
+        """Denial probabilities for rows from _claim_values, without per-claim results"""
+        if not rows:
+            return np.zeros(0)
+        return self.model.predict_proba(self._prepare_batch(rows))[:, 1]
+
+    def describe_score(self, denial_prob: float, error_code: str, claim_amount: float, rw: float) -> Dict[str, Any]:
+        """Result for an already computed (persisted) score, same shape as predict()"""
+        high_risk_error = 1 if '998' in str(error_code) else 0
+        factors = _risk_factors(high_risk_error, claim_amount, rw, denial_prob)
+        return self._build_result(denial_prob, max(denial_prob, 1 - denial_prob), factors)
 
     def get_model_info(self) -> Dict[str, Any]:
         """Get model metadata and performance info"""
-        if not self.is_loaded:
-            self.load_model()
+        self.ensure_loaded()
 
         if self.metadata:
             return {
@@ -242,6 +312,8 @@ class DenialPredictor:
                 'model_type': self.metadata.get('model_type'),
                 'version': self.metadata.get('version'),
                 'metrics': self.metadata.get('metrics', {}),
+                'format': self.model_format,
+                'load_ms': round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
                 'is_available': True
             }
         else:
@@ -251,18 +323,96 @@ class DenialPredictor:
             }
 
 
-# Singleton instance
+def _unknown_risk(error: str) -> Dict[str, Any]:
+    """Result returned when a claim cannot be scored"""
+    return {
+        'error': error,
+        'risk_score': 0.5,
+        'risk_level': 'unknown',
+        'confidence': 0
+    }
+
+
+def _risk_factors(high_risk_error: int, claim_amt: float, rw: float, denial_prob: float) -> List[Dict[str, str]]:
+    """Identify key risk factors from a claim's prepared features"""
+    factors = []
+
+    # Check high risk error
+    if high_risk_error == 1:
+        factors.append({
+            'factor': 'High Risk Error Code',
+            'description': 'Error code 998 detected (72% denial rate)',
+            'impact': 'high'
+        })
+
+    # Check claim amount
+    if claim_amt < 3500 and claim_amt > 0:
+        factors.append({
+            'factor': 'Low Claim Amount',
+            'description': f'Amount {claim_amt:,.0f} is below average',
+            'impact': 'medium'
+        })
+
+    # Check RW
+    if rw < 0.5 and rw > 0:
+        factors.append({
+            'factor': 'Low Relative Weight',
+            'description': f'RW {rw:.2f} indicates lower complexity',
+            'impact': 'low'
+        })
+
+    # If high probability but no specific factors
+    if denial_prob > 0.5 and len(factors) == 0:
+        factors.append({
+            'factor': 'Pattern Match',
+            'description': 'Claim matches historical denial patterns',
+            'impact': 'medium'
+        })
+
+    return factors
+
+
+# Singleton instance, shared by all requests in the process
 _predictor = None
+_predictor_lock = threading.Lock()
 
 
 def get_predictor() -> DenialPredictor:
     """Get or create predictor singleton"""
     global _predictor
     if _predictor is None:
-        _predictor = DenialPredictor()
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = DenialPredictor()
     return _predictor
 
 
+def _reset_after_fork():
+    """A fork during a background load must not leave the child's lock held"""
+    if _predictor is not None:
+        _predictor._load_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def preload_model(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Load the shared predictor ahead of the first request
+
+    Args:
+        background: Load in a daemon thread (app start) instead of blocking
+            (e.g. the gunicorn --preload master, so workers inherit the mapped model)
+    """
+    if not background:
+        get_predictor().ensure_loaded()
+        return None
+    thread = threading.Thread(target=get_predictor().ensure_loaded, name='ml-preload', daemon=True)
+    thread.start()
+    return thread
+
+
 def predict_denial_risk(data: Dict[str, Any]) -> Dict[str, Any]:
     """Convenience function for single prediction"""
     return get_predictor().predict(data)
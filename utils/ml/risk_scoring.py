@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Denial Risk Scoring - Persist model scores on claim_rep_opip_nhso_item
+
+REP imports score their new claims once (score_file) and store the
+probability in denial_risk_score together with the model version in
+denial_risk_model (migration 021). High-risk listings then read an indexed
+column instead of running the model on every page view.
+
+After the model is retrained, rescore_stale() re-scores every claim whose
+denial_risk_model differs from the loaded model
+(scripts/rescore_denial_risk.py).
+
+Usage:
+    from utils.ml.risk_scoring import score_file, rescore_stale
+
+    score_file(conn, file_id)     # after importing a REP file
+    rescore_stale(conn)           # after retraining
+"""
+
+import logging
+import os
+from typing import Dict, Optional, Sequence
+
+from utils.ml.predictor import DenialPredictor, get_predictor
+
+logger = logging.getLogger(__name__)
+
+DENIAL_RISK_SCORING = os.getenv('DENIAL_RISK_SCORING', 'true').lower() == 'true'
+DENIAL_RISK_BATCH_SIZE = int(os.getenv('DENIAL_RISK_BATCH_SIZE', 5000))
+
+# Same defaults as the training query, in DenialPredictor._claim_values order
+SCORE_COLUMNS = """
+    id,
+    COALESCE(service_type, 'UN'),
+    COALESCE(drg, 'UNKNOWN'),
+    COALESCE(main_fund, 'UNKNOWN'),
+    COALESCE(main_inscl, 'UNKNOWN'),
+    COALESCE(ptype, 'UNKNOWN'),
+    COALESCE(error_code, '0'),
+    COALESCE(claim_drg, 0),
+    COALESCE(rw, 0),
+    COALESCE(adjrw_nhso, 0)
+"""
+
+UPDATE_SQL = """
+    UPDATE claim_rep_opip_nhso_item
+    SET denial_risk_score = %s, denial_risk_model = %s
+    WHERE id = %s
+"""
+
+
+def _feature_row(row: tuple) -> tuple:
+    """SCORE_COLUMNS row (without id) -> DenialPredictor._claim_values tuple"""
+    return tuple(str(value) for value in row[1:7]) + tuple(float(value or 0) for value in row[7:10])
+
+
+def _execute_updates(cursor, updates):
+    """Batch the score updates (execute_batch on PostgreSQL)"""
+    try:
+        from psycopg2.extras import execute_batch
+        if cursor.__class__.__module__.startswith('psycopg2'):
+            execute_batch(cursor, UPDATE_SQL, updates, page_size=500)
+            return
+    except ImportError:
+        pass
+    cursor.executemany(UPDATE_SQL, updates)
+
+
+def score_claims(conn, where: str = '1=1', params: Sequence = (),
+                 predictor: Optional[DenialPredictor] = None,
+                 batch_size: int = DENIAL_RISK_BATCH_SIZE) -> Dict:
+    """
+    Score the claims matching a condition and persist the scores
+
+    Claims are read in primary-key order, batch_size at a time, scored with
+    one model call per batch and committed per batch.
+
+    Args:
+        conn: Database connection
+        where: SQL condition on claim_rep_opip_nhso_item
+        params: Parameters for where
+        predictor: Predictor to use (default: shared instance)
+        batch_size: Claims per model call / commit
+
+    Returns:
+        {'scored': n, 'model_version': version} or {'scored': 0, 'skipped': reason}
+    """
+    predictor = predictor or get_predictor()
+    if not predictor.ensure_loaded():
+        return {'scored': 0, 'skipped': 'Model not loaded'}
+
+    version = predictor.model_version
+    scored, last_id = 0, 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT {SCORE_COLUMNS}
+                FROM claim_rep_opip_nhso_item
+                WHERE ({where}) AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (*params, last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            scores = predictor.score_rows([_feature_row(row) for row in rows])
+            _execute_updates(cursor, [
+                (round(float(score), 4), version, row[0]) for row, score in zip(rows, scores)
+            ])
+            conn.commit()
+
+            scored += len(rows)
+            last_id = rows[-1][0]
+            if len(rows) < batch_size:
+                break
+    finally:
+        cursor.close()
+
+    return {'scored': scored, 'model_version': version}
+
+
+def score_file(conn, file_id: int) -> Dict:
+    """Score the claims of one imported REP file"""
+    if not DENIAL_RISK_SCORING:
+        return {'scored': 0, 'skipped': 'DENIAL_RISK_SCORING is disabled'}
+    result = score_claims(conn, 'file_id = %s', (file_id,))
+    if result['scored']:
+        logger.info(f"Scored denial risk for {result['scored']} claims of file {file_id}")
+    return result
+
+
+def rescore_stale(conn, rescore_all: bool = False, batch_size: int = DENIAL_RISK_BATCH_SIZE) -> Dict:
+    """
+    Re-score claims after the model changed
+
+    Args:
+        conn: Database connection
+        rescore_all: Re-score every claim, not only unscored / other-version ones
+        batch_size: Claims per model call / commit
+    """
+    predictor = get_predictor()
+    if not predictor.ensure_loaded():
+        return {'scored': 0, 'skipped': 'Model not loaded'}
+    if rescore_all:
+        return score_claims(conn, predictor=predictor, batch_size=batch_size)
+    return score_claims(conn, 'denial_risk_model IS NULL OR denial_risk_model <> %s',
+                        (predictor.model_version,), predictor=predictor, batch_size=batch_size)
@@ -8,12 +8,26 @@ Trains a machine learning model to predict claim denial risk using:
 - Fund type and other claim metadata
 
 Uses RandomForest with class weighting to handle imbalanced data (6% denial rate)
+
+Claims are streamed through a server-side cursor in chunks and encoded
+straight into one float32 feature matrix (category codes included), the
+dtype the trees use internally, so memory grows with the rows kept rather
+than with a DataFrame of strings. For large histories --mode stratified
+keeps every denied claim and a sample of approved ones, and --mode sample
+keeps a random --max-rows sample. Peak memory and wall time per phase are
+saved in the model metadata.
+
+Usage:
+    python utils/ml/train_denial_model.py
+    python utils/ml/train_denial_model.py --mode stratified --negative-ratio 5 --n-jobs 8
 """
 
 import os
 import sys
 import json
+import time
 import logging
+import argparse
 from datetime import datetime
 from pathlib import Path
 
@@ -42,7 +56,9 @@ from sklearn.metrics import (
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from config.database import get_db_config
+from config.database import DB_TYPE, get_db_config
+from utils.ml.model_artifact import export_forest
+from utils.sql_helpers import sql_cast_float
 
 # Setup logging
 logging.basicConfig(
@@ -55,6 +71,38 @@ logger = logging.getLogger(__name__)
 MODEL_DIR = Path(__file__).parent / 'models'
 MODEL_PATH = MODEL_DIR / 'denial_predictor.joblib'
 METADATA_PATH = MODEL_DIR / 'model_metadata.json'
+ARTIFACT_DIR = MODEL_DIR / 'denial_predictor'
+
+TRAIN_CHUNK_ROWS = int(os.getenv('TRAIN_CHUNK_ROWS', 50000))
+
+CATEGORICAL_COLS = ['service_type', 'drg', 'main_fund', 'main_inscl', 'ptype']
+
+# Feature columns for model
+FEATURE_COLS = [
+    'service_type_encoded',
+    'drg_encoded',
+    'main_fund_encoded',
+    'main_inscl_encoded',
+    'ptype_encoded',
+    'error_code_num',
+    'high_risk_error',
+    'claim_amount',
+    'claim_amount_log',
+    'rw',
+    'adjrw'
+]
+
+SAMPLING_MODES = ('full', 'stratified', 'sample')
+
+TRAINING_WHERE = "claim_drg IS NOT NULL AND claim_drg > 0"
+
+DENIED_SQL = """
+    CASE
+        WHEN reimb_nhso > 0 THEN 0  -- Approved (has reimbursement)
+        WHEN error_code IS NOT NULL AND error_code != '' AND error_code != '0' THEN 1  -- Denied
+        ELSE 0  -- Default to approved
+    END
+"""
 
 
 def get_db_connection():
@@ -88,103 +136,238 @@ def get_db_connection():
         )
 
 
-def load_training_data():
-    """Load claims data from database for training"""
-    logger.info("Loading training data from database...")
-
-    conn = get_db_connection()
-
-    # Query to get relevant features for denial prediction
-    query = """
-    SELECT
-        tran_id,
-        COALESCE(service_type, 'UN') as service_type,
-        COALESCE(error_code, '0') as error_code,
-        COALESCE(drg, 'UNKNOWN') as drg,
-        COALESCE(main_fund, 'UNKNOWN') as main_fund,
-        COALESCE(main_inscl, 'UNKNOWN') as main_inscl,
-        COALESCE(ptype, 'UNKNOWN') as ptype,
-        COALESCE(claim_drg, 0) as claim_amount,
-        COALESCE(rw, 0) as rw,
-        COALESCE(adjrw_nhso, 0) as adjrw,
-        CASE
-            WHEN reimb_nhso > 0 THEN 0  -- Approved (has reimbursement)
-            WHEN error_code IS NOT NULL AND error_code != '' AND error_code != '0' THEN 1  -- Denied
-            ELSE 0  -- Default to approved
-        END as is_denied
-    FROM claim_rep_opip_nhso_item
-    WHERE claim_drg IS NOT NULL AND claim_drg > 0
-    """
+class _CategoryCodes:
+    """Encodes one categorical column chunk by chunk, codes in first-seen order"""
+
+    def __init__(self):
+        self.codes: dict = {}
+
+    def encode(self, values) -> np.ndarray:
+        unique, inverse = np.unique(np.array(values, dtype=str), return_inverse=True)
+        mapped = np.array([self.codes.setdefault(u, len(self.codes)) for u in unique], dtype=np.float32)
+        return mapped[inverse] if len(mapped) else np.zeros(0, dtype=np.float32)
+
+    def label_encoder(self):
+        """
+        LabelEncoder with the seen classes and the remap first-seen code -> its code
+
+        LabelEncoder codes are positions in the sorted classes, which is what
+        DenialPredictor expects.
+        """
+        labels = np.array(list(self.codes), dtype=str)
+        encoder = LabelEncoder().fit(labels)
+        remap = np.searchsorted(encoder.classes_, labels).astype(np.float32)
+        return encoder, remap
+
 
-    df = pd.read_sql(query, conn)
-    conn.close()
+class _FeatureBuffer:
+    """Growable float32 feature matrix plus int8 labels"""
 
-    logger.info(f"Loaded {len(df)} records")
-    logger.info(f"Denial rate: {df['is_denied'].mean()*100:.2f}%")
+    def __init__(self, capacity: int, n_features: int):
+        self.X = np.empty((max(capacity, 1), n_features), dtype=np.float32)
+        self.y = np.empty(max(capacity, 1), dtype=np.int8)
+        self.size = 0
 
-    return df
+    def append(self, X: np.ndarray, y: np.ndarray):
+        needed = self.size + len(X)
+        if needed > len(self.X):
+            capacity = max(needed, int(len(self.X) * 1.5))
+            self.X = np.resize(self.X, (capacity, self.X.shape[1]))
+            self.y = np.resize(self.y, capacity)
+        self.X[self.size:needed] = X
+        self.y[self.size:needed] = y
+        self.size = needed
 
+    def arrays(self):
+        return self.X[:self.size], self.y[:self.size]
 
-def prepare_features(df):
-    """Prepare features for training"""
-    logger.info("Preparing features...")
 
-    # Create feature dataframe
-    features = df.copy()
+def _error_code_features(error_codes) -> tuple:
+    """(error_code_num, high_risk_error) per claim, computed once per distinct code"""
+    unique, inverse = np.unique(np.array(error_codes, dtype=str), return_inverse=True)
+    extracted = pd.Series(unique).str.extract(r'(\d+)', expand=False)
+    numbers = pd.to_numeric(extracted, errors='coerce').fillna(0).to_numpy(dtype=np.float32)
+    high_risk = np.char.find(unique, '998') >= 0
+    return numbers[inverse], high_risk.astype(np.float32)[inverse]
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process in MB (0 where unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _stream_cursor(conn, chunk_rows: int):
+    """Server-side cursor so the claims are never materialised client-side"""
+    try:
+        if DB_TYPE == 'mysql':
+            import pymysql.cursors
+            return conn.cursor(pymysql.cursors.SSCursor)
+        cursor = conn.cursor(name='denial_training_scan')
+        cursor.itersize = chunk_rows
+        return cursor
+    except (ImportError, TypeError) as e:
+        logger.debug(f"Server-side cursor unavailable, using a client cursor: {e}")
+        return conn.cursor()
+
+
+def sampling_rates(mode: str, total: int, denied: int,
+                   negative_ratio: float = 4.0, max_rows: int = 1000000) -> tuple:
+    """
+    Probability of keeping a (denied, approved) claim
+
+    full:       every claim
+    stratified: every denied claim and about negative_ratio approved claims per denied one
+    sample:     a uniform sample of about max_rows claims
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode {mode!r}, expected one of {SAMPLING_MODES}")
+    if mode == 'stratified':
+        approved = total - denied
+        return 1.0, min(1.0, negative_ratio * denied / approved) if approved else 1.0
+    if mode == 'sample':
+        rate = min(1.0, max_rows / total) if total else 1.0
+        return rate, rate
+    return 1.0, 1.0
+
+
+def load_training_data(conn=None, mode: str = 'full', negative_ratio: float = 4.0,
+                       max_rows: int = 1000000, chunk_rows: int = TRAIN_CHUNK_ROWS, seed: int = 42):
+    """
+    Stream claims from the database into a compact feature matrix
+
+    Args:
+        conn: Database connection (default: a new connection, closed afterwards)
+        mode: 'full', 'stratified' or 'sample' (see sampling_rates)
+        negative_ratio: Approved claims kept per denied claim in stratified mode
+        max_rows: Claims kept in sample mode
+        chunk_rows: Rows fetched per round trip
+        seed: Random seed for sampling
+
+    Returns:
+        (X, y, label_encoders, stats): float32 DataFrame with FEATURE_COLS,
+        int8 labels, LabelEncoder per categorical column and load statistics
+    """
+    logger.info(f"Loading training data from database ({mode} mode)...")
+    started = time.perf_counter()
 
-    # Encode categorical variables
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM({DENIED_SQL}), 0)
+            FROM claim_rep_opip_nhso_item
+            WHERE {TRAINING_WHERE}
+        """)
+        total, denied = (int(value or 0) for value in cursor.fetchone())
+        cursor.close()
+
+        keep_denied, keep_approved = sampling_rates(mode, total, denied, negative_ratio, max_rows)
+        expected = denied * keep_denied + (total - denied) * keep_approved
+        # Headroom for sampling variance; the buffer grows if it is exceeded
+        buffer = _FeatureBuffer(min(total, int(expected * 1.02) + 1000), len(FEATURE_COLS))
+        encoders = {col: _CategoryCodes() for col in CATEGORICAL_COLS}
+        rng = np.random.default_rng(seed)
+        rows_read = 0
+
+        # Query to get relevant features for denial prediction
+        cursor = _stream_cursor(conn, chunk_rows)
+        try:
+            cursor.execute(f"""
+                SELECT
+                    COALESCE(service_type, 'UN') as service_type,
+                    COALESCE(drg, 'UNKNOWN') as drg,
+                    COALESCE(main_fund, 'UNKNOWN') as main_fund,
+                    COALESCE(main_inscl, 'UNKNOWN') as main_inscl,
+                    COALESCE(ptype, 'UNKNOWN') as ptype,
+                    COALESCE(error_code, '0') as error_code,
+                    COALESCE({sql_cast_float('claim_drg')}, 0) as claim_amount,
+                    COALESCE({sql_cast_float('rw')}, 0) as rw,
+                    COALESCE({sql_cast_float('adjrw_nhso')}, 0) as adjrw,
+                    {DENIED_SQL} as is_denied
+                FROM claim_rep_opip_nhso_item
+                WHERE {TRAINING_WHERE}
+            """)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                rows_read += len(rows)
+
+                labels = np.array([row[9] for row in rows], dtype=np.int8)
+                if keep_approved < 1.0 or keep_denied < 1.0:
+                    keep = rng.random(len(rows)) < np.where(labels == 1, keep_denied, keep_approved)
+                    rows = [row for row, kept in zip(rows, keep) if kept]
+                    labels = labels[keep]
+                    if not rows:
+                        continue
+
+                columns = list(zip(*rows))
+                chunk = np.empty((len(rows), len(FEATURE_COLS)), dtype=np.float32)
+                for i, col in enumerate(CATEGORICAL_COLS):
+                    chunk[:, i] = encoders[col].encode(columns[i])
+                chunk[:, 5], chunk[:, 6] = _error_code_features(columns[5])
+                claim_amount = np.array(columns[6], dtype=np.float64)
+                chunk[:, 7] = claim_amount
+                chunk[:, 8] = np.log1p(claim_amount)
+                chunk[:, 9] = np.array(columns[7], dtype=np.float32)
+                chunk[:, 10] = np.array(columns[8], dtype=np.float32)
+                buffer.append(chunk, labels)
+        finally:
+            cursor.close()
+    finally:
+        if own_conn:
+            conn.close()
+
+    X, y = buffer.arrays()
+
+    # First-seen codes -> LabelEncoder codes (positions in the sorted classes)
     label_encoders = {}
+    for i, col in enumerate(CATEGORICAL_COLS):
+        label_encoders[col], remap = encoders[col].label_encoder()
+        if len(X):
+            X[:, i] = remap[X[:, i].astype(np.int64)]
+
+    stats = {
+        'sampling_mode': mode,
+        'rows_available': total,
+        'denied_available': denied,
+        'rows_read': rows_read,
+        'rows_used': int(len(y)),
+        'denied_used': int(y.sum()),
+        'keep_rate_denied': round(keep_denied, 6),
+        'keep_rate_approved': round(keep_approved, 6),
+        'chunk_rows': chunk_rows,
+        'feature_matrix_mb': round(X.nbytes / (1024 * 1024), 2),
+        'load_seconds': round(time.perf_counter() - started, 2),
+        'peak_rss_mb_after_load': peak_memory_mb(),
+    }
+
+    logger.info(f"Loaded {stats['rows_used']} of {total} records "
+                f"({stats['feature_matrix_mb']} MB feature matrix, {stats['load_seconds']}s)")
+    if len(y):
+        logger.info(f"Denial rate: {y.mean()*100:.2f}%")
+
+    return pd.DataFrame(X, columns=FEATURE_COLS, copy=False), y, label_encoders, stats
+
 
-    categorical_cols = ['service_type', 'drg', 'main_fund', 'main_inscl', 'ptype']
-    for col in categorical_cols:
-        le = LabelEncoder()
-        features[f'{col}_encoded'] = le.fit_transform(features[col].astype(str))
-        label_encoders[col] = le
-
-    # Error code - extract numeric part
-    features['error_code_num'] = pd.to_numeric(
-        features['error_code'].str.extract(r'(\d+)', expand=False),
-        errors='coerce'
-    ).fillna(0).astype(int)
-
-    # Create high-risk error code flag (998 is most common denial code)
-    features['high_risk_error'] = (features['error_code'].str.contains('998', na=False)).astype(int)
-
-    # Numeric features
-    features['claim_amount'] = pd.to_numeric(features['claim_amount'], errors='coerce').fillna(0)
-    features['rw'] = pd.to_numeric(features['rw'], errors='coerce').fillna(0)
-    features['adjrw'] = pd.to_numeric(features['adjrw'], errors='coerce').fillna(0)
-
-    # Log transform for skewed amount
-    features['claim_amount_log'] = np.log1p(features['claim_amount'])
-
-    # Feature columns for model
-    feature_cols = [
-        'service_type_encoded',
-        'drg_encoded',
-        'main_fund_encoded',
-        'main_inscl_encoded',
-        'ptype_encoded',
-        'error_code_num',
-        'high_risk_error',
-        'claim_amount',
-        'claim_amount_log',
-        'rw',
-        'adjrw'
-    ]
-
-    X = features[feature_cols]
-    y = features['is_denied']
-
-    logger.info(f"Feature shape: {X.shape}")
-    logger.info(f"Class distribution: {y.value_counts().to_dict()}")
-
-    return X, y, label_encoders, feature_cols
-
-
-def train_model(X, y):
-    """Train the denial prediction model"""
-    logger.info("Training model...")
+def train_model(X, y, n_jobs: int = -1, cv_folds: int = 5):
+    """
+    Train the denial prediction model
+
+    Args:
+        X: Feature matrix (FEATURE_COLS)
+        y: Labels (1 = denied)
+        n_jobs: Cores for fitting and cross-validation (-1 = all)
+        cv_folds: Cross-validation folds (0 = skip)
+    """
+    logger.info(f"Training model (n_jobs={n_jobs})...")
 
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -207,10 +390,13 @@ def train_model(X, y):
         min_samples_leaf=2,
         class_weight=class_weight,
         random_state=42,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
 
+    started = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    logger.info(f"Fitted in {fit_seconds:.1f}s")
 
     # Evaluate on test set
     y_pred = model.predict(X_test)
@@ -247,10 +433,15 @@ def train_model(X, y):
         logger.info(f"  {row['feature']}: {row['importance']:.4f}")
 
     # Cross-validation
-    logger.info("\nCross-validation scores:")
-    cv_scores = cross_val_score(model, X, y, cv=5, scoring='f1')
-    logger.info(f"  F1 scores: {cv_scores}")
-    logger.info(f"  Mean F1: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+    started = time.perf_counter()
+    if cv_folds:
+        logger.info("\nCross-validation scores:")
+        cv_scores = cross_val_score(model, X, y, cv=cv_folds, scoring='f1', n_jobs=n_jobs)
+        logger.info(f"  F1 scores: {cv_scores}")
+        logger.info(f"  Mean F1: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+    else:
+        cv_scores = np.zeros(1)
+    cv_seconds = time.perf_counter() - started
 
     # Calculate precision, recall, f1 for metadata
     precision, recall, f1, _ = precision_recall_fscore_support(y_test, y_pred, average='binary')
@@ -266,6 +457,8 @@ def train_model(X, y):
         'test_size': len(X_test),
         'train_size': len(X_train),
         'denial_rate': float(y.mean()),
+        'fit_seconds': round(fit_seconds, 2),
+        'cv_seconds': round(cv_seconds, 2),
         'confusion_matrix': {
             'true_negative': int(cm[0,0]),
             'false_positive': int(cm[0,1]),
@@ -277,8 +470,8 @@ def train_model(X, y):
     return model, metrics, feature_importance
 
 
-def save_model(model, label_encoders, feature_cols, metrics):
-    """Save trained model and metadata"""
+def save_model(model, label_encoders, feature_cols, metrics, training=None):
+    """Save trained model and metadata (training: load/memory statistics)"""
     logger.info(f"\nSaving model to {MODEL_PATH}...")
 
     # Create models directory if not exists
@@ -301,7 +494,8 @@ def save_model(model, label_encoders, feature_cols, metrics):
         'model_type': 'RandomForestClassifier',
         'version': '1.0.0',
         'feature_columns': feature_cols,
-        'metrics': metrics
+        'metrics': metrics,
+        'training': training or {}
     }
 
     with open(METADATA_PATH, 'w') as f:
@@ -309,34 +503,66 @@ def save_model(model, label_encoders, feature_cols, metrics):
 
     logger.info(f"Metadata saved to {METADATA_PATH}")
 
+    # Compact artefact the predictor memory-maps
+    class_index = {col: {cls: i for i, cls in enumerate(encoder.classes_)}
+                   for col, encoder in label_encoders.items()}
+    export_forest(model, class_index, feature_cols, metadata, ARTIFACT_DIR)
+    logger.info(f"Compact model saved to {ARTIFACT_DIR}")
 
-def main():
+
+def main(argv=None):
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description='Train the denial prediction model')
+    parser.add_argument('--mode', choices=SAMPLING_MODES, default='full',
+                        help='full: every claim; stratified: all denied + sampled approved; sample: --max-rows claims')
+    parser.add_argument('--negative-ratio', type=float, default=4.0,
+                        help='Approved claims kept per denied claim in stratified mode (default 4)')
+    parser.add_argument('--max-rows', type=int, default=1000000,
+                        help='Claims kept in sample mode (default 1,000,000)')
+    parser.add_argument('--chunk-rows', type=int, default=TRAIN_CHUNK_ROWS,
+                        help=f'Rows fetched per round trip (default {TRAIN_CHUNK_ROWS})')
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help='Cores for training (default -1 = all)')
+    parser.add_argument('--cv-folds', type=int, default=5,
+                        help='Cross-validation folds, 0 to skip (default 5)')
+    args = parser.parse_args(argv)
+
     logger.info("="*60)
     logger.info("DENIAL PREDICTION MODEL TRAINING")
     logger.info("="*60)
 
+    started = time.perf_counter()
     try:
         # Load data
-        df = load_training_data()
+        X, y, label_encoders, training = load_training_data(
+            mode=args.mode, negative_ratio=args.negative_ratio,
+            max_rows=args.max_rows, chunk_rows=args.chunk_rows
+        )
 
-        if len(df) < 100:
+        if len(y) < 100:
             logger.error("Not enough data for training. Need at least 100 records.")
             return False
 
-        # Prepare features
-        X, y, label_encoders, feature_cols = prepare_features(df)
+        logger.info(f"Feature shape: {X.shape}")
+        logger.info(f"Class distribution: {dict(zip(*np.unique(y, return_counts=True)))}")
 
         # Check if we have enough denied cases
-        denial_count = y.sum()
+        denial_count = int(y.sum())
         if denial_count < 10:
             logger.warning(f"Only {denial_count} denied cases. Model may not be reliable.")
 
         # Train model
-        model, metrics, feature_importance = train_model(X, y)
+        model, metrics, feature_importance = train_model(X, y, n_jobs=args.n_jobs, cv_folds=args.cv_folds)
+
+        training.update({
+            'n_jobs': args.n_jobs,
+            'cpu_count': os.cpu_count(),
+            'total_seconds': round(time.perf_counter() - started, 2),
+            'peak_rss_mb': peak_memory_mb(),
+        })
 
         # Save model
-        save_model(model, label_encoders, feature_cols, metrics)
+        save_model(model, label_encoders, FEATURE_COLS, metrics, training)
 
         logger.info("\n" + "="*60)
         logger.info("TRAINING COMPLETE")
@@ -344,6 +570,8 @@ def main():
         logger.info(f"Model saved to: {MODEL_PATH}")
         logger.info(f"F1 Score: {metrics['f1_score']:.4f}")
         logger.info(f"AUC-ROC: {metrics['auc_roc']:.4f}")
+        logger.info(f"Wall time: {training['total_seconds']}s, peak memory: {training['peak_rss_mb']} MB")
+        logger.info("Re-score stored claims with: python scripts/rescore_denial_risk.py")
 
         return True
 
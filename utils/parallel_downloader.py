@@ -14,11 +14,8 @@ from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from queue import Queue
 from typing import List, Dict, Optional, Callable
-from urllib.parse import urljoin, urlparse, parse_qs
-import re
 
 import requests
-from bs4 import BeautifulSoup
 
 from utils.browser_fingerprints import (
     create_session_pool,
@@ -26,9 +23,8 @@ from utils.browser_fingerprints import (
     create_session_with_fingerprint,
     get_fingerprint
 )
+from utils.eclaim.links import parse_download_links
 from utils.log_stream import stream_log
-from config.db_pool import get_connection, return_connection
-from config.database import DB_TYPE
 
 # Configuration
 PARALLEL_CONFIG = {
@@ -40,6 +36,7 @@ PARALLEL_CONFIG = {
         'backoff_max': 60,         # max backoff
         'retry_count': 3,          # number of retries
         'timeout': 120,            # request timeout
+        'history_flush': 20,       # downloads recorded per history upsert
     },
     'import': {
         'max_workers': 3,          # 3 parallel imports
@@ -111,94 +108,75 @@ class ParallelDownloader:
         }
         self.progress_lock = threading.Lock()
 
-        # Download history - now using database (no need to load entire history)
-        # Just check DB on demand for each file
+        # Download history - loaded once per run by _load_download_history(),
+        # successful downloads are buffered and written in batches
         # Progress is tracked in-memory and synced to DownloadManager via Bridge
+        self._already_downloaded = set()
+        self._history_db = None
+        self._pending_records = []
+        self._history_lock = threading.Lock()
 
-    def _is_already_downloaded(self, filename: str) -> bool:
-        """Check if file was already downloaded (using database)"""
-        conn = None
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 1 FROM download_history
-                WHERE download_type = 'rep'
-                  AND filename = %s
-                  AND file_exists = TRUE
-                  AND download_status = 'success'
-            """, (filename,))
-            exists_in_db = cursor.fetchone() is not None
-            cursor.close()
-            return_connection(conn)
-            conn = None
-
-            # Also check if file exists on disk
-            if exists_in_db:
-                file_path = self.download_dir / filename
-                if file_path.exists():
-                    return True
+    def _load_download_history(self, download_links: List[Dict]):
+        """
+        Look up all files of this run in download history at once
 
-            return False
+        Runs one batched query before the workers start, so the per-file
+        _is_already_downloaded() checks in worker threads are set lookups.
+        A file counts as downloaded if its record is 'success' with
+        file_exists set.
+        """
+        filenames = [link['filename'] for link in download_links]
+        try:
+            from utils.download_history_db import DownloadHistoryDB
+            self._history_db = DownloadHistoryDB()
+            pending = set(self._history_db.filter_not_downloaded(
+                'rep', filenames, statuses=('success',), require_file_exists=True
+            ))
+            self._already_downloaded = {f for f in filenames if f not in pending}
         except Exception as e:
             stream_log(f"Warning: Could not check download history: {e}", 'warning')
+            self._already_downloaded = set()
+
+    def _is_already_downloaded(self, filename: str) -> bool:
+        """Check if file was already downloaded (from the preloaded history)"""
+        if filename not in self._already_downloaded:
             return False
-        finally:
-            if conn:
-                return_connection(conn)
+        return (self.download_dir / filename).exists()
 
     def _record_download(self, filename: str, file_size: int, url: str):
-        """Record a successful download to database (thread-safe)"""
-        conn = None
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-
-            file_path = str(self.download_dir / filename)
-
-            # Use appropriate UPSERT syntax based on database type
-            if DB_TYPE == 'mysql':
-                query = """
-                    INSERT INTO download_history
-                    (download_type, filename, scheme, fiscal_year, service_month,
-                     file_size, file_path, source_url, file_exists, download_status)
-                    VALUES ('rep', %s, %s, %s, %s, %s, %s, %s, TRUE, 'success')
-                    ON DUPLICATE KEY UPDATE
-                        file_size = VALUES(file_size),
-                        file_path = VALUES(file_path),
-                        file_exists = TRUE,
-                        download_status = 'success',
-                        updated_at = CURRENT_TIMESTAMP
-                """
-            else:
-                query = """
-                    INSERT INTO download_history
-                    (download_type, filename, scheme, fiscal_year, service_month,
-                     file_size, file_path, source_url, file_exists, download_status)
-                    VALUES ('rep', %s, %s, %s, %s, %s, %s, %s, TRUE, 'success')
-                    ON CONFLICT (download_type, filename) DO UPDATE SET
-                        file_size = EXCLUDED.file_size,
-                        file_path = EXCLUDED.file_path,
-                        file_exists = TRUE,
-                        download_status = 'success',
-                        updated_at = CURRENT_TIMESTAMP
-                """
-
-            cursor.execute(query, (filename, self.scheme, self.year, self.month,
-                  file_size, file_path, url))
-
-            conn.commit()
-            cursor.close()
-            return_connection(conn)
-            conn = None
+        """Buffer a successful download for the next history write (thread-safe)"""
+        with self._history_lock:
+            self._pending_records.append({
+                'filename': filename,
+                'scheme': self.scheme,
+                'fiscal_year': self.year,
+                'service_month': self.month,
+                'file_size': file_size,
+                'file_path': str(self.download_dir / filename),
+                'source_url': url,
+            })
+
+    def _flush_download_history(self):
+        """Write buffered downloads with one multi-row upsert (called from the run's thread)"""
+        with self._history_lock:
+            records, self._pending_records = self._pending_records, []
+        if not records:
+            return
 
+        try:
+            if self._history_db is None:
+                from utils.download_history_db import DownloadHistoryDB
+                self._history_db = DownloadHistoryDB()
+            self._history_db.record_downloads('rep', records)
         except Exception as e:
-            stream_log(f"Warning: Could not record download to DB: {e}", 'warning')
-            if conn:
-                conn.rollback()
-        finally:
-            if conn:
-                return_connection(conn)
+            stream_log(f"Warning: Could not record {len(records)} downloads to DB: {e}", 'warning')
+
+    def _close_download_history(self):
+        """Write the remaining downloads and close the history connection"""
+        self._flush_download_history()
+        if self._history_db is not None:
+            self._history_db.disconnect()
+            self._history_db = None
 
     def _update_progress(self, **kwargs):
         """
@@ -364,42 +342,7 @@ class ParallelDownloader:
             response = session.get(self.validation_url, timeout=PARALLEL_CONFIG['download']['timeout'])
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.content, 'lxml')
-            download_links = []
-            tables = soup.find_all('table')
-
-            for table in tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    excel_links = row.find_all('a', string=re.compile(r'download excel', re.IGNORECASE))
-                    for excel_link in excel_links:
-                        excel_href = excel_link.get('href')
-                        if excel_href:
-                            parsed = urlparse(excel_href)
-                            params = parse_qs(parsed.query)
-
-                            filename = None
-                            if 'fn' in params:
-                                filename = params['fn'][0]
-                            elif 'filename' in params:
-                                filename = params['filename'][0].replace('.ecd', '.xls')
-
-                            if not filename:
-                                filename = f"eclaim_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xls"
-
-                            full_url = urljoin(self.base_url, excel_href)
-                            download_links.append({
-                                'url': full_url,
-                                'filename': filename
-                            })
-
-            # Remove duplicates
-            unique_links = []
-            seen = set()
-            for link in download_links:
-                if link['filename'] not in seen:
-                    unique_links.append(link)
-                    seen.add(link['filename'])
+            unique_links = parse_download_links(response.content, self.base_url)
 
             stream_log(f"[{datetime.now().strftime('%H:%M:%S')}] Found {len(unique_links)} files to download")
             return unique_links
@@ -492,7 +435,7 @@ class ParallelDownloader:
                 session_info['total_downloads'] = session_info.get('total_downloads', 0) + 1
                 session_info['error_count'] = 0
 
-                # Record to history for file listing
+                # Record to history for file listing (written in batches)
                 self._record_download(filename, file_size, url)
 
                 stream_log(f"[{worker_name}] [{file_idx}/{total_files}] ✓ Downloaded: {filename} ({file_size:,} bytes)", 'success')
@@ -562,50 +505,63 @@ class ParallelDownloader:
         if not available_sessions:
             raise Exception("No logged-in sessions available")
 
+        self._load_download_history(download_links)
+
         results = []
         completed = 0
         failed = 0
         skipped = 0
 
+        flush_size = PARALLEL_CONFIG['download']['history_flush']
+
         # Use ThreadPoolExecutor for parallel downloads
-        with ThreadPoolExecutor(max_workers=len(available_sessions)) as executor:
-            # Submit all download tasks
-            futures = {}
-            for idx, link in enumerate(download_links, 1):
-                # Round-robin session assignment
-                session = available_sessions[(idx - 1) % len(available_sessions)]
-                future = executor.submit(
-                    self._download_file,
-                    session,
-                    link,
-                    idx,
-                    total_files
-                )
-                futures[future] = link
+        try:
+            with ThreadPoolExecutor(max_workers=len(available_sessions)) as executor:
+                # Submit all download tasks
+                futures = {}
+                for idx, link in enumerate(download_links, 1):
+                    # Round-robin session assignment
+                    session = available_sessions[(idx - 1) % len(available_sessions)]
+                    future = executor.submit(
+                        self._download_file,
+                        session,
+                        link,
+                        idx,
+                        total_files
+                    )
+                    futures[future] = link
+
+                # Process results as they complete
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+
+                    if result['skipped']:
+                        skipped += 1
+                    elif result['success']:
+                        completed += 1
+                    else:
+                        failed += 1
+                        with self.progress_lock:
+                            self.progress['errors'].append({
+                                'filename': result['filename'],
+                                'error': result['error'],
+                                'worker': result['worker'],
+                            })
 
-            # Process results as they complete
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
+                    self._update_progress(
+                        completed=completed,
+                        failed=failed,
+                        skipped=skipped,
+                    )
 
-                if result['skipped']:
-                    skipped += 1
-                elif result['success']:
-                    completed += 1
-                else:
-                    failed += 1
-                    with self.progress_lock:
-                        self.progress['errors'].append({
-                            'filename': result['filename'],
-                            'error': result['error'],
-                            'worker': result['worker'],
-                        })
-
-                self._update_progress(
-                    completed=completed,
-                    failed=failed,
-                    skipped=skipped,
-                )
+                    # Record finished downloads in batches so the file list keeps up
+                    with self._history_lock:
+                        pending = len(self._pending_records)
+                    if pending >= flush_size:
+                        self._flush_download_history()
+        finally:
+            self._close_download_history()
 
         # Final summary
         end_time = datetime.now()
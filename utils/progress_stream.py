@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Progress Stream - Coalesced progress push via Server-Sent Events (SSE)
+
+Producers publish the latest progress snapshot for a channel (for example
+'download:rep', 'import', 'seed'); every watcher of that channel streams the
+same pre-serialized snapshot. Snapshots published faster than
+PROGRESS_PUSH_INTERVAL are coalesced, so each watcher receives at most a few
+events per second, and N watchers cost one producer.
+
+Downloads, bulk downloads, imports and seeding run in this process and
+publish as they go. Progress that is only recorded elsewhere can be fed by a
+registered source instead: one background poller calls it every
+PROGRESS_POLL_INTERVAL seconds, and only while the channel has watchers.
+
+Usage:
+    from utils.progress_stream import progress_hub
+
+    progress_hub.publish('seed', seed_progress)
+
+    for event in progress_hub.stream(['download:rep', 'import']):
+        yield event
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Generator, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PUSH_INTERVAL = float(os.getenv('PROGRESS_PUSH_INTERVAL', 0.25))
+PROGRESS_POLL_INTERVAL = float(os.getenv('PROGRESS_POLL_INTERVAL', 1.0))
+PROGRESS_HEARTBEAT = 15
+
+
+class ProgressHub:
+    """Latest-value progress store with coalescing SSE streams"""
+
+    def __init__(self, push_interval: float = PROGRESS_PUSH_INTERVAL,
+                 poll_interval: float = PROGRESS_POLL_INTERVAL,
+                 heartbeat: float = PROGRESS_HEARTBEAT):
+        """
+        Initialize hub
+
+        Args:
+            push_interval: Minimum seconds between events sent to one watcher
+            poll_interval: Seconds between calls to registered sources
+            heartbeat: Seconds of silence before a keep-alive comment is sent
+        """
+        self.push_interval = push_interval
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+
+        # channel -> (version, serialized JSON)
+        self._latest: Dict[str, Tuple[int, str]] = {}
+        self._version = 0
+        self._cond = threading.Condition()
+
+        self._sources: Dict[str, Callable[[], Any]] = {}
+        self._watchers: Dict[str, int] = {}
+        self._poller: Optional[threading.Thread] = None
+
+    def publish(self, channel: str, data: Any):
+        """
+        Store the latest snapshot for a channel and wake its watchers
+
+        Unchanged snapshots are dropped without waking anyone.
+
+        Args:
+            channel: Channel name
+            data: JSON-serializable progress snapshot
+        """
+        try:
+            payload = json.dumps(data, default=str, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Cannot publish progress for {channel}: {e}")
+            return
+
+        with self._cond:
+            current = self._latest.get(channel)
+            if current and current[1] == payload:
+                return
+            self._version += 1
+            self._latest[channel] = (self._version, payload)
+            self._cond.notify_all()
+
+    def latest(self, channel: str) -> Optional[Any]:
+        """Return the last published snapshot for a channel, or None"""
+        with self._cond:
+            entry = self._latest.get(channel)
+        return json.loads(entry[1]) if entry else None
+
+    def register_source(self, channel: str, load_fn: Callable[[], Any]):
+        """
+        Poll load_fn for a channel while it has watchers
+
+        Args:
+            channel: Channel name
+            load_fn: Callable returning the current snapshot
+        """
+        with self._cond:
+            self._sources[channel] = load_fn
+            if self._watchers.get(channel):
+                self._start_poller()
+
+    def watcher_count(self, channel: str) -> int:
+        """Number of open streams watching a channel"""
+        with self._cond:
+            return self._watchers.get(channel, 0)
+
+    def stream(self, channels: Iterable[str]) -> Generator[str, None, None]:
+        """
+        Stream channel snapshots as Server-Sent Events
+
+        The latest snapshot of each channel is sent first, then each change,
+        as events named after the channel. Heartbeat comments keep idle
+        connections open.
+
+        Args:
+            channels: Channel names to watch
+
+        Yields:
+            SSE formatted events
+        """
+        channels = list(dict.fromkeys(channels))
+        sent: Dict[str, int] = {}
+
+        with self._cond:
+            for channel in channels:
+                self._watchers[channel] = self._watchers.get(channel, 0) + 1
+            if any(channel in self._sources for channel in channels):
+                self._start_poller()
+
+        try:
+            while True:
+                with self._cond:
+                    pending = self._pending(channels, sent)
+                    if not pending:
+                        self._cond.wait(timeout=self.heartbeat)
+                        pending = self._pending(channels, sent)
+
+                if not pending:
+                    yield ': heartbeat\n\n'
+                    continue
+
+                for channel, (version, payload) in pending:
+                    sent[channel] = version
+                    yield f"event: {channel}\ndata: {payload}\n\n"
+
+                # Anything published while sleeping is coalesced into one event
+                time.sleep(self.push_interval)
+        finally:
+            with self._cond:
+                for channel in channels:
+                    remaining = self._watchers.get(channel, 0) - 1
+                    if remaining > 0:
+                        self._watchers[channel] = remaining
+                        continue
+                    self._watchers.pop(channel, None)
+                    # Polled snapshots go stale once nobody watches; the next
+                    # watcher waits for a fresh poll instead
+                    if channel in self._sources:
+                        self._latest.pop(channel, None)
+
+    def _pending(self, channels, sent) -> list:
+        """Channels whose latest snapshot has not been sent (caller holds lock)"""
+        pending = []
+        for channel in channels:
+            entry = self._latest.get(channel)
+            if entry and entry[0] != sent.get(channel):
+                pending.append((channel, entry))
+        return pending
+
+    def _start_poller(self):
+        """Start the source poller if it is not running (caller holds lock)"""
+        if self._poller and self._poller.is_alive():
+            return
+        self._poller = threading.Thread(target=self._poll_sources, name='progress-poller', daemon=True)
+        self._poller.start()
+
+    def _poll_sources(self):
+        """Call watched sources until no source has watchers"""
+        while True:
+            with self._cond:
+                watched = [(channel, load_fn) for channel, load_fn in self._sources.items()
+                           if self._watchers.get(channel)]
+                if not watched:
+                    self._poller = None
+                    return
+
+            for channel, load_fn in watched:
+                try:
+                    self.publish(channel, load_fn())
+                except Exception as e:
+                    logger.warning(f"Progress source {channel} failed: {e}")
+
+            time.sleep(self.poll_interval)
+
+
+# Shared by producers (download manager, bulk downloader, seed and import jobs) and the SSE route
+progress_hub = ProgressHub()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Query Fanout - Run independent SQL statements concurrently on pooled connections
+
+Multi-section analytics endpoints run 5-15 independent aggregates. Running
+them one after another makes the endpoint as slow as the sum of its
+queries; fanning them out makes it about as slow as the slowest one.
+
+Each call uses at most QUERY_FANOUT_MAX_WORKERS connections from the pool
+(one per worker, each worker drains a shared queue of statements). If the
+pool has no connection to spare, the remaining statements run one by one on
+the caller's own connection, so a busy pool degrades to the old behaviour.
+
+Per-query timings are sent as a Server-Timing header when the app runs in
+debug mode or QUERY_TIMING_HEADER=true.
+
+Usage:
+    from utils.query_fanout import run_queries
+
+    results = run_queries({
+        'totals': ("SELECT COUNT(*), SUM(paid) FROM claim_rep_opip_nhso_item WHERE ...", params),
+        'by_month': ("SELECT service_month, COUNT(*) FROM ... GROUP BY service_month", params),
+    }, connect=get_db_connection, fallback_conn=conn)
+
+    total, paid = results.one('totals')
+    months = results['by_month']
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Connections one request may hold at once (keep well below DB_POOL_MAX)
+QUERY_FANOUT_MAX_WORKERS = int(os.getenv('QUERY_FANOUT_MAX_WORKERS', 4))
+# Threads shared by all requests
+QUERY_FANOUT_THREADS = int(os.getenv('QUERY_FANOUT_THREADS', 16))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared worker threads (created on first use)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=QUERY_FANOUT_THREADS,
+                                               thread_name_prefix='query-fanout')
+    return _executor
+
+
+class QueryResults(dict):
+    """Query name -> fetched rows; failed queries are in .errors instead"""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
+        self.timings = {}
+
+    def one(self, name: str, default=None):
+        """First row of a query (for single-row aggregates)"""
+        rows = self.get(name)
+        return rows[0] if rows else default
+
+
+def _execute(conn, name: str, sql: str, params, results: QueryResults):
+    """Run one statement, storing its rows, error and duration"""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        results[name] = cursor.fetchall()
+    except Exception as e:
+        results.errors[name] = e
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+    finally:
+        cursor.close()
+        results.timings[name] = (time.perf_counter() - start) * 1000
+
+
+def _worker(connect: Callable, pending: queue.Queue, results: QueryResults):
+    """Drain pending statements on one pooled connection"""
+    try:
+        conn = connect()
+    except Exception as e:
+        logger.warning(f"Query fanout could not get a connection: {e}")
+        return
+    if conn is None:
+        return
+    try:
+        while True:
+            try:
+                name, sql, params = pending.get_nowait()
+            except queue.Empty:
+                return
+            _execute(conn, name, sql, params, results)
+    finally:
+        conn.close()
+
+
+def run_queries(queries: Dict[str, Tuple[str, Sequence]], connect: Callable,
+                fallback_conn=None, max_workers: Optional[int] = None,
+                optional: Iterable[str] = ()) -> QueryResults:
+    """
+    Run independent SELECT statements concurrently
+
+    Args:
+        queries: name -> (sql, params)
+        connect: Returns a pooled connection (or None when none is available)
+        fallback_conn: Caller's connection for statements no worker picked up
+        max_workers: Concurrency cap for this call (default QUERY_FANOUT_MAX_WORKERS)
+        optional: Queries whose failure is only logged; any other failure is
+            re-raised after all queries have finished
+
+    Returns:
+        QueryResults mapping each name to its fetched rows
+    """
+    results = QueryResults()
+    pending = queue.Queue()
+    for name, (sql, params) in queries.items():
+        pending.put((name, sql, params))
+
+    workers = min(max_workers or QUERY_FANOUT_MAX_WORKERS, len(queries))
+    if workers > 1:
+        executor = _get_executor()
+        wait([executor.submit(_worker, connect, pending, results) for _ in range(workers)])
+
+    # Pool exhausted (or a single query): finish on the caller's connection
+    if not pending.empty():
+        conn = fallback_conn or connect()
+        if conn is None:
+            raise RuntimeError('Database connection failed')
+        try:
+            while not pending.empty():
+                name, sql, params = pending.get_nowait()
+                _execute(conn, name, sql, params, results)
+        finally:
+            if conn is not fallback_conn:
+                conn.close()
+
+    _record_timings(results.timings)
+
+    optional = set(optional)
+    for name, error in results.errors.items():
+        if name in optional:
+            logger.warning(f"Query '{name}' failed: {error}")
+        else:
+            logger.error(f"Query '{name}' failed: {error}")
+            raise error
+    return results
+
+
+def _record_timings(timings: Dict[str, float]):
+    """Keep timings on flask.g for the Server-Timing header"""
+    if not has_request_context():
+        return
+    recorded = g.get('query_timings')
+    if recorded is None:
+        recorded = g.query_timings = []
+    recorded.extend(timings.items())
+
+
+def init_query_timing(app):
+    """Add a Server-Timing header with per-query durations in debug mode"""
+
+    @app.after_request
+    def add_query_timing_header(response):
+        timings = g.get('query_timings')
+        if timings and (app.debug or app.config.get('QUERY_TIMING_HEADER')):
+            response.headers['Server-Timing'] = ', '.join(
+                f"{name};dur={duration:.1f}" for name, duration in timings
+            )
+        return response
@@ -1,16 +1,17 @@
 """
-API Rate Limiting with Token Bucket Algorithm
+API Rate Limiting with Sliding Window Counters
 
-Implements token bucket algorithm for rate limiting API requests.
-Prevents abuse, DoS attacks, and ensures fair resource usage.
+Limits API requests per user/IP and endpoint using sliding window counters
+(the current window's count plus the previous window's count weighted by
+how much of it still overlaps), stored in a pluggable backend:
 
-Features:
-- Token bucket algorithm (industry standard)
-- Per-user and per-IP rate limits
-- Configurable limits per endpoint
-- Automatic token refill
-- Redis support for distributed systems (optional)
-- In-memory fallback for single server
+- memory: per-process dict with LRU eviction (single worker)
+- sqlite: a SQLite file shared by all workers on one host
+- database: the rate_limit_counters table (migration 016), shared by all
+  workers and servers, updated with one atomic upsert per check
+
+Select the backend with RATE_LIMIT_BACKEND (default: memory). Backend
+errors fail open so an unavailable store never blocks the API.
 
 Usage:
     from utils.rate_limiter import rate_limiter
@@ -21,23 +22,39 @@ Usage:
         return jsonify({'success': True})
 """
 
+import logging
+import os
+import sqlite3
+import threading
 import time
 import hashlib
-from typing import Optional, Literal
-from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Literal, Tuple
 from threading import Lock
 from flask import request, jsonify
 from flask_login import current_user
 from functools import wraps
-from config.database import get_db_config, DB_TYPE
-import psycopg2
-import pymysql
+from config.database import DB_TYPE
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', 'data/rate_limits.sqlite3')
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))  # memory backend LRU bound
+CLEANUP_INTERVAL = 60  # Seconds between expired-row deletes (sqlite/database)
+
+# (allowed, remaining, seconds until the next request would be allowed)
+HitResult = Tuple[bool, int, float]
 
 
 class TokenBucket:
     """
-    Token Bucket implementation for rate limiting.
+    Token Bucket implementation for custom rate limiting logic.
+
+    RateLimiter uses sliding window counters instead (they can be shared
+    between workers); this class is kept for in-process burst control.
 
     How it works:
     - Bucket starts with N tokens (capacity)
@@ -110,29 +127,310 @@ class TokenBucket:
             return tokens_needed / self.refill_rate if tokens_needed > 0 else 0
 
 
+def _retry_after(previous: float, current: int, elapsed: float, limit: int, window: int) -> float:
+    """Seconds until previous * (1 - elapsed) + current + 1 <= limit (approximate past this window)"""
+    if previous > 0 and current + 1 <= limit:
+        needed = 1 - (limit - 1 - current) / previous
+        return max(0.0, (needed - elapsed) * window)
+    return (1 - elapsed) * window
+
+
+def sliding_window_hit(state: Optional[Tuple[int, int, int]], now: float, limit: int,
+                       window: int) -> Tuple[HitResult, Tuple[int, int, int]]:
+    """
+    Count one request against a sliding window counter.
+
+    Args:
+        state: (window_id, current_count, previous_count) or None for a new key
+        now: Current time (epoch seconds)
+        limit: Requests allowed per window
+        window: Window length in seconds
+
+    Returns:
+        ((allowed, remaining, retry_after), new_state). Rejected requests are not counted.
+    """
+    window_id = int(now // window)
+    elapsed = (now % window) / window
+
+    if state is None or state[0] < window_id - 1:
+        current, previous = 0, 0
+    elif state[0] == window_id - 1:
+        current, previous = 0, state[1]
+    else:
+        current, previous = state[1], state[2]
+
+    estimate = previous * (1 - elapsed) + current
+    allowed = estimate + 1 <= limit
+    if allowed:
+        current += 1
+        estimate += 1
+
+    remaining = max(0, int(limit - estimate))
+    retry_after = 0.0 if remaining else _retry_after(previous, current, elapsed, limit, window)
+    return (allowed, remaining, retry_after), (window_id, current, previous)
+
+
+class MemoryBackend:
+    """Per-process sliding window counters, bounded by LRU eviction."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        """
+        Initialize backend.
+
+        Args:
+            max_keys: Maximum keys kept; least recently used keys are evicted
+        """
+        self.max_keys = max_keys
+        self._windows = OrderedDict()  # key -> (window_id, current, previous)
+        self._lock = Lock()
+
+    def hit(self, key: str, limit: int, window: int) -> HitResult:
+        """Count one request for key and return (allowed, remaining, retry_after)."""
+        now = time.time()
+        with self._lock:
+            result, self._windows[key] = sliding_window_hit(self._windows.get(key), now, limit, window)
+            self._windows.move_to_end(key)
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        return result
+
+    def reset(self, key: str):
+        """Forget the counters for key."""
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def __len__(self):
+        return len(self._windows)
+
+
+def _upsert_sql(dialect: str) -> str:
+    """
+    Build the atomic sliding-window upsert for rate_limit_counters.
+
+    Parameters (named): key, window_id, weight (1 - elapsed part of window),
+    limit, now, expires_at. Counts the request only if it is allowed and
+    stores the decision in `allowed`.
+    """
+    if dialect == 'sqlite':
+        param = ':{}'.format
+    else:
+        param = '%({})s'.format
+    t = 'rate_limit_counters'
+    w = param('window_id')
+
+    prev_eff = (f"CASE WHEN {t}.window_id = {w} THEN {t}.previous_count "
+                f"WHEN {t}.window_id = {w} - 1 THEN {t}.current_count ELSE 0 END")
+    cur_eff = f"CASE WHEN {t}.window_id = {w} THEN {t}.current_count ELSE 0 END"
+    allow = f"({prev_eff}) * {param('weight')} + ({cur_eff}) + 1 <= {param('limit')}"
+
+    insert = f"""
+        INSERT INTO {t} (bucket_key, window_id, current_count, previous_count, allowed, expires_at)
+        VALUES ({param('key')}, {w}, 1, 0, 1, {param('expires_at')})"""
+
+    if dialect == 'mysql':
+        # MySQL applies assignments left to right: `allowed` and `previous_count`
+        # read the old row, then current_count reads the new `allowed`
+        return insert + f"""
+        ON DUPLICATE KEY UPDATE
+            allowed = CASE WHEN {allow} THEN 1 ELSE 0 END,
+            previous_count = {prev_eff},
+            current_count = ({cur_eff}) + {t}.allowed,
+            window_id = {w},
+            expires_at = {param('expires_at')}"""
+
+    # PostgreSQL / SQLite: every SET expression reads the old row
+    return insert + f"""
+        ON CONFLICT (bucket_key) DO UPDATE SET
+            allowed = CASE WHEN {allow} THEN 1 ELSE 0 END,
+            previous_count = {prev_eff},
+            current_count = ({cur_eff}) + CASE WHEN {allow} THEN 1 ELSE 0 END,
+            window_id = {w},
+            expires_at = {param('expires_at')}
+        RETURNING allowed, current_count, previous_count"""
+
+
+def _upsert_params(key: str, limit: int, window: int, now: float) -> dict:
+    """Named parameters for _upsert_sql."""
+    return {
+        'key': key,
+        'window_id': int(now // window),
+        'weight': 1 - (now % window) / window,
+        'limit': limit,
+        'expires_at': now + 2 * window,  # Row is irrelevant once two windows have passed
+    }
+
+
+def _upsert_result(row, limit: int, window: int, now: float) -> HitResult:
+    """Turn (allowed, current_count, previous_count) into a HitResult."""
+    allowed, current, previous = bool(row[0]), row[1], row[2]
+    elapsed = (now % window) / window
+    remaining = max(0, int(limit - (previous * (1 - elapsed) + current)))
+    retry_after = 0.0 if remaining else _retry_after(previous, current, elapsed, limit, window)
+    return allowed, remaining, retry_after
+
+
+class SQLiteBackend:
+    """Sliding window counters in a SQLite file shared by all workers on the host."""
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        """
+        Initialize backend.
+
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._sql = _upsert_sql('sqlite')
+        self._last_cleanup = 0.0
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                bucket_key TEXT PRIMARY KEY,
+                window_id INTEGER NOT NULL,
+                current_count INTEGER NOT NULL,
+                previous_count INTEGER NOT NULL,
+                allowed INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode (each upsert is its own transaction)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window: int) -> HitResult:
+        """Count one request for key and return (allowed, remaining, retry_after)."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(self._sql, _upsert_params(key, limit, window, now)).fetchone()
+            if now - self._last_cleanup > CLEANUP_INTERVAL:
+                self._last_cleanup = now
+                conn.execute('DELETE FROM rate_limit_counters WHERE expires_at < ?', (now,))
+            return _upsert_result(row, limit, window, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            return True, limit, 0.0
+
+    def reset(self, key: str):
+        """Forget the counters for key."""
+        self._connection().execute('DELETE FROM rate_limit_counters WHERE bucket_key = ?', (key,))
+
+
+class DatabaseBackend:
+    """Sliding window counters in the rate_limit_counters table (PostgreSQL or MySQL)."""
+
+    def __init__(self, db_type: str = DB_TYPE):
+        """
+        Initialize backend.
+
+        Args:
+            db_type: 'postgresql' or 'mysql'
+        """
+        self.db_type = db_type
+        self._sql = _upsert_sql(db_type)
+        self._last_cleanup = 0.0
+
+    def hit(self, key: str, limit: int, window: int) -> HitResult:
+        """Count one request for key and return (allowed, remaining, retry_after)."""
+        from config.db_pool import get_connection, return_connection
+
+        now = time.time()
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(self._sql, _upsert_params(key, limit, window, now))
+            if self.db_type == 'mysql':
+                cursor.execute("""
+                    SELECT allowed, current_count, previous_count
+                    FROM rate_limit_counters WHERE bucket_key = %s
+                """, (key,))
+            row = cursor.fetchone()
+            if now - self._last_cleanup > CLEANUP_INTERVAL:
+                self._last_cleanup = now
+                cursor.execute('DELETE FROM rate_limit_counters WHERE expires_at < %s', (now,))
+            conn.commit()
+            cursor.close()
+            return _upsert_result(row, limit, window, now)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            return True, limit, 0.0
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def reset(self, key: str):
+        """Forget the counters for key."""
+        from config.db_pool import get_connection, return_connection
+
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM rate_limit_counters WHERE bucket_key = %s', (key,))
+            conn.commit()
+            cursor.close()
+        finally:
+            return_connection(conn)
+
+
+def create_backend(name: str):
+    """
+    Create a rate limit backend by name.
+
+    Args:
+        name: 'memory', 'sqlite' or 'database'
+
+    Returns:
+        Backend instance
+    """
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend()
+    if name == 'database':
+        return DatabaseBackend()
+    raise ValueError(f"Invalid rate limit backend: {name}")
+
+
+@lru_cache(maxsize=4096)
+def _hash_key(key: str) -> str:
+    """Hash a bucket key (cached - the same endpoint/identifier pairs repeat)."""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
 class RateLimiter:
     """
-    Application-level rate limiter using token buckets.
+    Application-level rate limiter using sliding window counters.
 
     Supports:
     - Per-user limits (requires authentication)
     - Per-IP limits (anonymous requests)
     - Per-endpoint configuration
-    - In-memory storage (single server)
-    - Database persistence (optional)
+    - Memory, shared SQLite or database storage (see module docstring)
     """
 
-    def __init__(self, use_database: bool = False):
+    def __init__(self, use_database: bool = False, backend=None):
         """
         Initialize rate limiter.
 
         Args:
-            use_database: Store rate limits in database (for multi-server)
+            use_database: Store counters in the database (for multi-server)
+            backend: Backend instance (default: from RATE_LIMIT_BACKEND)
         """
-        self.use_database = use_database
-        self.buckets = defaultdict(lambda: None)  # key -> TokenBucket
-        self.cleanup_interval = 3600  # Cleanup old buckets every hour
-        self.last_cleanup = time.time()
+        if backend is None:
+            backend = create_backend('database' if use_database else RATE_LIMIT_BACKEND)
+        self.backend = backend
+        self.use_database = isinstance(backend, DatabaseBackend)
 
     def _get_identifier(self, per: Literal['user', 'ip']) -> str:
         """
@@ -166,34 +464,23 @@ class RateLimiter:
         Returns:
             Bucket key (hashed for privacy)
         """
-        # Hash to protect privacy (don't store raw IPs/user IDs in memory)
-        key = f"{endpoint}:{identifier}"
-        return hashlib.sha256(key.encode()).hexdigest()[:16]
-
-    def _get_bucket(self, key: str, capacity: int, refill_rate: float) -> TokenBucket:
-        """Get or create token bucket."""
-        if self.buckets[key] is None:
-            self.buckets[key] = TokenBucket(capacity, refill_rate)
+        # Hash to protect privacy (don't store raw IPs/user IDs in memory or tables)
+        return _hash_key(f"{endpoint}:{identifier}")
 
-        return self.buckets[key]
-
-    def _cleanup_old_buckets(self):
-        """Remove old buckets to prevent memory leaks."""
-        now = time.time()
-
-        if now - self.last_cleanup < self.cleanup_interval:
-            return
-
-        # Remove buckets that haven't been used in 1 hour
-        keys_to_remove = []
-        for key, bucket in self.buckets.items():
-            if bucket and (now - bucket.last_refill) > 3600:
-                keys_to_remove.append(key)
+    def hit(self, endpoint: str, identifier: str, requests: int, window: int) -> HitResult:
+        """
+        Count one request and check it against the limit.
 
-        for key in keys_to_remove:
-            del self.buckets[key]
+        Args:
+            endpoint: Endpoint name
+            identifier: User/IP identifier
+            requests: Number of requests allowed
+            window: Time window in seconds
 
-        self.last_cleanup = now
+        Returns:
+            (allowed, remaining, retry_after seconds)
+        """
+        return self.backend.hit(self._get_bucket_key(endpoint, identifier), requests, window)
 
     def limit(
         self,
@@ -229,26 +516,16 @@ class RateLimiter:
                 # Get identifier
                 identifier = self._get_identifier(per)
 
-                # Get bucket key
-                bucket_key = self._get_bucket_key(_endpoint, identifier)
+                allowed, remaining, reset_time = self.hit(_endpoint, identifier, requests, window)
 
-                # Calculate refill rate (tokens per second)
-                refill_rate = requests / window
-
-                # Get or create bucket
-                bucket = self._get_bucket(bucket_key, requests, refill_rate)
-
-                # Try to consume token
-                if not bucket.consume():
+                if not allowed:
                     # Rate limit exceeded
-                    remaining = bucket.get_remaining()
-                    reset_time = bucket.get_reset_time()
                     retry_after = int(reset_time) + 1  # Round up
 
                     # Log rate limit event
                     from utils.logging_config import setup_logger
-                    logger = setup_logger('rate_limiter')
-                    logger.warning(
+                    limit_logger = setup_logger('rate_limiter')
+                    limit_logger.warning(
                         f"Rate limit exceeded: {identifier} on {_endpoint} "
                         f"(limit: {requests}/{window}s)"
                     )
@@ -271,13 +548,6 @@ class RateLimiter:
 
                     return response
 
-                # Cleanup old buckets periodically
-                self._cleanup_old_buckets()
-
-                # Add rate limit headers to successful response
-                remaining = bucket.get_remaining()
-                reset_time = bucket.get_reset_time()
-
                 response = f(*args, **kwargs)
 
                 # If response is tuple (response, status_code), extract response
@@ -305,13 +575,11 @@ class RateLimiter:
             endpoint: Endpoint name
             identifier: User/IP identifier
         """
-        bucket_key = self._get_bucket_key(endpoint, identifier)
-        if bucket_key in self.buckets:
-            del self.buckets[bucket_key]
+        self.backend.reset(self._get_bucket_key(endpoint, identifier))
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter(use_database=False)
+rate_limiter = RateLimiter()
 
 
 # Convenience decorators for common limits
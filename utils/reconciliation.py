@@ -7,48 +7,15 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from decimal import Decimal
 
-from config.database import DB_TYPE
-from utils.fiscal_year import (
-    get_fiscal_year_sql_filter_gregorian,
-    get_fiscal_year_sql_filter_be,
-    get_fiscal_year_be_range_for_query
+from utils.fiscal_year import get_fiscal_year_be_range_for_query
+from utils.sql_helpers import (
+    be_month_to_service_month,
+    fiscal_year_of_be_month,
+    service_month_to_be,
+    sql_fiscal_year_filter,
+    sql_posting_fiscal_year_filter,
 )
-
-
-# SQL helpers for cross-database compatibility
-def sql_extract_year(column: str) -> str:
-    """Generate SQL for extracting year as integer"""
-    if DB_TYPE == 'mysql':
-        return f"YEAR({column})"
-    return f"EXTRACT(YEAR FROM {column})::int"
-
-
-def sql_extract_month(column: str) -> str:
-    """Generate SQL for extracting month"""
-    if DB_TYPE == 'mysql':
-        return f"MONTH({column})"
-    return f"EXTRACT(MONTH FROM {column})"
-
-
-def sql_extract_month_text(column: str) -> str:
-    """Generate SQL for extracting month as zero-padded text"""
-    if DB_TYPE == 'mysql':
-        return f"LPAD(MONTH({column}), 2, '0')"
-    return f"LPAD(EXTRACT(MONTH FROM {column})::text, 2, '0')"
-
-
-def sql_year_month_format(column: str) -> str:
-    """Generate SQL for YYYY-MM format"""
-    if DB_TYPE == 'mysql':
-        return f"DATE_FORMAT({column}, '%Y-%m')"
-    return f"TO_CHAR({column}, 'YYYY-MM')"
-
-
-def sql_be_month(column: str) -> str:
-    """Generate SQL for Buddhist Era YYYYMM format"""
-    if DB_TYPE == 'mysql':
-        return f"CONCAT(YEAR({column}) + 543, LPAD(MONTH({column}), 2, '0'))"
-    return f"(EXTRACT(YEAR FROM {column})::int + 543)::text || LPAD(EXTRACT(MONTH FROM {column})::text, 2, '0')"
+from utils.vendor_code import normalize_vendor_code
 
 
 # Fund code mapping: REP main_fund codes to SMT fund groups
@@ -129,6 +96,7 @@ class ReconciliationReport:
     def __init__(self, db_connection, hospital_code: str = None):
         self.conn = db_connection
         self.hospital_code = hospital_code
+        self.vendor_code5 = normalize_vendor_code(hospital_code)
 
     def get_rep_monthly_summary(self) -> List[Dict]:
         """
@@ -139,23 +107,17 @@ class ReconciliationReport:
         """
         cursor = self.conn.cursor()
 
-        month_gregorian_sql = sql_year_month_format('dateadm')
-        be_month_sql = sql_be_month('dateadm')
-
-        query = f"""
+        # service_month is a generated, indexed 'YYYY-MM' of dateadm (migration 020)
+        query = """
         SELECT
-            {month_gregorian_sql} as month_gregorian,
-            {be_month_sql} as month_be,
+            service_month as month_gregorian,
             main_fund,
             COUNT(*) as claim_count,
             COALESCE(SUM(reimb_nhso), 0) as reimb_nhso,
             COALESCE(SUM(reimb_agency), 0) as reimb_agency
         FROM claim_rep_opip_nhso_item
-        WHERE dateadm IS NOT NULL
-        GROUP BY
-            {month_gregorian_sql},
-            {be_month_sql},
-            main_fund
+        WHERE service_month IS NOT NULL
+        GROUP BY service_month, main_fund
         ORDER BY month_gregorian DESC, main_fund
         """
 
@@ -167,12 +129,12 @@ class ReconciliationReport:
         for row in rows:
             results.append({
                 'month_gregorian': row[0],
-                'month_be': row[1],
-                'main_fund': row[2] or 'UNKNOWN',
-                'claim_count': row[3],
-                'reimb_nhso': float(row[4] or 0),
-                'reimb_agency': float(row[5] or 0),
-                'total_claim': float((row[4] or 0) + (row[5] or 0))
+                'month_be': service_month_to_be(row[0]),
+                'main_fund': row[1] or 'UNKNOWN',
+                'claim_count': row[2],
+                'reimb_nhso': float(row[3] or 0),
+                'reimb_agency': float(row[4] or 0),
+                'total_claim': float((row[3] or 0) + (row[4] or 0))
             })
 
         return results
@@ -187,16 +149,16 @@ class ReconciliationReport:
         cursor = self.conn.cursor()
 
         # Build WHERE clause with hospital filter
-        where_clause = "WHERE posting_date IS NOT NULL"
+        where_clause = "WHERE posting_month IS NOT NULL"
         params = []
         if self.hospital_code:
-            # Normalize vendor_no by removing leading zeros for comparison
-            where_clause += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-            params.append(self.hospital_code)
+            # vendor_code5 is vendor_no without leading zeros (indexed)
+            where_clause += " AND vendor_code5 = %s"
+            params.append(self.vendor_code5)
 
         query = f"""
         SELECT
-            LEFT(posting_date, 6) as month_be,
+            posting_month as month_be,
             fund_group_desc,
             fund_name,
             COUNT(*) as payment_count,
@@ -205,7 +167,7 @@ class ReconciliationReport:
         FROM smt_budget_transfers
         {where_clause}
         GROUP BY
-            LEFT(posting_date, 6),
+            posting_month,
             fund_group_desc,
             fund_name
         ORDER BY month_be DESC, fund_group_desc
@@ -218,18 +180,9 @@ class ReconciliationReport:
         results = []
         for row in rows:
             # Convert BE month to gregorian for comparison
-            be_month = row[0]
-            if be_month and len(be_month) == 6:
-                be_year = int(be_month[:4])
-                month = be_month[4:6]
-                gregorian_year = be_year - 543
-                month_gregorian = f"{gregorian_year}-{month}"
-            else:
-                month_gregorian = None
-
             results.append({
                 'month_be': row[0],
-                'month_gregorian': month_gregorian,
+                'month_gregorian': be_month_to_service_month(row[0]),
                 'fund_group': row[1],
                 'fund_name': row[2],
                 'payment_count': row[3],
@@ -249,23 +202,21 @@ class ReconciliationReport:
         cursor = self.conn.cursor()
 
         # Get REP summary by month
-        be_month_sql = sql_be_month('dateadm')
-        rep_query = f"""
+        rep_query = """
         SELECT
-            {be_month_sql} as month_be,
+            service_month,
             COUNT(*) as claim_count,
             COUNT(DISTINCT tran_id) as unique_claims,
             COALESCE(SUM(reimb_nhso), 0) as total_reimb_nhso,
             COALESCE(SUM(reimb_agency), 0) as total_reimb_agency
         FROM claim_rep_opip_nhso_item
-        WHERE dateadm IS NOT NULL
-        GROUP BY
-            {be_month_sql}
-        ORDER BY month_be DESC
+        WHERE service_month IS NOT NULL
+        GROUP BY service_month
+        ORDER BY service_month DESC
         """
 
         cursor.execute(rep_query)
-        rep_data = {row[0]: {
+        rep_data = {service_month_to_be(row[0]): {
             'claim_count': row[1],
             'unique_claims': row[2],
             'reimb_nhso': float(row[3] or 0),
@@ -273,22 +224,22 @@ class ReconciliationReport:
         } for row in cursor.fetchall()}
 
         # Get SMT summary by month
-        smt_where = "WHERE posting_date IS NOT NULL"
+        smt_where = "WHERE posting_month IS NOT NULL"
         smt_params = []
         if self.hospital_code:
-            smt_where += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-            smt_params.append(self.hospital_code)
+            smt_where += " AND vendor_code5 = %s"
+            smt_params.append(self.vendor_code5)
 
         smt_query = f"""
         SELECT
-            LEFT(posting_date, 6) as month_be,
+            posting_month as month_be,
             COUNT(*) as payment_count,
             COALESCE(SUM(amount), 0) as total_amount,
             COALESCE(SUM(wait_amount), 0) as wait_amount,
             COALESCE(SUM(debt_amount), 0) as debt_amount
         FROM smt_budget_transfers
         {smt_where}
-        GROUP BY LEFT(posting_date, 6)
+        GROUP BY posting_month
         ORDER BY month_be DESC
         """
 
@@ -361,17 +312,19 @@ class ReconciliationReport:
 
         # Build WHERE clause
         rep_where = "WHERE dateadm IS NOT NULL"
+        rep_params = []
         smt_where = "WHERE posting_date IS NOT NULL"
         smt_params = []
 
         if month_be:
-            be_month_sql = sql_be_month('dateadm')
-            rep_where += f" AND {be_month_sql} = '{month_be}'"
-            smt_where += f" AND LEFT(posting_date, 6) = '{month_be}'"
+            rep_where += " AND service_month = %s"
+            rep_params.append(be_month_to_service_month(month_be))
+            smt_where += " AND posting_month = %s"
+            smt_params.append(month_be)
 
         if self.hospital_code:
-            smt_where += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-            smt_params.append(self.hospital_code)
+            smt_where += " AND vendor_code5 = %s"
+            smt_params.append(self.vendor_code5)
 
         # Get REP by fund
         rep_query = f"""
@@ -385,7 +338,7 @@ class ReconciliationReport:
         ORDER BY reimb_nhso DESC
         """
 
-        cursor.execute(rep_query)
+        cursor.execute(rep_query, rep_params)
         rep_data = {row[0]: {
             'claim_count': row[1],
             'reimb_nhso': float(row[2] or 0)
@@ -462,37 +415,22 @@ class ReconciliationReport:
         """
         cursor = self.conn.cursor()
 
-        # Get fiscal years from REP data
-        year_expr = sql_extract_year('dateadm')
-        month_expr = sql_extract_month('dateadm')
-        rep_query = f"""
-        SELECT DISTINCT
-            CASE
-                WHEN {month_expr} >= 10
-                THEN {year_expr} + 544
-                ELSE {year_expr} + 543
-            END as fiscal_year
+        # Get fiscal years from REP data (generated, indexed fiscal_year_be)
+        cursor.execute("""
+        SELECT DISTINCT fiscal_year_be
         FROM claim_rep_opip_nhso_item
-        WHERE dateadm IS NOT NULL
-        """
-        cursor.execute(rep_query)
+        WHERE fiscal_year_be IS NOT NULL
+        """)
         rep_years = set(row[0] for row in cursor.fetchall())
 
-        # Get fiscal years from SMT data
-        # MySQL uses SIGNED instead of INT for CAST
-        int_type = "SIGNED" if DB_TYPE == 'mysql' else "INT"
-        smt_query = f"""
-        SELECT DISTINCT
-            CASE
-                WHEN CAST(SUBSTRING(posting_date, 5, 2) AS {int_type}) >= 10
-                THEN CAST(SUBSTRING(posting_date, 1, 4) AS {int_type}) + 1
-                ELSE CAST(SUBSTRING(posting_date, 1, 4) AS {int_type})
-            END as fiscal_year
+        # Get fiscal years from SMT data (distinct posting months off the index)
+        cursor.execute("""
+        SELECT DISTINCT posting_month
         FROM smt_budget_transfers
-        WHERE posting_date IS NOT NULL AND LENGTH(posting_date) >= 6
-        """
-        cursor.execute(smt_query)
-        smt_years = set(row[0] for row in cursor.fetchall())
+        WHERE posting_month IS NOT NULL
+        """)
+        smt_years = {fiscal_year_of_be_month(row[0]) for row in cursor.fetchall()}
+        smt_years.discard(None)
 
         cursor.close()
 
@@ -516,25 +454,22 @@ class ReconciliationReport:
         fy_start_year_be, fy_end_year_be = get_fiscal_year_be_range_for_query(fiscal_year)
 
         # Get REP data for fiscal year using Gregorian date filter
-        rep_where, rep_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+        rep_where, rep_params = sql_fiscal_year_filter(fiscal_year)
 
-        be_month_sql = sql_be_month('dateadm')
         rep_query = f"""
         SELECT
-            {be_month_sql} as month_be,
+            service_month,
             COUNT(*) as claim_count,
             COUNT(DISTINCT tran_id) as unique_claims,
             COALESCE(SUM(reimb_nhso), 0) as total_reimb_nhso,
             COALESCE(SUM(reimb_agency), 0) as total_reimb_agency
         FROM claim_rep_opip_nhso_item
-        WHERE dateadm IS NOT NULL
-          AND {rep_where}
-        GROUP BY
-            {be_month_sql}
-        ORDER BY month_be
+        WHERE {rep_where}
+        GROUP BY service_month
+        ORDER BY service_month
         """
         cursor.execute(rep_query, rep_params)
-        rep_data = {row[0]: {
+        rep_data = {service_month_to_be(row[0]): {
             'claim_count': row[1],
             'unique_claims': row[2],
             'reimb_nhso': float(row[3] or 0),
@@ -542,25 +477,25 @@ class ReconciliationReport:
         } for row in cursor.fetchall()}
 
         # Get SMT data for fiscal year using BE date filter
-        smt_where_fy, smt_fy_params = get_fiscal_year_sql_filter_be(fiscal_year, 'posting_date')
+        smt_where_fy, smt_fy_params = sql_posting_fiscal_year_filter(fiscal_year)
 
-        smt_where = f"WHERE posting_date IS NOT NULL AND {smt_where_fy}"
+        smt_where = f"WHERE {smt_where_fy}"
         smt_params = smt_fy_params.copy()
 
         if self.hospital_code:
-            smt_where += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-            smt_params.append(self.hospital_code)
+            smt_where += " AND vendor_code5 = %s"
+            smt_params.append(self.vendor_code5)
 
         smt_query = f"""
         SELECT
-            LEFT(posting_date, 6) as month_be,
+            posting_month as month_be,
             COUNT(*) as payment_count,
             COALESCE(SUM(amount), 0) as total_amount,
             COALESCE(SUM(wait_amount), 0) as wait_amount,
             COALESCE(SUM(debt_amount), 0) as debt_amount
         FROM smt_budget_transfers
         {smt_where}
-        GROUP BY LEFT(posting_date, 6)
+        GROUP BY posting_month
         ORDER BY month_be
         """
         cursor.execute(smt_query, smt_params)
@@ -636,7 +571,7 @@ class ReconciliationReport:
 
         if fiscal_year:
             # Get REP stats for fiscal year using Gregorian date filter
-            rep_where, rep_params = get_fiscal_year_sql_filter_gregorian(fiscal_year, 'dateadm')
+            rep_where, rep_params = sql_fiscal_year_filter(fiscal_year)
 
             cursor.execute(f"""
             SELECT
@@ -653,14 +588,14 @@ class ReconciliationReport:
             rep_row = cursor.fetchone()
 
             # Get SMT stats for fiscal year using BE date filter
-            smt_fy_where, smt_fy_params = get_fiscal_year_sql_filter_be(fiscal_year, 'posting_date')
+            smt_fy_where, smt_fy_params = sql_posting_fiscal_year_filter(fiscal_year)
 
-            smt_where = f"WHERE posting_date IS NOT NULL AND {smt_fy_where}"
+            smt_where = f"WHERE {smt_fy_where}"
             smt_params = smt_fy_params.copy()
 
             if self.hospital_code:
-                smt_where += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-                smt_params.append(self.hospital_code)
+                smt_where += " AND vendor_code5 = %s"
+                smt_params.append(self.vendor_code5)
 
             cursor.execute(f"""
             SELECT
@@ -691,8 +626,8 @@ class ReconciliationReport:
             smt_all_where = "WHERE 1=1"
             smt_all_params = []
             if self.hospital_code:
-                smt_all_where += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-                smt_all_params.append(self.hospital_code)
+                smt_all_where += " AND vendor_code5 = %s"
+                smt_all_params.append(self.vendor_code5)
 
             cursor.execute(f"""
             SELECT
@@ -756,8 +691,8 @@ class ReconciliationReport:
         smt_summary_where = "WHERE 1=1"
         smt_summary_params = []
         if self.hospital_code:
-            smt_summary_where += " AND TRIM(LEADING '0' FROM vendor_no) = TRIM(LEADING '0' FROM %s)"
-            smt_summary_params.append(self.hospital_code)
+            smt_summary_where += " AND vendor_code5 = %s"
+            smt_summary_params.append(self.vendor_code5)
 
         cursor.execute(f"""
         SELECT
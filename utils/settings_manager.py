@@ -1,18 +1,56 @@
 #!/usr/bin/env python3
 """
 Settings Manager - Manage application settings
+
+Parsed settings are kept in a per-process snapshot shared by all
+SettingsManager instances and reloaded only when settings.json changes
+(inode, mtime or size), so getters called per request or per file do not
+re-read the file. Writes go through a temp file + os.replace under a
+lock file, so the Flask process and downloader subprocesses never see a
+half-written file or lose each other's read-modify-write updates.
 """
 
+import copy
+import functools
 import json
 import os
 import random
+import stat
+import sys
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, Optional, List, Tuple
 
+try:
+    import fcntl
+except ImportError:  # Windows - writes are only serialized within the process
+    fcntl = None
+
+# Parsed settings per file: path -> (file signature, settings); shared, never modified in place
+_snapshots: Dict[str, Tuple[Tuple[int, int, int], Dict]] = {}
+_snapshots_lock = threading.Lock()
+
+# Serializes writes within the process; the lock file serializes across processes
+_write_lock = threading.RLock()
+_write_depth = 0
+
+
+def _exclusive(method):
+    """Run a read-modify-write settings method under the settings write lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class SettingsManager:
     """Manage application settings"""
 
+    # LicenseChecker.revision last synced into hospital_code (shared by all instances)
+    _license_synced_revision = None
+
     def __init__(self, settings_file=None):
         if settings_file is None:
             # Check environment variable first
@@ -32,6 +70,7 @@ class SettingsManager:
 
         self.settings_file = Path(settings_file)
         self.settings_file.parent.mkdir(parents=True, exist_ok=True)
+        self._snapshot_key = str(self.settings_file.resolve())
 
         # Default settings
         self.default_settings = {
@@ -63,22 +102,66 @@ class SettingsManager:
             'smt_auto_save_db': True
         }
 
-    def load_settings(self) -> Dict:
-        """Load settings from file"""
-        if not self.settings_file.exists():
-            return self.default_settings.copy()
-
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Return (inode, mtime_ns, size) of the settings file, or None if missing"""
         try:
-            with open(self.settings_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
-                # Merge with defaults to ensure all keys exist
-                return {**self.default_settings, **settings}
-        except Exception:
-            return self.default_settings.copy()
+            file_stat = os.stat(self.settings_file)
+        except OSError:
+            return None
+        return (file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+
+    def _snapshot(self) -> Dict:
+        """
+        Return the current parsed settings, reloading only if the file changed
+
+        Returns:
+            Settings merged with defaults. Shared between callers - do not modify.
+        """
+        signature = self._file_signature()
+        with _snapshots_lock:
+            cached = _snapshots.get(self._snapshot_key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        if signature is None:
+            settings = copy.deepcopy(self.default_settings)
+        else:
+            try:
+                with open(self.settings_file, 'r', encoding='utf-8') as f:
+                    # Merge with defaults to ensure all keys exist
+                    settings = {**copy.deepcopy(self.default_settings), **json.load(f)}
+            except Exception:
+                # Unreadable file - use defaults but retry on the next read
+                return copy.deepcopy(self.default_settings)
+
+        with _snapshots_lock:
+            _snapshots[self._snapshot_key] = (signature, settings)
+        return settings
+
+    @contextmanager
+    def _locked(self):
+        """Hold the settings write lock (re-entrant, across threads and processes)"""
+        global _write_depth
+        with _write_lock:
+            lock_file = None
+            if _write_depth == 0 and fcntl is not None:
+                lock_file = open(self.settings_file.with_name(self.settings_file.name + '.lock'), 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _write_depth += 1
+            try:
+                yield
+            finally:
+                _write_depth -= 1
+                if lock_file is not None:
+                    lock_file.close()  # Releases the flock
+
+    def load_settings(self) -> Dict:
+        """Load settings (a private copy the caller may modify and pass to save_settings)"""
+        return copy.deepcopy(self._snapshot())
 
     def save_settings(self, settings: Dict) -> bool:
         """
-        Save settings to file
+        Save settings to file atomically
 
         Args:
             settings: Settings dict to save
@@ -86,12 +169,34 @@ class SettingsManager:
         Returns:
             True if successful, False otherwise
         """
+        tmp_path = self.settings_file.with_name(f'{self.settings_file.name}.{os.getpid()}.tmp')
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            with self._locked():
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(settings, f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if self.settings_file.exists():
+                    # Keep permissions of the existing file (it holds credentials)
+                    os.chmod(tmp_path, stat.S_IMODE(os.stat(self.settings_file).st_mode))
+                os.replace(tmp_path, self.settings_file)
+
+                written = {**copy.deepcopy(self.default_settings), **copy.deepcopy(settings)}
+                with _snapshots_lock:
+                    _snapshots[self._snapshot_key] = (self._file_signature(), written)
+
+            # Hospital code is part of license validation - re-verify on next check
+            license_checker = sys.modules.get('utils.license_checker')
+            if license_checker is not None:
+                license_checker.LicenseChecker.settings_generation += 1
+
             return True
         except Exception as e:
             print(f"Error saving settings: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
             return False
 
     def get_eclaim_credentials(self, random_select: bool = True) -> Tuple[str, str]:
@@ -104,7 +209,7 @@ class SettingsManager:
         Returns:
             (username, password) tuple
         """
-        settings = self.load_settings()
+        settings = self._snapshot()
         credentials_list = settings.get('eclaim_credentials', [])
 
         # Filter only enabled credentials
@@ -147,6 +252,7 @@ class SettingsManager:
 
         return credentials_list
 
+    @_exclusive
     def update_credentials(self, username: str, password: str) -> bool:
         """
         Update E-Claim credentials (legacy single credential mode)
@@ -183,6 +289,7 @@ class SettingsManager:
 
         return self.save_settings(settings)
 
+    @_exclusive
     def add_credential(self, username: str, password: str, note: str = '', enabled: bool = True) -> bool:
         """
         Add a new E-Claim credential
@@ -224,6 +331,7 @@ class SettingsManager:
 
         return self.save_settings(settings)
 
+    @_exclusive
     def remove_credential(self, username: str) -> bool:
         """
         Remove an E-Claim credential
@@ -252,6 +360,7 @@ class SettingsManager:
 
         return self.save_settings(settings)
 
+    @_exclusive
     def update_credential(self, username: str, password: str = None, note: str = None, enabled: bool = None) -> bool:
         """
         Update an existing E-Claim credential
@@ -280,6 +389,7 @@ class SettingsManager:
 
         return False
 
+    @_exclusive
     def set_all_credentials(self, credentials: List[Dict]) -> bool:
         """
         Set all E-Claim credentials (replace all)
@@ -349,7 +459,7 @@ class SettingsManager:
             schedule_schemes, schedule_type_rep, schedule_type_stm, schedule_type_smt,
             schedule_smt_vendor_id, schedule_parallel_download, schedule_parallel_workers
         """
-        settings = self.load_settings()
+        settings = copy.deepcopy(self._snapshot())
         # For SMT vendor ID, use schedule_smt_vendor_id first, then hospital_code
         smt_vendor = settings.get('schedule_smt_vendor_id', '')
         if not smt_vendor:
@@ -368,6 +478,7 @@ class SettingsManager:
             'schedule_parallel_workers': settings.get('schedule_parallel_workers', 3)
         }
 
+    @_exclusive
     def update_schedule_settings(self, enabled: bool, times: list, auto_import: bool,
                                    type_rep: bool = True, type_stm: bool = False,
                                    type_smt: bool = False, smt_vendor_id: str = '',
@@ -424,6 +535,7 @@ class SettingsManager:
             'smt_auto_save_db': settings.get('smt_auto_save_db', True)
         }
 
+    @_exclusive
     def update_smt_settings(self, vendor_id: str, schedule_enabled: bool,
                             times: list, auto_save_db: bool) -> bool:
         """
@@ -455,9 +567,9 @@ class SettingsManager:
         Returns:
             List of scheme codes like ['ucs', 'ofc', 'sss', 'lgo']
         """
-        settings = self.load_settings()
-        return settings.get('enabled_schemes', ['ucs', 'ofc', 'sss', 'lgo'])
+        return list(self._snapshot().get('enabled_schemes', ['ucs', 'ofc', 'sss', 'lgo']))
 
+    @_exclusive
     def update_enabled_schemes(self, schemes: list) -> bool:
         """
         Update enabled insurance schemes
@@ -504,8 +616,7 @@ class SettingsManager:
         Returns:
             Setting value or default
         """
-        settings = self.load_settings()
-        return settings.get(key, default)
+        return copy.deepcopy(self._snapshot().get(key, default))
 
     # ===== Hospital Settings =====
 
@@ -517,13 +628,14 @@ class SettingsManager:
         Returns:
             Hospital code (5-digit string) or empty string
         """
-        settings = self.load_settings()
+        settings = self._snapshot()
         hospital_code = settings.get('hospital_code', '').strip()
         if hospital_code:
             return hospital_code
         # Fallback to legacy smt_vendor_id
         return settings.get('smt_vendor_id', '').strip()
 
+    @_exclusive
     def set_hospital_code(self, hospital_code: str) -> bool:
         """
         Set the global hospital code.
@@ -582,7 +694,7 @@ class SettingsManager:
         Returns:
             Dict with stm_schedule_enabled, stm_schedule_times, stm_schedule_auto_import, stm_schedule_schemes
         """
-        settings = self.load_settings()
+        settings = copy.deepcopy(self._snapshot())
         return {
             'stm_schedule_enabled': settings.get('stm_schedule_enabled', False),
             'stm_schedule_times': settings.get('stm_schedule_times', []),
@@ -590,6 +702,7 @@ class SettingsManager:
             'stm_schedule_schemes': settings.get('stm_schedule_schemes', ['ucs', 'ofc', 'sss', 'lgo'])
         }
 
+    @_exclusive
     def update_stm_schedule_settings(self, enabled: bool, times: list,
                                       auto_import: bool, schemes: list) -> bool:
         """
@@ -626,9 +739,9 @@ class SettingsManager:
         Returns:
             List of scheme codes
         """
-        settings = self.load_settings()
-        return settings.get('schedule_schemes', ['ucs', 'ofc', 'sss', 'lgo'])
+        return list(self._snapshot().get('schedule_schemes', ['ucs', 'ofc', 'sss', 'lgo']))
 
+    @_exclusive
     def update_schedule_schemes(self, schemes: list) -> bool:
         """
         Update schemes for scheduled downloads
@@ -666,11 +779,14 @@ class SettingsManager:
             license_info = checker.get_license_info()
 
             # Case 2: Sync hospital code from license to settings when reading
-            if license_info.get('is_valid') and license_info.get('hospital_code'):
+            # (once per verification - the checker caches the verified license)
+            if license_info.get('is_valid') and license_info.get('hospital_code') \
+                    and SettingsManager._license_synced_revision != checker.revision:
                 self._sync_hospital_code_from_license(
                     license_info.get('hospital_code'),
                     license_info.get('hospital_name')
                 )
+                SettingsManager._license_synced_revision = checker.revision
 
             return license_info
         except Exception as e:
@@ -755,8 +871,7 @@ class SettingsManager:
         try:
             from utils.license_checker import get_license_checker
             checker = get_license_checker()
-            checker._cached_license = None
-            checker._cache_time = None
+            checker.invalidate()
         except Exception:
             pass
 
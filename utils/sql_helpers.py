@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+SQL Helpers - Shared date expressions and sargable month / fiscal-year predicates
+
+Migration 020 adds stored generated columns, filled by the database on every
+import, and indexes them:
+
+- claim_rep_opip_nhso_item, stm_claim_item:
+    service_month  'YYYY-MM' of the service date (dateadm / date_admit)
+    fiscal_year_be Buddhist Era fiscal year (Oct-Sep) of the service date
+- smt_budget_transfers:
+    posting_month  'YYYYMM' (BE) of posting_date
+
+Month grouping and fiscal-year filters go through the helpers below, which
+use the generated columns for those tables and fall back to the plain
+expression / date range for any other table (e.g. eclaim_drug.dateadm).
+
+Usage:
+    from utils.sql_helpers import sql_fiscal_year_filter, sql_service_month
+
+    where, params = sql_fiscal_year_filter(2569)   # "fiscal_year_be = %s", [2569]
+    month_col = sql_service_month()                 # "service_month"
+"""
+
+from typing import List, Optional, Tuple
+
+from config.database import DB_TYPE
+from utils.fiscal_year import get_fiscal_year_sql_filter_gregorian
+
+CLAIM_TABLE = 'claim_rep_opip_nhso_item'
+
+# table -> service date column behind service_month / fiscal_year_be
+SERVICE_DATE_COLUMNS = {
+    'claim_rep_opip_nhso_item': 'dateadm',
+    'stm_claim_item': 'date_admit',
+}
+
+
+# Database-specific expressions for PostgreSQL/MySQL compatibility
+# Note: MySQL % in DATE_FORMAT must be escaped as %% when used with cursor.execute()
+def sql_extract_year(column: str) -> str:
+    """Generate SQL for extracting year as integer"""
+    if DB_TYPE == 'mysql':
+        return f"YEAR({column})"
+    return f"EXTRACT(YEAR FROM {column})::int"
+
+
+def sql_extract_month(column: str) -> str:
+    """Generate SQL for extracting month"""
+    if DB_TYPE == 'mysql':
+        return f"MONTH({column})"
+    return f"EXTRACT(MONTH FROM {column})"
+
+
+def sql_format_year_month(column: str) -> str:
+    """Generate SQL for formatting date as YYYY-MM"""
+    if DB_TYPE == 'mysql':
+        return f"DATE_FORMAT({column}, '%%Y-%%m')"
+    return f"TO_CHAR({column}, 'YYYY-MM')"
+
+
+def sql_be_month(column: str) -> str:
+    """Generate SQL for Buddhist Era YYYYMM format"""
+    if DB_TYPE == 'mysql':
+        return f"CONCAT(YEAR({column}) + 543, LPAD(MONTH({column}), 2, '0'))"
+    return f"(EXTRACT(YEAR FROM {column})::int + 543)::text || LPAD(EXTRACT(MONTH FROM {column})::int::text, 2, '0')"
+
+
+def sql_cast_float(expr: str) -> str:
+    """Generate SQL for casting to a float (fetched as Python float, not Decimal)"""
+    if DB_TYPE == 'mysql':
+        return f"CAST({expr} AS DOUBLE)"
+    return f"CAST({expr} AS DOUBLE PRECISION)"
+
+
+def _qualify(column: str, alias: str = '') -> str:
+    return f"{alias}.{column}" if alias else column
+
+
+def has_service_columns(table: str, column: str = 'dateadm') -> bool:
+    """True if table has generated service_month / fiscal_year_be for column"""
+    return SERVICE_DATE_COLUMNS.get(table) == column
+
+
+def sql_service_month(table: str = CLAIM_TABLE, column: str = 'dateadm', alias: str = '') -> str:
+    """'YYYY-MM' of the service date, from the generated column where available"""
+    if has_service_columns(table, column):
+        return _qualify('service_month', alias)
+    return sql_format_year_month(_qualify(column, alias))
+
+
+def sql_fiscal_year(table: str = CLAIM_TABLE, column: str = 'dateadm', alias: str = '') -> str:
+    """Buddhist Era fiscal year of the service date, from the generated column where available"""
+    if has_service_columns(table, column):
+        return _qualify('fiscal_year_be', alias)
+    qualified = _qualify(column, alias)
+    year_expr = sql_extract_year(qualified)
+    return f"CASE WHEN {sql_extract_month(qualified)} >= 10 THEN {year_expr} + 544 ELSE {year_expr} + 543 END"
+
+
+def sql_fiscal_year_filter(fiscal_year: int, table: str = CLAIM_TABLE, column: str = 'dateadm',
+                           alias: str = '') -> Tuple[str, List]:
+    """
+    Fiscal-year predicate for a service date
+
+    Returns:
+        (where_clause, params): "fiscal_year_be = %s" for tables with generated
+        columns, otherwise a date range on column (both index range scans)
+    """
+    if has_service_columns(table, column):
+        return f"{_qualify('fiscal_year_be', alias)} = %s", [fiscal_year]
+    return get_fiscal_year_sql_filter_gregorian(fiscal_year, _qualify(column, alias))
+
+
+def sql_posting_fiscal_year_filter(fiscal_year: int, alias: str = '') -> Tuple[str, List]:
+    """Fiscal-year predicate on smt_budget_transfers.posting_month (Oct-Sep, BE)"""
+    return f"{_qualify('posting_month', alias)} BETWEEN %s AND %s", [f"{fiscal_year - 1}10", f"{fiscal_year}09"]
+
+
+def service_month_to_be(service_month: Optional[str]) -> Optional[str]:
+    """'2025-10' -> '256810'"""
+    if not service_month or len(service_month) != 7:
+        return None
+    return f"{int(service_month[:4]) + 543}{service_month[5:7]}"
+
+
+def be_month_to_service_month(month_be: Optional[str]) -> Optional[str]:
+    """'256810' -> '2025-10'"""
+    if not month_be or len(month_be) != 6 or not month_be.isdigit():
+        return None
+    return f"{int(month_be[:4]) - 543}-{month_be[4:6]}"
+
+
+def fiscal_year_of_be_month(month_be: Optional[str]) -> Optional[int]:
+    """'256810' -> 2569 (October starts the next fiscal year)"""
+    if not month_be or len(month_be) != 6 or not month_be.isdigit():
+        return None
+    return int(month_be[:4]) + (1 if int(month_be[4:6]) >= 10 else 0)
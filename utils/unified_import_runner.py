@@ -1,16 +1,40 @@
 #!/usr/bin/env python3
 """
-Unified Import Runner - Manage background import processes for all types (REP, STM, SMT)
+Unified Import Runner - Manage background imports for all types (REP, STM, SMT)
+
+Imports run as 'import' jobs on the in-process job executor: a warm worker
+thread calls unified_import_batch directly, so no interpreter is started per
+import, only one import runs at a time (the 'import' pool has one worker by
+default), and stop() cancels between files instead of killing a process.
 """
 
-import subprocess
-import sys
-import os
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from config.db_pool import get_connection, return_connection
+from utils.job_executor import JobContext, JobExecutor, job_executor
+
+IMPORT_JOB = 'import'
+IMPORT_POOL = 'import'
+
+
+def run_import_job(context: JobContext) -> Dict[str, Any]:
+    """Job handler: import a file, a list of files or a directory in this process"""
+    import unified_import_batch
+
+    params = context.params
+    import_type = params['import_type']
+    should_stop = lambda: context.cancelled
+
+    unified_import_batch.stream_log(f"Unified Import started: type={import_type}", 'info', 'import')
+    unified_import_batch.start_progress(import_type)
+
+    if params.get('file'):
+        return unified_import_batch.import_single_file(import_type, params['file'])
+    if params.get('files'):
+        return unified_import_batch.import_files(import_type, params['files'], should_stop)
+    return unified_import_batch.import_directory(import_type, params['directory'], should_stop)
 
 
 class UnifiedImportRunner:
@@ -40,24 +64,17 @@ class UnifiedImportRunner:
         }
     }
 
-    def __init__(self):
-        # Single PID file - only one import at a time
-        self.pid_file = Path('/tmp/eclaim_import.pid')
+    def __init__(self, executor: JobExecutor = job_executor):
+        self.executor = executor
+        self.executor.register(IMPORT_JOB, run_import_job, pool=IMPORT_POOL)
 
-    def is_running(self) -> bool:
-        """Check if any import is currently running"""
-        if not self.pid_file.exists():
-            return False
+    def get_active_job(self) -> Optional[Dict[str, Any]]:
+        """Queued or running import job, if any"""
+        return self.executor.active_job(IMPORT_POOL)
 
-        try:
-            pid = int(self.pid_file.read_text().strip())
-            # Check if process exists using os.kill with signal 0
-            os.kill(pid, 0)
-            return True
-        except (ValueError, OSError, ProcessLookupError):
-            # PID file exists but process is dead
-            self.pid_file.unlink(missing_ok=True)
-            return False
+    def is_running(self) -> bool:
+        """Check if any import is currently queued or running"""
+        return self.get_active_job() is not None
 
     def get_progress(self, import_type: str = None) -> Dict:
         """
@@ -139,10 +156,24 @@ class UnifiedImportRunner:
 
     def get_current_import_type(self) -> Optional[str]:
         """Get the type of currently running import"""
-        progress = self.get_progress()
-        if progress.get('running'):
-            return progress.get('import_type')
-        return None
+        job = self.get_active_job()
+        return job['params'].get('import_type') if job else None
+
+    def _submit(self, params: Dict[str, Any]) -> Dict:
+        """Queue an import job, refusing if another import is queued or running"""
+        import unified_import_batch
+
+        # Replace the last import's final snapshot before watchers connect
+        unified_import_batch.start_progress(params['import_type'], status='pending')
+        try:
+            job_id = self.executor.submit(IMPORT_JOB, params, exclusive=True)
+        except ValueError:
+            current_type = self.get_current_import_type()
+            return {
+                'success': False,
+                'error': f'Import already running (type: {current_type or "unknown"})'
+            }
+        return {'success': True, 'job_id': job_id}
 
     def start_import(self, import_type: str, files: Optional[List[str]] = None) -> Dict:
         """
@@ -153,7 +184,7 @@ class UnifiedImportRunner:
             files: Optional list of specific files to import
 
         Returns:
-            Dict with success status and PID
+            Dict with success status and job ID
         """
         # Validate import type
         if import_type not in self.VALID_TYPES:
@@ -187,43 +218,22 @@ class UnifiedImportRunner:
                 'message': f'No {import_type.upper()} files to import',
                 'total': 0
             }
+
         # Progress tracking via database (eclaim_imported_files table)
         # Generate import_id for tracking
         import_id = f"import_{import_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-        # Build command
-        cmd = [
-            sys.executable,
-            'unified_import_batch.py',
-            '--type', import_type,
-            '--directory', str(directory)
-        ]
-
-        # Add specific files if provided
+        params = {'import_type': import_type, 'directory': str(directory)}
         if files:
-            cmd.extend(['--files'] + files)
-
-        # Write to log file
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-        log_file = log_dir / f"import_{import_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        with open(log_file, 'w') as log_f:
-            process = subprocess.Popen(
-                cmd,
-                stdout=log_f,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=os.environ.get('APP_ROOT', str(Path(__file__).parent.parent)),
-                start_new_session=True  # Detach from parent
-            )
-
-        # Save PID
-        self.pid_file.write_text(str(process.pid))
+            params['files'] = [f if Path(f).exists() else str(directory / f) for f in files]
+
+        result = self._submit(params)
+        if not result['success']:
+            return result
 
         return {
             'success': True,
-            'pid': process.pid,
+            'job_id': result['job_id'],
             'import_id': import_id,
             'import_type': import_type,
             'total_files': total_files
@@ -238,7 +248,7 @@ class UnifiedImportRunner:
             filepath: Path to file to import
 
         Returns:
-            Dict with success status and PID
+            Dict with success status and job ID
         """
         # Validate import type
         if import_type not in self.VALID_TYPES:
@@ -261,74 +271,43 @@ class UnifiedImportRunner:
                 'success': False,
                 'error': f'File not found: {filepath}'
             }
+
         # Progress tracking via database (eclaim_imported_files table)
         # Generate import_id for tracking
         import_id = f"import_{import_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-        # Build command
-        cmd = [
-            sys.executable,
-            'unified_import_batch.py',
-            '--type', import_type,
-            '--file', str(filepath)
-        ]
-
-        # Write to log file
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-        log_file = log_dir / f"import_{import_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-
-        with open(log_file, 'w') as log_f:
-            process = subprocess.Popen(
-                cmd,
-                stdout=log_f,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=os.environ.get('APP_ROOT', str(Path(__file__).parent.parent)),
-                start_new_session=True
-            )
-
-        # Save PID
-        self.pid_file.write_text(str(process.pid))
+        result = self._submit({'import_type': import_type, 'file': str(filepath)})
+        if not result['success']:
+            return result
 
         return {
             'success': True,
-            'pid': process.pid,
+            'job_id': result['job_id'],
             'import_id': import_id,
             'import_type': import_type,
-            'filename': Path(filepath).name
+            'filename': file_path.name
         }
 
     def stop(self) -> Dict:
-        """Stop running import process"""
-        if not self.is_running():
+        """Cancel the running import (it stops before the next file)"""
+        job = self.get_active_job()
+        if not job:
             return {
                 'success': False,
                 'error': 'No import running'
             }
 
-        try:
-            pid = int(self.pid_file.read_text().strip())
-            subprocess.run(['kill', str(pid)], check=True)
-            self.pid_file.unlink(missing_ok=True)            # Progress is tracked in database
-
-            return {
-                'success': True,
-                'message': 'Import cancelled'
-            }
-
-        except (ValueError, subprocess.CalledProcessError) as e:
+        if not self.executor.cancel(job['id']):
             return {
                 'success': False,
-                'error': str(e)
+                'error': 'Import already finished'
             }
 
-    def cleanup(self):
-        """Cleanup old progress files and PID files"""
-        self.pid_file.unlink(missing_ok=True)
-
-        # Keep progress file for history, but mark as completed if stale
-        # Progress is tracked in database, no JSON cleanup needed
+        return {
+            'success': True,
+            'message': 'Import cancelled',
+            'job_id': job['id']
+        }
 
 
 # Singleton instance for use across app
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Vendor Code - Normalised SMT vendor numbers
+
+SMT reports the hospital as a zero-padded vendor number ("0000010670") while
+health_offices keys hospitals by 5-digit hcode5 ("10670"). smt_budget_transfers
+stores the normalised form in vendor_code5 (migration 018), so joins and
+filters are plain indexed equalities:
+
+    JOIN health_offices h ON h.hcode5 = s.vendor_code5
+    WHERE s.vendor_code5 = %s
+"""
+
+import re
+from typing import Optional
+
+NON_DIGIT_RE = re.compile(r'\D')
+
+
+def normalize_vendor_code(value) -> Optional[str]:
+    """
+    Normalise a vendor number / hospital code to its hcode5 form
+
+    Drops non-digits and leading zeros ("0000010670" -> "10670"). A code of
+    only zeros keeps its digits; a code without digits returns None.
+    """
+    if value is None:
+        return None
+    digits = NON_DIGIT_RE.sub('', str(value))
+    return digits.lstrip('0') or digits or None
+